@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Benchmark BM25Index top-k search against rank_bm25.BM25Okapi.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_bm25.py [--sizes 1000 10000 100000] [--queries 200] [--k 10]
+"""
+
+import argparse
+import time
+
+import numpy as np
+from rank_bm25 import BM25Okapi
+
+from openchatbi.bm25_index import BM25Index
+
+
+def make_corpus(num_docs: int, vocab_size: int, rng: np.random.Generator) -> list[list[str]]:
+    """Generate column-like documents with a Zipf-distributed vocabulary."""
+    vocab = np.array([f"w{i}" for i in range(vocab_size)])
+    lengths = rng.integers(3, 20, size=num_docs)
+    ranks = np.minimum(rng.zipf(1.3, size=int(lengths.sum())) - 1, vocab_size - 1)
+    words = vocab[ranks].tolist()
+    corpus, offset = [], 0
+    for length in lengths:
+        corpus.append(words[offset : offset + length])
+        offset += length
+    return corpus
+
+
+def bench(fn, queries) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BM25 top-k search")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    print(f"{'docs':>8} {'build okapi':>12} {'build index':>12} {'okapi ms/q':>11} {'index ms/q':>11} {'speedup':>8}")
+    for size in args.sizes:
+        corpus = make_corpus(size, vocab_size=max(1000, size // 5), rng=rng)
+        sampled_docs = rng.integers(0, size, size=args.queries)
+        queries = [list(rng.choice(corpus[i], size=min(3, len(corpus[i])))) for i in sampled_docs]
+
+        start = time.perf_counter()
+        okapi = BM25Okapi(corpus)
+        build_okapi = time.perf_counter() - start
+        start = time.perf_counter()
+        index = BM25Index.from_corpus(corpus)
+        build_index = time.perf_counter() - start
+
+        def okapi_top_k(query, okapi=okapi):
+            scores = okapi.get_scores(query)
+            return sorted(enumerate(scores), key=lambda x: x[1], reverse=True)[: args.k]
+
+        okapi_ms = bench(okapi_top_k, queries)
+        index_ms = bench(lambda query, index=index: index.top_k(query, args.k), queries)
+        print(
+            f"{size:>8} {build_okapi:>11.2f}s {build_index:>11.2f}s {okapi_ms:>11.3f} {index_ms:>11.3f}"
+            f" {okapi_ms / index_ms:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
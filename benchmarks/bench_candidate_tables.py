@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Benchmark building the candidate tables of a question with the table index against the table x column loop.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_candidate_tables.py [--tables 500] [--columns 5000] [--relevant 300]
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+
+from openchatbi.catalog.schema_retrival import TableColumnIndex
+from openchatbi.constants import datetime_format
+
+
+def make_catalog(tables: int, columns: int, rng: np.random.Generator):
+    """Generate tables of 20-400 random columns, each with a start time."""
+    col_dict = {f"col_{i}": {"column_name": f"col_{i}", "category": "dimension"} for i in range(columns)}
+    column_tables_mapping: dict[str, list[str]] = {}
+    table_infos = {}
+    for t in range(tables):
+        table = f"table_{t}"
+        for column_id in rng.choice(columns, size=rng.integers(20, 400), replace=False):
+            column_tables_mapping.setdefault(f"col_{column_id}", []).append(table)
+        table_infos[table] = {"start_time": f"2024-{t % 12 + 1:02d}-01 00:00:00"}
+    return col_dict, column_tables_mapping, table_infos
+
+
+def loop_candidates(col_dict, column_tables_mapping, table_infos, relevant_columns, start_time):
+    """The previous implementation: copy and check every relevant column of every candidate table."""
+    start_time = datetime.strptime(start_time, datetime_format)
+    candidate_tables = set()
+    for column in relevant_columns:
+        candidate_tables.update(column_tables_mapping.get(column, []))
+    related = {}
+    for table_name in candidate_tables:
+        table_info = table_infos[table_name]
+        if datetime.strptime(table_info["start_time"], datetime_format) > start_time:
+            continue
+        columns = []
+        for column_name in relevant_columns:
+            column_dict = col_dict[column_name].copy()
+            if table_name not in column_tables_mapping.get(column_name, []):
+                continue
+            columns.append(column_dict)
+        related[table_name] = (table_info, columns)
+    return related
+
+
+def index_candidates(col_dict, index, table_infos, relevant_columns, start_time):
+    """Candidate tables from the table bitsets and column sets."""
+    start_time = datetime.strptime(start_time, datetime_format)
+    column_ranks = {column_name: rank for rank, column_name in enumerate(relevant_columns)}
+    relevant_column_set = frozenset(column_ranks)
+    related = {}
+    for table_name in index.tables_of(relevant_columns):
+        if index.table_start_times[table_name] > start_time:
+            continue
+        table_columns = sorted(index.table_columns[table_name] & relevant_column_set, key=column_ranks.get)
+        related[table_name] = (table_infos[table_name], [col_dict[column_name] for column_name in table_columns])
+    return related
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark candidate table construction")
+    parser.add_argument("--tables", type=int, default=500)
+    parser.add_argument("--columns", type=int, default=5000)
+    parser.add_argument("--relevant", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    col_dict, column_tables_mapping, table_infos = make_catalog(args.tables, args.columns, rng)
+    relevant_columns = [f"col_{i}" for i in rng.choice(args.columns, size=args.relevant, replace=False)]
+    relevant_columns = [column for column in relevant_columns if column in column_tables_mapping]
+    start = time.perf_counter()
+    index = TableColumnIndex(
+        column_tables_mapping,
+        {table: datetime.strptime(info["start_time"], datetime_format) for table, info in table_infos.items()},
+    )
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        expected = loop_candidates(
+            col_dict, column_tables_mapping, table_infos, relevant_columns, "2024-06-15 00:00:00"
+        )
+    loop_ms = (time.perf_counter() - start) * 1000 / args.repeat
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        result = index_candidates(col_dict, index, table_infos, relevant_columns, "2024-06-15 00:00:00")
+    index_ms = (time.perf_counter() - start) * 1000 / args.repeat
+
+    assert {table: columns for table, (_, columns) in result.items()} == {
+        table: columns for table, (_, columns) in expected.items()
+    }
+    print(
+        f"{'tables':>7} {'relevant':>9} {'candidates':>11} {'loop ms':>9} {'index ms':>9} {'speedup':>8} {'build ms':>9}"
+    )
+    print(
+        f"{args.tables:>7} {len(relevant_columns):>9} {len(result):>11} {loop_ms:>9.2f} {index_ms:>9.2f}"
+        f" {loop_ms / index_ms:>7.1f}x {build_ms:>9.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
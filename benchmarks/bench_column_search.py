@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Benchmark fuzzy column name search against the pairwise edit distance loop.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_column_search.py [--sizes 1000 10000 40000] [--keywords 10]
+"""
+
+import argparse
+import re
+import time
+
+import numpy as np
+
+from openchatbi.catalog.schema_retrival import ColumnNameMatcher, edit_distance_score, normalize_column_name
+
+WORDS = [
+    "user", "revenue", "country", "click", "impression", "ad", "campaign", "cost", "date", "spend",
+    "order", "product", "region", "device", "account", "session", "browser", "page", "event", "channel",
+]  # fmt: skip
+
+
+def make_col_dict(num_columns: int, rng: np.random.Generator) -> dict[str, dict]:
+    """Generate columns named from 1-4 random words with a numeric suffix."""
+    col_dict = {}
+    for i in range(num_columns):
+        words = rng.choice(WORDS, size=rng.integers(1, 5))
+        column_name = "_".join(words) + f"_{i % 100}"
+        col_dict[f"{column_name}_{i}"] = {"column_name": column_name, "display_name": " ".join(words).title()}
+    return col_dict
+
+
+def pairwise_search(col_dict: dict[str, dict], keywords: list[str], top_k: int, threshold: float) -> set[str]:
+    """The previous implementation: normalize and score every column for every keyword."""
+    results = set()
+    for key in {re.sub(r"(_id|_name| id| name)$", "", key.lower()) for key in keywords}:
+        scores = {}
+        for column_name, row in col_dict.items():
+            column_name_score = edit_distance_score(key, re.sub(r"(_id|_name| id| name)$", "", row["column_name"]))
+            display_score = edit_distance_score(key, re.sub(r"(_id|_name| id| name)$", "", row["display_name"].lower()))
+            if column_name_score < threshold or display_score < threshold:
+                scores[column_name] = min(column_name_score, display_score)
+        results.update(name for name, _ in sorted(scores.items(), key=lambda x: x[1])[:top_k])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fuzzy column name search")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 40_000])
+    parser.add_argument("--keywords", type=int, default=10)
+    parser.add_argument("--threshold", type=float, default=0.3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    keywords = [" ".join(rng.choice(WORDS, size=rng.integers(1, 3))) for _ in range(args.keywords)]
+    print(f"{'columns':>8} {'build':>9} {'pairwise ms':>12} {'matcher ms':>11} {'speedup':>8}")
+    for size in args.sizes:
+        col_dict = make_col_dict(size, rng)
+        start = time.perf_counter()
+        matcher = ColumnNameMatcher(col_dict)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        pairwise_search(col_dict, keywords, args.keywords, args.threshold)
+        pairwise_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        for key in {normalize_column_name(key) for key in keywords}:
+            matcher.search(key, args.keywords, args.threshold)
+        matcher_ms = (time.perf_counter() - start) * 1000
+        print(
+            f"{size:>8} {build_ms:>7.1f}ms {pairwise_ms:>12.1f} {matcher_ms:>11.2f} {pairwise_ms / matcher_ms:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
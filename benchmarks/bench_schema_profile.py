@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Benchmark schema profiling of query results against the per-column analysis loop.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_schema_profile.py [--rows 1000000] [--columns 50]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from openchatbi.text2sql.result_profile import profile_dataframe
+
+
+def make_frame(rows: int, columns: int, rng: np.random.Generator) -> pd.DataFrame:
+    """Generate a result with numeric, low and high cardinality string, date string and datetime columns."""
+    countries = np.array([f"country_{i}" for i in range(200)], dtype=object)
+    ids = np.array([f"user_{i}" for i in range(rows // 4)], dtype=object)
+    days = np.array(pd.date_range("2020-01-01", periods=1000).strftime("%Y-%m-%d"), dtype=object)
+    data = {}
+    for i in range(columns):
+        kind = i % 5
+        if kind == 0:
+            data[f"metric_{i}"] = rng.random(rows)
+        elif kind == 1:
+            data[f"count_{i}"] = rng.integers(0, 1_000_000, rows)
+        elif kind == 2:
+            data[f"country_{i}"] = countries[rng.integers(0, len(countries), rows)]
+        elif kind == 3:
+            data[f"user_{i}"] = ids[rng.integers(0, len(ids), rows)]
+        else:
+            data[f"day_{i}"] = days[rng.integers(0, len(days), rows)]
+    return pd.DataFrame(data)
+
+
+def analyze_loop(df: pd.DataFrame) -> dict:
+    """The previous implementation: classify and count distinct values column by column."""
+    schema_info = {
+        "columns": list(df.columns),
+        "column_types": {},
+        "row_count": len(df),
+        "numeric_columns": [],
+        "categorical_columns": [],
+        "datetime_columns": [],
+    }
+    for col in df.columns:
+        schema_info["column_types"][col] = str(df[col].dtype)
+        if df[col].dtype in ["int64", "float64", "int32", "float32"]:
+            schema_info["numeric_columns"].append(col)
+        elif df[col].dtype == "object":
+            try:
+                pd.to_datetime(df[col].head(10))
+                schema_info["datetime_columns"].append(col)
+            except Exception:
+                schema_info["categorical_columns"].append(col)
+    schema_info["unique_counts"] = {col: df[col].nunique() for col in schema_info["categorical_columns"]}
+    return schema_info
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark schema profiling of query results")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--columns", type=int, default=50)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows, args.columns, np.random.default_rng(42))
+    start = time.perf_counter()
+    loop_info = analyze_loop(df)
+    loop_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    profile_info = profile_dataframe(df)
+    profile_ms = (time.perf_counter() - start) * 1000
+
+    assert profile_info["categorical_columns"] == loop_info["categorical_columns"]
+    errors = [
+        abs(profile_info["unique_counts"][col] - exact) / exact for col, exact in loop_info["unique_counts"].items()
+    ]
+    print(f"{'rows':>9} {'columns':>8} {'loop ms':>9} {'profile ms':>11} {'speedup':>8} {'max distinct error':>19}")
+    print(
+        f"{args.rows:>9} {args.columns:>8} {loop_ms:>9.1f} {profile_ms:>11.1f}"
+        f" {loop_ms / profile_ms:>7.1f}x {max(errors, default=0):>18.1%}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Evaluate the heuristic table selector on the table selection examples of the configured catalog.
+
+Each labelled example question is linked to its candidate tables with the words of the question as keywords,
+dimensions and metrics, and its similar examples are retrieved without the question itself. Reports how often
+the LLM call is avoided, and how often the selected table is one of the labelled tables.
+
+Usage:
+    PYTHONPATH=. python benchmarks/eval_table_selection.py [--min-coverage 0.8] [--min-margin 0.15]
+"""
+
+import argparse
+
+from openchatbi import config
+from openchatbi.text2sql.data import table_selection_example_dict, table_selection_retriever
+from openchatbi.text2sql.schema_linking import get_related_tables_and_columns
+from openchatbi.text2sql.speculative_retrieval import question_terms
+from openchatbi.text2sql.table_selector import (
+    DEFAULT_TABLE_SELECTION_HEURISTIC_CONFIG,
+    HeuristicTableSelector,
+    evaluate_table_selector,
+)
+
+
+def labelled_cases(catalog):
+    """Build the selector inputs of each labelled example question."""
+    for question, expected in catalog.get_table_selection_examples():
+        terms = question_terms(question)
+        related_table_column_dict, relevant_columns = get_related_tables_and_columns(catalog, terms, terms, terms)
+        similar_examples = {
+            document.page_content: [
+                table
+                for table in table_selection_example_dict[document.page_content]
+                if table in related_table_column_dict
+            ]
+            for document in table_selection_retriever.invoke(question)
+            if document.page_content != question
+        }
+        yield {
+            "related_table_column_dict": related_table_column_dict,
+            "relevant_columns": relevant_columns,
+            "dimensions": terms,
+            "metrics": terms,
+            "similar_examples": {example: tables for example, tables in similar_examples.items() if tables},
+            "expected": expected,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the heuristic table selector on labelled examples")
+    parser.add_argument("--min-coverage", type=float, default=DEFAULT_TABLE_SELECTION_HEURISTIC_CONFIG["min_coverage"])
+    parser.add_argument("--min-margin", type=float, default=DEFAULT_TABLE_SELECTION_HEURISTIC_CONFIG["min_margin"])
+    args = parser.parse_args()
+
+    selector = HeuristicTableSelector(min_coverage=args.min_coverage, min_margin=args.min_margin)
+    result = evaluate_table_selector(selector, labelled_cases(config.get().catalog_store))
+    print(f"{'cases':>6} {'decided':>8} {'LLM avoided':>12} {'agreed':>7} {'agreement':>10}")
+    print(
+        f"{result['cases']:>6} {result['decided']:>8} {result['avoided_rate']:>12.1%}"
+        f" {result['agreed']:>7} {result['agreement']:>10.1%}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -112,6 +112,13 @@ def _format_sql_response(sql_graph_response: dict) -> str:
         response_parts.append(f"SQL Query:\n```sql\n{sql}\n```")
     if data:
         response_parts.append(f"\nQuery Results (CSV format):\n```csv\n{data}\n```")
+    result_handle = sql_graph_response.get("result_handle", "")
+    if result_handle:
+        stored_rows = sql_graph_response.get("result_info", {}).get("stored_rows", "all")
+        response_parts.append(
+            f"Full Query Results: stored as `{result_handle}` ({stored_rows} rows), "
+            f'load them as a DataFrame in Python code with `load_result("{result_handle}")`.'
+        )
 
     # Include visualization status
     if visualization_dsl and "error" not in visualization_dsl:
@@ -293,7 +300,7 @@ def _build_graph_core(
     Returns:
         CompiledStateGraph: Compiled agent graph ready for execution
     """
-    sql_graph = build_sql_graph(catalog, checkpointer, memory_store)
+    sql_graph = build_sql_graph(catalog, checkpointer, memory_store, sync_mode=sync_mode)
     call_sql_graph_tool = get_sql_tools(sql_graph=sql_graph, sync_mode=sync_mode)
 
     # Use provided memory tools or create them
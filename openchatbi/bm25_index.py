@@ -0,0 +1,494 @@
+"""BM25 index with incremental updates and an on-disk, memory-mappable snapshot format."""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from collections import Counter
+from collections.abc import Callable, Iterable
+
+import numpy as np
+
+from openchatbi.text_segmenter import _segmenter
+
+logger = logging.getLogger(__name__)
+
+# Bump when the snapshot layout or scoring parameters change, so stale snapshots are rebuilt
+SNAPSHOT_FORMAT_VERSION = 2
+
+_ARRAY_FILES = ("indptr", "doc_ids", "term_freqs", "doc_lens")
+
+
+def _ensure_capacity(array: np.ndarray, size: int) -> np.ndarray:
+    """Return a writable array holding at least `size` items, growing geometrically and keeping the content."""
+    if size <= len(array) and array.flags.writeable:
+        return array
+    grown = np.zeros(max(size, 2 * len(array), 16), dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+class BM25Index:
+    """Okapi BM25 index stored as a term dictionary plus CSR postings.
+
+    Scores are identical to ``rank_bm25.BM25Okapi`` built over the live documents with the same
+    parameters. The index can be saved as a snapshot directory of ``.npy`` arrays and loaded
+    memory-mapped, so worker processes share the pages instead of re-tokenizing the corpus on
+    every start.
+
+    Documents can be added and removed in O(tokens of the document): added documents go to
+    per-term postings lists next to the CSR arrays, removed documents are tombstoned, and
+    document frequencies and lengths are maintained incrementally. ``compact`` merges them
+    back into CSR arrays and renumbers the live documents.
+
+    Snapshot layout:
+        - meta.json: format version, content hash, BM25 parameters and corpus statistics
+        - terms.json: term dictionary, term id is the position in the list
+        - indptr.npy: postings offsets per term id (CSR row pointer)
+        - doc_ids.npy / term_freqs.npy: postings, document id and term frequency
+        - doc_lens.npy: token count per document
+    """
+
+    def __init__(
+        self,
+        terms: list[str],
+        indptr: np.ndarray,
+        doc_ids: np.ndarray,
+        term_freqs: np.ndarray,
+        doc_lens: np.ndarray,
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+    ):
+        """Initialize index from its arrays, use ``from_corpus`` or ``load`` to create one.
+
+        Args:
+            terms (list[str]): Term dictionary, the position of a term is its term id.
+            indptr (np.ndarray): Postings offsets, postings of term i are in [indptr[i], indptr[i + 1]).
+            doc_ids (np.ndarray): Document id of each posting, ascending within a term.
+            term_freqs (np.ndarray): Term frequency of each posting.
+            doc_lens (np.ndarray): Token count of each document.
+            k1 (float): BM25 term frequency saturation parameter.
+            b (float): BM25 document length normalization parameter.
+            epsilon (float): Floor of negative idf values, as a fraction of the average idf.
+        """
+        self.terms = terms
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+
+        # Document slots, including tombstoned ones; arrays may have spare capacity
+        self.corpus_size = len(doc_lens)
+        self._doc_lens = doc_lens
+        self._deleted = np.zeros(self.corpus_size, dtype=bool)
+        self.deleted_count = 0
+        self._total_len = int(doc_lens.sum())
+        self._doc_freqs = np.diff(indptr)
+        # Postings of documents added after the CSR arrays were built: term id -> (doc ids, freqs)
+        self._added_postings: dict[int, tuple[list[int], list[int]]] = {}
+        self._added_posting_count = 0
+        self._eps: float | None = None
+
+    @classmethod
+    def from_corpus(
+        cls, tokenized_corpus: list[list[str]], k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25
+    ) -> "BM25Index":
+        """Build index from tokenized documents.
+
+        Args:
+            tokenized_corpus (list[list[str]]): Tokens of each document.
+            k1 (float): BM25 term frequency saturation parameter.
+            b (float): BM25 document length normalization parameter.
+            epsilon (float): Floor of negative idf values, as a fraction of the average idf.
+
+        Returns:
+            BM25Index: The built index.
+        """
+        term_ids: dict[str, int] = {}
+        posting_terms: list[int] = []
+        posting_docs: list[int] = []
+        posting_freqs: list[int] = []
+        doc_lens = np.zeros(len(tokenized_corpus), dtype=np.int32)
+        for doc_id, tokens in enumerate(tokenized_corpus):
+            doc_lens[doc_id] = len(tokens)
+            counts = Counter(tokens)
+            posting_terms.extend(term_ids.setdefault(term, len(term_ids)) for term in counts)
+            posting_docs.extend([doc_id] * len(counts))
+            posting_freqs.extend(counts.values())
+
+        return cls._from_postings(
+            list(term_ids),
+            np.array(posting_terms, dtype=np.int64),
+            np.array(posting_docs, dtype=np.int32),
+            np.array(posting_freqs, dtype=np.int32),
+            doc_lens,
+            k1=k1,
+            b=b,
+            epsilon=epsilon,
+        )
+
+    @classmethod
+    def _from_postings(
+        cls,
+        terms: list[str],
+        posting_terms: np.ndarray,
+        posting_docs: np.ndarray,
+        posting_freqs: np.ndarray,
+        doc_lens: np.ndarray,
+        **params,
+    ) -> "BM25Index":
+        """Build CSR arrays from flat postings ordered by document id."""
+        # group postings by term, stable sort keeps them ordered by document id
+        order = np.argsort(posting_terms, kind="stable")
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(np.bincount(posting_terms, minlength=len(terms)))
+        return cls(terms, indptr, posting_docs[order], posting_freqs[order], doc_lens, **params)
+
+    @property
+    def doc_count(self) -> int:
+        """Number of live (not deleted) documents."""
+        return self.corpus_size - self.deleted_count
+
+    @property
+    def avgdl(self) -> float:
+        return self._total_len / self.doc_count if self.doc_count else 0.0
+
+    @property
+    def doc_lens(self) -> np.ndarray:
+        return self._doc_lens[: self.corpus_size]
+
+    def _idf(self, term_id: int) -> float:
+        """Calculate idf the same way as BM25Okapi, flooring negative values to epsilon * average idf."""
+        doc_freq = self._doc_freqs[term_id]
+        idf = np.log(self.doc_count - doc_freq + 0.5) - np.log(doc_freq + 0.5)
+        if idf >= 0:
+            return float(idf)
+        if self._eps is None:
+            # average idf over the terms occurring in live documents, cached until the next update
+            doc_freqs = self._doc_freqs[: len(self.terms)]
+            doc_freqs = doc_freqs[doc_freqs > 0]
+            idfs = np.log(self.doc_count - doc_freqs + 0.5) - np.log(doc_freqs + 0.5)
+            self._eps = float(self.epsilon * (idfs.sum() / len(idfs)))
+        return self._eps
+
+    def _term_postings(self, term_id: int) -> tuple[np.ndarray, np.ndarray]:
+        """Get live postings of a term as (ascending document ids, term frequencies)."""
+        doc_ids, freqs = np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+        if term_id + 1 < len(self.indptr):
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            doc_ids, freqs = self.doc_ids[start:end], self.term_freqs[start:end]
+        if term_id in self._added_postings:
+            added_ids, added_freqs = self._added_postings[term_id]
+            doc_ids = np.concatenate([doc_ids, np.array(added_ids, dtype=np.int32)])
+            freqs = np.concatenate([freqs, np.array(added_freqs, dtype=np.int32)])
+        if self.deleted_count:
+            live = ~self._deleted[doc_ids]
+            doc_ids, freqs = doc_ids[live], freqs[live]
+        return doc_ids, freqs
+
+    def get_scores(self, query_tokens: list[str]) -> np.ndarray:
+        """Calculate BM25 scores of all document slots, only visiting postings of the query terms.
+
+        Args:
+            query_tokens (list[str]): Tokenized query, repeated tokens are counted repeatedly.
+
+        Returns:
+            np.ndarray: Score of each document slot, deleted documents score 0.
+        """
+        scores = np.zeros(self.corpus_size)
+        if not self.doc_count:
+            return scores
+        doc_ids, candidate_scores = self._score_candidates(query_tokens)
+        scores[doc_ids] = candidate_scores
+        return scores
+
+    def _score_candidates(self, query_tokens: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """Accumulate BM25 scores of the documents in the postings of the query terms.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (ascending document ids, their scores)
+        """
+        id_parts, score_parts = [], []
+        avgdl = self.avgdl
+        for token in query_tokens:
+            term_id = self.term_ids.get(token)
+            if term_id is None:
+                continue
+            doc_ids, freqs = self._term_postings(term_id)
+            if not len(doc_ids):
+                continue
+            norm = self.k1 * (1 - self.b + self.b * self._doc_lens[doc_ids] / avgdl)
+            id_parts.append(doc_ids)
+            score_parts.append(self._idf(term_id) * (freqs * (self.k1 + 1) / (freqs + norm)))
+        if not id_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        if len(id_parts) == 1:
+            return np.asarray(id_parts[0], dtype=np.int64), score_parts[0]
+        unique_ids, inverse = np.unique(np.concatenate(id_parts), return_inverse=True)
+        return unique_ids, np.bincount(inverse, weights=np.concatenate(score_parts), minlength=len(unique_ids))
+
+    def top_k(self, query_tokens: list[str], k: int) -> list[tuple[int, float]]:
+        """Get the k best scoring documents, ordered the same as a stable descending sort of ``get_scores``.
+
+        Only documents in the postings of the query terms are scored, the k best are selected with
+        ``argpartition``. If fewer than k documents match, zero score documents fill up in id order.
+
+        Args:
+            query_tokens (list[str]): Tokenized query.
+            k (int): Number of documents to return.
+
+        Returns:
+            list[tuple[int, float]]: (document id, score) pairs, best first.
+        """
+        k = min(k, self.doc_count)
+        if k <= 0:
+            return []
+        doc_ids, scores = self._score_candidates(query_tokens)
+
+        positive = scores > 0
+        pos_ids, pos_scores = doc_ids[positive], scores[positive]
+        if len(pos_scores) > k:
+            # keep every document tied with the k-th score so ties are broken by document id
+            kth_score = pos_scores[np.argpartition(pos_scores, len(pos_scores) - k)[len(pos_scores) - k]]
+            keep = pos_scores >= kth_score
+            pos_ids, pos_scores = pos_ids[keep], pos_scores[keep]
+        order = np.lexsort((pos_ids, -pos_scores))[:k]
+        results = [(int(pos_ids[i]), float(pos_scores[i])) for i in order]
+        if len(results) == k:
+            return results
+
+        # fill up with zero score documents, then negative ones (possible with floored idf)
+        nonzero_ids = set(doc_ids[scores != 0].tolist())
+        doc_id = 0
+        while len(results) < k and doc_id < self.corpus_size:
+            if doc_id not in nonzero_ids and not self._deleted[doc_id]:
+                results.append((doc_id, 0.0))
+            doc_id += 1
+        negative = scores < 0
+        neg_ids, neg_scores = doc_ids[negative], scores[negative]
+        for i in np.lexsort((neg_ids, -neg_scores))[: k - len(results)]:
+            results.append((int(neg_ids[i]), float(neg_scores[i])))
+        return results
+
+    def add_document(self, tokens: list[str]) -> int:
+        """Add a document in O(tokens).
+
+        Args:
+            tokens (list[str]): Tokens of the document.
+
+        Returns:
+            int: Document id of the added document.
+        """
+        doc_id = self.corpus_size
+        self._doc_lens = _ensure_capacity(self._doc_lens, doc_id + 1)
+        self._deleted = _ensure_capacity(self._deleted, doc_id + 1)
+        self._doc_lens[doc_id] = len(tokens)
+        self._deleted[doc_id] = False
+        self.corpus_size += 1
+        self._total_len += len(tokens)
+        for term, freq in Counter(tokens).items():
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                term_id = len(self.terms)
+                self.terms.append(term)
+                self.term_ids[term] = term_id
+                self._doc_freqs = _ensure_capacity(self._doc_freqs, term_id + 1)
+                self._doc_freqs[term_id] = 0
+            added_ids, added_freqs = self._added_postings.setdefault(term_id, ([], []))
+            added_ids.append(doc_id)
+            added_freqs.append(freq)
+            self._doc_freqs = _ensure_capacity(self._doc_freqs, len(self.terms))
+            self._doc_freqs[term_id] += 1
+            self._added_posting_count += 1
+        self._eps = None
+        return doc_id
+
+    def remove_document(self, doc_id: int, tokens: list[str]) -> None:
+        """Tombstone a document in O(tokens), its postings are dropped on the next ``compact``.
+
+        Args:
+            doc_id (int): Document id to remove.
+            tokens (list[str]): Tokens the document was added with, used to update document frequencies.
+        """
+        if self._deleted[doc_id]:
+            return
+        self._deleted[doc_id] = True
+        self.deleted_count += 1
+        self._total_len -= int(self._doc_lens[doc_id])
+        self._doc_freqs = _ensure_capacity(self._doc_freqs, len(self.terms))
+        for term in set(tokens):
+            term_id = self.term_ids.get(term)
+            if term_id is not None:
+                self._doc_freqs[term_id] -= 1
+        self._eps = None
+
+    def needs_compaction(self, ratio: float = 0.25) -> bool:
+        """Whether tombstones or added postings exceed `ratio` of the index, so it is worth compacting."""
+        return self.deleted_count > ratio * self.corpus_size or self._added_posting_count > max(
+            1024, ratio * len(self.doc_ids)
+        )
+
+    def compact(self) -> None:
+        """Merge added postings into the CSR arrays, drop deleted documents and unused terms.
+
+        Live documents are renumbered in their current order, so document id i becomes the i-th live document.
+        """
+        term_count = len(self.terms)
+        base_term_count = len(self.indptr) - 1
+        posting_terms = [np.repeat(np.arange(base_term_count, dtype=np.int64), np.diff(self.indptr))]
+        posting_docs = [np.asarray(self.doc_ids)]
+        posting_freqs = [np.asarray(self.term_freqs)]
+        for term_id, (added_ids, added_freqs) in self._added_postings.items():
+            posting_terms.append(np.full(len(added_ids), term_id, dtype=np.int64))
+            posting_docs.append(np.array(added_ids, dtype=np.int32))
+            posting_freqs.append(np.array(added_freqs, dtype=np.int32))
+        posting_terms = np.concatenate(posting_terms)
+        posting_docs = np.concatenate(posting_docs)
+        posting_freqs = np.concatenate(posting_freqs)
+
+        # drop postings of deleted documents, renumber documents and terms
+        deleted = self._deleted[: self.corpus_size]
+        live = ~deleted[posting_docs]
+        posting_terms, posting_docs, posting_freqs = posting_terms[live], posting_docs[live], posting_freqs[live]
+        new_doc_ids = (np.cumsum(~deleted) - 1).astype(np.int32)
+        used_terms = self._doc_freqs[:term_count] > 0
+        new_term_ids = np.cumsum(used_terms) - 1
+        terms = [term for term, used in zip(self.terms, used_terms, strict=True) if used]
+
+        # restore document order within each term before grouping
+        doc_order = np.argsort(posting_docs, kind="stable")
+        compacted = self._from_postings(
+            terms,
+            new_term_ids[posting_terms[doc_order]],
+            new_doc_ids[posting_docs[doc_order]],
+            posting_freqs[doc_order],
+            np.array(self.doc_lens[~deleted], dtype=np.int32),
+            k1=self.k1,
+            b=self.b,
+            epsilon=self.epsilon,
+        )
+        self.__dict__.update(compacted.__dict__)
+
+    def save(self, path: str, content_hash: str) -> None:
+        """Save the index as a snapshot directory, atomically replacing any existing one.
+
+        Args:
+            path (str): Snapshot directory.
+            content_hash (str): Hash of the indexed content, stored to validate the snapshot on load.
+        """
+        if self.deleted_count or self._added_postings:
+            raise ValueError("BM25 index has pending updates, compact it before saving")
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=parent)
+        try:
+            meta = {
+                "format_version": SNAPSHOT_FORMAT_VERSION,
+                "content_hash": content_hash,
+                "k1": self.k1,
+                "b": self.b,
+                "epsilon": self.epsilon,
+                "corpus_size": self.corpus_size,
+                "term_count": len(self.terms),
+            }
+            with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            with open(os.path.join(tmp_dir, "terms.json"), "w", encoding="utf-8") as f:
+                json.dump(self.terms, f, ensure_ascii=False)
+            for name in _ARRAY_FILES:
+                np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+            # Move the previous snapshot aside instead of deleting it first, so only the two renames
+            # separate it from the new one
+            old_dir = f"{tmp_dir}.old"
+            if os.path.exists(path):
+                os.replace(path, old_dir)
+            os.replace(tmp_dir, path)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path: str, content_hash: str | None = None, mmap: bool = True) -> "BM25Index | None":
+        """Load an index snapshot.
+
+        Args:
+            path (str): Snapshot directory.
+            content_hash (str | None): Expected content hash, None to skip validation.
+            mmap (bool): Memory-map the arrays read-only instead of reading them into memory.
+
+        Returns:
+            BM25Index | None: The loaded index, or None if the snapshot is missing, stale or corrupted.
+        """
+        try:
+            with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+                return None
+            if content_hash is not None and meta.get("content_hash") != content_hash:
+                return None
+            with open(os.path.join(path, "terms.json"), encoding="utf-8") as f:
+                terms = json.load(f)
+            arrays = {
+                name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+                for name in _ARRAY_FILES
+            }
+        except (OSError, ValueError):
+            return None
+        return cls(terms, **arrays, k1=meta["k1"], b=meta["b"], epsilon=meta["epsilon"])
+
+
+def compute_content_hash(texts: Iterable[str]) -> str:
+    """Hash the texts to index together with the tokenizer mode and snapshot format.
+
+    Args:
+        texts (Iterable[str]): Texts in document order.
+
+    Returns:
+        str: Hex digest identifying the index content.
+    """
+    digest = hashlib.sha256(f"v{SNAPSHOT_FORMAT_VERSION}:jieba={_segmenter.use_jieba}".encode())
+    for text in texts:
+        encoded = text.encode("utf-8")
+        digest.update(len(encoded).to_bytes(8, "little"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+def load_or_build_bm25_index(
+    texts: list[str], tokenize: Callable[[str], list[str]], index_dir: str | None = None, name: str = "bm25"
+) -> BM25Index:
+    """Load a BM25 index snapshot matching the texts, or build one and save its snapshot.
+
+    Args:
+        texts (list[str]): Texts to index.
+        tokenize (Callable[[str], list[str]]): Tokenizer applied to each text when building.
+        index_dir (str | None): Directory of index snapshots, None to always build in memory.
+        name (str): Snapshot name, unique per indexed collection.
+
+    Returns:
+        BM25Index: The index of the texts.
+    """
+    if not index_dir:
+        return BM25Index.from_corpus([tokenize(text) for text in texts])
+
+    content_hash = compute_content_hash(texts)
+    path = os.path.join(index_dir, name)
+    index = BM25Index.load(path, content_hash)
+    if index is not None:
+        logger.info(f"Loaded BM25 index snapshot for {name}")
+        return index
+
+    logger.info(f"Building BM25 index snapshot for {name}...")
+    index = BM25Index.from_corpus([tokenize(text) for text in texts])
+    try:
+        index.save(path, content_hash)
+    except OSError as e:
+        logger.warning(f"Failed to save BM25 index snapshot for {name}: {e}")
+    return index
@@ -1,8 +1,11 @@
 import logging
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any
 
 from sqlalchemy import MetaData, inspect
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Engine, Inspector
 
 from .catalog_store import CatalogStore
 
@@ -14,18 +17,128 @@ class DataCatalogLoader:
     The loader to load data catalog from data warehouse metadata and save to catalog store.
     """
 
-    def __init__(self, engine: Engine, include_tables: list[str] | None = None):
+    def __init__(
+        self,
+        engine: Engine,
+        include_tables: list[str] | None = None,
+        max_workers: int = 1,
+        progress_callback: Callable[[str, int, int], None] | None = None,
+    ):
         """
         Initialize catalog loader.
 
         Args:
             engine (Engine): SQLAlchemy engine instance
             include_tables (Optional[List[str]]): List of table names to include, None for all
+            max_workers (int): Number of tables to introspect concurrently, each worker uses its own inspector
+                and checks out connections from the engine pool, so it should not exceed the pool size
+            progress_callback (Optional[Callable[[str, int, int], None]]): Called with (stage, done, total)
+                after each table is introspected
         """
         self.engine = engine
         self.include_tables = include_tables
+        self.max_workers = max(1, max_workers)
+        self.progress_callback = progress_callback
         self.metadata = MetaData()
         self.inspector = inspect(engine)
+        self._local = threading.local()
+
+    def _get_inspector(self) -> Inspector:
+        """Get the inspector of the current thread, the shared inspector caches results and is not thread safe."""
+        if self.max_workers == 1:
+            return self.inspector
+        if not hasattr(self._local, "inspector"):
+            self._local.inspector = inspect(self.engine)
+        return self._local.inspector
+
+    def _report_progress(self, stage: str, done: int, total: int) -> None:
+        if self.progress_callback is not None:
+            self.progress_callback(stage, done, total)
+        # log about every 10% to keep the output short for thousands of tables
+        if done == total or done % max(1, total // 10) == 0:
+            logger.info(f"{stage}: {done}/{total} tables")
+
+    def _map_tables(self, stage: str, func: Callable[[str], Any], table_names: list[str]) -> dict[str, Any]:
+        """
+        Apply func to each table, concurrently with `max_workers` threads, reporting progress.
+
+        Args:
+            stage (str): Name of the step for progress reporting
+            func (Callable[[str], Any]): Function getting the metadata of a table, returns None on failure
+            table_names (List[str]): Table names
+
+        Returns:
+            Dict[str, Any]: Results by table name in the order of table_names, tables with None results are skipped
+        """
+        results = {}
+        total = len(table_names)
+        if self.max_workers == 1 or total <= 1:
+            for done, table_name in enumerate(table_names, 1):
+                results[table_name] = func(table_name)
+                self._report_progress(stage, done, total)
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="catalog-loader") as executor:
+                futures = {executor.submit(func, table_name): table_name for table_name in table_names}
+                for done, future in enumerate(as_completed(futures), 1):
+                    results[futures[future]] = future.result()
+                    self._report_progress(stage, done, total)
+        return {name: results[name] for name in table_names if results[name] is not None}
+
+    def _get_table_columns(self, table_name: str) -> list[dict[str, Any]] | None:
+        """
+        Get the column information of a table
+
+        Args:
+            table_name (str): Name of the table
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: List of column information, None if failed
+        """
+        try:
+            # Get column information for the table
+            columns = self._get_inspector().get_columns(table_name)
+            column_list = []
+            for column in columns:
+                is_common_column = column not in ("id", "name", "type", "status")
+                column_info = {
+                    "column_name": column["name"],
+                    "display_name": "",
+                    "alias": "",
+                    "type": str(column["type"]),
+                    "category": "",
+                    "tag": "",
+                    "description": column.get("comment", "") or "",
+                    "dimension_table": "",
+                    "default": str(column.get("default", "")) if column.get("default") is not None else "",
+                    "is_common": is_common_column,
+                }
+                column_list.append(column_info)
+
+            logger.debug(f"Processed table {table_name} with {len(column_list)} columns")
+            return column_list
+        except Exception as e:
+            logger.error(f"Failed to process table {table_name}: {e}")
+            return None
+
+    def _get_table_comment(self, table_name: str) -> str:
+        try:
+            table_info = self._get_inspector().get_table_comment(table_name)
+            return table_info.get("text", "") if table_info else ""
+        except Exception:
+            # Some databases don't support table comments
+            return ""
+
+    def get_table_comments(self, table_names: list[str]) -> dict[str, str]:
+        """
+        Get the comments of tables, empty string if the database does not support table comments.
+
+        Args:
+            table_names (List[str]): Table names
+
+        Returns:
+            Dict[str, str]: Table comment by table name
+        """
+        return self._map_tables("Loading table comments", self._get_table_comment, table_names)
 
     def get_tables_and_columns(self) -> dict[str, list[dict[str, Any]]]:
         """
@@ -35,8 +148,6 @@ class DataCatalogLoader:
             Dict[str, List[Dict[str, Any]]]: Dictionary mapping table names to list of column information
         """
         try:
-            tables_columns = {}
-
             # Get all table names
             table_names = self.inspector.get_table_names()
 
@@ -46,33 +157,7 @@ class DataCatalogLoader:
 
             logger.info(f"Found {len(table_names)} tables to process")
 
-            for table_name in table_names:
-                try:
-                    # Get column information for the table
-                    columns = self.inspector.get_columns(table_name)
-                    column_list = []
-                    for column in columns:
-                        is_common_column = column not in ("id", "name", "type", "status")
-                        column_info = {
-                            "column_name": column["name"],
-                            "display_name": "",
-                            "alias": "",
-                            "type": str(column["type"]),
-                            "category": "",
-                            "tag": "",
-                            "description": column.get("comment", "") or "",
-                            "dimension_table": "",
-                            "default": str(column.get("default", "")) if column.get("default") is not None else "",
-                            "is_common": is_common_column,
-                        }
-                        column_list.append(column_info)
-
-                    tables_columns[table_name] = column_list
-                    logger.debug(f"Processed table {table_name} with {len(column_list)} columns")
-
-                except Exception as e:
-                    logger.error(f"Failed to process table {table_name}: {e}")
-                    continue
+            tables_columns = self._map_tables("Loading table columns", self._get_table_columns, table_names)
 
             logger.info(f"Successfully processed {len(tables_columns)} tables")
             return tables_columns
@@ -140,38 +225,39 @@ class DataCatalogLoader:
                 logger.warning("No tables found in data warehouse")
                 return True
 
-            # Import each table
+            # Import each table, in one batch so the catalog files are written once
             success_count = 0
             total_count = len(tables_columns)
-
-            for table_name, columns in tables_columns.items():
-                try:
-                    # Get table comment if available
-                    table_comment = ""
+            table_comments = self.get_table_comments(list(tables_columns))
+            catalog_store.begin_batch()
+            try:
+                for table_name, columns in tables_columns.items():
                     try:
-                        table_info = self.inspector.get_table_comment(table_name)
-                        table_comment = table_info.get("text", "") if table_info else ""
-                    except Exception:
-                        # Some databases don't support table comments
-                        pass
-
-                    table_info = {"description": table_comment, "selection_rule": "", "sql_rule": ""}
-                    if catalog_store.save_table_information(table_name, table_info, columns, database_name):
-                        success_count += 1
-                        logger.info(f"Successfully loaded table: {database_name}.{table_name}")
-                    else:
-                        logger.error(f"Failed to load table: {database_name}.{table_name}")
-
-                    # init null SQL examples
-                    catalog_store.save_table_sql_examples(
-                        table_name, [{"question": "null", "answer": "null"}], database_name
-                    )
-
-                except Exception as e:
-                    logger.error(f"Error loading table {table_name}: {e}")
-
-            # init empty table selection examples
-            catalog_store.save_table_selection_examples([("", [])])
+                        table_comment = table_comments.get(table_name, "")
+                        table_info = {"description": table_comment, "selection_rule": "", "sql_rule": ""}
+                        if catalog_store.save_table_information(table_name, table_info, columns, database_name):
+                            success_count += 1
+                            logger.info(f"Successfully loaded table: {database_name}.{table_name}")
+                        else:
+                            logger.error(f"Failed to load table: {database_name}.{table_name}")
+
+                        # init null SQL examples
+                        catalog_store.save_table_sql_examples(
+                            table_name, [{"question": "null", "answer": "null"}], database_name
+                        )
+
+                    except Exception as e:
+                        logger.error(f"Error loading table {table_name}: {e}")
+
+                # init empty table selection examples
+                catalog_store.save_table_selection_examples([("", [])])
+            except Exception:
+                catalog_store.rollback()
+                raise
+
+            if not catalog_store.commit():
+                logger.error("Failed to write catalog changes")
+                return False
 
             logger.info(f"Load completed: {success_count}/{total_count} tables loaded successfully")
             return success_count == total_count
@@ -198,9 +284,10 @@ def load_catalog_from_data_warehouse(catalog_store: CatalogStore) -> bool:
         database_uri = data_warehouse_config.get("uri")
         include_tables = data_warehouse_config.get("include_tables")
         database_name = data_warehouse_config.get("database_name", "default")
+        max_workers = data_warehouse_config.get("introspection_workers", 1)
         engine = catalog_store.get_sql_engine()
 
-        loader = DataCatalogLoader(engine, include_tables)
+        loader = DataCatalogLoader(engine, include_tables, max_workers=max_workers)
         return loader.save_to_catalog_store(catalog_store, database_name)
 
     except Exception as e:
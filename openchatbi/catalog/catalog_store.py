@@ -1,8 +1,13 @@
+import logging
 from abc import ABC, abstractmethod
+from collections.abc import Callable, Mapping
+from types import MappingProxyType
 from typing import Any
 
 from sqlalchemy import Engine
 
+logger = logging.getLogger(__name__)
+
 
 class CatalogStore(ABC):
     """
@@ -77,6 +82,20 @@ class CatalogStore(ABC):
         """
         pass
 
+    def get_column_views(self, table: str | None = None, database: str | None = None) -> tuple[Mapping[str, Any], ...]:
+        """
+        Get read-only column records, same content as `get_column_list`. Stores override it to serve the
+        records from their cache without copying, callers must copy a record before modifying it.
+
+        Args:
+            table (Optional[str]): Table name
+            database (Optional[str]): Database name
+
+        Returns:
+            Tuple[Mapping[str, Any], ...]: Read-only column information
+        """
+        return tuple(MappingProxyType(column) for column in self.get_column_list(table, database))
+
     @abstractmethod
     def get_table_information(self, table: str, database: str | None = None) -> dict[str, Any]:
         """
@@ -170,6 +189,78 @@ class CatalogStore(ABC):
         """
         pass
 
+    def begin_batch(self) -> None:
+        """
+        Start a batch of writes. Until `commit` is called, stores supporting batches keep the saved tables,
+        columns and examples in memory and write each underlying file once on commit. Stores without batch
+        support save immediately.
+        """
+        return None
+
+    def commit(self) -> bool:
+        """
+        Write the changes saved since `begin_batch`
+
+        Returns:
+            bool: Whether the changes were written successfully
+        """
+        return True
+
+    def rollback(self) -> None:
+        """
+        Discard the changes saved since `begin_batch`
+        """
+        return None
+
+    def get_index_directory(self) -> str | None:
+        """
+        Get the directory to persist retrieval index snapshots built from the catalog
+
+        Returns:
+            Optional[str]: Directory path, None if the store does not persist index snapshots
+        """
+        return None
+
+    def get_catalog_version(self) -> int | None:
+        """
+        Get the version of the catalog content, which changes whenever tables, columns or examples are saved
+
+        Returns:
+            Optional[int]: Catalog version, None if the store does not track changes
+        """
+        return None
+
+    def add_change_listener(self, listener: Callable[["CatalogStore"], None]) -> None:
+        """
+        Register a function called with the catalog store after its content is changed by this process.
+        Listeners are called in the thread saving the change, so they should only schedule the work.
+
+        Args:
+            listener (Callable[[CatalogStore], None]): Listener function
+        """
+        self.__dict__.setdefault("_change_listeners", []).append(listener)
+
+    def remove_change_listener(self, listener: Callable[["CatalogStore"], None]) -> None:
+        """
+        Unregister a listener added by `add_change_listener`
+
+        Args:
+            listener (Callable[[CatalogStore], None]): Listener function
+        """
+        listeners = self.__dict__.get("_change_listeners", [])
+        if listener in listeners:
+            listeners.remove(listener)
+
+    def _notify_change(self) -> None:
+        """
+        Call the change listeners, stores call it after changing the catalog content
+        """
+        for listener in list(self.__dict__.get("_change_listeners", [])):
+            try:
+                listener(self)
+            except Exception as e:
+                logger.error(f"Catalog change listener failed: {e}")
+
     @abstractmethod
     def check_exists(self) -> bool:
         """
@@ -0,0 +1,160 @@
+"""Background reload of the indexes built from a catalog store when the catalog changes."""
+
+import threading
+import weakref
+from collections.abc import Callable
+
+from openchatbi import config
+from openchatbi.catalog.catalog_store import CatalogStore
+from openchatbi.utils import log
+
+# Seconds to wait after a change notification, so a burst of saves triggers one rebuild
+SETTLE_SECONDS = 1.0
+
+
+class CatalogWatcher:
+    """Watch a catalog store and rebuild the registered indexes in a background thread when it changes.
+
+    Changes made in this process are picked up from the store's change listeners, changes made by other
+    processes or by editing the catalog files by polling `get_catalog_version`. Rebuild functions build the
+    new index aside and swap it in with one assignment, so queries running on the old index finish undisturbed.
+    """
+
+    def __init__(self, catalog: CatalogStore, interval: float = 30.0, settle: float = SETTLE_SECONDS):
+        """Initialize the watcher, the thread is started by `start`.
+
+        Args:
+            catalog (CatalogStore): Catalog store to watch, referenced weakly.
+            interval (float): Seconds between version checks.
+            settle (float): Seconds to wait after a change notification before rebuilding.
+        """
+        self._catalog_ref = weakref.ref(catalog)
+        self.interval = interval
+        self.settle = settle
+        self._rebuilds: dict[str, Callable[[CatalogStore], None]] = {}
+        self._version = catalog.get_catalog_version()
+        self._changed = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        catalog.add_change_listener(self._on_change)
+
+    def register(self, name: str, rebuild: Callable[[CatalogStore], None]) -> None:
+        """Register a function rebuilding an index from the catalog store.
+
+        Args:
+            name (str): Name of the index, registering the same name again replaces the function.
+            rebuild (Callable[[CatalogStore], None]): Function building the index and swapping it in.
+        """
+        self._rebuilds[name] = rebuild
+
+    def start(self) -> None:
+        """Start the background thread, if not started yet."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="catalog-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread."""
+        self._stopped.set()
+        self._changed.set()
+
+    def _on_change(self, catalog: CatalogStore) -> None:
+        self._changed.set()
+
+    def check(self, force: bool = False) -> bool:
+        """Rebuild the registered indexes if the catalog version changed since the last rebuild.
+
+        Args:
+            force (bool): Rebuild if the store does not track its version.
+
+        Returns:
+            bool: Whether the indexes were rebuilt.
+        """
+        catalog = self._catalog_ref()
+        if catalog is None:
+            return False
+        version = catalog.get_catalog_version()
+        if version == self._version and not (force and version is None):
+            return False
+
+        log(f"Catalog changed (version {self._version} -> {version}), rebuilding {', '.join(self._rebuilds)}")
+        self._version = version
+        for name, rebuild in list(self._rebuilds.items()):
+            try:
+                rebuild(catalog)
+            except Exception as e:
+                # keep serving the previous index
+                log(f"Failed to rebuild {name} after catalog change: {e}")
+        return True
+
+    def _run(self) -> None:
+        while not self._stopped.is_set() and self._catalog_ref() is not None:
+            changed = self._changed.wait(self.interval)
+            if self._stopped.is_set():
+                break
+            if changed:
+                self._stopped.wait(self.settle)
+                self._changed.clear()
+            self.check(force=changed)
+
+
+_watchers: "weakref.WeakKeyDictionary[CatalogStore, CatalogWatcher]" = weakref.WeakKeyDictionary()
+_watchers_lock = threading.Lock()
+
+
+def _reload_interval() -> float:
+    try:
+        return config.get().catalog_reload_interval
+    except ValueError:
+        return 30.0
+
+
+def _get_watcher(catalog: CatalogStore) -> CatalogWatcher | None:
+    interval = _reload_interval()
+    if not interval or interval <= 0:
+        return None
+    with _watchers_lock:
+        watcher = _watchers.get(catalog)
+        if watcher is None:
+            watcher = CatalogWatcher(catalog, interval)
+            _watchers[catalog] = watcher
+    return watcher
+
+
+def watch_catalog(catalog: CatalogStore, name: str, rebuild: Callable[[CatalogStore], None]) -> CatalogWatcher | None:
+    """Rebuild an index in the background whenever the catalog store changes.
+
+    The rebuild only runs once the application has started the watcher with `start_catalog_watcher`,
+    so importing the modules that register their indexes does not start a polling thread.
+
+    Args:
+        catalog (CatalogStore): Catalog store the index is built from.
+        name (str): Name of the index.
+        rebuild (Callable[[CatalogStore], None]): Function building the index and swapping it in,
+            it must not hold a reference to the catalog store.
+
+    Returns:
+        CatalogWatcher | None: The watcher of the catalog store, None if hot reload is disabled
+            by setting `catalog_reload_interval` to 0.
+    """
+    watcher = _get_watcher(catalog)
+    if watcher is not None:
+        watcher.register(name, rebuild)
+    return watcher
+
+
+def start_catalog_watcher(catalog: CatalogStore) -> CatalogWatcher | None:
+    """Start rebuilding the indexes registered for the catalog store when it changes.
+
+    Called by the application entry points, indexes registered later are rebuilt by the same thread.
+
+    Args:
+        catalog (CatalogStore): Catalog store to watch.
+
+    Returns:
+        CatalogWatcher | None: The started watcher, None if hot reload is disabled.
+    """
+    watcher = _get_watcher(catalog)
+    if watcher is not None:
+        watcher.start()
+    return watcher
@@ -4,9 +4,14 @@ import os
 from openchatbi.catalog.catalog_loader import load_catalog_from_data_warehouse
 from openchatbi.catalog.catalog_store import CatalogStore
 from openchatbi.catalog.store.file_system import FileSystemCatalogStore
+from openchatbi.catalog.store.sqlite import SQLiteCatalogStore
 
 logger = logging.getLogger(__name__)
 
+# Retrieval index snapshots are kept in the working directory next to the Chroma database (./.chroma_db),
+# not in data_path which may be read-only once the package is installed
+DEFAULT_INDEX_DIR = "./.index"
+
 
 # Factory function for creating CatalogStore instances
 def create_catalog_store(
@@ -16,10 +21,11 @@ def create_catalog_store(
     Create a CatalogStore instance
 
     Args:
-        store_type (str): Storage type, supports 'file_system'
+        store_type (str): Storage type, supports 'file_system' and 'sqlite'
         auto_load (bool): Whether to autoload from database if catalog files don't exist
         data_warehouse_config (dict): Data warehouse configuration dictionary
-        **kwargs: Other parameters
+        **kwargs: Other parameters, `index_dir` is the directory of the retrieval index snapshots,
+            None to not persist them
 
     Returns:
         CatalogStore: CatalogStore instance
@@ -27,21 +33,35 @@ def create_catalog_store(
     Raises:
         ValueError: If the storage type is not supported
     """
-    if store_type == "file_system":
-        data_path = kwargs.get("data_path", "data")
-        # convert relative path to absolute path
-        if not data_path.startswith("/"):
-            data_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), data_path)
-        catalog_store = FileSystemCatalogStore(data_path, data_warehouse_config)
-
-        # Check if autoload is enabled and if catalog files are missing
-        if auto_load:
-            _auto_load_catalog_if_needed(catalog_store)
+    data_path = kwargs.get("data_path", "data")
+    # convert relative path to absolute path
+    if not data_path.startswith("/"):
+        data_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), data_path)
+    index_dir = kwargs.get("index_dir", DEFAULT_INDEX_DIR)
+    if index_dir:
+        index_dir = os.path.abspath(index_dir)
 
-        return catalog_store
+    if store_type == "file_system":
+        catalog_store = FileSystemCatalogStore(data_path, data_warehouse_config, index_dir)
+    elif store_type == "sqlite":
+        catalog_store = SQLiteCatalogStore(
+            data_path, data_warehouse_config, kwargs.get("db_file", "catalog.db"), index_dir
+        )
+        # One-shot migration from catalog files in the same directory
+        if not catalog_store.check_exists():
+            file_catalog_store = FileSystemCatalogStore(data_path, data_warehouse_config)
+            if file_catalog_store.check_exists():
+                logger.info(f"Migrating catalog files in {data_path} to {catalog_store.db_file}")
+                catalog_store.import_catalog(file_catalog_store)
     else:
         raise ValueError(f"Unsupported storage type: {store_type}")
 
+    # Check if autoload is enabled and if catalog data is missing
+    if auto_load:
+        _auto_load_catalog_if_needed(catalog_store)
+
+    return catalog_store
+
 
 def _auto_load_catalog_if_needed(catalog_store: CatalogStore) -> None:
     """
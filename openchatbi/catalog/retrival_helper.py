@@ -1,7 +1,9 @@
 """Helper functions for building column retrieval systems."""
 
-from rank_bm25 import BM25Okapi
+from datetime import datetime
 
+from openchatbi.bm25_index import BM25Index, load_or_build_bm25_index
+from openchatbi.constants import datetime_format
 from openchatbi.llm.llm import get_embedding_model
 from openchatbi.text_segmenter import _segmenter
 from openchatbi.utils import create_vector_db, log
@@ -14,11 +16,11 @@ def get_columns_metadata(catalog):
         catalog: Catalog store instance.
 
     Returns:
-        tuple: (columns, col_dict, column_tokens, embedding_keys)
+        tuple: (columns, col_dict, column_texts, embedding_keys)
     """
-    columns = catalog.get_column_list()
+    columns = list(catalog.get_column_views())
     col_dict = {}
-    column_tokens = []
+    column_texts = []
     embedding_keys = []
     for column in columns:
         col_dict[column["column_name"]] = column
@@ -29,19 +31,22 @@ def get_columns_metadata(catalog):
             column.get("tag", ""),
             column.get("description", ""),
         ]
-        text = " ".join(text_parts)
-        tokens = [token for token in _segmenter.cut(text) if token not in ("_", " ")]
-        column_tokens.append(tokens)
+        column_texts.append(" ".join(text_parts))
         embedding_key = f"{column['column_name']}: {column['display_name']}"
         embedding_keys.append(embedding_key)
-    return columns, col_dict, column_tokens, embedding_keys
+    return columns, col_dict, column_texts, embedding_keys
+
+
+def tokenize_column_text(text):
+    """Tokenize column text for BM25 indexing, dropping separator tokens."""
+    return [token for token in _segmenter.cut(text) if token not in ("_", " ")]
 
 
 def build_column_tables_mapping(catalog):
     """Build a mapping of column names to their corresponding table names."""
     column_tables_mapping = {}
     for table_name in catalog.get_table_list():
-        for column in catalog.get_column_list(table_name):
+        for column in catalog.get_column_views(table_name):
             column_name = column["column_name"]
             if column_name not in column_tables_mapping:
                 column_tables_mapping[column_name] = []
@@ -49,6 +54,20 @@ def build_column_tables_mapping(catalog):
     return column_tables_mapping
 
 
+def build_table_start_times(catalog, column_tables_mapping):
+    """Parse the start time of the tables having columns, tables without a valid start time are left out."""
+    table_start_times = {}
+    for table_name in dict.fromkeys(table for tables in column_tables_mapping.values() for table in tables):
+        start_time = (catalog.get_table_information(table_name) or {}).get("start_time")
+        if not start_time:
+            continue
+        try:
+            table_start_times[table_name] = datetime.strptime(start_time, datetime_format)
+        except (TypeError, ValueError):
+            log(f"Invalid start_time {start_time!r} of table {table_name}, not filtering the table by time")
+    return table_start_times
+
+
 def build_columns_retriever(catalog):
     """Build BM25 and vector retrievers for columns.
 
@@ -58,17 +77,18 @@ def build_columns_retriever(catalog):
     Returns:
         tuple: (bm25, vector_db, columns, col_dict)
     """
-    columns, col_dict, column_tokens, embedding_keys = get_columns_metadata(catalog)
+    columns, col_dict, column_texts, embedding_keys = get_columns_metadata(catalog)
 
-    # Handle empty columns case to prevent division by zero in BM25
-    if not column_tokens or len(column_tokens) == 0:
+    # Handle empty columns case
+    if not column_texts:
         log("Warning: No columns found in catalog. Creating empty retrievers.")
-        # Create a dummy BM25 with a single empty document to avoid division by zero
-        bm25 = BM25Okapi([[""]])
+        bm25 = BM25Index.from_corpus([])
         vector_db = None
         return bm25, vector_db, columns, col_dict
 
-    bm25 = BM25Okapi(column_tokens)
+    # BM25 index snapshot is reused across restarts while the column texts are unchanged
+    index_dir = catalog.get_index_directory()
+    bm25 = load_or_build_bm25_index(column_texts, tokenize_column_text, index_dir, "column_keywords")
 
     log("Building vector database for columns...")
     vector_db = create_vector_db(
@@ -77,6 +97,7 @@ def build_columns_retriever(catalog):
         metadatas=columns,
         collection_name="columns",
         collection_metadata={"hnsw:space": "cosine"},
+        index_dir=index_dir,
     )
 
     return bm25, vector_db, columns, col_dict
@@ -1,33 +1,324 @@
 """Schema and column retrieval functionality for finding relevant database structures."""
 
-import os
 import re
+import threading
+import time
+import weakref
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
 
 import Levenshtein
+import numpy as np
+from rapidfuzz import process
+from rapidfuzz.distance import Levenshtein as RapidLevenshtein
 
 from openchatbi import config
-from openchatbi.catalog.retrival_helper import build_column_tables_mapping, build_columns_retriever
+from openchatbi.catalog.catalog_store import CatalogStore
+from openchatbi.catalog.catalog_watcher import watch_catalog
+from openchatbi.catalog.retrival_helper import (
+    build_column_tables_mapping,
+    build_columns_retriever,
+    build_table_start_times,
+)
 from openchatbi.text_segmenter import _segmenter
 from openchatbi.utils import log
 
-# Skip build during documentation build
-if not os.environ.get("SPHINX_BUILD"):
+_NAME_SUFFIX_PATTERN = re.compile(r"(_id|_name| id| name)$")
+
+# Constant of reciprocal-rank fusion, dampens the weight of the top ranks of any single retriever
+RRF_K = 60
+
+# Distance thresholds of the vector similarity search of each column category
+VECTOR_SEARCH_THRESHOLDS = {"dimension": 0.5, "metric": 0.55}
+
+# Shared pool for the column retrievers fan-out, threads are started on demand
+_search_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="column-search")
+
+
+def normalize_column_name(name: str) -> str:
+    """Lowercase a column or keyword name and strip the trailing id/name suffix."""
+    return _NAME_SUFFIX_PATTERN.sub("", name.lower())
+
+
+class ColumnNameMatcher:
+    """Fuzzy matcher over the normalized column names and display names of a catalog.
+
+    Distinct normalized names are sorted by length once, so a keyword is only compared with
+    names whose length can be within the edit distance threshold, in one rapidfuzz batch.
+    """
+
+    def __init__(self, col_dict: dict[str, dict]):
+        """Precompute the normalized names.
+
+        Args:
+            col_dict (dict[str, dict]): Column name to column metadata.
+        """
+        self.column_names = list(col_dict)
+        name_columns: dict[str, list[int]] = {}
+        for column_idx, row in enumerate(col_dict.values()):
+            for name in {
+                normalize_column_name(row.get("column_name", "")),
+                normalize_column_name(row.get("display_name", "")),
+            }:
+                # empty names never score below a threshold <= 1
+                if name:
+                    name_columns.setdefault(name, []).append(column_idx)
+        self.names = sorted(name_columns, key=len)
+        self.name_lens = np.array([len(name) for name in self.names])
+        # columns of each name in CSR layout, following the order of self.names
+        self.column_indptr = np.zeros(len(self.names) + 1, dtype=np.int64)
+        self.column_indptr[1:] = np.cumsum([len(name_columns[name]) for name in self.names])
+        self.column_ids = np.array([idx for name in self.names for idx in name_columns[name]], dtype=np.int64)
+
+    def search(self, keyword: str, top_k: int, threshold: float) -> list[str]:
+        """Find the columns whose normalized column or display name is closest to a keyword.
+
+        Args:
+            keyword (str): Normalized keyword.
+            top_k (int): Maximum number of columns to return.
+            threshold (float): Exclusive upper bound of the normalized edit distance.
+
+        Returns:
+            list[str]: Column names, best match first, ties in catalog order.
+        """
+        if not keyword or not self.names:
+            return []
+        # |len(a) - len(b)| <= distance, so names outside this length window cannot score below threshold
+        key_len = len(keyword)
+        lo = np.searchsorted(self.name_lens, key_len * (1 - threshold), side="left")
+        hi = (
+            np.searchsorted(self.name_lens, key_len / (1 - threshold), side="right")
+            if threshold < 1
+            else len(self.names)
+        )
+        if lo >= hi:
+            return []
+        scores = process.cdist(
+            [keyword],
+            self.names[lo:hi],
+            scorer=RapidLevenshtein.normalized_distance,
+            score_cutoff=threshold,
+            dtype=np.float64,
+        )[0]
+        matched = np.flatnonzero(scores < threshold)
+        if not len(matched):
+            return []
+
+        # expand matched names to their columns and keep the best score of each column
+        starts, ends = self.column_indptr[lo + matched], self.column_indptr[lo + matched + 1]
+        column_ids = np.concatenate([self.column_ids[start:end] for start, end in zip(starts, ends, strict=True)])
+        column_scores = np.repeat(scores[matched], ends - starts)
+        order = np.lexsort((column_scores, column_ids))
+        column_ids, column_scores = column_ids[order], column_scores[order]
+        first = np.ones(len(column_ids), dtype=bool)
+        first[1:] = column_ids[1:] != column_ids[:-1]
+        column_ids, column_scores = column_ids[first], column_scores[first]
+
+        best = np.lexsort((column_ids, column_scores))[:top_k]
+        return [self.column_names[column_ids[i]] for i in best]
+
+
+class TableColumnIndex:
+    """Table membership of the columns of a catalog, and the parsed start times of the tables.
+
+    Each column maps to a bitset of table ids, so the candidate tables of a set of columns are the bits of
+    one OR, and each table maps to its column set, so its relevant columns are one set intersection.
+    """
+
+    def __init__(
+        self, column_tables_mapping: dict[str, list[str]], table_start_times: dict[str, datetime] | None = None
+    ):
+        """Precompute the table bitsets and column sets.
+
+        Args:
+            column_tables_mapping (dict[str, list[str]]): Column name to the tables having the column.
+            table_start_times (dict[str, datetime] | None): Table to the earliest time it has data for.
+        """
+        self.tables: list[str] = list(
+            dict.fromkeys(table for tables in column_tables_mapping.values() for table in tables)
+        )
+        table_ids = {table: table_id for table_id, table in enumerate(self.tables)}
+        self.column_table_bits: dict[str, int] = {}
+        table_columns: dict[str, set[str]] = {table: set() for table in self.tables}
+        for column_name, tables in column_tables_mapping.items():
+            bits = 0
+            for table in tables:
+                bits |= 1 << table_ids[table]
+                table_columns[table].add(column_name)
+            self.column_table_bits[column_name] = bits
+        self.table_columns: dict[str, frozenset[str]] = {
+            table: frozenset(columns) for table, columns in table_columns.items()
+        }
+        self.table_start_times = table_start_times or {}
+
+    def tables_of(self, columns: list[str]) -> list[str]:
+        """Get the tables having any of the columns, in catalog order."""
+        bits = 0
+        for column_name in columns:
+            bits |= self.column_table_bits.get(column_name, 0)
+        tables = []
+        while bits:
+            lowest = bits & -bits
+            tables.append(self.tables[lowest.bit_length() - 1])
+            bits ^= lowest
+        return tables
+
+
+class ColumnRetriever:
+    """Column indexes (BM25, vector store and column metadata) of one catalog store.
+
+    The indexes are built lazily on first access, or ahead of time in a background
+    thread via ``build_in_background`` so that importing the retrieval modules stays cheap.
+    """
+
+    def __init__(self, catalog: CatalogStore | None):
+        """Initialize an unbuilt column retriever.
+
+        Args:
+            catalog (CatalogStore | None): Catalog store to index, None for an empty retriever.
+        """
+        self.catalog = catalog
+        self._lock = threading.Lock()
+        self._built = False
+        self._build_thread: threading.Thread | None = None
+        self._bm25 = None
+        self._vector_db = None
+        self._columns: list[dict] = []
+        self._col_dict: dict[str, dict] = {}
+        self._column_tables_mapping: dict[str, list[str]] = {}
+        self._table_index = TableColumnIndex({})
+        self._name_matcher = ColumnNameMatcher({})
+
+    @property
+    def is_built(self) -> bool:
+        return self._built
+
+    def build(self) -> "ColumnRetriever":
+        """Build the column indexes if not built yet, blocking until they are ready.
+
+        Returns:
+            ColumnRetriever: self, for chaining.
+        """
+        if self._built:
+            return self
+        with self._lock:
+            if self._built:
+                return self
+            if self.catalog is not None:
+                log("Building column retriever...")
+                bm25, vector_db, columns, col_dict = build_columns_retriever(self.catalog)
+                self._bm25, self._vector_db, self._columns, self._col_dict = bm25, vector_db, columns, col_dict
+                self._name_matcher = ColumnNameMatcher(col_dict)
+                self._column_tables_mapping = build_column_tables_mapping(self.catalog)
+                self._table_index = TableColumnIndex(
+                    self._column_tables_mapping, build_table_start_times(self.catalog, self._column_tables_mapping)
+                )
+            self._built = True
+        return self
+
+    def build_in_background(self) -> threading.Thread:
+        """Start building the column indexes in a daemon thread.
+
+        Queries issued before the build finishes block on the same lock until it is done.
+
+        Returns:
+            threading.Thread: The build thread.
+        """
+        if self._build_thread is None:
+            self._build_thread = threading.Thread(target=self._background_build, name="column-retriever", daemon=True)
+            self._build_thread.start()
+        return self._build_thread
+
+    def _background_build(self) -> None:
+        try:
+            self.build()
+        except Exception as e:
+            log(f"Failed to build column retriever in background: {e}")
+
+    @property
+    def bm25(self):
+        return self.build()._bm25
+
+    @property
+    def vector_db(self):
+        return self.build()._vector_db
+
+    @property
+    def columns(self) -> list[dict]:
+        return self.build()._columns
+
+    @property
+    def col_dict(self) -> dict[str, dict]:
+        return self.build()._col_dict
+
+    @property
+    def column_tables_mapping(self) -> dict[str, list[str]]:
+        return self.build()._column_tables_mapping
+
+    @property
+    def table_index(self) -> TableColumnIndex:
+        return self.build()._table_index
+
+    @property
+    def name_matcher(self) -> ColumnNameMatcher:
+        return self.build()._name_matcher
+
+
+_retrievers: "weakref.WeakKeyDictionary[CatalogStore, ColumnRetriever]" = weakref.WeakKeyDictionary()
+_empty_retriever = ColumnRetriever(None)
+_retrievers_lock = threading.Lock()
+
+
+def _default_catalog_store() -> CatalogStore | None:
     try:
-        _catalog_store = config.get().catalog_store
+        return config.get().catalog_store
     except ValueError:
-        _catalog_store = None
-else:
-    _catalog_store = None
+        return None
+
+
+def get_column_retriever(catalog: CatalogStore | None = None) -> ColumnRetriever:
+    """Get the column retriever of a catalog store, creating it (unbuilt) if needed.
+
+    The retriever is replaced by a rebuilt one when the catalog changes, so callers should
+    get it for every query instead of keeping it.
+
+    Args:
+        catalog (CatalogStore | None): Catalog store, defaults to the catalog store in config.
+
+    Returns:
+        ColumnRetriever: The retriever keyed by the catalog store.
+    """
+    if catalog is None:
+        catalog = _default_catalog_store()
+    if catalog is None:
+        return _empty_retriever
+    with _retrievers_lock:
+        retriever = _retrievers.get(catalog)
+        if retriever is None:
+            retriever = ColumnRetriever(catalog)
+            _retrievers[catalog] = retriever
+            watch_catalog(catalog, "column retriever", _rebuild_column_retriever)
+        return retriever
 
-if _catalog_store:
-    bm25, vector_db, columns, col_dict = build_columns_retriever(_catalog_store)
-    column_tables_mapping = build_column_tables_mapping(_catalog_store)
-else:
-    bm25, vector_db, columns, col_dict = None, None, [], {}
-    column_tables_mapping = {}
 
+def _rebuild_column_retriever(catalog: CatalogStore) -> None:
+    """Rebuild the column retriever of a changed catalog store aside, then swap it in.
 
-def column_retrieval(query, db, k=10, threshold=0.5, filter=None):
+    Queries that already got the previous retriever keep using it until they finish. The BM25 snapshot and
+    the vector store are synced by content, so only the changed columns are indexed and embedded again.
+    """
+    with _retrievers_lock:
+        previous = _retrievers.get(catalog)
+    retriever = ColumnRetriever(catalog)
+    if previous is not None and previous.is_built:
+        retriever.build()
+    with _retrievers_lock:
+        _retrievers[catalog] = retriever
+
+
+def column_retrieval(query, db, k=10, threshold=0.5, filter=None, embedding=None):
     """Retrieves relevant columns based on a similarity search.
 
     Args:
@@ -36,20 +327,41 @@ def column_retrieval(query, db, k=10, threshold=0.5, filter=None):
         k (int, optional): The number of top results to return. Defaults to 10.
         threshold (float, optional): The similarity threshold for filtering results. Defaults to 0.5.
         filter (dict, optional): A filter to apply to the search. Defaults to None.
+        embedding (list[float], optional): Precomputed embedding of the query, embedded by the search if not given.
 
     Returns:
         list: List of relevant column names.
     """
+    if db is None:
+        return []
     log(f"Get the top relevant columns for query: {query}")
-    similar_column_key_scores = db.similarity_search_with_score(query, k=k, filter=filter)
+    if embedding is not None:
+        similar_column_key_scores = db.similarity_search_by_vector_with_relevance_scores(embedding, k=k, filter=filter)
+    else:
+        similar_column_key_scores = db.similarity_search_with_score(query, k=k, filter=filter)
     # log(f"similar_column_key_scores: {similar_column_key_scores}")
     column_names = [key.metadata["column_name"] for (key, score) in similar_column_key_scores if score < threshold]
     log(f"Filtered relevant columns: {column_names}")
     return column_names
 
 
-def merge_list(list1, list2):
-    return list(set(list1 + list2))
+def reciprocal_rank_fusion(result_lists, k=RRF_K):
+    """Merge ranked result lists by reciprocal-rank fusion.
+
+    Each item scores the sum of 1 / (k + rank) over the lists containing it, rank starting at 1.
+
+    Args:
+        result_lists (list[list]): Ranked results of each retriever, best first.
+        k (int, optional): Rank constant. Defaults to RRF_K.
+
+    Returns:
+        list: Distinct items, best fused score first, ties in order of first appearance.
+    """
+    fused_scores = {}
+    for results in result_lists:
+        for rank, item in enumerate(dict.fromkeys(results), start=1):
+            fused_scores[item] = fused_scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(fused_scores, key=lambda item: -fused_scores[item])
 
 
 def edit_distance_score(key1, key2):
@@ -63,90 +375,170 @@ def edit_distance_score(key1, key2):
     return dist / max_len if max_len > 0 else 1
 
 
-def edit_distance_search(keywords_list, top_k=10, threshold=0.5):
+def edit_distance_search(keywords_list, top_k=10, threshold=0.5, retriever: ColumnRetriever | None = None):
     """Searches for columns using edit distance similarity.
 
     Args:
         keywords_list (list): List of keywords to search for.
         top_k (int, optional): The number of top results to return per keyword. Defaults to 10.
         threshold (float, optional): The maximum edit distance score to consider. Defaults to 0.5.
+        retriever (ColumnRetriever, optional): Column retriever to search in. Defaults to the one of config catalog.
 
     Returns:
         list: List of relevant column names.
     """
-    keys = set([re.sub(r"(_id|_name| id| name)$", "", key.lower()) for key in keywords_list])
-    column_similarity_score = set()
+    retriever = retriever or get_column_retriever()
+    matcher = retriever.name_matcher
+    keys = dict.fromkeys(normalize_column_name(key) for key in keywords_list)
+    column_similarity_score = {}
     for key in keys:
-        key_column_similarity_score = {}
-        for column_name, row in col_dict.items():
-            column_name_score = edit_distance_score(
-                key, re.sub(r"(_id|_name| id| name)$", "", row.get("column_name", ""))
-            )
-            display_score = edit_distance_score(
-                key, re.sub(r"(_id|_name| id| name)$", "", row.get("display_name", "").lower())
-            )
-            if column_name_score < threshold or display_score < threshold:
-                key_column_similarity_score[column_name] = min(column_name_score, display_score)
-        key_top_column = [
-            key for key, _ in sorted(key_column_similarity_score.items(), key=lambda x: x[1], reverse=True)[:top_k]
-        ]
-        column_similarity_score.update(key_top_column)
+        column_similarity_score.update(dict.fromkeys(matcher.search(key, top_k, threshold)))
     return list(column_similarity_score)
 
 
-def bm25_search(query_list, top_k=5, score_threshold=0.5):
+def bm25_search(query_list, top_k=5, score_threshold=0.5, retriever: ColumnRetriever | None = None):
     """Performs a BM25 search on columns based on the query.
 
     Args:
         query_list (list): List of query terms.
         top_k (int, optional): The number of top results to return. Defaults to 5.
         score_threshold (float, optional): The minimum BM25 score to consider. Defaults to 0.5.
+        retriever (ColumnRetriever, optional): Column retriever to search in. Defaults to the one of config catalog.
 
     Returns:
         list: List of relevant column names.
     """
+    retriever = retriever or get_column_retriever()
+    if retriever.bm25 is None:
+        return []
     query_tokens = [token for token in _segmenter.cut(" ".join(query_list)) if token not in ("_", " ")]
-    scores = bm25.get_scores(query_tokens)
-    ranked = sorted(enumerate(scores), key=lambda x: x[1], reverse=True)
+    columns = retriever.columns
     results = []
-    for idx, score in ranked[:top_k]:
+    for idx, score in retriever.bm25.top_k(query_tokens, top_k):
         if score_threshold and score < score_threshold:
             continue
         results.append(columns[idx]["column_name"])
     return results
 
 
-def get_relevant_columns(keywords_list, dimensions, metrics):
+def _timed(name: str, fn: Callable, timings: dict[str, float]) -> Callable:
+    def run():
+        start = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            timings[name] = time.perf_counter() - start
+
+    return run
+
+
+def search_columns_by_term(
+    terms: list[str], catalog: CatalogStore | None = None, k: int = 10, parallel: bool = True
+) -> dict[str, dict[str, list[str]]]:
+    """Search the dimension and metric columns similar to each term, embedding each term once.
+
+    The results of a term are those of the vector search of `get_relevant_columns` for the same text.
+
+    Args:
+        terms (list[str]): Terms to search for, e.g. the words of a question.
+        catalog (CatalogStore, optional): Catalog store to search in. Defaults to the catalog store in config.
+        k (int, optional): The number of top results per term and category. Defaults to 10.
+        parallel (bool, optional): Run the searches concurrently in the column search pool. Defaults to True.
+
+    Returns:
+        dict: Term to {"dimension": column names, "metric": column names}, most similar first.
+    """
+    terms = list(dict.fromkeys(terms))
+    vector_db = get_column_retriever(catalog).build().vector_db
+    if not terms or vector_db is None:
+        return {term: {category: [] for category in VECTOR_SEARCH_THRESHOLDS} for term in terms}
+    searches = {term: partial(_search_term, term, vector_db, k) for term in terms}
+    if parallel:
+        futures = {term: _search_executor.submit(search) for term, search in searches.items()}
+        return {term: future.result() for term, future in futures.items()}
+    return {term: search() for term, search in searches.items()}
+
+
+def _search_term(term: str, vector_db, k: int) -> dict[str, list[str]]:
+    """Search the dimension and metric columns similar to a term, embedding it once like a search query."""
+    embeddings = getattr(vector_db, "embeddings", None)
+    embedding = embeddings.embed_query(term) if embeddings is not None else None
+    return {
+        category: column_retrieval(
+            term, vector_db, k=k, threshold=threshold, filter={"category": category}, embedding=embedding
+        )
+        for category, threshold in VECTOR_SEARCH_THRESHOLDS.items()
+    }
+
+
+def get_relevant_columns(
+    keywords_list,
+    dimensions,
+    metrics,
+    catalog: CatalogStore | None = None,
+    parallel: bool = True,
+    timings: dict[str, float] | None = None,
+    term_columns: dict[str, dict[str, list[str]]] | None = None,
+):
     """Get the most relevant columns for given keywords, dimensions, and metrics.
 
     Uses multiple retrieval methods (BM25, edit distance, vector similarity)
-    to find the best matching columns.
+    to find the best matching columns, and merges their rankings by reciprocal-rank fusion.
+    Each dimension and metric search embeds its query in the thread pool, concurrently with the other retrievers.
 
     Args:
         keywords_list (list): General keywords to search for.
         dimensions (list): Dimension-specific keywords.
         metrics (list): Metric-specific keywords.
+        catalog (CatalogStore, optional): Catalog store to search in. Defaults to the catalog store in config.
+        parallel (bool, optional): Run the retrievers concurrently in a thread pool. Defaults to True.
+        timings (dict, optional): Filled with the seconds spent in each retriever and in embedding.
+        term_columns (dict, optional): Vector search results of texts searched ahead, from
+            ``search_columns_by_term``. A dimension or metric query, its terms joined by spaces, found in it
+            as is reuses its results instead of being searched again.
 
     Returns:
-        list: Relevant column names.
+        list: Relevant column names, most relevant first.
     """
-    # 1. BM25 search for general keywords
-    total_results = bm25_search(keywords_list, top_k=len(keywords_list) * 4)
-
-    # 2. Edit distance search for exact matches
-    keyword_len = len(keywords_list + dimensions + metrics)
-    ed_results = edit_distance_search(keywords_list + dimensions + metrics, top_k=keyword_len, threshold=0.3)
-    total_results = merge_list(total_results, ed_results)
+    retriever = get_column_retriever(catalog).build()
+    timings = {} if timings is None else timings
+    all_keywords = keywords_list + dimensions + metrics
+    # dimension and metric queries with their distance thresholds, queries searched ahead are reused
+    vector_queries, reused = {}, {}
+    for category, terms in (("dimension", dimensions), ("metric", metrics)):
+        if not terms:
+            continue
+        query = " ".join(terms)
+        if term_columns is not None and query in term_columns:
+            reused[category] = term_columns[query][category]
+        else:
+            vector_queries[category] = (query, VECTOR_SEARCH_THRESHOLDS[category])
+    if reused:
+        log(f"Reused the vector search results of the {' and '.join(reused)} query")
 
-    # 3. Vector similarity search for dimensions
-    if dimensions:
-        d_results = column_retrieval(" ".join(dimensions), vector_db, k=10, filter={"category": "dimension"})
-        total_results = merge_list(total_results, d_results)
+    # 1. BM25 search for general keywords, 2. Edit distance search for exact matches
+    searches = {
+        "bm25": partial(bm25_search, keywords_list, top_k=len(keywords_list) * 4, retriever=retriever),
+        "edit_distance": partial(
+            edit_distance_search, all_keywords, top_k=len(all_keywords), threshold=0.3, retriever=retriever
+        ),
+    }
+    # 3. / 4. Vector similarity search for dimensions and metrics
+    for category, (query, threshold) in vector_queries.items():
+        searches[category] = partial(
+            column_retrieval, query, retriever.vector_db, k=10, threshold=threshold, filter={"category": category}
+        )
 
-    # 4. Vector similarity search for metrics
-    if metrics:
-        m_results = column_retrieval(" ".join(metrics), vector_db, k=10, threshold=0.55, filter={"category": "metric"})
-        total_results = merge_list(total_results, m_results)
+    if parallel:
+        futures = {name: _search_executor.submit(_timed(name, fn, timings)) for name, fn in searches.items()}
+        results = {name: future.result() for name, future in futures.items()}
+    else:
+        results = {name: _timed(name, fn, timings)() for name, fn in searches.items()}
+    results.update(reused)
 
-    log(f"Relevant columns: {total_results}")
+    # fused in a fixed order, ties are broken by first appearance
+    total_results = reciprocal_rank_fusion(
+        [results[name] for name in ("bm25", "edit_distance", *VECTOR_SEARCH_THRESHOLDS) if name in results]
+    )
+    log(f"Relevant columns: {total_results}, retriever seconds: { {k: round(v, 4) for k, v in timings.items()} }")
     return total_results
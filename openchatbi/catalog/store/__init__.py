@@ -1,3 +1,4 @@
 """Catalog store implementations."""
 
 from .file_system import FileSystemCatalogStore
+from .sqlite import SQLiteCatalogStore
@@ -4,8 +4,13 @@ import csv
 import logging
 import os
 import re
+import stat
+import tempfile
 import traceback
-from typing import Any
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager, suppress
+from types import MappingProxyType
+from typing import IO, Any
 
 import yaml
 from sqlalchemy import Engine
@@ -16,6 +21,31 @@ from ..helper import create_sqlalchemy_engine_instance
 logger = logging.getLogger(__name__)
 
 
+@contextmanager
+def _atomic_open(file_path: str, newline: str | None = None) -> Iterator[IO[str]]:
+    """
+    Open a temporary file next to `file_path` for writing, and replace `file_path` with it once written,
+    so readers never see a partially written file.
+
+    Args:
+        file_path (str): File path
+        newline (Optional[str]): Newline mode passed to `open`
+    """
+    directory, name = os.path.split(file_path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=f".{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline=newline) as f:
+            yield f
+        # mkstemp creates the file readable by the owner only, keep the mode of the replaced file
+        mode = stat.S_IMODE(os.stat(file_path).st_mode) if os.path.exists(file_path) else 0o644
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        with suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+
 class FileSystemCatalogStore(CatalogStore):
     """File system-based data catalog storage implementation.
 
@@ -23,6 +53,7 @@ class FileSystemCatalogStore(CatalogStore):
     """
 
     data_path: str
+    index_dir: str | None
     table_info_file: str
     sql_example_file: str
     table_selection_example_file: str
@@ -36,11 +67,13 @@ class FileSystemCatalogStore(CatalogStore):
     _table_spec_columns_cache: dict | None
     _sql_example_cache: dict | None
     _table_selection_example_cache: dict | None
+    _column_index: tuple[tuple[Mapping[str, Any], ...], dict[str, tuple[Mapping[str, Any], ...]]] | None
+    _batch: dict[str, Any] | None
 
     _data_warehouse_config: dict
     _sql_engine: Engine
 
-    def __init__(self, data_path: str, data_warehouse_config: dict):
+    def __init__(self, data_path: str, data_warehouse_config: dict, index_dir: str | None = None):
         """Initialize filesystem catalog store.
 
         Args:
@@ -49,6 +82,7 @@ class FileSystemCatalogStore(CatalogStore):
                 - uri (str): Database connection URI
                 - include_tables (Optional[List[str]]): List of tables to include, if None include all
                 - database_name (Optional[str]): Database name to use in catalog
+            index_dir (Optional[str]): Directory of the retrieval index snapshots, None to not persist them.
         """
         if not isinstance(data_path, str) or not data_path.strip():
             raise ValueError("data_path must be a non-empty string")
@@ -59,6 +93,7 @@ class FileSystemCatalogStore(CatalogStore):
             raise ValueError("data_warehouse_config must be a dictionary")
 
         self.data_path = data_path.strip()
+        self.index_dir = index_dir
         self.table_info_file = os.path.join(data_path, "table_info.yaml")
         self.sql_example_file = os.path.join(data_path, "sql_example.yaml")
         self.table_selection_example_file = os.path.join(data_path, "table_selection_example.csv")
@@ -79,6 +114,12 @@ class FileSystemCatalogStore(CatalogStore):
         self._table_spec_columns_cache = None
         self._sql_example_cache = None
         self._table_selection_example_cache = None
+        self._column_index = None
+        # Incremented on every change, so consumers can invalidate what they derived from the catalog
+        self._catalog_version = 0
+        self._file_signature = self._get_file_signature()
+        # Data loaded for update during a batch, keyed by file, written on commit
+        self._batch = None
 
         self._data_warehouse_config = data_warehouse_config
         try:
@@ -97,8 +138,38 @@ class FileSystemCatalogStore(CatalogStore):
         self._table_spec_columns_cache = None
         self._sql_example_cache = None
         self._table_selection_example_cache = None
+        self._column_index = None
+        self._bump_version()
         logger.debug("Cleared all caches")
 
+    def _get_file_signature(self) -> tuple[tuple[int, int] | None, ...]:
+        """
+        Get the modification time and size of the catalog files, to detect changes made outside this store
+        """
+        signature = []
+        for file_path in (
+            self.table_info_file,
+            self.sql_example_file,
+            self.table_selection_example_file,
+            self.table_columns_file,
+            self.common_columns_file,
+            self.table_spec_columns_file,
+        ):
+            try:
+                file_stat = os.stat(file_path)
+                signature.append((file_stat.st_mtime_ns, file_stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _bump_version(self) -> None:
+        """
+        Increment the catalog version after a change, and notify the change listeners
+        """
+        self._catalog_version += 1
+        self._file_signature = self._get_file_signature()
+        self._notify_change()
+
     def get_data_warehouse_config(self) -> dict:
         return self._data_warehouse_config
 
@@ -296,7 +367,7 @@ class FileSystemCatalogStore(CatalogStore):
             bool: Whether the save was successful
         """
         try:
-            with open(file_path, "w", encoding="utf-8") as f:
+            with _atomic_open(file_path) as f:
                 yaml.dump(data, f, default_flow_style=False, allow_unicode=True)
             return True
         except Exception as e:
@@ -332,7 +403,7 @@ class FileSystemCatalogStore(CatalogStore):
                     if key not in headers:
                         headers.append(key)
 
-            with open(file_path, "w", encoding="utf-8", newline="") as f:
+            with _atomic_open(file_path, newline="") as f:
                 writer = csv.DictWriter(f, fieldnames=headers)
                 writer.writeheader()
                 for row in data:
@@ -453,16 +524,15 @@ class FileSystemCatalogStore(CatalogStore):
 
         return list(databases)
 
-    def _get_all_table_schema(self) -> dict[str, list[str]]:
+    def _get_all_table_schema(self) -> Mapping[str, list[str]]:
         """
         Get all tables schema (columns of table)
         Returns:
-            Dict[str, List[str]]: Tables schema (columns) dict, keyed by table name
+            Mapping[str, List[str]]: Read-only view of tables schema (columns), keyed by table name
         """
         if self._table_columns_cache is None:
             self._table_columns_cache = self._load_tables()
-        # Return a deep copy to prevent external modifications
-        return {k: v.copy() for k, v in self._table_columns_cache.items()}
+        return MappingProxyType(self._table_columns_cache)
 
     def get_table_list(self, database: str | None = None) -> list[str]:
         tables = self._get_all_table_schema()
@@ -478,63 +548,65 @@ class FileSystemCatalogStore(CatalogStore):
 
         return filtered_tables
 
-    def _get_common_columns(self) -> dict[str, dict[str, Any]]:
+    def _get_common_columns(self) -> Mapping[str, dict[str, Any]]:
         """
         Get information of all common columns
         Returns:
-            Dict[str, Dict[str, Any]]: Dictionary of columns information, keyed by column name
+            Mapping[str, Dict[str, Any]]: Read-only view of columns information, keyed by column name
         """
         if self._common_columns_cache is None:
             self._common_columns_cache = self._load_common_columns()
-        # Return a deep copy to prevent external modifications
-        return {k: v.copy() for k, v in self._common_columns_cache.items()}
+        return MappingProxyType(self._common_columns_cache)
 
-    def _get_table_spec_columns(self) -> dict[str, dict[str, Any]]:
+    def _get_table_spec_columns(self) -> Mapping[str, dict[str, Any]]:
         """
         Get information of all table specific columns
         Returns:
-            Dict[str, Dict[str, Any]]: Dictionary of table specific columns information, keyed by "full_table_name:column_name"
+            Mapping[str, Dict[str, Any]]: Read-only view of table specific columns information,
+                keyed by "full_table_name:column_name"
         """
         if self._table_spec_columns_cache is None:
             self._table_spec_columns_cache = self._load_table_spec_columns()
-        # Return a deep copy to prevent external modifications
-        return {k: v.copy() for k, v in self._table_spec_columns_cache.items()}
+        return MappingProxyType(self._table_spec_columns_cache)
 
-    def get_column_list(self, table: str | None = None, database: str | None = None) -> list[dict[str, Any]]:
-        _common_columns = self._get_common_columns()
+    def _get_column_index(self) -> tuple[tuple[Mapping[str, Any], ...], dict[str, tuple[Mapping[str, Any], ...]]]:
+        """
+        Get the read-only column records of the catalog, built once from the cached catalog files
+        Returns:
+            Tuple: (common column records, column records with `is_common` of every table keyed by full table name)
+        """
+        if self._column_index is None:
+            common_columns = self._get_common_columns()
+            table_spec_columns = self._get_table_spec_columns()
+            common_column_views = {
+                column_name: MappingProxyType({**column_info, "is_common": True})
+                for column_name, column_info in common_columns.items()
+            }
+            index = {}
+            for full_table_name, table_columns in self._get_all_table_schema().items():
+                column_views = []
+                for column in table_columns:
+                    # check if the column is table specific
+                    key = f"{full_table_name}:{column}"
+                    if key in table_spec_columns:
+                        column_views.append(MappingProxyType({**table_spec_columns[key], "is_common": False}))
+                    elif column in common_column_views:
+                        column_views.append(common_column_views[column])
+                index[full_table_name] = tuple(column_views)
+            self._column_index = (tuple(MappingProxyType(info) for info in common_columns.values()), index)
+        return self._column_index
+
+    def get_column_views(self, table: str | None = None, database: str | None = None) -> tuple[Mapping[str, Any], ...]:
+        common_column_views, table_column_index = self._get_column_index()
         if table is None:
-            return list(_common_columns.values())
+            return common_column_views
 
-        # Get the full table name
         full_table_name, db_name, table_name = split_db_table_name(table, database)
+        return table_column_index.get(full_table_name, ())
 
-        # Filter table columns
-        tables_dict = self._get_all_table_schema()
-        if full_table_name not in tables_dict:
-            return []
-
-        table_columns = tables_dict[full_table_name]
-
-        # If no columns found, return empty list
-        if not table_columns:
-            return []
-
-        # Filter and return column details
-        result = []
-        _table_spec_columns = self._get_table_spec_columns()
-        for column in table_columns:
-            # check if the column is table specific
-            key = f"{full_table_name}:{column}"
-            if key in _table_spec_columns:
-                column_info = _table_spec_columns[key]
-                column_info["is_common"] = False
-                result.append(column_info)
-            else:
-                column_info = _common_columns.get(column)
-                if column_info:
-                    column_info["is_common"] = True
-                    result.append(column_info)
-        return result
+    def get_column_list(self, table: str | None = None, database: str | None = None) -> list[dict[str, Any]]:
+        # Return copies of only the requested columns to prevent external modifications
+        return [dict(column) for column in self.get_column_views(table, database)]
 
     def get_table_information(self, table: str, database: str | None = None) -> dict[str, Any]:
         full_table_name, db_name, table_name = split_db_table_name(table, database)
@@ -600,6 +672,61 @@ class FileSystemCatalogStore(CatalogStore):
             )
         return self._table_selection_example_cache
 
+    def begin_batch(self) -> None:
+        if self._batch is not None:
+            raise RuntimeError("A catalog batch is already in progress")
+        self._batch = {}
+
+    def commit(self) -> bool:
+        batch, self._batch = self._batch, None
+        if not batch:
+            return True
+
+        success = True
+        if "table_info" in batch:
+            success = self._save_yaml_file(self.table_info_file, batch["table_info"]) and success
+        if "columns" in batch:
+            success = self._write_columns(batch["columns"]) and success
+        if "sql_examples" in batch:
+            success = self._save_yaml_file(self.sql_example_file, batch["sql_examples"]) and success
+        if "table_selection_examples" in batch:
+            success = (
+                self._save_csv_file(
+                    self.table_selection_example_file,
+                    batch["table_selection_examples"],
+                    ["question", "selected_tables"],
+                )
+                and success
+            )
+
+        # Files may be partially written on failure, drop all caches either way
+        self._clear_cache()
+        if success:
+            logger.info("Successfully committed catalog batch")
+        else:
+            logger.error("Failed to commit catalog batch")
+        return success
+
+    def rollback(self) -> None:
+        self._batch = None
+
+    def _load_for_update(self, name: str, load: Callable[[], Any]) -> Any:
+        """
+        Load data to modify. During a batch, the data is loaded once and kept in memory until commit.
+
+        Args:
+            name (str): Name of the data in the batch
+            load (Callable[[], Any]): Function to load the data from files
+
+        Returns:
+            Any: The loaded data
+        """
+        if self._batch is None:
+            return load()
+        if name not in self._batch:
+            self._batch[name] = load()
+        return self._batch[name]
+
     def save_table_information(
         self,
         table: str,
@@ -616,7 +743,7 @@ class FileSystemCatalogStore(CatalogStore):
         try:
             full_table_name, db_name, table_name = split_db_table_name(table, database)
 
-            table_info = self._load_yaml_file(self.table_info_file)
+            table_info = self._load_for_update("table_info", lambda: self._load_yaml_file(self.table_info_file))
 
             # Save columns first
             if not self._save_columns(table_name, columns, db_name, update_existing):
@@ -628,6 +755,8 @@ class FileSystemCatalogStore(CatalogStore):
                 table_info[db_name] = {}
             if update_existing or table_name not in table_info[db_name]:
                 table_info[db_name][table_name] = information
+            if self._batch is not None:
+                return True
             success = self._save_yaml_file(self.table_info_file, table_info)
 
             if success:
@@ -641,6 +770,55 @@ class FileSystemCatalogStore(CatalogStore):
             logger.error(traceback.format_stack())
             return False
 
+    def _load_columns(self) -> dict[str, Any]:
+        """
+        Load the column files for update
+
+        Returns:
+            Dict[str, Any]: Rows of table_columns.csv, the set of their "full_table_name:column_name" keys,
+                common columns and table specific columns
+        """
+        tables_data = self._load_csv_file(self.table_columns_file)
+
+        # Create a set of existing table-column combinations
+        existing_table_columns = set()
+        for row in tables_data:
+            if "db_name" in row and "table_name" in row and "column_name" in row:
+                key = f"{row['db_name']}.{row['table_name']}:{row['column_name']}"
+                existing_table_columns.add(key)
+
+        return {
+            "tables_data": tables_data,
+            "existing_table_columns": existing_table_columns,
+            "common_columns": self._load_common_columns(),
+            "table_spec_columns": self._load_table_spec_columns(),
+        }
+
+    def _write_columns(self, column_data: dict[str, Any]) -> bool:
+        """
+        Write the column files loaded by `_load_columns`
+
+        Args:
+            column_data (Dict[str, Any]): Column data to write
+
+        Returns:
+            bool: Whether the save was successful
+        """
+        tables_success = self._save_csv_file(
+            self.table_columns_file, column_data["tables_data"], ["db_name", "table_name", "column_name"]
+        )
+        common_columns_success = self._save_csv_file(
+            self.common_columns_file,
+            list(column_data["common_columns"].values()),
+            ["column_name", "display_name", "alias", "type", "category", "tag", "description"],
+        )
+        table_spec_columns_success = self._save_csv_file(
+            self.table_spec_columns_file,
+            list(column_data["table_spec_columns"].values()),
+            ["db_name", "table_name", "column_name", "display_name", "alias", "type", "category", "tag", "description"],
+        )
+        return tables_success and common_columns_success and table_spec_columns_success
+
     def _save_columns(
         self, table_name: str, columns: list[dict[str, Any]], db_name: str = "", update_existing: bool = False
     ) -> bool:
@@ -658,16 +836,11 @@ class FileSystemCatalogStore(CatalogStore):
         """
         full_table_name, db_name, table_name = split_db_table_name(table_name, db_name)
         # Load existing data
-        tables_data = self._load_csv_file(self.table_columns_file)
-        common_columns_dict = self._load_common_columns()
-        table_spec_columns_dict = self._load_table_spec_columns()
-
-        # Create a set of existing table-column combinations
-        existing_table_columns = set()
-        for row in tables_data:
-            if "db_name" in row and "table_name" in row and "column_name" in row:
-                key = f"{row['db_name']}.{row['table_name']}:{row['column_name']}"
-                existing_table_columns.add(key)
+        column_data = self._load_for_update("columns", self._load_columns)
+        tables_data = column_data["tables_data"]
+        existing_table_columns = column_data["existing_table_columns"]
+        common_columns_dict = column_data["common_columns"]
+        table_spec_columns_dict = column_data["table_spec_columns"]
 
         # Update table_columns.csv and track new columns to add
 
@@ -703,22 +876,11 @@ class FileSystemCatalogStore(CatalogStore):
                 else:
                     table_spec_columns_dict[key] = column_info
 
-        # Save updated data
-        tables_success = self._save_csv_file(
-            self.table_columns_file, tables_data, ["db_name", "table_name", "column_name"]
-        )
-        common_columns_success = self._save_csv_file(
-            self.common_columns_file,
-            list(common_columns_dict.values()),
-            ["column_name", "display_name", "alias", "type", "category", "tag", "description"],
-        )
-        table_spec_columns_success = self._save_csv_file(
-            self.table_spec_columns_file,
-            list(table_spec_columns_dict.values()),
-            ["db_name", "table_name", "column_name", "display_name", "alias", "type", "category", "tag", "description"],
-        )
+        if self._batch is not None:
+            return True
 
-        success = tables_success and common_columns_success and table_spec_columns_success
+        # Save updated data
+        success = self._write_columns(column_data)
         if success:
             # Clear cache to ensure consistency
             self._clear_cache()
@@ -734,7 +896,7 @@ class FileSystemCatalogStore(CatalogStore):
         try:
             full_table_name, db_name, table_name = split_db_table_name(table, database)
 
-            sql_examples = self._load_yaml_file(self.sql_example_file)
+            sql_examples = self._load_for_update("sql_examples", lambda: self._load_yaml_file(self.sql_example_file))
 
             # Ensure database exists in structure
             if db_name not in sql_examples:
@@ -746,6 +908,8 @@ class FileSystemCatalogStore(CatalogStore):
                 example_text += f"Q: {example['question']}\nA: {example['answer']}\n\n"
 
             sql_examples[db_name][table_name] = example_text.strip()
+            if self._batch is not None:
+                return True
 
             success = self._save_yaml_file(self.sql_example_file, sql_examples)
 
@@ -753,6 +917,7 @@ class FileSystemCatalogStore(CatalogStore):
                 logger.info(f"Successfully saved {len(examples)} examples for table {full_table_name}")
                 # Update cache
                 self._sql_example_cache = sql_examples
+                self._bump_version()
 
             return success
         except Exception as e:
@@ -764,13 +929,28 @@ class FileSystemCatalogStore(CatalogStore):
         example_data = []
         for example in examples:
             example_data.append({"question": example[0], "selected_tables": example[1]})
+        if self._batch is not None:
+            self._batch["table_selection_examples"] = example_data
+            return True
         save_success = self._save_csv_file(
             self.table_selection_example_file, example_data, ["question", "selected_tables"]
         )
         if save_success:
             logger.info(f"Successfully saved {len(examples)} table selection examples.")
+            self._table_selection_example_cache = None
+            self._bump_version()
         return save_success
 
+    def get_index_directory(self) -> str | None:
+        return self.index_dir
+
+    def get_catalog_version(self) -> int | None:
+        # Pick up edits of the catalog files by hand or by other processes
+        if self._batch is None and self._get_file_signature() != self._file_signature:
+            logger.info(f"Catalog files in {self.data_path} changed, reloading")
+            self._clear_cache()
+        return self._catalog_version
+
     def check_exists(self) -> bool:
         try:
             # Check if essential catalog files exist and have content
@@ -0,0 +1,490 @@
+"""SQLite-based catalog store implementation."""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from types import MappingProxyType
+from typing import Any
+
+from sqlalchemy import Engine
+
+from ..catalog_store import CatalogStore, split_db_table_name
+from ..helper import create_sqlalchemy_engine_instance
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO catalog_meta (key, value) VALUES ('version', 0);
+
+CREATE TABLE IF NOT EXISTS tables (
+    db_name TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    information TEXT NOT NULL,
+    PRIMARY KEY (db_name, table_name)
+);
+
+CREATE TABLE IF NOT EXISTS table_columns (
+    db_name TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    column_name TEXT NOT NULL,
+    PRIMARY KEY (db_name, table_name, column_name)
+);
+CREATE INDEX IF NOT EXISTS idx_table_columns_column ON table_columns (column_name);
+
+CREATE TABLE IF NOT EXISTS common_columns (
+    column_name TEXT PRIMARY KEY,
+    information TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS table_spec_columns (
+    db_name TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    column_name TEXT NOT NULL,
+    information TEXT NOT NULL,
+    PRIMARY KEY (db_name, table_name, column_name)
+);
+
+CREATE TABLE IF NOT EXISTS sql_examples (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    db_name TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sql_examples_table ON sql_examples (db_name, table_name);
+
+CREATE TABLE IF NOT EXISTS table_selection_examples (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    question TEXT NOT NULL,
+    selected_tables TEXT NOT NULL
+);
+"""
+
+
+class SQLiteCatalogStore(CatalogStore):
+    """SQLite-based data catalog storage implementation.
+
+    Stores catalog data in a single SQLite database in WAL mode, so several processes can read the catalog
+    while one of them updates it. Lookups of a table and its columns use the primary key indexes, and saving
+    a table only writes its own rows.
+    """
+
+    data_path: str
+    db_file: str
+    index_dir: str | None
+
+    _data_warehouse_config: dict
+    _sql_engine: Engine
+
+    def __init__(
+        self, data_path: str, data_warehouse_config: dict, db_file: str = "catalog.db", index_dir: str | None = None
+    ):
+        """Initialize SQLite catalog store.
+
+        Args:
+            data_path (str): Directory absolute path for storing the catalog database.
+            data_warehouse_config (dict): Data warehouse configuration dictionary, see `FileSystemCatalogStore`.
+            db_file (str): File name of the catalog database in data_path.
+            index_dir (Optional[str]): Directory of the retrieval index snapshots, None to not persist them.
+        """
+        if not isinstance(data_path, str) or not data_path.strip():
+            raise ValueError("data_path must be a non-empty string")
+
+        if data_warehouse_config is None:
+            data_warehouse_config = {}
+        elif not isinstance(data_warehouse_config, dict):
+            raise ValueError("data_warehouse_config must be a dictionary")
+
+        self.data_path = data_path.strip()
+        self.db_file = os.path.join(self.data_path, db_file)
+        self.index_dir = index_dir
+
+        try:
+            os.makedirs(self.data_path, exist_ok=True)
+        except (OSError, PermissionError) as e:
+            raise RuntimeError(f"Failed to create data directory '{self.data_path}': {e}") from e
+
+        # Autocommit mode, transactions are started explicitly by `_write` and `begin_batch`
+        self._conn = sqlite3.connect(self.db_file, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.RLock()
+        self._in_batch = False
+
+        # Cached read-only column records, dropped whenever the version in the database changes
+        self._cache_version = None
+        self._common_column_views = None
+        self._table_column_views = {}
+
+        self._data_warehouse_config = data_warehouse_config
+        try:
+            self._sql_engine = create_sqlalchemy_engine_instance(data_warehouse_config)
+        except Exception as e:
+            logger.warning(f"Failed to create SQL engine: {e}. Some catalog operations may not work.")
+            self._sql_engine = None
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def get_data_warehouse_config(self) -> dict:
+        return self._data_warehouse_config
+
+    def get_sql_engine(self) -> Engine:
+        if self._sql_engine is None:
+            raise RuntimeError("SQL engine is not available. Check data warehouse configuration.")
+        return self._sql_engine
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        try:
+            with self._lock:
+                return self._conn.execute(sql, params).fetchall()
+        except Exception as e:
+            logger.error(f"Failed to query catalog database {self.db_file}: {e}")
+            return []
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """
+        Run writes in a transaction which also increments the catalog version. Inside a batch, the writes
+        join the batch transaction in a savepoint, so a failed write leaves the rest of the batch intact.
+        """
+        with self._lock:
+            if self._in_batch:
+                self._conn.execute("SAVEPOINT catalog_write")
+                try:
+                    yield self._conn
+                    self._conn.execute("UPDATE catalog_meta SET value = value + 1 WHERE key = 'version'")
+                except BaseException:
+                    self._conn.execute("ROLLBACK TO catalog_write")
+                    raise
+                finally:
+                    self._conn.execute("RELEASE catalog_write")
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+                self._conn.execute("UPDATE catalog_meta SET value = value + 1 WHERE key = 'version'")
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        self._notify_change()
+
+    def _refresh_cache(self) -> None:
+        """Drop the cached column records if the catalog was changed, by this or another process."""
+        version = self.get_catalog_version()
+        if version != self._cache_version:
+            self._cache_version = version
+            self._common_column_views = None
+            self._table_column_views = {}
+
+    def get_database_list(self) -> list[str]:
+        rows = self._query("SELECT DISTINCT db_name FROM table_columns")
+        return [row[0] for row in rows]
+
+    def get_table_list(self, database: str | None = None) -> list[str]:
+        if database is None:
+            rows = self._query(
+                "SELECT db_name, table_name FROM table_columns GROUP BY db_name, table_name ORDER BY MIN(rowid)"
+            )
+        else:
+            rows = self._query(
+                "SELECT db_name, table_name FROM table_columns WHERE db_name = ?"
+                " GROUP BY db_name, table_name ORDER BY MIN(rowid)",
+                (database,),
+            )
+        return [f"{db_name}.{table_name}" for db_name, table_name in rows]
+
+    def get_column_views(self, table: str | None = None, database: str | None = None) -> tuple[Mapping[str, Any], ...]:
+        try:
+            return self._get_column_views(table, database)
+        except Exception as e:
+            logger.error(f"Failed to read columns from catalog database {self.db_file}: {e}")
+            return ()
+
+    def _get_column_views(self, table: str | None, database: str | None) -> tuple[Mapping[str, Any], ...]:
+        with self._lock:
+            self._refresh_cache()
+            if table is None:
+                if self._common_column_views is None:
+                    rows = self._conn.execute("SELECT information FROM common_columns ORDER BY rowid").fetchall()
+                    self._common_column_views = tuple(MappingProxyType(json.loads(row[0])) for row in rows)
+                return self._common_column_views
+
+            full_table_name, db_name, table_name = split_db_table_name(table, database)
+            if full_table_name not in self._table_column_views:
+                rows = self._conn.execute(
+                    "SELECT s.information, c.information FROM table_columns t"
+                    " LEFT JOIN table_spec_columns s"
+                    " ON s.db_name = t.db_name AND s.table_name = t.table_name AND s.column_name = t.column_name"
+                    " LEFT JOIN common_columns c ON c.column_name = t.column_name"
+                    " WHERE t.db_name = ? AND t.table_name = ? ORDER BY t.rowid",
+                    (db_name, table_name),
+                ).fetchall()
+                column_views = []
+                for spec_information, common_information in rows:
+                    # table specific column information takes precedence over the common column
+                    if spec_information is not None:
+                        column_views.append(MappingProxyType({**json.loads(spec_information), "is_common": False}))
+                    elif common_information is not None:
+                        column_views.append(MappingProxyType({**json.loads(common_information), "is_common": True}))
+                self._table_column_views[full_table_name] = tuple(column_views)
+            return self._table_column_views[full_table_name]
+
+    def get_column_list(self, table: str | None = None, database: str | None = None) -> list[dict[str, Any]]:
+        return [dict(column) for column in self.get_column_views(table, database)]
+
+    def get_table_information(self, table: str, database: str | None = None) -> dict[str, Any]:
+        full_table_name, db_name, table_name = split_db_table_name(table, database)
+        rows = self._query("SELECT information FROM tables WHERE db_name = ? AND table_name = ?", (db_name, table_name))
+        try:
+            return json.loads(rows[0][0]) if rows else {}
+        except Exception as e:
+            logger.error(f"Failed to load table information for {full_table_name}: {e}")
+            return {}
+
+    def get_sql_examples(
+        self, table: str | None = None, database: str | None = None
+    ) -> list[tuple[str, str, list[str]]]:
+        if table is None:
+            rows = self._query("SELECT db_name, table_name, question, answer FROM sql_examples ORDER BY id")
+        else:
+            full_table_name, db_name, table_name = split_db_table_name(table, database)
+            rows = self._query(
+                "SELECT db_name, table_name, question, answer FROM sql_examples"
+                " WHERE db_name = ? AND table_name = ? ORDER BY id",
+                (db_name, table_name),
+            )
+        return [(question, answer, [f"{db_name}.{table_name}"]) for db_name, table_name, question, answer in rows]
+
+    def get_table_selection_examples(self) -> list[tuple[str, list[str]]]:
+        rows = self._query("SELECT question, selected_tables FROM table_selection_examples ORDER BY id")
+        try:
+            return [(question, json.loads(selected_tables)) for question, selected_tables in rows]
+        except Exception as e:
+            logger.error(f"Failed to load table selection examples: {e}")
+            return []
+
+    def begin_batch(self) -> None:
+        """
+        Start a transaction holding the writes until `commit`. All threads share the connection, so reads from
+        this store during the batch, including the catalog version polled by the catalog watcher, see the
+        uncommitted writes, while other processes see the catalog as before the batch.
+        """
+        with self._lock:
+            if self._in_batch:
+                raise RuntimeError("A catalog batch is already in progress")
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._in_batch = True
+
+    def commit(self) -> bool:
+        with self._lock:
+            if not self._in_batch:
+                return True
+            self._in_batch = False
+            try:
+                self._conn.execute("COMMIT")
+                logger.info("Successfully committed catalog batch")
+            except Exception as e:
+                logger.error(f"Failed to commit catalog batch: {e}")
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                return False
+        self._notify_change()
+        return True
+
+    def rollback(self) -> None:
+        with self._lock:
+            if self._in_batch:
+                self._in_batch = False
+                self._conn.execute("ROLLBACK")
+
+    def save_table_information(
+        self,
+        table: str,
+        information: dict[str, Any],
+        columns: list[dict[str, Any]],
+        database: str | None = None,
+        update_existing: bool = False,
+    ) -> bool:
+        if not table or not isinstance(table, str):
+            raise ValueError("Table name must be a non-empty string")
+        if not isinstance(information, dict):
+            raise ValueError("Table information must be a dictionary")
+        if not isinstance(columns, list) or not all(isinstance(column, dict) for column in columns):
+            raise ValueError("Columns must be a list of dictionaries")
+
+        full_table_name, db_name, table_name = split_db_table_name(table, database)
+        try:
+            with self._write() as conn:
+                self._save_columns(conn, db_name, table_name, columns, update_existing)
+                conflict = "REPLACE" if update_existing else "IGNORE"
+                conn.execute(
+                    f"INSERT OR {conflict} INTO tables (db_name, table_name, information) VALUES (?, ?, ?)",
+                    (db_name, table_name, json.dumps(information, ensure_ascii=False)),
+                )
+            logger.info(f"Successfully saved table information for {full_table_name}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save table information for {full_table_name}: {e}")
+            return False
+
+    @staticmethod
+    def _save_columns(
+        conn: sqlite3.Connection, db_name: str, table_name: str, columns: list[dict[str, Any]], update_existing: bool
+    ) -> None:
+        """
+        Save columns of a table, with the same rules as `FileSystemCatalogStore`: new columns are linked to the
+        table, a new common column is only added if no common column has the name, and existing columns are only
+        changed with update_existing.
+
+        Args:
+            conn (sqlite3.Connection): Connection in a transaction
+            db_name (str): Database name
+            table_name (str): Table name
+            columns (List[Dict[str, Any]]): List of column information
+            update_existing (bool): Update existing column information
+        """
+        for column in columns:
+            if "column_name" not in column:
+                continue
+
+            column_name = column["column_name"]
+            is_common_column = column.get("is_common", False)
+            column_info = {k: "" if v is None else str(v) for k, v in column.items() if k != "is_common"}
+            if not is_common_column:
+                column_info["db_name"] = db_name
+                column_info["table_name"] = table_name
+            information = json.dumps(column_info, ensure_ascii=False)
+
+            is_new = conn.execute(
+                "INSERT OR IGNORE INTO table_columns (db_name, table_name, column_name) VALUES (?, ?, ?)",
+                (db_name, table_name, column_name),
+            ).rowcount
+            if not is_new and not update_existing:
+                continue
+            conflict = "REPLACE" if update_existing else "IGNORE"
+            if is_common_column:
+                conn.execute(
+                    f"INSERT OR {conflict} INTO common_columns (column_name, information) VALUES (?, ?)",
+                    (column_name, information),
+                )
+            else:
+                conn.execute(
+                    "INSERT OR REPLACE INTO table_spec_columns (db_name, table_name, column_name, information)"
+                    " VALUES (?, ?, ?, ?)",
+                    (db_name, table_name, column_name, information),
+                )
+
+    def save_table_sql_examples(self, table: str, examples: list[dict[str, str]], database: str | None = None) -> bool:
+        if not table or not isinstance(table, str):
+            raise ValueError("Table name must be a non-empty string")
+        for i, example in enumerate(examples):
+            for field in ("question", "answer"):
+                value = example.get(field) if isinstance(example, dict) else None
+                if not isinstance(value, str) or not value.strip():
+                    raise ValueError(f"Example {i}: {field} must be a non-empty string")
+
+        full_table_name, db_name, table_name = split_db_table_name(table, database)
+        try:
+            with self._write() as conn:
+                conn.execute("DELETE FROM sql_examples WHERE db_name = ? AND table_name = ?", (db_name, table_name))
+                conn.executemany(
+                    "INSERT INTO sql_examples (db_name, table_name, question, answer) VALUES (?, ?, ?, ?)",
+                    [
+                        (db_name, table_name, example["question"].strip(), example["answer"].strip())
+                        for example in examples
+                    ],
+                )
+            logger.info(f"Successfully saved {len(examples)} examples for table {full_table_name}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save examples for table {full_table_name}: {e}")
+            return False
+
+    def save_table_selection_examples(self, examples: list[tuple[str, list[str]]]) -> bool:
+        try:
+            with self._write() as conn:
+                conn.execute("DELETE FROM table_selection_examples")
+                conn.executemany(
+                    "INSERT INTO table_selection_examples (question, selected_tables) VALUES (?, ?)",
+                    [
+                        (question.strip(), json.dumps(list(tables)))
+                        for question, tables in examples
+                        # skip placeholders like ("", []), as the file system store does
+                        if question.strip() and tables
+                    ],
+                )
+            logger.info(f"Successfully saved {len(examples)} table selection examples.")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save table selection examples: {e}")
+            return False
+
+    def import_catalog(self, source: CatalogStore) -> bool:
+        """
+        Copy the content of another catalog store into this one, e.g. to migrate from the file system store.
+        Does nothing if this catalog already has tables, so several processes can start up and migrate at once.
+
+        Args:
+            source (CatalogStore): Catalog store to copy from
+
+        Returns:
+            bool: Whether the catalog was imported
+        """
+        try:
+            self.begin_batch()
+            if self.check_exists():
+                self.rollback()
+                logger.info("Catalog database is not empty, skip importing")
+                return False
+
+            with self._write() as conn:
+                # common columns first, to keep the ones not used by any table
+                conn.executemany(
+                    "INSERT OR IGNORE INTO common_columns (column_name, information) VALUES (?, ?)",
+                    [
+                        (column["column_name"], json.dumps(dict(column), ensure_ascii=False))
+                        for column in source.get_column_list()
+                    ],
+                )
+            tables = source.get_table_list()
+            for table in tables:
+                self.save_table_information(table, source.get_table_information(table), source.get_column_list(table))
+            sql_examples = {}
+            for question, answer, example_tables in source.get_sql_examples():
+                sql_examples.setdefault(example_tables[0], []).append({"question": question, "answer": answer})
+            for table, examples in sql_examples.items():
+                self.save_table_sql_examples(table, examples)
+            self.save_table_selection_examples(source.get_table_selection_examples())
+        except Exception as e:
+            self.rollback()
+            logger.error(f"Failed to import catalog: {e}")
+            return False
+
+        if self.commit():
+            logger.info(f"Imported catalog with {len(tables)} tables into {self.db_file}")
+            return True
+        return False
+
+    def get_index_directory(self) -> str | None:
+        return self.index_dir
+
+    def get_catalog_version(self) -> int | None:
+        rows = self._query("SELECT value FROM catalog_meta WHERE key = 'version'")
+        return rows[0][0] if rows else None
+
+    def check_exists(self) -> bool:
+        rows = self._query("SELECT EXISTS (SELECT 1 FROM table_columns)")
+        return bool(rows and rows[0][0])
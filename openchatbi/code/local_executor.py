@@ -36,6 +36,10 @@ class LocalExecutor(ExecutorBase):
             # This allows the code to work even if some libraries are missing
             pass
         
+        # Full SQL query results are loaded by result handle
+        from openchatbi.text2sql.result_store import load_result
+        safe_globals['load_result'] = load_result
+
         # Load local datasets if available
         try:
             from openchatbi.config_loader import ConfigLoader
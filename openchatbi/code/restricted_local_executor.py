@@ -49,6 +49,10 @@ class RestrictedLocalExecutor(ExecutorBase):
                 # If any library is not available, continue without it
                 pass
 
+            # Full SQL query results are loaded by result handle
+            from openchatbi.text2sql.result_store import load_result
+            restricted_globals['load_result'] = load_result
+
             # Load local datasets if available
             try:
                 from openchatbi.config_loader import ConfigLoader
@@ -4,10 +4,12 @@ from importlib.util import find_spec
 from typing import Any
 from unittest.mock import MagicMock
 
+from langchain_core.embeddings import Embeddings
 from langchain_core.language_models import BaseChatModel
 from pydantic import BaseModel
 
 from openchatbi.catalog.factory import create_catalog_store
+from openchatbi.llm.embedding_cache import wrap_embedding_model
 from openchatbi.utils import log
 
 
@@ -18,10 +20,13 @@ class Config(BaseModel):
         organization (str): Organization name. Defaults to "The Company".
         dialect (str): SQL dialect to use. Defaults to "presto".
         default_llm (BaseChatModel): Default language model for general tasks.
-        embedding_model (BaseModel): Language model for embedding generation.
+        embedding_model (BaseModel): Language model for embedding generation, wrapped with an embedding cache.
         text2sql_llm (Optional[BaseChatModel]): Language model specifically for text-to-SQL tasks.
         bi_config (Dict[str, Any]): BI configuration loaded from YAML file. Defaults to empty dict.
         data_warehouse_config (Dict[str, Any]): Data warehouse configuration. Defaults to empty dict.
+        embedding_cache (Dict[str, Any]): Embedding cache options `enabled`, `max_entries` and `sqlite_path`.
+        catalog_reload_interval (float): Seconds between checks for catalog changes, indexes built from the
+            catalog are rebuilt in the background when it changes. 0 disables hot reload. Defaults to 30.
     """
 
     model_config = {"arbitrary_types_allowed": True}
@@ -32,9 +37,12 @@ class Config(BaseModel):
 
     # LLM Configurations
     default_llm: BaseChatModel | MagicMock
-    embedding_model: BaseModel | MagicMock | None = None
+    embedding_model: BaseModel | Embeddings | MagicMock | None = None
     text2sql_llm: BaseChatModel | MagicMock | None = None
 
+    # Embedding Cache Configuration
+    embedding_cache: dict[str, Any] = {}
+
     # BI Configuration
     bi_config: dict[str, Any] = {}
 
@@ -43,6 +51,7 @@ class Config(BaseModel):
 
     # Catalog Store
     catalog_store: Any = None
+    catalog_reload_interval: float = 30.0
 
     # MCP Servers Configuration
     mcp_servers: list[dict[str, Any]] = []
@@ -56,6 +65,27 @@ class Config(BaseModel):
     # Visualization Configuration
     visualization_mode: str | None = "rule"  # Options: "rule", "llm", None (skip visualization)
 
+    # SQL Result Limits, keys `max_rows`, `max_bytes`, `fetch_size` and `count_limit`
+    sql_result_limits: dict[str, int] = {}
+
+    # SQL Result Store, keys `max_memory_bytes`, `max_result_bytes`, `max_results` and `spill_dir`
+    result_store: dict[str, Any] = {}
+
+    # SQL Result Cache, keys `enabled`, `ttl_seconds`, `max_bytes` and `disk_path`
+    sql_result_cache: dict[str, Any] = {}
+
+    # Question SQL Cache, keys `enabled`, `similarity_threshold`, `ttl_seconds`, `max_entries` and `share_across_users`
+    sql_question_cache: dict[str, Any] = {}
+
+    # Speculative retrieval of columns and examples with the raw question while its information is extracted
+    speculative_retrieval: bool = False
+
+    # Heuristic table selection skipping the LLM call, keys `enabled`, `min_coverage` and `min_margin`
+    table_selection_heuristic: dict[str, Any] = {}
+
+    # Token budgets of the table schemas in prompts, keys `enabled`, `sql_max_tokens` and `table_selection_max_tokens`
+    schema_prompt_budget: dict[str, Any] = {}
+
     # Context Management Configuration
     context_config: dict[str, Any] = {}
 
@@ -223,6 +253,11 @@ class ConfigLoader:
                     f"Failed to load {config_key} class '{config_data[config_key]['class']}': {e}"
                 ) from e
 
+        if config_data.get("embedding_model") is not None:
+            config_data["embedding_model"] = wrap_embedding_model(
+                config_data["embedding_model"], config_data.get("embedding_cache")
+            )
+
     def load_bi_config(self, bi_config_file: str) -> dict[str, Any]:
         """Load BI configuration from a YAML file.
 
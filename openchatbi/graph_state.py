@@ -36,14 +36,20 @@ class SQLGraphState(MessagesState):
 
     rewrite_question: str
     tables: list[dict[str, Any]]
+    relevant_columns: list[str]  # Columns retrieved for the question during table selection, most relevant first
     info_entities: dict[str, Any]
     sql: str
     sql_retry_count: int
+    sql_generated_time: float  # Time the SQL was generated or regenerated
     sql_execution_result: str
     schema_info: dict[str, Any]  # Data schema analysis results
     data: str  # CSV data for display
+    result_handle: str  # Handle of the full SQL result in the result store, empty if it is not stored
+    result_info: dict[str, Any]  # Row counts of the SQL result, and whether `data` is a truncated preview
     previous_sql_errors: list[dict[str, Any]]
     visualization_dsl: dict[str, Any]
+    sql_cache: dict[str, Any]  # Question SQL cache lookup: hit, match type, similarity and seconds saved
+    speculative_retrieval: dict[str, Any]  # Columns and examples retrieved with the raw question during extraction
 
 
 class InputState(MessagesState):
@@ -66,4 +72,6 @@ class SQLOutputState(MessagesState):
     sql: str
     schema_info: dict[str, Any]  # Data schema analysis results
     data: str  # CSV data for display
+    result_handle: str  # Handle of the full SQL result in the result store, empty if it is not stored
+    result_info: dict[str, Any]  # Row counts of the SQL result, and whether `data` is a truncated preview
     visualization_dsl: dict[str, Any]
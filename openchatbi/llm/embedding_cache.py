@@ -0,0 +1,223 @@
+"""Embedding cache wrapping the configured embedding model."""
+
+import hashlib
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any
+
+from langchain_core.embeddings import Embeddings
+
+from openchatbi.utils import log
+
+
+def normalize_embedding_text(text: str) -> str:
+    """Normalize text for the cache key: collapse whitespace, keeping case, which can change the embedding."""
+    return " ".join(text.split())
+
+
+def get_embedding_model_name(embeddings: Any) -> str:
+    """Get a name identifying the embedding model, so cached vectors of different models never mix."""
+    if isinstance(embeddings, CachedEmbeddings):
+        return embeddings.model_name
+    for attr in ("model", "model_name", "deployment"):
+        name = getattr(embeddings, attr, None)
+        if isinstance(name, str) and name:
+            return f"{type(embeddings).__name__}:{name}"
+    return type(embeddings).__name__
+
+
+class SQLiteEmbeddingStore:
+    """On-disk embedding store in SQLite, shared by processes on the same host."""
+
+    def __init__(self, path: str):
+        """Open or create the store.
+
+        Args:
+            path (str): Path of the SQLite database file.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        """Get the stored vectors of the keys, missing keys are left out."""
+        rows = []
+        with self._lock:
+            # stay below the SQLite host parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows += self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+        return {key: array("d", vector).tolist() for key, vector in rows}
+
+    def set_many(self, items: dict[str, list[float]]) -> None:
+        """Store vectors by key, replacing existing ones."""
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, array("d", vector).tobytes()) for key, vector in items.items()],
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper serving repeated texts from an in-process LRU cache and an optional SQLite store.
+
+    Cache keys are the model name plus the normalized text, so texts that differ only in
+    whitespace share an embedding. Query and document embeddings are cached separately,
+    as some models embed them differently. Only the texts missing from both tiers are sent to the
+    wrapped model, in one batch.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_entries: int = 10000, sqlite_path: str | None = None):
+        """Initialize the cache.
+
+        Args:
+            embeddings (Embeddings): Embedding model to wrap.
+            max_entries (int): Maximum number of vectors kept in memory.
+            sqlite_path (str | None): Path of the SQLite store, None to only cache in memory.
+        """
+        self.embeddings = embeddings
+        self.model_name = get_embedding_model_name(embeddings)
+        self.max_entries = max_entries
+        self.store = SQLiteEmbeddingStore(sqlite_path) if sqlite_path else None
+        self._lru: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name: str) -> Any:
+        # expose attributes of the wrapped model, e.g. `model` or `dimensions`
+        if name == "embeddings":
+            raise AttributeError(name)
+        return getattr(self.embeddings, name)
+
+    def _key(self, text: str, kind: str = "document") -> str:
+        key = f"{self.model_name}\0{kind}\0{normalize_embedding_text(text)}"
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def _lookup(self, keys: list[str]) -> dict[str, list[float]]:
+        """Get cached vectors from memory, then from the SQLite store, counting hits and misses."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                    found[key] = vector
+        if self.store is not None:
+            stored = self.store.get_many([key for key in set(keys) if key not in found])
+            self._remember(stored)
+            found.update(stored)
+        with self._lock:
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found
+
+    def _remember(self, items: dict[str, list[float]]) -> None:
+        with self._lock:
+            for key, vector in items.items():
+                self._lru[key] = vector
+                self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def _store(self, items: dict[str, list[float]]) -> None:
+        self._remember(items)
+        if self.store is not None:
+            try:
+                self.store.set_many(items)
+            except sqlite3.Error as e:
+                log(f"Failed to store embeddings in {self.store.path}: {e}")
+
+    def _missing(self, texts: list[str], keys: list[str], found: dict) -> tuple[list[str], list[str]]:
+        """Get the distinct texts (and their keys) not found in the cache."""
+        missing = {key: text for key, text in zip(keys, texts, strict=True) if key not in found}
+        return list(missing.values()), list(missing)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [self._key(text) for text in texts]
+        found = self._lookup(keys)
+        missing_texts, missing_keys = self._missing(texts, keys, found)
+        if missing_texts:
+            computed = dict(zip(missing_keys, self.embeddings.embed_documents(missing_texts), strict=True))
+            self._store(computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        key = self._key(text, "query")
+        found = self._lookup([key])
+        if key not in found:
+            found[key] = self.embeddings.embed_query(text)
+            self._store({key: found[key]})
+        return found[key]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [self._key(text) for text in texts]
+        found = self._lookup(keys)
+        missing_texts, missing_keys = self._missing(texts, keys, found)
+        if missing_texts:
+            computed = dict(zip(missing_keys, await self.embeddings.aembed_documents(missing_texts), strict=True))
+            self._store(computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        key = self._key(text, "query")
+        found = self._lookup([key])
+        if key not in found:
+            found[key] = await self.embeddings.aembed_query(text)
+            self._store({key: found[key]})
+        return found[key]
+
+    def stats(self) -> dict[str, Any]:
+        """Get cache metrics.
+
+        Returns:
+            dict: hits, misses, hit_rate and the number of vectors in memory.
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._lru),
+            }
+
+
+def wrap_embedding_model(embeddings: Any, cache_config: dict[str, Any] | None = None) -> Any:
+    """Wrap an embedding model with ``CachedEmbeddings`` according to the `embedding_cache` config.
+
+    Args:
+        embeddings: The embedding model, returned unchanged if it is not an ``Embeddings`` instance.
+        cache_config (dict | None): Options `enabled` (default True), `max_entries` and `sqlite_path`.
+
+    Returns:
+        The cached embedding model, or the original one if caching is disabled.
+    """
+    cache_config = cache_config or {}
+    if not cache_config.get("enabled", True) or not isinstance(embeddings, Embeddings):
+        return embeddings
+    if isinstance(embeddings, CachedEmbeddings):
+        return embeddings
+    return CachedEmbeddings(
+        embeddings,
+        max_entries=cache_config.get("max_entries", 10000),
+        sqlite_path=cache_config.get("sqlite_path"),
+    )
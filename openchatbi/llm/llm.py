@@ -33,6 +33,44 @@ def _invalid_tool_names(valid_tools, tool_calls) -> str:
     return ",".join(invalid_tools)
 
 
+def _valid_tool_names(chat_model: BaseChatModel, bound_tools) -> list[str]:
+    """Get the names of the tools the model may call, from the bound tools or the tools bound to the model."""
+    valid_tools = []
+    if bound_tools:
+        for tool in bound_tools:
+            if isinstance(tool, str):
+                valid_tools.append(tool)
+            elif isinstance(tool, StructuredTool):
+                valid_tools.append(tool.name)
+            elif tool == AskHuman:
+                valid_tools.append("AskHuman")
+    elif isinstance(chat_model, RunnableBinding) and "tools" in chat_model.kwargs:
+        valid_tools += [tool["name"] for tool in chat_model.kwargs["tools"] if "name" in tool]
+    return valid_tools
+
+
+def _tool_call_retry_message(response, valid_tools: list[str], parallel_tool_call: bool) -> dict | None:
+    """Get the message asking the model to fix its tool calls, None if the response is valid."""
+    if not response.tool_calls:
+        return None
+    if len(response.tool_calls) > 1 and not parallel_tool_call:
+        log(f"More than one tool {response.tool_calls}.")
+        return {"role": "user", "content": "You should only response with one tool call."}
+    invalid_tools = _invalid_tool_names(valid_tools, response.tool_calls)
+    if invalid_tools:
+        log(f"Invalid tool {invalid_tools}.")
+        extra_prompt = (
+            " Please select the `AskHuman` tool if you need to confirm with user." if "AskHuman" in valid_tools else ""
+        )
+        return {
+            "role": "user",
+            "content": f"You should not use tool that does not exist:`{invalid_tools}`."
+            f"Available tools are: {valid_tools}. Please choose a valid tool and try again."
+            f"{extra_prompt}",
+        }
+    return None
+
+
 def call_llm_chat_model_with_retry(
     chat_model: BaseChatModel, messages, streaming_tokens=False, bound_tools=None, parallel_tool_call=False
 ):
@@ -51,20 +89,7 @@ def call_llm_chat_model_with_retry(
         AIMessage or None: The model response or None if all retries failed.
     """
     new_messages = list(messages)
-    valid_tools = []
-    if bound_tools:
-        for tool in bound_tools:
-            if isinstance(tool, str):
-                valid_tools.append(tool)
-            elif isinstance(tool, StructuredTool):
-                valid_tools.append(tool.name)
-            elif tool == AskHuman:
-                valid_tools.append("AskHuman")
-    elif isinstance(chat_model, RunnableBinding) and "tools" in chat_model.kwargs:
-        valid_tools += [tool["name"] for tool in chat_model.kwargs["tools"] if "name" in tool]
-    extra_prompt = (
-        " Please select the `AskHuman` tool if you need to confirm with user." if "AskHuman" in valid_tools else ""
-    )
+    valid_tools = _valid_tool_names(chat_model, bound_tools)
     response = None
     retry = 0
     # retry 3 times
@@ -84,26 +109,61 @@ def call_llm_chat_model_with_retry(
             traceback.print_exc()
             continue
 
-        if response.tool_calls:
-            if len(response.tool_calls) > 1 and not parallel_tool_call:
-                retry += 1
-                log(f"More than one tool {response.tool_calls}, retry {retry} times.")
-                new_messages += [{"role": "user", "content": "You should only response with one tool call."}]
-                response = None
-                continue
-            invalid_tools = _invalid_tool_names(valid_tools, response.tool_calls)
-            if invalid_tools:
-                retry += 1
-                log(f"Invalid tool {invalid_tools}, retry {retry} times.")
-                new_messages += [
-                    {
-                        "role": "user",
-                        "content": f"You should not use tool that does not exist:`{invalid_tools}`."
-                        f"Available tools are: {valid_tools}. Please choose a valid tool and try again."
-                        f"{extra_prompt}",
-                    }
-                ]
-                response = None
-                continue
+        retry_message = _tool_call_retry_message(response, valid_tools, parallel_tool_call)
+        if retry_message:
+            retry += 1
+            log(f"Invalid tool calls, retry {retry} times.")
+            new_messages.append(retry_message)
+            response = None
+            continue
+        break
+    return response
+
+
+async def acall_llm_chat_model_with_retry(
+    chat_model: BaseChatModel, messages, streaming_tokens=False, bound_tools=None, parallel_tool_call=False
+):
+    """Async version of `call_llm_chat_model_with_retry`, calling the model with `ainvoke`.
+
+    Args:
+        chat_model: The chat model to invoke.
+        messages (list): List of messages to send to the model.
+        streaming_tokens (bool, optional): flag to indicate whether or not to show streaming tokens in UI.
+        bound_tools (list, optional): List of valid tool names that can be called.
+        parallel_tool_call (bool, optional): whether or not to call multiple tools in parallel.
+
+    Returns:
+        AIMessage or None: The model response or None if all retries failed.
+    """
+    new_messages = list(messages)
+    valid_tools = _valid_tool_names(chat_model, bound_tools)
+    response = None
+    retry = 0
+    # retry 3 times
+    while retry < 3:
+        start_time = time.time()
+        try:
+            log(f"Call LLM chat model with retry {retry} times.")
+            response = await chat_model.ainvoke(
+                new_messages, config={"metadata": {"streaming_tokens": streaming_tokens}}
+            )
+            run_time = int(time.time() - start_time)
+            log(f"LLM response after {run_time} seconds.")
+        except Exception:
+            run_time = int(time.time() - start_time)
+            retry += 1
+            log(f"LLM response error after {run_time} seconds, retry {retry} times.")
+            log("===== Messages:")
+            log(str(messages))
+            traceback.print_exc()
+            continue
+
+        retry_message = _tool_call_retry_message(response, valid_tools, parallel_tool_call)
+        if retry_message:
+            retry += 1
+            log(f"Invalid tool calls, retry {retry} times.")
+            new_messages.append(retry_message)
+            response = None
+            continue
         break
     return response
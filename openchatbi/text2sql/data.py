@@ -1,8 +1,70 @@
 import os
+from collections.abc import Callable, Iterator, Mapping
+from typing import Any
 
 from openchatbi import config
+from openchatbi.catalog.catalog_store import CatalogStore
+from openchatbi.catalog.catalog_watcher import watch_catalog
 from openchatbi.text2sql.text2sql_utils import init_sql_example_retriever, init_table_selection_example_dict
 
+
+class ExampleIndex:
+    """Example retriever and example dict built from the catalog store, rebuilt when the catalog changes.
+
+    Both are kept in one tuple, so a rebuild swaps them in together with a single assignment.
+    """
+
+    def __init__(self, build: Callable[[CatalogStore], tuple[Any, dict]], catalog: CatalogStore | None):
+        """Build the index.
+
+        Args:
+            build (Callable): Function building (retriever, example dict) from a catalog store.
+            catalog (CatalogStore | None): Catalog store, None for an empty index.
+        """
+        self._build = build
+        self._index = build(catalog) if catalog else (None, {})
+        # views delegating to the current index, for modules importing the retriever and dict by name
+        self.retriever = _RetrieverView(self)
+        self.examples = _ExamplesView(self)
+
+    def get(self) -> tuple[Any, dict]:
+        """Get the current (retriever, example dict)."""
+        return self._index
+
+    def rebuild(self, catalog: CatalogStore) -> None:
+        """Build the index from the catalog store, and swap it in."""
+        self._index = self._build(catalog)
+
+
+class _RetrieverView:
+    """Retriever delegating to the current retriever of an example index."""
+
+    def __init__(self, index: ExampleIndex):
+        self._example_index = index
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._example_index.get()[0], name)
+
+    def __bool__(self) -> bool:
+        return self._example_index.get()[0] is not None
+
+
+class _ExamplesView(Mapping):
+    """Read-only example dict delegating to the current examples of an example index."""
+
+    def __init__(self, index: ExampleIndex):
+        self._example_index = index
+
+    def __getitem__(self, key: str) -> Any:
+        return self._example_index.get()[1][key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._example_index.get()[1])
+
+    def __len__(self) -> int:
+        return len(self._example_index.get()[1])
+
+
 # Skip init during documentation build
 if not os.environ.get("SPHINX_BUILD"):
     try:
@@ -12,9 +74,14 @@ if not os.environ.get("SPHINX_BUILD"):
 else:
     _catalog_store = None
 
+sql_example_index = ExampleIndex(init_sql_example_retriever, _catalog_store)
+table_selection_example_index = ExampleIndex(init_table_selection_example_dict, _catalog_store)
 if _catalog_store:
-    sql_example_retriever, sql_example_dicts = init_sql_example_retriever(_catalog_store)
-    table_selection_retriever, table_selection_example_dict = init_table_selection_example_dict(_catalog_store)
-else:
-    sql_example_retriever, sql_example_dicts = None, {}
-    table_selection_retriever, table_selection_example_dict = None, {}
+    watch_catalog(_catalog_store, "sql examples", sql_example_index.rebuild)
+    watch_catalog(_catalog_store, "table selection examples", table_selection_example_index.rebuild)
+
+sql_example_retriever, sql_example_dicts = sql_example_index.retriever, sql_example_index.examples
+table_selection_retriever, table_selection_example_dict = (
+    table_selection_example_index.retriever,
+    table_selection_example_index.examples,
+)
@@ -8,9 +8,11 @@ from typing import Any
 from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
+from openchatbi.catalog import CatalogStore
 from openchatbi.graph_state import SQLGraphState
-from openchatbi.llm.llm import call_llm_chat_model_with_retry
+from openchatbi.llm.llm import acall_llm_chat_model_with_retry, call_llm_chat_model_with_retry
 from openchatbi.prompts.system_prompt import get_basic_knowledge, get_extraction_prompt_template
+from openchatbi.text2sql.speculative_retrieval import start_speculative_retrieval
 from openchatbi.utils import extract_json_from_answer, get_text_from_content, log
 
 
@@ -46,34 +48,29 @@ def parse_extracted_info_json(llm_answer_content: Any) -> dict[str, Any]:
     return result
 
 
-def information_extraction(llm: BaseChatModel) -> Callable:
+def information_extraction(llm: BaseChatModel, sync_mode: bool = True, catalog: CatalogStore | None = None) -> Callable:
     """Create function to extract information from questions.
 
     Args:
         llm (BaseChatModel): Language model for information extraction.
+        sync_mode (bool): Whether to create a sync node, or an async node calling the model with `ainvoke`.
+        catalog (CatalogStore | None): Catalog store searched speculatively with the raw question while the model
+            extracts, see `speculative_retrieval`. None to leave all retrieval to the following nodes.
 
     Returns:
         function: Node function that extracts information from questions.
     """
 
-    def _extract(state: SQLGraphState):
-        """Extract information from question in state.
-
-        Args:
-            state (SQLGraphState): Current SQL graph state with question.
-
-        Returns:
-            dict: Updated state with extracted information.
-        """
+    def _extraction_messages(state: SQLGraphState) -> list:
         messages = state["messages"]
         last_message = messages[-1]
         user_input = last_message.content
         log(f"information_extraction: {user_input}")
         system_prompt = generate_extraction_prompt()
         prompt = "Please extract the information according to the context."
-        response = call_llm_chat_model_with_retry(
-            llm, ([SystemMessage(system_prompt)] + messages + [HumanMessage(prompt)]), ["search_knowledge", "AskHuman"]
-        )
+        return [SystemMessage(system_prompt)] + messages + [HumanMessage(prompt)]
+
+    def _extraction_update(response) -> dict:
         if response:
             log(response)
             if response.tool_calls:
@@ -89,7 +86,63 @@ def information_extraction(llm: BaseChatModel) -> Callable:
         else:
             return {"messages": [AIMessage(role="system", content="{}")]}
 
-    return _extract
+    def _raw_question(state: SQLGraphState) -> str:
+        """The last question of the user, searched speculatively, empty without a catalog to search in."""
+        if catalog is None:
+            return ""
+        for message in reversed(state["messages"]):
+            if isinstance(message, HumanMessage):
+                return get_text_from_content(message.content)
+        return ""
+
+    def _extract(state: SQLGraphState):
+        """Extract information from question in state.
+
+        Args:
+            state (SQLGraphState): Current SQL graph state with question.
+
+        Returns:
+            dict: Updated state with extracted information.
+        """
+        question = _raw_question(state)
+        speculation = start_speculative_retrieval(question, catalog) if question else None
+        try:
+            response = call_llm_chat_model_with_retry(
+                llm, _extraction_messages(state), ["search_knowledge", "AskHuman"]
+            )
+            update = _extraction_update(response)
+            # the speculative results are only used once the question is extracted, not for tool calls
+            if speculation is not None and "rewrite_question" in update:
+                update["speculative_retrieval"] = speculation.result(update["info_entities"])
+            return update
+        finally:
+            if speculation is not None:
+                speculation.cancel()
+
+    async def _aextract(state: SQLGraphState):
+        """Extract information from question in state, without blocking the event loop.
+
+        Args:
+            state (SQLGraphState): Current SQL graph state with question.
+
+        Returns:
+            dict: Updated state with extracted information.
+        """
+        question = _raw_question(state)
+        speculation = start_speculative_retrieval(question, catalog) if question else None
+        try:
+            response = await acall_llm_chat_model_with_retry(
+                llm, _extraction_messages(state), ["search_knowledge", "AskHuman"]
+            )
+            update = _extraction_update(response)
+            if speculation is not None and "rewrite_question" in update:
+                update["speculative_retrieval"] = await speculation.aresult(update["info_entities"])
+            return update
+        finally:
+            if speculation is not None:
+                speculation.cancel()
+
+    return _extract if sync_mode else _aextract
 
 
 def information_extraction_conditional_edges(state: SQLGraphState):
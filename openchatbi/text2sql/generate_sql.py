@@ -1,11 +1,16 @@
+import asyncio
 import datetime
-from collections.abc import Callable
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+from functools import partial
 from typing import Any
 
 import pandas as pd
 from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
-from sqlalchemy import text
+from sqlalchemy import Connection, text
 from sqlalchemy.exc import DatabaseError, OperationalError, ProgrammingError, TimeoutError
 
 from openchatbi.catalog import CatalogStore
@@ -20,9 +25,21 @@ from openchatbi.constants import (
 from openchatbi.graph_state import SQLGraphState
 from openchatbi.prompts.system_prompt import get_text2sql_dialect_prompt_template
 from openchatbi.text2sql.data import sql_example_dicts, sql_example_retriever
+from openchatbi.text2sql.result_cache import SQLResultCache
+from openchatbi.text2sql.result_profile import column_kinds_from_cursor, profile_dataframe
+from openchatbi.text2sql.result_store import ResultStore, ResultWriter
+from openchatbi.text2sql.schema_packer import SchemaPacker, TableSchema, essential_columns
 from openchatbi.text2sql.visualization import VisualizationService
 from openchatbi.utils import get_text_from_content, log
 
+# Limits of the SQL result kept in the graph state and sent to the LLM, overridden by the `sql_result_limits` config
+DEFAULT_SQL_RESULT_LIMITS = {
+    "max_rows": 5000,  # rows kept in the result preview
+    "max_bytes": 100_000,  # size of the CSV result preview
+    "fetch_size": 1000,  # rows fetched from the database cursor at a time
+    "count_limit": 1_000_000,  # rows counted after the preview is full, the total is approximate beyond it
+}
+
 COLUMN_PROMPT_TEMPLATE = """### Columns
 Column(Name, Type, Display Name, Description):
 [
@@ -31,8 +48,163 @@ Column(Name, Type, Display Name, Description):
 """
 
 
+class SchemaPromptCache:
+    """LRU cache of rendered table schemas, keyed by (tables, catalog version).
+
+    Saving to the catalog changes its version, so schemas rendered from older catalog content are
+    dropped. Reusing the exact same text across retries and repeated questions also keeps the
+    system prompt prefix stable for provider-side prompt caching.
+    """
+
+    def __init__(
+        self, catalog: CatalogStore, render: Callable[[tuple[str, ...]], list[TableSchema]], max_size: int = 128
+    ):
+        """Initialize the cache.
+
+        Args:
+            catalog (CatalogStore): Catalog store the schemas are rendered from.
+            render (Callable[[tuple[str, ...]], list[TableSchema]]): Renders the schema of each table.
+            max_size (int): Maximum number of cached table sets.
+        """
+        self.catalog = catalog
+        self.render = render
+        self.max_size = max_size
+        self._prompts: OrderedDict[tuple[str, ...], list[TableSchema]] = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self, tables: list[str]) -> list[TableSchema]:
+        """Get the schemas of the tables, rendering them on a cache miss.
+
+        Args:
+            tables (List[str]): Table names, in prompt order.
+
+        Returns:
+            List[TableSchema]: Schema of each table.
+        """
+        version = self.catalog.get_catalog_version()
+        key = tuple(tables)
+        if version is None:
+            # store does not track changes, cached prompts could go stale
+            return self.render(key)
+        with self._lock:
+            if version != self._version:
+                self._prompts.clear()
+                self._version = version
+            prompt = self._prompts.get(key)
+            if prompt is not None:
+                self._prompts.move_to_end(key)
+                return prompt
+        prompt = self.render(key)
+        with self._lock:
+            if version == self._version:
+                self._prompts[key] = prompt
+                if len(self._prompts) > self.max_size:
+                    self._prompts.popitem(last=False)
+        return prompt
+
+
+def _estimate_row_bytes(row: Sequence[Any]) -> int:
+    """Estimate the size of a row in CSV, without formatting it."""
+    return sum(len(str(value)) for value in row) + len(row)
+
+
+def _to_csv_within(df: pd.DataFrame, max_bytes: int) -> tuple[pd.DataFrame, str]:
+    """Format the DataFrame as CSV, dropping trailing rows until the CSV fits in max_bytes.
+
+    Args:
+        df (pd.DataFrame): Result rows.
+        max_bytes (int): Maximum CSV size.
+
+    Returns:
+        Tuple[pd.DataFrame, str]: The kept rows and their CSV.
+    """
+    csv_data = df.to_csv(index=False)
+    while len(csv_data) > max_bytes and len(df) > 0:
+        # keep the share of rows that fits, at least one row less each time
+        keep = min(len(df) - 1, int(len(df) * max_bytes / len(csv_data)))
+        df = df.head(keep)
+        csv_data = df.to_csv(index=False)
+    return df, csv_data
+
+
+def fetch_sql_result(
+    connection: Connection,
+    sql: str,
+    limits: dict[str, int],
+    result_store: ResultStore | None = None,
+) -> tuple[pd.DataFrame, str, dict[str, Any]]:
+    """Execute a query and fetch a bounded preview of its result.
+
+    Rows are streamed from a server-side cursor in batches of `fetch_size`. Up to `max_rows` rows,
+    and no more than about `max_bytes` of CSV, are kept. Rows after the preview are only counted, up
+    to `count_limit`, so memory stays bounded regardless of the result size. With a result store, the
+    fetched rows are also written to it as an Arrow table, within the store's `max_result_bytes`.
+
+    Args:
+        connection (Connection): Database connection.
+        sql (str): The SQL query to execute.
+        limits (Dict[str, int]): Limits `max_rows`, `max_bytes`, `fetch_size` and `count_limit`.
+        result_store (ResultStore | None): Store the full result is written to, None to only keep the preview.
+
+    Returns:
+        Tuple[pd.DataFrame, str, Dict[str, Any]]: The preview rows, with the column kinds given by the
+            cursor type metadata in `attrs["column_kinds"]`, their CSV, and result info with
+            `preview_rows`, `total_rows`, `total_rows_exact` and `truncated`, plus `result_handle` and
+            `stored_rows` with a result store.
+    """
+    max_rows, max_bytes = limits["max_rows"], limits["max_bytes"]
+    fetch_size, count_limit = limits["fetch_size"], limits["count_limit"]
+    result = connection.execute(text(sql).execution_options(stream_results=True, max_row_buffer=fetch_size))
+    columns = list(result.keys())
+    column_kinds = column_kinds_from_cursor(
+        getattr(result.cursor, "description", None), getattr(connection.dialect, "loaded_dbapi", None)
+    )
+    writer: ResultWriter | None = result_store.create_writer(columns) if result_store is not None else None
+
+    rows, estimated_bytes, total_rows = [], 0, 0
+    exhausted = False
+    while True:
+        batch = result.fetchmany(fetch_size)
+        if not batch:
+            exhausted = True
+            break
+        total_rows += len(batch)
+        if writer is not None:
+            writer.write_rows(batch)
+        for row in batch:
+            if len(rows) >= max_rows or estimated_bytes > max_bytes:
+                break
+            rows.append(tuple(row))
+            estimated_bytes += _estimate_row_bytes(row)
+        if total_rows >= count_limit:
+            break
+    result.close()
+
+    df, csv_data = _to_csv_within(pd.DataFrame(rows, columns=columns), max_bytes)
+    df.attrs["column_kinds"] = column_kinds
+    result_info = {
+        "preview_rows": len(df),
+        "total_rows": total_rows,
+        "total_rows_exact": exhausted,
+        "truncated": len(df) < total_rows or not exhausted,
+    }
+    if writer is not None:
+        result_info["result_handle"] = writer.close()
+        result_info["stored_rows"] = writer.stored_rows
+    return df, csv_data, result_info
+
+
 def create_sql_nodes(
-    llm: BaseChatModel, catalog: CatalogStore, dialect: str, visualization_mode: str | None = "rule"
+    llm: BaseChatModel,
+    catalog: CatalogStore,
+    dialect: str,
+    visualization_mode: str | None = "rule",
+    result_limits: dict[str, int] | None = None,
+    result_store: ResultStore | None = None,
+    result_cache: SQLResultCache | None = None,
+    sync_mode: bool = True,
+    schema_packer: SchemaPacker | None = None,
 ) -> tuple[Callable, Callable, Callable, Callable]:
     """Creates the four SQL processing nodes for LangGraph.
 
@@ -41,11 +213,22 @@ def create_sql_nodes(
         catalog (CatalogStore): The catalog store containing schema information.
         dialect (str): The SQL dialect to use (e.g., 'presto', 'mysql').
         visualization_mode (str | None): Visualization analysis mode ("rule", "llm", or None to skip).
+        result_limits (dict | None): Overrides of `DEFAULT_SQL_RESULT_LIMITS`.
+        result_store (ResultStore | None): Store of full query results, referenced from the state by
+            `result_handle`. None to only keep the CSV preview in the state.
+        result_cache (SQLResultCache | None): Cache of query results by normalized SQL, None to always query
+            the database.
+        sync_mode (bool): Whether to create sync nodes, or async nodes calling the model with `ainvoke` and running
+            database queries in a worker thread, for graphs driven by `ainvoke`/`astream`.
+        schema_packer (SchemaPacker | None): Packer fitting the table schemas into a token budget, None to
+            always include every column of the selected tables.
 
     Returns:
         tuple: Four node functions (generate_sql_node, execute_sql_node, regenerate_sql_node, generate_visualization_node)
     """
 
+    result_limits = {**DEFAULT_SQL_RESULT_LIMITS, **(result_limits or {})}
+
     # Initialize visualization service based on configuration
     visualization_service = VisualizationService(llm if visualization_mode == "llm" else None)
 
@@ -56,153 +239,198 @@ def create_sql_nodes(
             f""" "{alias_prompt}{column['description']}"),"""
         )
 
-    def _get_table_schema_prompt(tables_columns: list[dict[str, Any]]) -> str:
-        """Generates a prompt string for table schemas, including table description,
-        columns, derived metrics and rules when writting SQL
+    def _render_table_schema(table_name: str, table_info: dict[str, Any], column_lines: list[str], omitted: int) -> str:
+        """Renders the schema prompt of a table from its kept column lines.
 
         Args:
-            tables_columns (List[Dict[str, Any]]): List of tables with selected columns.
+            table_name (str): Name of the table.
+            table_info (Dict[str, Any]): Table information.
+            column_lines (List[str]): Prompt lines of the kept columns.
+            omitted (int): Number of columns left out to fit the token budget.
 
         Returns:
             str: Formatted table schema prompt string.
         """
-        schema_prompt = []
-        for table_dict in tables_columns:
-            table_name = table_dict["table"]
-            # TODO maybe use columns in prompt
-            columns = table_dict["columns"]
+        if omitted:
+            column_lines = column_lines + [f"    # {omitted} less relevant columns are not listed"]
+        single_table_schema_prompt = f"## Table {table_name}\n{table_info['description']}\n"
+        single_table_schema_prompt += COLUMN_PROMPT_TEMPLATE.format("\n".join(column_lines))
+        single_table_schema_prompt += table_info.get("derived_metric", "")
+        single_table_schema_prompt += table_info["sql_rule"]
+        return single_table_schema_prompt
+
+    def _render_table_schemas(tables: tuple[str, ...]) -> list[TableSchema]:
+        """Generates the schemas of the tables, including table description, columns, derived metrics and
+        rules when writting SQL
+
+        Args:
+            tables (Tuple[str, ...]): Names of the selected tables.
+
+        Returns:
+            List[TableSchema]: Schema of each table.
+        """
+        schemas = []
+        for table_name in tables:
             table_info = catalog.get_table_information(table_name)
-            single_table_schema_prompt = f"## Table {table_name}\n{table_info['description']}\n"
             columns = catalog.get_column_list(table_name)
-            single_table_schema_prompt += COLUMN_PROMPT_TEMPLATE.format(
-                "\n".join([_get_column_prompt(column) for column in columns])
+            schemas.append(
+                TableSchema(
+                    table=table_name,
+                    columns=[column["column_name"] for column in columns],
+                    column_lines=[_get_column_prompt(column) for column in columns],
+                    essential=essential_columns(columns, table_info),
+                    render=partial(_render_table_schema, table_name, table_info),
+                )
             )
-            single_table_schema_prompt += table_info.get("derived_metric", "")
-            single_table_schema_prompt += table_info["sql_rule"]
-            schema_prompt.append(single_table_schema_prompt)
-        return "\n".join(schema_prompt)
+        return schemas
+
+    schema_prompt_cache = SchemaPromptCache(catalog, _render_table_schemas)
 
-    def _get_relevant_sql_examples_prompt(question, tables_columns: list[dict[str, Any]]) -> str:
+    def _get_table_schema_prompt(
+        tables_columns: list[dict[str, Any]], relevant_columns: list[str] | None = None
+    ) -> str:
+        """Gets the table schema prompt of the selected tables, reusing the rendered schemas if the catalog is unchanged.
+
+        Args:
+            tables_columns (List[Dict[str, Any]]): List of tables with selected columns.
+            relevant_columns (List[str] | None): Columns retrieved for the question, most relevant first, ranking
+                the columns kept within the token budget.
+
+        Returns:
+            str: Formatted table schema prompt string.
+        """
+        schemas = schema_prompt_cache.get([table_dict["table"] for table_dict in tables_columns])
+        if schema_packer is None:
+            return "\n".join(schema.full() for schema in schemas)
+        selected_columns = {table_dict["table"]: table_dict.get("columns") or [] for table_dict in tables_columns}
+        sections, _ = schema_packer.pack(schemas, relevant_columns, selected_columns)
+        return "\n".join(sections)
+
+    def _get_relevant_sql_examples_prompt(
+        question, tables_columns: list[dict[str, Any]], speculative_questions: list[str] | None = None
+    ) -> str:
         """Retrieves relevant SQL examples based on the question and selected tables.
 
         Args:
             question (str): The natural language question.
             tables_columns (List[str]): List of selected tables with selected columns.
+            speculative_questions (List[str] | None): Example questions retrieved with the raw question during
+                extraction, added after the examples of the question.
 
         Returns:
             str: Formatted string of relevant SQL examples.
         """
         tables = [d["table"] for d in tables_columns]
-        relevant_questions = sql_example_retriever.invoke(question)
-        # log(f"Retrieved examples for question: {question} \n Relevant questions: {relevant_questions}")
-        # filter examples that only use the selected tables
+        relevant_questions = [document.page_content for document in sql_example_retriever.invoke(question)]
+        relevant_questions = list(dict.fromkeys(relevant_questions + (speculative_questions or [])))
+        examples = _sql_examples_using(relevant_questions, tables)
+        log(f"Examples using selected tables: {examples}")
+        return "\n".join(examples)
+
+    def _sql_examples_using(relevant_questions: list[str], tables: list[str]) -> list[str]:
+        """Formats the examples of the questions that only use the selected tables."""
         examples = []
-        for relevant_document in relevant_questions:
-            question = relevant_document.page_content
+        for question in relevant_questions:
             # Skip if question not in example dict (handle missing examples gracefully)
-            if question not in sql_example_dicts:
+            example = sql_example_dicts.get(question)
+            if example is None:
                 continue
-            example_sql, used_tables = sql_example_dicts[question]
+            example_sql, used_tables = example
             if all(table in tables for table in used_tables):
                 examples.append(f"<example>\nQ: {question}\nA: {example_sql}\n</example>\n")
-        log(f"Examples using selected tables: {examples}")
-        return "\n".join(examples)
+        return examples
 
     def _analyze_dataframe_schema(df: pd.DataFrame) -> dict[str, Any]:
         """Analyze DataFrame to understand column types and characteristics."""
         try:
-            schema_info = {
-                "columns": list(df.columns),
-                "column_types": {},
-                "row_count": len(df),
-                "numeric_columns": [],
-                "categorical_columns": [],
-                "datetime_columns": [],
-            }
-
-            for col in df.columns:
-                dtype = str(df[col].dtype)
-                schema_info["column_types"][col] = dtype
-
-                # Classify column types
-                if df[col].dtype in ["int64", "float64", "int32", "float32"]:
-                    schema_info["numeric_columns"].append(col)
-                elif df[col].dtype == "object":
-                    # Check if it could be datetime
-                    try:
-                        pd.to_datetime(df[col].head(10))
-                        schema_info["datetime_columns"].append(col)
-                    except:
-                        schema_info["categorical_columns"].append(col)
-
-            # Calculate unique value counts for categorical columns
-            schema_info["unique_counts"] = {}
-            for col in schema_info["categorical_columns"]:
-                schema_info["unique_counts"][col] = df[col].nunique()
-
-            return schema_info
+            return profile_dataframe(df, df.attrs.get("column_kinds"))
         except Exception as e:
             return {"error": f"Failed to analyze data schema: {str(e)}"}
 
-    def _execute_sql(sql: str) -> tuple[dict, str]:
-        """Executes the generated SQL query and returns the result with schema analysis.
+    def _execute_sql(sql: str) -> tuple[dict, str, dict]:
+        """Executes the generated SQL query and returns a bounded preview of the result with schema analysis.
 
         Args:
             sql (str): The SQL query to execute.
 
         Returns:
-            Tuple[dict, str]: A tuple containing (schema_info, CSV string).
+            Tuple[dict, str, dict]: A tuple containing (schema_info, CSV string of the preview, result info).
         """
-        with catalog.get_sql_engine().connect() as connection:
-            result = connection.execute(text(sql))
-
-            # Fetch all rows from the result
-            rows = result.fetchall()
-
-            # Get column names
-            columns = list(result.keys())
-
-            # Create DataFrame for analysis
-            df = pd.DataFrame(rows, columns=columns)
-
-            # Analyze data schema
+        engine = catalog.get_sql_engine()
+        if result_cache is not None:
+            namespace = _cache_namespace(engine)
+            cached = result_cache.get(sql, namespace)
+            if cached is not None:
+                log("SQL result cache hit")
+                result_info = dict(cached["result_info"])
+                if result_store is None or result_info.get("result_handle") not in result_store:
+                    # the full result was evicted, only the preview is served
+                    result_info.pop("result_handle", None)
+                return cached["schema_info"], cached["data"], result_info
+
+        with engine.connect() as connection:
+            df, csv_data, result_info = fetch_sql_result(connection, sql, result_limits, result_store)
+
+            # Analyze data schema of the preview
             schema_info = _analyze_dataframe_schema(df)
 
-            # Format as CSV
-            csv_data = df.to_csv(index=False)
-
             connection.commit()
-            return schema_info, csv_data
-
-    def generate_sql_node(state: SQLGraphState) -> dict:
-        """First node: Generates initial SQL query based on the state.
 
-        Args:
-            state (SQLGraphState): The current SQL graph state containing the question and tables.
+        if result_cache is not None and "error" not in schema_info:
+            result_cache.put(sql, {"schema_info": schema_info, "data": csv_data, "result_info": result_info}, namespace)
+        return schema_info, csv_data, result_info
 
-        Returns:
-            dict: Updated state with generated SQL query.
-        """
-        if "rewrite_question" not in state:
-            log("Missing rewrite question, skipping SQL generation.")
-            return {}
-        if "tables" not in state or len(state["tables"]) == 0:
-            log("Missing tables, skipping SQL generation.")
-            return {}
+    def _cache_namespace(engine: Any) -> str:
+        """Identify the database in SQL result cache keys by dialect and connection URL."""
+        try:
+            url = engine.url.render_as_string(hide_password=True)
+        except AttributeError:
+            url = ""
+        return f"{dialect}:{url}"
+
+    def _describe_result(result_info: dict) -> str:
+        """Describe a truncated result for the LLM, empty if the result is complete."""
+        if not result_info["truncated"]:
+            return ""
+        total = (
+            result_info["total_rows"] if result_info["total_rows_exact"] else f"more than {result_info['total_rows']}"
+        )
+        return f" (first {result_info['preview_rows']} of {total} rows)"
 
+    def _generation_messages(state: SQLGraphState, previous_errors: list[dict] | None = None) -> list:
+        """Builds the messages asking the model to generate SQL for the question, with the previous errors."""
         question = state["rewrite_question"]
         tables_columns = state["tables"]
         system_prompt = (
             get_text2sql_dialect_prompt_template(dialect)
-            .replace("[table_schema]", _get_table_schema_prompt(tables_columns))
-            .replace("[examples]", _get_relevant_sql_examples_prompt(question, tables_columns))
+            .replace("[table_schema]", _get_table_schema_prompt(tables_columns, state.get("relevant_columns")))
+            .replace(
+                "[examples]",
+                _get_relevant_sql_examples_prompt(
+                    question, tables_columns, (state.get("speculative_retrieval") or {}).get("sql_examples")
+                ),
+            )
             .replace("[time_field_placeholder]", datetime.datetime.now().strftime(datetime_format))
         )
 
         user_prompt = f"""Generate a SQL query for the question: {question}"""
-        messages = [SystemMessage(system_prompt)] + list(state["messages"]) + [HumanMessage(user_prompt)]
+        if previous_errors:
+            user_prompt += "\n\nPrevious attempts failed with errors:"
+            for i, error_info in enumerate(previous_errors, 1):
+                user_prompt += f"\n\nAttempt {i}:\nSQL: {error_info['sql']}\nError: {error_info['error']}"
+            user_prompt += "\n\nPlease analyze the errors above and generate a corrected SQL query."
+        return [SystemMessage(system_prompt)] + list(state["messages"]) + [HumanMessage(user_prompt)]
 
-        response = llm.invoke(messages)
+    def _can_generate_sql(state: SQLGraphState) -> bool:
+        if "rewrite_question" not in state:
+            log("Missing rewrite question, skipping SQL generation.")
+            return False
+        if "tables" not in state or len(state["tables"]) == 0:
+            log("Missing tables, skipping SQL generation.")
+            return False
+        return True
+
+    def _generated_sql_update(response) -> dict:
         response_content = get_text_from_content(response.content)
         sql_query = response_content.replace("```sql", "").replace("```", "").strip()
 
@@ -216,7 +444,48 @@ def create_sql_nodes(
                 "previous_sql_errors": [],
             }
 
-        return {"sql": sql_query, "sql_retry_count": 0, "sql_execution_result": "", "previous_sql_errors": []}
+        return {
+            "sql": sql_query,
+            "sql_retry_count": 0,
+            "sql_execution_result": "",
+            "previous_sql_errors": [],
+            "sql_generated_time": time.time(),
+        }
+
+    def _regenerated_sql_update(response, retry_count: int) -> dict:
+        response_content = get_text_from_content(response.content)
+        sql_query = response_content.replace("```sql", "").replace("```", "").strip()
+
+        if not sql_query:
+            log(f"Generated SQL query is empty. LLM output: {response.content}")
+            error_result = f"Failed to regenerate valid SQL after {retry_count} attempts."
+            return {
+                "messages": [AIMessage(error_result)],
+                "sql": "",
+                "sql_retry_count": retry_count,
+                "sql_execution_result": SQL_NA,
+            }
+
+        return {
+            "sql": sql_query,
+            "sql_retry_count": retry_count,
+            "sql_execution_result": "",
+            "sql_generated_time": time.time(),
+        }
+
+    def generate_sql_node(state: SQLGraphState) -> dict:
+        """First node: Generates initial SQL query based on the state.
+
+        Args:
+            state (SQLGraphState): The current SQL graph state containing the question and tables.
+
+        Returns:
+            dict: Updated state with generated SQL query.
+        """
+        if not _can_generate_sql(state):
+            return {}
+        response = llm.invoke(_generation_messages(state))
+        return _generated_sql_update(response)
 
     def execute_sql_node(state: SQLGraphState) -> dict:
         """Second node: Executes the SQL query and returns result or error.
@@ -232,12 +501,15 @@ def create_sql_nodes(
             return {"sql_execution_result": SQL_NA, "messages": [AIMessage("No SQL query to execute")]}
 
         try:
-            schema_info, csv_result = _execute_sql(sql_query)
-            result = f"```sql\n{sql_query}\n```\nSQL Result:\n```csv\n{csv_result}\n```"
+            schema_info, csv_result, result_info = _execute_sql(sql_query)
+            result_handle = result_info.pop("result_handle", "")
+            result = f"```sql\n{sql_query}\n```\nSQL Result{_describe_result(result_info)}:\n```csv\n{csv_result}\n```"
             return {
                 "sql_execution_result": SQL_SUCCESS,
                 "schema_info": schema_info,
                 "data": csv_result,
+                "result_handle": result_handle,
+                "result_info": result_info,
                 "messages": [AIMessage(result)],
             }
         except (OperationalError, TimeoutError) as e:
@@ -273,42 +545,39 @@ def create_sql_nodes(
         Returns:
             dict: Updated state with regenerated SQL query.
         """
-        question = state["rewrite_question"]
-        tables = state["tables"]
-        previous_errors = state.get("previous_sql_errors", [])
         retry_count = state.get("sql_retry_count", 0) + 1
+        response = llm.invoke(_generation_messages(state, state.get("previous_sql_errors", [])))
+        return _regenerated_sql_update(response, retry_count)
 
-        system_prompt = (
-            get_text2sql_dialect_prompt_template(dialect)
-            .replace("[table_schema]", _get_table_schema_prompt(tables))
-            .replace("[examples]", _get_relevant_sql_examples_prompt(question, tables))
-            .replace("[time_field_placeholder]", datetime.datetime.now().strftime(datetime_format))
+    def _should_visualize(state: SQLGraphState) -> bool:
+        if state.get("sql_execution_result", "") != SQL_SUCCESS:
+            # No visualization for failed queries
+            return False
+        return bool(
+            state.get("rewrite_question") and state.get("schema_info") and state.get("data") and visualization_mode
         )
 
-        user_prompt = f"""Generate a SQL query for the question: {question}"""
-        if previous_errors:
-            user_prompt += "\n\nPrevious attempts failed with errors:"
-            for i, error_info in enumerate(previous_errors, 1):
-                user_prompt += f"\n\nAttempt {i}:\nSQL: {error_info['sql']}\nError: {error_info['error']}"
-            user_prompt += "\n\nPlease analyze the errors above and generate a corrected SQL query."
+    def _visualization_sample(state: SQLGraphState) -> str | pd.DataFrame:
+        """Reads the typed result columns from the result store, the CSV preview if it was evicted."""
+        result_table = None
+        if result_store is not None and state.get("result_handle"):
+            result_table = result_store.get_table(state["result_handle"])
+        return result_table.slice(0, 3).to_pandas() if result_table is not None else state["data"]
 
-        messages = [SystemMessage(system_prompt)] + list(state["messages"]) + [HumanMessage(user_prompt)]
+    def _visualization_update(state: SQLGraphState, viz_dsl: Any) -> dict:
+        # Handle case where visualization is skipped
+        if viz_dsl is None:
+            return {"visualization_dsl": {}}
 
-        response = llm.invoke(messages)
-        response_content = get_text_from_content(response.content)
-        sql_query = response_content.replace("```sql", "").replace("```", "").strip()
+        # Update the AI message to include visualization information
+        messages = list(state.get("messages", []))
+        if messages and hasattr(messages[-1], "content"):
+            current_content = messages[-1].content
+            viz_info = f"\n\n**Visualization Generated**: {viz_dsl.chart_type.title()} chart with {len(viz_dsl.data_columns)} column(s)"
+            messages[-1] = AIMessage(current_content + viz_info)
 
-        if not sql_query:
-            log(f"Generated SQL query is empty. LLM output: {response.content}")
-            error_result = f"Failed to regenerate valid SQL after {retry_count} attempts."
-            return {
-                "messages": [AIMessage(error_result)],
-                "sql": "",
-                "sql_retry_count": retry_count,
-                "sql_execution_result": SQL_NA,
-            }
-
-        return {"sql": sql_query, "sql_retry_count": retry_count, "sql_execution_result": ""}
+        # Return both visualization_dsl and data so they're available in the event stream
+        return {"visualization_dsl": viz_dsl.to_dict(), "data": state["data"], "messages": messages}
 
     def generate_visualization_node(state: SQLGraphState) -> dict:
         """Fourth node: Generates visualization DSL based on successful SQL execution result.
@@ -319,39 +588,87 @@ def create_sql_nodes(
         Returns:
             dict: Updated state with visualization DSL.
         """
-        execution_result = state.get("sql_execution_result", "")
-        if execution_result != SQL_SUCCESS:
-            # No visualization for failed queries
-            return {"visualization_dsl": {}}
-
-        question = state.get("rewrite_question", "")
-        schema_info = state.get("schema_info", {})
-        data = state.get("data", "")
-
-        if not question or not schema_info or not data or not visualization_mode:
+        if not _should_visualize(state):
             return {"visualization_dsl": {}}
 
         try:
             # Generate visualization DSL using configured service
-            viz_dsl = visualization_service.generate_visualization(question, schema_info, data)
+            viz_dsl = visualization_service.generate_visualization(
+                state["rewrite_question"], state["schema_info"], _visualization_sample(state)
+            )
+            return _visualization_update(state, viz_dsl)
+        except Exception as e:
+            log(f"Visualization generation error: {str(e)}")
+            return {"visualization_dsl": {"error": f"Failed to generate visualization: {str(e)}"}}
+
+    async def agenerate_sql_node(state: SQLGraphState) -> dict:
+        """Async version of `generate_sql_node`, calling the model with `ainvoke`.
+
+        Args:
+            state (SQLGraphState): The current SQL graph state containing the question and tables.
 
-            # Handle case where visualization is skipped
-            if viz_dsl is None:
-                return {"visualization_dsl": {}}
+        Returns:
+            dict: Updated state with generated SQL query.
+        """
+        if not _can_generate_sql(state):
+            return {}
+        # the schema prompt and SQL example retrieval may read the catalog and call embedding models
+        messages = await asyncio.to_thread(_generation_messages, state)
+        response = await llm.ainvoke(messages)
+        return _generated_sql_update(response)
+
+    async def aexecute_sql_node(state: SQLGraphState) -> dict:
+        """Async version of `execute_sql_node`, running the query in a worker thread.
 
-            # Update the AI message to include visualization information
-            messages = list(state.get("messages", []))
-            if messages and hasattr(messages[-1], "content"):
-                current_content = messages[-1].content
-                viz_info = f"\n\n**Visualization Generated**: {viz_dsl.chart_type.title()} chart with {len(viz_dsl.data_columns)} column(s)"
-                messages[-1] = AIMessage(current_content + viz_info)
+        The database drivers used with the catalog (e.g. PyHive, Trino, pymysql) have no asyncio support, so the
+        blocking query runs in the default executor while the event loop keeps serving other requests.
 
-            # Return both visualization_dsl and data so they're available in the event stream
-            return {"visualization_dsl": viz_dsl.to_dict(), "data": data, "messages": messages}
+        Args:
+            state (SQLGraphState): The current SQL graph state containing the SQL query.
+
+        Returns:
+            dict: Updated state with execution result or error information.
+        """
+        return await asyncio.to_thread(execute_sql_node, state)
+
+    async def aregenerate_sql_node(state: SQLGraphState) -> dict:
+        """Async version of `regenerate_sql_node`, calling the model with `ainvoke`.
+
+        Args:
+            state (SQLGraphState): The current SQL graph state containing error information.
+
+        Returns:
+            dict: Updated state with regenerated SQL query.
+        """
+        retry_count = state.get("sql_retry_count", 0) + 1
+        messages = await asyncio.to_thread(_generation_messages, state, state.get("previous_sql_errors", []))
+        response = await llm.ainvoke(messages)
+        return _regenerated_sql_update(response, retry_count)
+
+    async def agenerate_visualization_node(state: SQLGraphState) -> dict:
+        """Async version of `generate_visualization_node`, calling the model with `ainvoke` in "llm" mode.
+
+        Args:
+            state (SQLGraphState): The current SQL graph state containing query data and results.
+
+        Returns:
+            dict: Updated state with visualization DSL.
+        """
+        if not _should_visualize(state):
+            return {"visualization_dsl": {}}
+
+        try:
+            sample = await asyncio.to_thread(_visualization_sample, state)
+            viz_dsl = await visualization_service.agenerate_visualization(
+                state["rewrite_question"], state["schema_info"], sample
+            )
+            return _visualization_update(state, viz_dsl)
         except Exception as e:
             log(f"Visualization generation error: {str(e)}")
             return {"visualization_dsl": {"error": f"Failed to generate visualization: {str(e)}"}}
 
+    if not sync_mode:
+        return agenerate_sql_node, aexecute_sql_node, aregenerate_sql_node, agenerate_visualization_node
     return generate_sql_node, execute_sql_node, regenerate_sql_node, generate_visualization_node
 
 
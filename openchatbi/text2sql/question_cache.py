@@ -0,0 +1,336 @@
+"""Cache of the SQL generated for a question, letting repeated questions skip table selection and SQL generation."""
+
+import asyncio
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import RunnableConfig
+
+from openchatbi.catalog.catalog_store import CatalogStore
+from openchatbi.constants import SQL_SUCCESS
+from openchatbi.graph_state import SQLGraphState
+from openchatbi.utils import log
+
+DEFAULT_SQL_QUESTION_CACHE_CONFIG = {
+    "enabled": False,
+    "similarity_threshold": 0.0,  # cosine similarity of question embeddings for a semantic hit, 0 for exact only
+    "ttl_seconds": 3600,  # seconds a cached SQL is reused
+    "max_entries": 1000,  # number of cached questions
+    "share_across_users": False,  # reuse SQL generated for another user
+}
+
+
+# Relative time wording, the SQL generated for it holds dates computed from the current time
+_RELATIVE_TIME = re.compile(
+    r"\b(today|yesterday|tomorrow|now|current(ly)?|recent(ly)?|latest|ago|so far|to date|ytd|qtd|mtd|wtd"
+    r"|(this|last|past|previous|next)\s+(\d+\s+)?(hours?|days?|weeks?|months?|quarters?|years?))\b"
+    r"|今天|昨天|明天|本周|上周|本月|上月|本季度|上季度|今年|去年|最近|近\d",
+    re.IGNORECASE,
+)
+
+
+def mentions_relative_time(question: str) -> bool:
+    """Whether a question is relative to the current time, like "orders last week", its SQL is not cached."""
+    return _RELATIVE_TIME.search(question) is not None
+
+
+def _end_of_day(timestamp: float) -> float:
+    """Timestamp of the next local midnight."""
+    day = datetime.fromtimestamp(timestamp).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (day + timedelta(days=1)).timestamp()
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question for exact matching: collapse whitespace, fold case and drop trailing punctuation."""
+    return " ".join(question.split()).casefold().rstrip("?.!。？ ")
+
+
+@dataclass
+class CachedSQL:
+    """SQL generated for a question."""
+
+    question: str
+    sql: str
+    tables: list[dict[str, Any]]
+    scope: str
+    catalog_version: Any
+    expires: float
+    generation_seconds: float  # time spent from the cache miss to generating the working SQL
+    vector: np.ndarray | None = field(default=None, repr=False)
+
+
+class SQLQuestionCache:
+    """Cache of the SQL generated for rewritten questions, scoped by catalog version and user.
+
+    Questions are matched exactly after normalization first, then by cosine similarity of their
+    embeddings when an embedding model and a similarity threshold are given. Questions relative to the
+    current time are not cached, and cached SQL expires at the end of the day at the latest, as the SQL
+    may hold dates computed from the day it was generated.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings | None = None,
+        similarity_threshold: float = DEFAULT_SQL_QUESTION_CACHE_CONFIG["similarity_threshold"],
+        ttl_seconds: float = DEFAULT_SQL_QUESTION_CACHE_CONFIG["ttl_seconds"],
+        max_entries: int = DEFAULT_SQL_QUESTION_CACHE_CONFIG["max_entries"],
+        share_across_users: bool = False,
+    ):
+        """Initialize the cache.
+
+        Args:
+            embeddings (Embeddings | None): Embedding model for similarity matching, None for exact matching only.
+            similarity_threshold (float): Cosine similarity of question embeddings for a semantic hit.
+            ttl_seconds (float): Seconds a cached SQL is reused.
+            max_entries (int): Number of cached questions.
+            share_across_users (bool): Reuse SQL generated for another user.
+        """
+        self.embeddings = embeddings if similarity_threshold > 0 else None
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.share_across_users = share_across_users
+        self._entries: OrderedDict[str, CachedSQL] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "saved_seconds": 0.0}
+
+    def scope_of(self, config: RunnableConfig | None) -> str:
+        """Get the cache scope of a graph run, the user id unless SQL is shared across users."""
+        if self.share_across_users:
+            return ""
+        return str(((config or {}).get("configurable") or {}).get("user_id") or "")
+
+    def _key(self, question: str, scope: str) -> str:
+        return hashlib.sha256(f"{scope}\0{normalize_question(question)}".encode()).hexdigest()
+
+    def _embed(self, question: str) -> np.ndarray | None:
+        if self.embeddings is None:
+            return None
+        try:
+            vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        except Exception as e:
+            log(f"Failed to embed question for the SQL cache: {e}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def lookup(self, question: str, scope: str, catalog_version: Any) -> tuple[CachedSQL | None, str, float]:
+        """Look up the SQL cached for a question.
+
+        Args:
+            question (str): Rewritten question.
+            scope (str): Cache scope, see `scope_of`.
+            catalog_version (Any): Current catalog version, SQL cached for other versions is not reused.
+
+        Returns:
+            Tuple[CachedSQL | None, str, float]: The cached SQL or None, the match type "exact", "semantic"
+                or "miss", and the similarity.
+        """
+        if mentions_relative_time(question):
+            with self._lock:
+                self.stats["misses"] += 1
+            return None, "miss", 0.0
+        now = time.time()
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry.expires <= now]:
+                del self._entries[key]
+            entry = self._entries.get(self._key(question, scope))
+            if entry is not None and entry.catalog_version == catalog_version:
+                self._entries.move_to_end(self._key(question, scope))
+                self.stats["exact_hits"] += 1
+                self.stats["saved_seconds"] += entry.generation_seconds
+                return entry, "exact", 1.0
+            candidates = [
+                entry
+                for entry in self._entries.values()
+                if entry.scope == scope and entry.catalog_version == catalog_version and entry.vector is not None
+            ]
+
+        vector = self._embed(question) if candidates else None
+        if vector is not None:
+            similarities = np.stack([entry.vector for entry in candidates]) @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.similarity_threshold:
+                with self._lock:
+                    self.stats["semantic_hits"] += 1
+                    self.stats["saved_seconds"] += candidates[best].generation_seconds
+                return candidates[best], "semantic", float(similarities[best])
+        with self._lock:
+            self.stats["misses"] += 1
+        return None, "miss", 0.0
+
+    def add(
+        self,
+        question: str,
+        scope: str,
+        catalog_version: Any,
+        sql: str,
+        tables: list[dict[str, Any]],
+        generation_seconds: float,
+    ) -> None:
+        """Cache the SQL generated for a question.
+
+        Args:
+            question (str): Rewritten question.
+            scope (str): Cache scope, see `scope_of`.
+            catalog_version (Any): Catalog version the SQL was generated on.
+            sql (str): SQL that was executed successfully.
+            tables (List[Dict[str, Any]]): Tables selected for the question.
+            generation_seconds (float): Time spent generating the SQL, saved by each hit.
+        """
+        if mentions_relative_time(question):
+            log("Question is relative to the current time, its SQL is not cached")
+            return
+        now = time.time()
+        entry = CachedSQL(
+            question=question,
+            sql=sql,
+            tables=tables,
+            scope=scope,
+            catalog_version=catalog_version,
+            expires=min(now + self.ttl_seconds, _end_of_day(now)),
+            generation_seconds=generation_seconds,
+            vector=self._embed(question),
+        )
+        key = self._key(question, scope)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all cached SQL."""
+        with self._lock:
+            self._entries.clear()
+
+
+def create_sql_question_cache(
+    cache_config: dict[str, Any] | None, embeddings: Embeddings | None
+) -> SQLQuestionCache | None:
+    """Create the question SQL cache from the `sql_question_cache` config.
+
+    Args:
+        cache_config (Dict[str, Any] | None): Overrides of `DEFAULT_SQL_QUESTION_CACHE_CONFIG`.
+        embeddings (Embeddings | None): Embedding model for similarity matching.
+
+    Returns:
+        SQLQuestionCache | None: The cache, None if it is disabled.
+    """
+    cache_config = {**DEFAULT_SQL_QUESTION_CACHE_CONFIG, **(cache_config or {})}
+    if not cache_config.pop("enabled") or cache_config["ttl_seconds"] <= 0:
+        return None
+    return SQLQuestionCache(embeddings, **cache_config)
+
+
+def create_sql_cache_nodes(
+    catalog: CatalogStore, cache: SQLQuestionCache, sync_mode: bool = True
+) -> tuple[Callable, Callable]:
+    """Creates the nodes looking up and updating the question SQL cache.
+
+    Args:
+        catalog (CatalogStore): The catalog store, cached SQL is only reused for the same catalog version.
+        cache (SQLQuestionCache): The question SQL cache.
+        sync_mode (bool): Whether to create sync nodes, or async nodes embedding questions in a worker thread.
+
+    Returns:
+        tuple: Two node functions (lookup_sql_cache_node, update_sql_cache_node)
+    """
+
+    def lookup_sql_cache_node(state: SQLGraphState, config: RunnableConfig) -> dict:
+        """Looks up the SQL cached for the rewritten question, a hit skips table selection and SQL generation.
+
+        Args:
+            state (SQLGraphState): The current SQL graph state containing the rewritten question.
+            config (RunnableConfig): Run config with the user id in `configurable`.
+
+        Returns:
+            dict: The cached SQL and tables on a hit, and the cache status.
+        """
+        question = state.get("rewrite_question") or ""
+        start = time.time()
+        entry, match, similarity = cache.lookup(question, cache.scope_of(config), catalog.get_catalog_version())
+        if entry is None:
+            return {"sql_cache": {"hit": False, "lookup_time": start}}
+
+        log(
+            f"SQL cache {match} hit (similarity {similarity:.3f}) for question: {question}, "
+            f"skipping table selection and SQL generation, about {entry.generation_seconds:.1f}s saved"
+        )
+        return {
+            "sql": entry.sql,
+            "tables": entry.tables,
+            "relevant_columns": [],
+            "sql_retry_count": 0,
+            "sql_execution_result": "",
+            "previous_sql_errors": [],
+            "sql_cache": {
+                "hit": True,
+                "lookup_time": start,
+                "match": match,
+                "similarity": similarity,
+                "cached_question": entry.question,
+                "saved_seconds": entry.generation_seconds,
+            },
+        }
+
+    def update_sql_cache_node(state: SQLGraphState, config: RunnableConfig) -> dict:
+        """Caches the SQL of the question after it was executed successfully.
+
+        Args:
+            state (SQLGraphState): The current SQL graph state containing the executed SQL.
+            config (RunnableConfig): Run config with the user id in `configurable`.
+
+        Returns:
+            dict: Empty update.
+        """
+        sql_cache = state.get("sql_cache") or {}
+        question = state.get("rewrite_question")
+        if not question or not sql_cache or state.get("sql_execution_result") != SQL_SUCCESS:
+            return {}
+        if sql_cache["hit"] and not state.get("sql_retry_count"):
+            # the cached SQL worked as is
+            return {}
+        generation_seconds = state.get("sql_generated_time", sql_cache["lookup_time"]) - sql_cache["lookup_time"]
+        cache.add(
+            question,
+            cache.scope_of(config),
+            catalog.get_catalog_version(),
+            state["sql"],
+            list(state.get("tables", [])),
+            generation_seconds,
+        )
+        return {}
+
+    async def alookup_sql_cache_node(state: SQLGraphState, config: RunnableConfig) -> dict:
+        """Async version of `lookup_sql_cache_node`, embedding the question in a worker thread."""
+        return await asyncio.to_thread(lookup_sql_cache_node, state, config)
+
+    async def aupdate_sql_cache_node(state: SQLGraphState, config: RunnableConfig) -> dict:
+        """Async version of `update_sql_cache_node`, embedding the question in a worker thread."""
+        return await asyncio.to_thread(update_sql_cache_node, state, config)
+
+    if not sync_mode:
+        return alookup_sql_cache_node, aupdate_sql_cache_node
+    return lookup_sql_cache_node, update_sql_cache_node
+
+
+def sql_cache_route(state: SQLGraphState) -> str:
+    """Conditional edge function to skip to SQL execution on a question cache hit.
+
+    Args:
+        state (SQLGraphState): Current state
+
+    Returns:
+        str: Next node name - "execute_sql" on a cache hit, "table_selection" otherwise
+    """
+    return "execute_sql" if (state.get("sql_cache") or {}).get("hit") else "table_selection"
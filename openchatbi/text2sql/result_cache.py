@@ -0,0 +1,298 @@
+"""Cache of SQL query results, keyed by normalized SQL text."""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from openchatbi.catalog.catalog_store import CatalogStore
+from openchatbi.utils import log
+
+DEFAULT_SQL_RESULT_CACHE_CONFIG = {
+    "enabled": True,
+    "ttl_seconds": 300,  # seconds a cached result is served
+    "max_bytes": 64 * 1024 * 1024,  # size of the results kept in memory
+    "disk_path": None,  # SQLite file keeping results across restarts, None for memory only
+}
+
+# String literals, quoted identifiers, comments, words and single characters
+_SQL_TOKEN = re.compile(
+    r"""(?P<string>'(?:[^']|'')*')"""
+    r"""|(?P<quoted>"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])"""
+    r"""|(?P<comment>--[^\n]*|/\*.*?\*/)"""
+    r"""|(?P<space>\s+)"""
+    r"""|(?P<word>[^\s'"`\[\-/]+|.)""",
+    re.DOTALL,
+)
+# Functions whose value changes between runs, queries using them are never cached
+_NON_DETERMINISTIC = re.compile(
+    r"\b(now|rand|random|uuid|newid|sysdate|getdate|getutcdate|sysdatetime|current_timestamp|current_date"
+    r"|current_time|curdate|curtime|today|unix_timestamp|utc_timestamp|localtime|localtimestamp)\b"
+)
+_TABLE_NAME = r"(?:[\w$]+|\"[^\"]+\"|`[^`]+`)(?:\.(?:[\w$]+|\"[^\"]+\"|`[^`]+`))*"
+_TABLE_ALIAS = (
+    r"(?:\s+(?:as\s+)?(?!(?:on|using|where|group|order|having|limit|union|join|inner|left|right|full|cross)\b)[\w$]+)?"
+)
+# The comma separated tables after FROM or JOIN, matched by lookahead so that the next JOIN is matched too
+_TABLE_REFERENCE = re.compile(
+    rf"\b(?:from|join)\s+(?=({_TABLE_NAME}{_TABLE_ALIAS}(?:\s*,\s*{_TABLE_NAME}{_TABLE_ALIAS})*))"
+)
+_TABLE_LIST_ITEM = re.compile(rf"({_TABLE_NAME}){_TABLE_ALIAS}\s*(?:,\s*|$)")
+
+# Only queries reading data are cached, never statements changing it, e.g. in a WITH clause
+_READ_QUERY = re.compile(r"\(*\s*(select|with)\b")
+_WRITE_STATEMENT = re.compile(r"\b(insert|update|delete|merge|create|drop|alter|truncate)\b")
+
+# Live caches, for invalidating the results of tables whose data changed
+_caches: "weakref.WeakSet[SQLResultCache]" = weakref.WeakSet()
+
+
+def normalize_sql(sql: str) -> str:
+    """Normalize SQL text so that queries differing only in whitespace, keyword case and comments are equal.
+
+    String literals and quoted identifiers are kept as written.
+
+    Args:
+        sql (str): SQL query.
+
+    Returns:
+        str: Normalized SQL.
+    """
+    parts = []
+    for match in _SQL_TOKEN.finditer(sql):
+        kind = match.lastgroup
+        if kind in ("comment", "space"):
+            if parts and parts[-1] != " ":
+                parts.append(" ")
+        elif kind == "word":
+            parts.append(match.group().lower())
+        else:
+            parts.append(match.group())
+    return "".join(parts).strip(" ;")
+
+
+def referenced_tables(normalized_sql: str) -> set[str]:
+    """Get the names of the tables a normalized query reads, without their database."""
+    tables = set()
+    for table_list in _TABLE_REFERENCE.findall(normalized_sql):
+        for reference in _TABLE_LIST_ITEM.findall(table_list):
+            tables.add(reference.rsplit(".", 1)[-1].strip('"`').lower())
+    return tables
+
+
+def is_read_query(normalized_sql: str) -> bool:
+    """Whether a normalized query only reads data, a SELECT or WITH query without data changing statements."""
+    without_strings = re.sub(r"'(?:[^']|'')*'", "''", normalized_sql)
+    return bool(_READ_QUERY.match(without_strings)) and _WRITE_STATEMENT.search(without_strings) is None
+
+
+def is_deterministic(normalized_sql: str) -> bool:
+    """Whether a normalized query returns the same result on every run of unchanged data."""
+    without_strings = re.sub(r"'(?:[^']|'')*'", "''", normalized_sql)
+    return _NON_DETERMINISTIC.search(without_strings) is None
+
+
+class SQLResultCache:
+    """LRU cache of SQL results with a TTL, bounded in bytes, with an optional SQLite tier.
+
+    Results are keyed by the normalized SQL and a namespace identifying the database, and can be
+    invalidated by the tables the query reads, see `invalidate_sql_results`. Only SELECT and WITH queries
+    are cached, and not those calling non-deterministic functions like `now()` or `rand()`.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = DEFAULT_SQL_RESULT_CACHE_CONFIG["ttl_seconds"],
+        max_bytes: int = DEFAULT_SQL_RESULT_CACHE_CONFIG["max_bytes"],
+        disk_path: str | None = None,
+    ):
+        """Initialize the cache.
+
+        Args:
+            ttl_seconds (float): Seconds a cached result is served.
+            max_bytes (int): Size of the results kept in memory.
+            disk_path (str | None): SQLite file keeping results across restarts, None for memory only.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        # key -> (expiry time, referenced tables, serialized result)
+        self._entries: OrderedDict[str, tuple[float, set[str], str]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if disk_path:
+            Path(disk_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False, isolation_level=None)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sql_results "
+                "(key TEXT PRIMARY KEY, expires REAL NOT NULL, tables TEXT NOT NULL, value TEXT NOT NULL)"
+            )
+        _caches.add(self)
+
+    def make_key(self, sql: str, namespace: str = "") -> tuple[str, set[str]] | None:
+        """Get the cache key of a query and the tables it reads.
+
+        Args:
+            sql (str): SQL query.
+            namespace (str): Database the query runs on, e.g. dialect and connection URL.
+
+        Returns:
+            Tuple[str, Set[str]] | None: Cache key and referenced tables, None if the query must not be cached:
+                it is not a SELECT or WITH query, or calls non-deterministic functions.
+        """
+        normalized = normalize_sql(sql)
+        if not is_read_query(normalized) or not is_deterministic(normalized):
+            return None
+        key = hashlib.sha256(f"{namespace}\n{normalized}".encode()).hexdigest()
+        return key, referenced_tables(normalized)
+
+    def get(self, sql: str, namespace: str = "") -> dict[str, Any] | None:
+        """Get the cached result of a query.
+
+        Args:
+            sql (str): SQL query.
+            namespace (str): Database the query runs on.
+
+        Returns:
+            Dict[str, Any] | None: The cached result, None on a miss.
+        """
+        key_tables = self.make_key(sql, namespace)
+        if key_tables is None:
+            return None
+        key = key_tables[0]
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                self._remove(key)
+                entry = None
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT expires, tables, value FROM sql_results WHERE key = ? AND expires > ?", (key, now)
+                ).fetchone()
+                if row is not None:
+                    entry = (row[0], set(filter(None, row[1].split("|"))), row[2])
+                    self._add(key, entry)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        return json.loads(entry[2])
+
+    def put(self, sql: str, result: dict[str, Any], namespace: str = "") -> bool:
+        """Cache the result of a query.
+
+        Args:
+            sql (str): SQL query.
+            result (Dict[str, Any]): JSON serializable result.
+            namespace (str): Database the query runs on.
+
+        Returns:
+            bool: Whether the result was cached.
+        """
+        key_tables = self.make_key(sql, namespace)
+        if key_tables is None:
+            return False
+        key, tables = key_tables
+        value = json.dumps(result, default=str)
+        if len(value) > self.max_bytes:
+            return False
+        expires = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remove(key)
+            self._add(key, (expires, tables, value))
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM sql_results WHERE expires <= ?", (time.time(),))
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO sql_results VALUES (?, ?, ?, ?)",
+                        (key, expires, f"|{'|'.join(sorted(tables))}|", value),
+                    )
+                except sqlite3.Error as e:
+                    log(f"Failed to write SQL result cache: {e}")
+        return True
+
+    def invalidate(self, tables: list[str] | None = None) -> int:
+        """Remove the cached results reading any of the tables.
+
+        Args:
+            tables (List[str] | None): Table names, with or without database. None to remove all results.
+
+        Returns:
+            int: Number of results removed from memory.
+        """
+        names = None if tables is None else {table.rsplit(".", 1)[-1].lower() for table in tables}
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if names is None or entry[1] & names]
+            for key in keys:
+                self._remove(key)
+            if self._db is not None:
+                if names is None:
+                    self._db.execute("DELETE FROM sql_results")
+                for name in names or ():
+                    self._db.execute("DELETE FROM sql_results WHERE tables LIKE ?", (f"%|{name}|%",))
+        return len(keys)
+
+    def clear(self) -> None:
+        """Remove all cached results."""
+        self.invalidate()
+
+    def on_catalog_change(self, catalog: CatalogStore) -> None:
+        """Catalog change listener removing all cached results, as the changed tables are not known."""
+        removed = self.invalidate()
+        log(f"Catalog changed, removed {removed} cached SQL results")
+
+    def close(self) -> None:
+        """Close the SQLite tier."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _add(self, key: str, entry: tuple[float, set[str], str]) -> None:
+        self._entries[key] = entry
+        self._bytes += len(entry[2])
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[2])
+
+
+def invalidate_sql_results(tables: list[str] | None = None) -> int:
+    """Remove the cached results reading any of the tables from all SQL result caches, e.g. after loading new data.
+
+    Args:
+        tables (List[str] | None): Table names, with or without database. None to remove all results.
+
+    Returns:
+        int: Number of results removed from memory.
+    """
+    return sum(cache.invalidate(tables) for cache in list(_caches))
+
+
+def create_sql_result_cache(
+    cache_config: dict[str, Any] | None, catalog: CatalogStore | None = None
+) -> SQLResultCache | None:
+    """Create the SQL result cache from the `sql_result_cache` config.
+
+    Args:
+        cache_config (Dict[str, Any] | None): Overrides of `DEFAULT_SQL_RESULT_CACHE_CONFIG`.
+        catalog (CatalogStore | None): Catalog store whose changes clear the cache.
+
+    Returns:
+        SQLResultCache | None: The cache, None if it is disabled.
+    """
+    cache_config = {**DEFAULT_SQL_RESULT_CACHE_CONFIG, **(cache_config or {})}
+    if not cache_config.pop("enabled") or cache_config["ttl_seconds"] <= 0:
+        return None
+    cache = SQLResultCache(**cache_config)
+    if catalog is not None:
+        catalog.add_change_listener(cache.on_catalog_change)
+    return cache
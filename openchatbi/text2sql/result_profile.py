@@ -0,0 +1,223 @@
+"""Schema profiling of SQL query results, for visualization and result descriptions."""
+
+import datetime
+import re
+import warnings
+from collections.abc import Sequence
+from decimal import Decimal
+from numbers import Number
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+# Rows sampled from larger results for type inference and distinct count estimation
+PROFILE_SAMPLE_ROWS = 10_000
+# Non-null values of an object column checked when inferring its type
+TYPE_INFERENCE_VALUES = 10
+
+NUMERIC, CATEGORICAL, DATETIME = "numeric", "categorical", "datetime"
+
+_TYPE_NAME_PATTERNS = (
+    (re.compile(r"interval|char|string|text|bool|json|uuid|binary"), CATEGORICAL),
+    (re.compile(r"date|time"), DATETIME),
+    (re.compile(r"int|decimal|numeric|number|double|float|real"), NUMERIC),
+)
+
+
+def _kind_of_type_code(type_code: Any, dbapi: Any) -> str | None:
+    """Classify a DB-API cursor type code, by type name or by the driver's DB-API type objects."""
+    if isinstance(type_code, str):
+        name = type_code.lower()
+        for pattern, kind in _TYPE_NAME_PATTERNS:
+            if pattern.search(name):
+                return kind
+        return None
+    if dbapi is None or type_code is None:
+        return None
+    for type_object, kind in (("DATETIME", DATETIME), ("NUMBER", NUMERIC), ("STRING", CATEGORICAL)):
+        try:
+            if getattr(dbapi, type_object, None) == type_code:
+                return kind
+        except Exception:
+            continue
+    return None
+
+
+def column_kinds_from_cursor(description: Any, dbapi: Any = None) -> dict[str, str]:
+    """Get the column kinds given by the database in the cursor description.
+
+    Args:
+        description (Any): DB-API `cursor.description`, a sequence of (name, type_code, ...) entries.
+        dbapi (Any): DB-API module of the driver, for drivers giving type codes instead of type names.
+
+    Returns:
+        Dict[str, str]: Column name to "numeric", "categorical" or "datetime", for the columns whose type is known.
+    """
+    if not isinstance(description, Sequence):
+        return {}
+    kinds = {}
+    for entry in description:
+        if not isinstance(entry, Sequence) or len(entry) < 2:
+            continue
+        kind = _kind_of_type_code(entry[1], dbapi)
+        if kind:
+            kinds[entry[0]] = kind
+    return kinds
+
+
+def _infer_object_kind(values: pd.Series) -> str:
+    """Infer the kind of an object column from a few of its non-null values."""
+    values = values.dropna().head(TYPE_INFERENCE_VALUES)
+    if len(values) == 0:
+        return CATEGORICAL
+    if all(isinstance(value, Number) and not isinstance(value, bool) for value in values):
+        return NUMERIC
+    if all(isinstance(value, datetime.date) for value in values):
+        return DATETIME
+    try:
+        with warnings.catch_warnings():
+            # format inference warning, a few values are parsed either way
+            warnings.simplefilter("ignore", UserWarning)
+            pd.to_datetime(values)
+        return DATETIME
+    except (ValueError, TypeError, OverflowError):
+        return CATEGORICAL
+
+
+def _sample(df: pd.DataFrame, rows: int) -> pd.DataFrame:
+    """Sample rows spread over the whole frame, the frame itself if it is small."""
+    if len(df) <= rows:
+        return df
+    positions = np.sort(np.random.default_rng(0).choice(len(df), size=rows, replace=False))
+    return df.iloc[positions]
+
+
+def estimate_distinct_count(sample: pd.Series, total_rows: int) -> int:
+    """Estimate the distinct values of a column from a uniform sample of its non-null values.
+
+    Uses the Duj1 estimator `n * d / (n - f1 + f1 * n / N)` (Haas et al.), d being the distinct values of the n
+    sampled values and f1 the values seen once: a sample of only repeated values gives d, a sample of only
+    unique values scales up to N.
+
+    Args:
+        sample (pd.Series): Sampled non-null values.
+        total_rows (int): Number of non-null values of the column.
+
+    Returns:
+        int: Estimated number of distinct values.
+    """
+    if len(sample) == 0:
+        return 0
+    counts = sample.value_counts(sort=False).to_numpy()
+    if len(sample) >= total_rows:
+        return len(counts)
+    n, singletons = len(sample), int((counts == 1).sum())
+    estimate = n * len(counts) / (n - singletons + singletons * n / total_rows)
+    return int(min(round(estimate), total_rows))
+
+
+def _to_python(value: Any) -> Any:
+    """Convert a min/max value to a plain Python value kept in the graph state."""
+    if value is None or value is pd.NaT or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, pd.Timestamp | datetime.date):
+        return value.isoformat()
+    return value
+
+
+def profile_dataframe(
+    df: pd.DataFrame, column_kinds: dict[str, str] | None = None, sample_rows: int = PROFILE_SAMPLE_ROWS
+) -> dict[str, Any]:
+    """Profile the columns of a query result in one vectorized pass.
+
+    Column kinds come from the database type metadata when given, else from the dtype, and for object
+    columns from a few sampled values. Numeric and datetime min/max and null counts of typed columns are
+    computed on the whole frame. On frames over `sample_rows` rows, distinct counts of categorical columns
+    and null counts of object columns are estimated from a sample of `sample_rows` rows, as checking every
+    Python object costs as much as the old per-column analysis.
+
+    Args:
+        df (pd.DataFrame): Query result.
+        column_kinds (Dict[str, str] | None): Column kinds from the cursor, see `column_kinds_from_cursor`.
+        sample_rows (int): Rows sampled from larger frames.
+
+    Returns:
+        Dict[str, Any]: Schema info with `columns`, `column_types`, `row_count`, `numeric_columns`,
+            `categorical_columns`, `datetime_columns`, `unique_counts`, `column_stats` holding the `null_count`,
+            `min` and `max` of each column, and `sampled` telling whether estimates from a sample are included.
+    """
+    column_kinds = column_kinds or {}
+    row_count = len(df)
+    sample = _sample(df, sample_rows)
+    schema_info = {
+        "columns": list(df.columns),
+        "column_types": {col: str(dtype) for col, dtype in df.dtypes.items()},
+        "row_count": row_count,
+        "numeric_columns": [],
+        "categorical_columns": [],
+        "datetime_columns": [],
+    }
+
+    # positional access, result columns may have duplicate names
+    kinds = []
+    for i, (col, dtype) in enumerate(zip(df.columns, df.dtypes, strict=True)):
+        if col in column_kinds:
+            kind = column_kinds[col]
+        elif pd.api.types.is_bool_dtype(dtype):
+            kind = CATEGORICAL
+        elif pd.api.types.is_numeric_dtype(dtype):
+            kind = NUMERIC
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            kind = DATETIME
+        else:
+            kind = _infer_object_kind(sample.iloc[:, i])
+        kinds.append(kind)
+        schema_info[f"{kind}_columns"].append(col)
+
+    # null checks of object columns cost as much as counting their distinct values, take them from the sample
+    sampled = len(sample) < row_count
+    is_object = [pd.api.types.is_object_dtype(dtype) for dtype in df.dtypes]
+    exact_positions = [i for i in range(len(kinds)) if not (sampled and is_object[i])]
+    null_counts = dict(zip(exact_positions, df.iloc[:, exact_positions].isna().sum().tolist(), strict=True))
+    if sampled:
+        sampled_positions = [i for i in range(len(kinds)) if is_object[i]]
+        scale = row_count / len(sample)
+        for i, null_count in zip(
+            sampled_positions, sample.iloc[:, sampled_positions].isna().sum().tolist(), strict=True
+        ):
+            null_counts[i] = round(null_count * scale)
+    stats = [{"null_count": int(null_counts[i])} for i in range(len(kinds))]
+    # min/max of typed columns in one reduction, numeric object columns (e.g. decimals) one by one
+    typed = [
+        i
+        for i, (kind, dtype) in enumerate(zip(kinds, df.dtypes, strict=True))
+        if kind != CATEGORICAL
+        and (pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_datetime64_any_dtype(dtype))
+        and not pd.api.types.is_bool_dtype(dtype)
+    ]
+    if typed:
+        typed_df = df.iloc[:, typed]
+        for i, minimum, maximum in zip(typed, typed_df.min().tolist(), typed_df.max().tolist(), strict=True):
+            stats[i].update(min=_to_python(minimum), max=_to_python(maximum))
+    for i, kind in enumerate(kinds):
+        if kind == NUMERIC and "min" not in stats[i]:
+            values = pd.to_numeric(df.iloc[:, i], errors="coerce")
+            stats[i].update(min=_to_python(values.min()), max=_to_python(values.max()))
+    schema_info["column_stats"] = dict(zip(df.columns, stats, strict=True))
+
+    unique_counts = {}
+    for i, (col, kind) in enumerate(zip(df.columns, kinds, strict=True)):
+        if kind != CATEGORICAL:
+            continue
+        if not sampled:
+            unique_counts[col] = int(df.iloc[:, i].nunique())
+        else:
+            unique_counts[col] = estimate_distinct_count(sample.iloc[:, i].dropna(), row_count - stats[i]["null_count"])
+    schema_info["unique_counts"] = unique_counts
+    schema_info["sampled"] = sampled
+    return schema_info
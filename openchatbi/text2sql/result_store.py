@@ -0,0 +1,288 @@
+"""Store of SQL query results as Arrow tables, referenced from the graph state by a result handle.
+
+Results are written once while rows are fetched from the database, and read back as typed columns by the
+visualization, the Python executor, report saving and the UI, instead of parsing the CSV preview again.
+Results are kept in memory up to `max_memory_bytes`, older results are spilled to Arrow IPC files in
+`spill_dir` (read back memory-mapped) or dropped if no spill directory is configured.
+"""
+
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from openchatbi import config
+from openchatbi.utils import log
+
+DEFAULT_RESULT_STORE_CONFIG = {
+    "max_memory_bytes": 256 * 1024 * 1024,  # size of the results kept in memory
+    "max_result_bytes": 64 * 1024 * 1024,  # size of a single stored result, rows after it are not stored
+    "max_results": 64,  # number of results kept, in memory and spilled
+    "spill_dir": None,  # directory of results spilled from memory, None to drop them
+}
+
+
+def _to_arrow_array(values: Sequence[Any]) -> pa.Array:
+    """Convert column values to an Arrow array, as strings if they have no common Arrow type."""
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return pa.array([None if value is None else str(value) for value in values], pa.string())
+
+
+def _concat_batches(columns: list[str], batches: list[pa.RecordBatch]) -> pa.Table:
+    """Concatenate record batches whose column types may differ, e.g. all-null batches or int and float batches."""
+    if not batches:
+        return pa.Table.from_arrays([pa.array([], pa.null()) for _ in columns], names=columns)
+    tables = [pa.Table.from_batches([batch]) for batch in batches]
+    try:
+        return pa.concat_tables(tables, promote_options="permissive")
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # incompatible types across batches, keep those columns as strings
+        conflicting = {
+            i for i in range(len(columns)) if len({table.schema.field(i).type for table in tables} - {pa.null()}) > 1
+        }
+        tables = [
+            pa.Table.from_arrays(
+                [
+                    pc.cast(table.column(i), pa.string()) if i in conflicting else table.column(i)
+                    for i in range(len(columns))
+                ],
+                names=columns,
+            )
+            for table in tables
+        ]
+        return pa.concat_tables(tables, promote_options="permissive")
+
+
+class ResultWriter:
+    """Collects the rows of a query result as Arrow record batches, and stores them as one table on close."""
+
+    def __init__(self, store: "ResultStore", columns: list[str]):
+        """Initialize the writer.
+
+        Args:
+            store (ResultStore): Store the result is written to.
+            columns (List[str]): Column names of the result.
+        """
+        self.store = store
+        self.columns = columns
+        self.stored_rows = 0
+        self.complete = True
+        self._batches: list[pa.RecordBatch] = []
+        self._bytes = 0
+
+    def write_rows(self, rows: Sequence[Sequence[Any]]) -> None:
+        """Append rows to the result, rows after `max_result_bytes` are dropped and the result marked incomplete.
+
+        Args:
+            rows (Sequence[Sequence[Any]]): Rows fetched from the database.
+        """
+        if not rows or not self.complete:
+            return
+        if self._bytes > self.store.max_result_bytes:
+            self.complete = False
+            return
+        arrays = [_to_arrow_array(values) for values in zip(*rows, strict=True)]
+        batch = pa.RecordBatch.from_arrays(arrays, names=self.columns)
+        self._batches.append(batch)
+        self._bytes += batch.nbytes
+        self.stored_rows += len(rows)
+
+    def close(self) -> str:
+        """Store the collected rows.
+
+        Returns:
+            str: Handle of the stored result.
+        """
+        table = _concat_batches(self.columns, self._batches)
+        self._batches = []
+        return self.store.put(table)
+
+
+class ResultStore:
+    """Bounded store of query results as Arrow tables, keyed by result handle."""
+
+    def __init__(
+        self,
+        max_memory_bytes: int = DEFAULT_RESULT_STORE_CONFIG["max_memory_bytes"],
+        max_result_bytes: int = DEFAULT_RESULT_STORE_CONFIG["max_result_bytes"],
+        max_results: int = DEFAULT_RESULT_STORE_CONFIG["max_results"],
+        spill_dir: str | None = None,
+    ):
+        """Initialize the store.
+
+        Args:
+            max_memory_bytes (int): Size of the results kept in memory.
+            max_result_bytes (int): Size of a single stored result.
+            max_results (int): Number of results kept, oldest results are removed first.
+            spill_dir (str | None): Directory of results spilled from memory, None to drop them.
+        """
+        self.max_memory_bytes = max_memory_bytes
+        self.max_result_bytes = max_result_bytes
+        self.max_results = max_results
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        # handle -> in-memory table, or path of the spilled Arrow IPC file
+        self._results: OrderedDict[str, pa.Table | Path] = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+    def create_writer(self, columns: list[str]) -> ResultWriter:
+        """Create a writer storing a result with the given columns.
+
+        Args:
+            columns (List[str]): Column names of the result.
+
+        Returns:
+            ResultWriter: Writer of the result.
+        """
+        return ResultWriter(self, columns)
+
+    def put(self, table: pa.Table) -> str:
+        """Store a result.
+
+        Args:
+            table (pa.Table): Result table.
+
+        Returns:
+            str: Handle of the stored result.
+        """
+        handle = f"result_{uuid.uuid4().hex[:16]}"
+        with self._lock:
+            self._results[handle] = table
+            self._memory_bytes += table.nbytes
+            self._evict()
+        return handle
+
+    def get_table(self, handle: str) -> pa.Table | None:
+        """Get a stored result as an Arrow table, spilled results are memory-mapped.
+
+        Args:
+            handle (str): Result handle.
+
+        Returns:
+            pa.Table | None: The result, None if it is unknown or was evicted.
+        """
+        with self._lock:
+            result = self._results.get(handle)
+            if result is None:
+                return None
+            self._results.move_to_end(handle)
+        if isinstance(result, Path):
+            try:
+                with pa.memory_map(str(result)) as source:
+                    return pa.ipc.open_file(source).read_all()
+            except OSError as e:
+                log(f"Failed to read spilled result {handle}: {e}")
+                return None
+        return result
+
+    def get_dataframe(self, handle: str) -> pd.DataFrame | None:
+        """Get a stored result as a pandas DataFrame.
+
+        Args:
+            handle (str): Result handle.
+
+        Returns:
+            pd.DataFrame | None: The result, None if it is unknown or was evicted.
+        """
+        table = self.get_table(handle)
+        return table.to_pandas() if table is not None else None
+
+    def remove(self, handle: str) -> None:
+        """Remove a stored result."""
+        with self._lock:
+            self._remove(handle)
+
+    def clear(self) -> None:
+        """Remove all stored results."""
+        with self._lock:
+            for handle in list(self._results):
+                self._remove(handle)
+
+    def __contains__(self, handle: str) -> bool:
+        return handle in self._results
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def _remove(self, handle: str) -> None:
+        result = self._results.pop(handle, None)
+        if isinstance(result, Path):
+            try:
+                os.remove(result)
+            except OSError:
+                pass
+        elif result is not None:
+            self._memory_bytes -= result.nbytes
+
+    def _evict(self) -> None:
+        """Remove the oldest results over `max_results`, and move the oldest in-memory results over
+        `max_memory_bytes` to the spill directory."""
+        while len(self._results) > self.max_results:
+            self._remove(next(iter(self._results)))
+        for handle in list(self._results):
+            if self._memory_bytes <= self.max_memory_bytes or len(self._results) <= 1:
+                break
+            result = self._results[handle]
+            if isinstance(result, Path):
+                continue
+            if self.spill_dir is None:
+                self._remove(handle)
+                continue
+            try:
+                self._results[handle] = self._spill(handle, result)
+                self._memory_bytes -= result.nbytes
+            except OSError as e:
+                log(f"Failed to spill result {handle}, dropping it: {e}")
+                self._remove(handle)
+
+    def _spill(self, handle: str, table: pa.Table) -> Path:
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        path = self.spill_dir / f"{handle}.arrow"
+        with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        return path
+
+
+_result_store: ResultStore | None = None
+_result_store_lock = threading.Lock()
+
+
+def get_result_store() -> ResultStore:
+    """Get the result store of the process, configured by the `result_store` config.
+
+    Returns:
+        ResultStore: The shared result store.
+    """
+    global _result_store
+    with _result_store_lock:
+        if _result_store is None:
+            try:
+                store_config = config.get().result_store
+            except ValueError:
+                store_config = {}
+            _result_store = ResultStore(**{**DEFAULT_RESULT_STORE_CONFIG, **store_config})
+        return _result_store
+
+
+def load_result(handle: str) -> pd.DataFrame:
+    """Load a stored SQL query result as a pandas DataFrame, for the Python code executors.
+
+    Args:
+        handle (str): Result handle given with the SQL query result.
+
+    Returns:
+        pd.DataFrame: The full query result.
+    """
+    df = get_result_store().get_dataframe(handle)
+    if df is None:
+        raise KeyError(f"Result {handle} is not available anymore, run the SQL query again")
+    return df
@@ -1,109 +1,164 @@
 """Schema linking module for table and column selection in text2sql."""
 
+import asyncio
 from datetime import datetime
+from functools import partial
 
 from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import HumanMessage, SystemMessage
 
 from openchatbi.catalog import CatalogStore
-from openchatbi.catalog.schema_retrival import col_dict, column_tables_mapping, get_relevant_columns
+from openchatbi.catalog.schema_retrival import get_column_retriever, get_relevant_columns
 from openchatbi.constants import datetime_format
 from openchatbi.graph_state import SQLGraphState
 from openchatbi.prompts.system_prompt import get_table_selection_prompt_template
 from openchatbi.text2sql.data import table_selection_example_dict, table_selection_retriever
+from openchatbi.text2sql.schema_packer import SchemaPacker, TableSchema, essential_columns
+from openchatbi.text2sql.table_selector import HeuristicTableSelector
 from openchatbi.utils import extract_json_from_answer, log
 
 
-def schema_linking(llm: BaseChatModel, catalog: CatalogStore):
+def get_related_tables_and_columns(
+    catalog: CatalogStore,
+    keywords_list,
+    dimensions,
+    metrics,
+    start_time=None,
+    invalid_table=None,
+    term_columns=None,
+):
+    """Retrieves tables and columns related to the given keywords, dimensions, and metrics.
+
+    Args:
+        catalog (CatalogStore): Catalog store with schema information.
+        keywords_list (list): List of keywords extracted from the question.
+        dimensions (list): List of dimensions mentioned in the question.
+        metrics (list): List of metrics mentioned in the question.
+        start_time (str, optional): Start time for filtering tables.
+        invalid_table (list, optional): List of tables to exclude.
+        term_columns (dict, optional): Column search results of the terms of the raw question, from the
+            speculative retrieval.
+
+    Returns:
+        tuple: Dictionary mapping table names to their information and related columns, and the relevant
+            column names, most relevant first.
+    """
+    invalid_table = set(invalid_table or [])
+    retriever = get_column_retriever(catalog)
+    col_dict = retriever.col_dict
+    table_index = retriever.table_index
+
+    # 1. Get the top similar columns
+    relevant_columns = get_relevant_columns(
+        keywords_list, dimensions, metrics, catalog=catalog, term_columns=term_columns
+    )
+    column_ranks = {column_name: rank for rank, column_name in enumerate(dict.fromkeys(relevant_columns))}
+    relevant_column_set = frozenset(column_ranks)
+
+    # 2. Get all the related tables
+    candidate_tables = table_index.tables_of(relevant_columns)
+    if start_time:
+        try:
+            start_time = datetime.strptime(start_time, datetime_format)
+        except ValueError:
+            start_time = None
+
+    # 3. Get all the table's related column
+    related_table_column_dict = {}
+    for table_name in candidate_tables:
+        if table_name in invalid_table:
+            continue
+        table_start_time = table_index.table_start_times.get(table_name)
+        if start_time and table_start_time and table_start_time > start_time:
+            continue
+        table_info = catalog.get_table_information(table_name)
+        if not table_info:
+            continue
+        # intersecting iterates the smaller set, the hits keep the relevance order of the columns
+        table_columns = sorted(table_index.table_columns[table_name] & relevant_column_set, key=column_ranks.get)
+        related_table_column_dict[table_name] = (table_info, [col_dict[column_name] for column_name in table_columns])
+
+    return related_table_column_dict, relevant_columns
+
+
+def schema_linking(
+    llm: BaseChatModel,
+    catalog: CatalogStore,
+    sync_mode: bool = True,
+    table_selector: HeuristicTableSelector | None = None,
+    schema_packer: SchemaPacker | None = None,
+):
     """Create function for schema linking: select appropriate tables and columns for a question.
 
     Args:
         llm (BaseChatModel): Language model for table selection.
         catalog (CatalogStore): Catalog store with schema information.
+        sync_mode (bool): Whether to create a sync node, or an async node calling the model with `ainvoke`.
+        table_selector (HeuristicTableSelector | None): Selector picking the table without the LLM when one
+            candidate clearly fits the question, None to always ask the LLM.
+        schema_packer (SchemaPacker | None): Packer fitting the candidate tables of the table selection prompt
+            into a token budget, None to list all their related columns.
 
     Returns:
         function: Node function for schema linking based on question.
     """
 
-    def _get_related_tables_and_columns(keywords_list, dimensions, metrics, start_time=None, invalid_table=None):
-        """Retrieves tables and columns related to the given keywords, dimensions, and metrics.
-
-        Args:
-            keywords_list (list): List of keywords extracted from the question.
-            dimensions (list): List of dimensions mentioned in the question.
-            metrics (list): List of metrics mentioned in the question.
-            start_time (str, optional): Start time for filtering tables.
-            invalid_table (list, optional): List of tables to exclude.
-
-        Returns:
-            dict: Dictionary mapping table names to their information and related columns.
-        """
-        # 1. Get the top similar columns
-        relevant_columns = get_relevant_columns(keywords_list, dimensions, metrics)
-
-        # 2. Get all the related tables
-        candidate_tables = set()
-        for column in relevant_columns:
-            table_list = column_tables_mapping.get(column, [])
-            candidate_tables.update(table_list)
-        if start_time:
-            try:
-                start_time = datetime.strptime(start_time, datetime_format)
-            except ValueError:
-                start_time = None
-
-        # 3. Get all the table's related column
-        related_table_column_dict = {}
-        for table_name in candidate_tables:
-            if table_name in invalid_table:
-                continue
-            table_info = catalog.get_table_information(table_name)
-            if not table_info:
-                continue
-            if start_time and "start_time" in table_info:
-                if datetime.strptime(table_info.get("start_time"), datetime_format) > start_time:
-                    continue
-            columns = []
-            for column_name in relevant_columns:
-                column_dict = col_dict[column_name].copy()
-                if table_name not in column_tables_mapping.get(column_name, []):
-                    continue
-                columns.append(column_dict)
-            related_table_column_dict[table_name] = (table_info, columns)
-
-        return related_table_column_dict
-
-    def _example_retrieval(query, candidate_tables):
+    def _example_retrieval(query, candidate_tables, speculative_questions=None):
         """Retrieves example questions and their selected tables that match the candidate tables.
 
         Args:
             query (str): The natural language question.
             candidate_tables (list): List of candidate table names.
+            speculative_questions (list, optional): Example questions retrieved with the raw question, reused
+                unless none of them matches the candidate tables.
 
         Returns:
             dict: Dictionary mapping example questions to their selected tables.
         """
-        similar_questions = table_selection_retriever.invoke(query)
+        if speculative_questions:
+            valid_examples = _valid_examples(speculative_questions, candidate_tables)
+            if valid_examples:
+                return valid_examples
+        similar_questions = [question_doc.page_content for question_doc in table_selection_retriever.invoke(query)]
+        return _valid_examples(similar_questions, candidate_tables)
+
+    def _valid_examples(similar_questions, candidate_tables):
+        """Maps the example questions to their selected tables among the candidate tables."""
         valid_examples = {}
-        for question_doc in similar_questions:
-            question = question_doc.page_content
+        for question in similar_questions:
             if not question:
                 continue
             # Skip if question not in example dict (handle missing examples gracefully)
-            if question not in table_selection_example_dict:
+            expected_tables = table_selection_example_dict.get(question)
+            if expected_tables is None:
                 continue
-            expected_tables = table_selection_example_dict[question]
             expected_tables = [table for table in expected_tables if table in candidate_tables]
             if expected_tables:
                 valid_examples[question] = expected_tables
         return valid_examples
 
-    def _build_table_selection_prompt(related_table_column_dict, similar_examples):
+    def _render_candidate_table(table_name, table_info, column_lines, omitted):
+        """Renders the prompt section of a candidate table from its kept column lines."""
+        if omitted:
+            column_lines = column_lines + [f"- ... {omitted} less relevant columns are not listed"]
+        columns_desc = "\n".join(column_lines)
+        desc_part = f"\n### Table Description: \n{table_info['description']}"
+        rule_part = f"\n### Rule: \n{table_info.get('selection_rule')}" if table_info.get("selection_rule") else ""
+        return (
+            f"\n## Table: {table_name} {desc_part} {rule_part}"
+            "\n### Columns: \nCategory(Name, Display Name, Description): "
+            f"\n{columns_desc}"
+            ""
+        )
+
+    def _build_table_selection_prompt(related_table_column_dict, similar_examples, relevant_columns=None):
         """Builds a prompt for table selection based on related tables and examples.
 
         Args:
             related_table_column_dict (dict): Dictionary of tables with their information and columns.
             similar_examples (dict): Dictionary of example questions and their selected tables.
+            relevant_columns (list, optional): Relevant column names, most relevant first, ranking the columns
+                kept within the token budget of the schema packer.
 
         Returns:
             str: Formatted prompt for table selection.
@@ -113,23 +168,23 @@ def schema_linking(llm: BaseChatModel, catalog: CatalogStore):
             for example, selected_tables in similar_examples.items()
         ]
 
-        table_column_descs = []
-        for table_name, (table_info, columns) in related_table_column_dict.items():
-            columns_desc = "\n".join(
-                [
+        table_schemas = [
+            TableSchema(
+                table=table_name,
+                columns=[column["column_name"] for column in columns],
+                column_lines=[
                     f"- {column['category']}({column['column_name']}, {column['display_name']}, \"{column['description']}\")"
                     for column in columns
-                ]
-            )
-            desc_part = f"\n### Table Description: \n{table_info['description']}"
-            rule_part = f"\n### Rule: \n{table_info.get('selection_rule')}" if table_info.get("selection_rule") else ""
-            table_desc = (
-                f"\n## Table: {table_name} {desc_part} {rule_part}"
-                "\n### Columns: \nCategory(Name, Display Name, Description): "
-                f"\n{columns_desc}"
-                ""
+                ],
+                essential=essential_columns(columns, table_info),
+                render=partial(_render_candidate_table, table_name, table_info),
             )
-            table_column_descs.append(table_desc)
+            for table_name, (table_info, columns) in related_table_column_dict.items()
+        ]
+        if schema_packer is None:
+            table_column_descs = [table_schema.full() for table_schema in table_schemas]
+        else:
+            table_column_descs, _ = schema_packer.pack(table_schemas, relevant_columns)
 
         # Build the LLM prompt
         prompt = (
@@ -156,6 +211,31 @@ def schema_linking(llm: BaseChatModel, catalog: CatalogStore):
                 return False
         return True
 
+    def _check_selection(response, messages, candidate_tables) -> dict | None:
+        """Checks the tables selected by the model, asking it to select again in `messages` if they are invalid.
+
+        Args:
+            response (AIMessage): The model response.
+            messages (list): List of messages, the retry request is appended to it.
+            candidate_tables (list): List of candidate tables.
+
+        Returns:
+            dict | None: Dictionary containing selected tables, None if they are invalid.
+        """
+        result = extract_json_from_answer(response.content)
+        selected_tables = result.get("tables")
+        log(result)
+        if _verify_table(selected_tables, candidate_tables):
+            return {"tables": selected_tables}
+        invalid_tables = ",".join([table.get("table") for table in result.get("tables")])
+        messages.append(
+            HumanMessage(
+                f"The selected table {invalid_tables} is not valid. Do not select this table, please try again."
+            )
+        )
+        log(f"The selected table {invalid_tables} is not in the candidate tables.")
+        return None
+
     def _call_llm_select(llm: BaseChatModel, system_prompt, messages, question, candidate_tables):
         """Calls the language model to select appropriate tables for the question.
 
@@ -172,73 +252,136 @@ def schema_linking(llm: BaseChatModel, catalog: CatalogStore):
             dict: Dictionary containing selected tables.
         """
         log("Selecting appropriate tables...")
-        # print(f"candidate_tables: {candidate_tables}")
-        prompt = f"""Please select the appropriate tables for the question: {question}"""
-        messages.append(HumanMessage(prompt))
-        retry_flag = True
-        retry_cnt = 1
-        while retry_flag:
+        messages.append(HumanMessage(f"""Please select the appropriate tables for the question: {question}"""))
+        for retry_cnt in range(1, 4):
             try:
                 log("Ask LLM to select the table...")
-                # print("_call_llm_select")
-                # print(messages)
                 response = llm.invoke([SystemMessage(system_prompt)] + messages)
-                result = extract_json_from_answer(response.content)
-                selected_tables = result.get("tables")
-                log(result)
-                if _verify_table(selected_tables, candidate_tables):
-                    return {"tables": selected_tables}
-                else:
-                    messages.append(
-                        HumanMessage(
-                            f'The selected table {",".join([table.get("table") for table in result.get("tables")])} is not valid. '
-                            f"Do not select this table, please try again."
-                        )
-                    )
-                retry_cnt += 1
-                if retry_cnt > 3:
-                    retry_flag = False
-                if retry_flag:
-                    log(
-                        f"The selected table {','.join([table.get('table') for table in result.get('tables')])} is not in the candidate tables."
-                    )
-                    log("Retry Table Selection...")
+                selected = _check_selection(response, messages, candidate_tables)
+                if selected is not None:
+                    return selected
+            except Exception as e:
+                log(str(e))
+            if retry_cnt < 3:
+                log("Retry Table Selection...")
+        return {}
+
+    async def _acall_llm_select(llm: BaseChatModel, system_prompt, messages, question, candidate_tables):
+        """Async version of `_call_llm_select`, calling the model with `ainvoke`.
+
+        Args:
+            llm (BaseChatModel): The language model to use.
+            system_prompt (str): The system prompt for table selection.
+            messages (list): List of previous messages.
+            question (str): The natural language question.
+            candidate_tables (list): List of candidate tables.
 
+        Returns:
+            dict: Dictionary containing selected tables.
+        """
+        log("Selecting appropriate tables...")
+        messages.append(HumanMessage(f"""Please select the appropriate tables for the question: {question}"""))
+        for retry_cnt in range(1, 4):
+            try:
+                log("Ask LLM to select the table...")
+                response = await llm.ainvoke([SystemMessage(system_prompt)] + messages)
+                selected = _check_selection(response, messages, candidate_tables)
+                if selected is not None:
+                    return selected
             except Exception as e:
                 log(str(e))
-                retry_cnt += 1
-                if retry_cnt > 3:
-                    retry_flag = False
+            if retry_cnt < 3:
+                log("Retry Table Selection...")
         return {}
 
-    def _select(state: SQLGraphState) -> dict:
-        if not state.get("rewrite_question"):
-            log("Missing rewrite question, skipping schema linking.")
-            return {}
+    def _selection_candidates(state: SQLGraphState) -> dict:
+        """Retrieves the candidate tables and table selection examples of the question.
+
+        Args:
+            state (SQLGraphState): The current SQL graph state.
 
-        messages = state["messages"]
-        question = state["rewrite_question"]
+        Returns:
+            dict: The related tables and columns, the relevant columns, similar examples and extracted entities.
+        """
         info_entities = state["info_entities"]
         keywords_list = info_entities.get("keywords", [])
         dimensions = info_entities.get("dimensions", [])
         metrics = info_entities.get("metrics", [])
         start_time = info_entities.get("start_time")
 
+        # reuse the retrieval done with the raw question while the question was extracted
+        speculation = state.get("speculative_retrieval") or {}
+        term_columns = speculation.get("term_columns")
+
         invalid_table = []
         log("Retrieving related table schema...")
         # 1. Get related tables and columns
-        related_table_column_dict = _get_related_tables_and_columns(
-            keywords_list, dimensions, metrics, start_time, invalid_table
+        related_table_column_dict, relevant_columns = get_related_tables_and_columns(
+            catalog, keywords_list, dimensions, metrics, start_time, invalid_table, term_columns
         )
-        candidate_tables = related_table_column_dict.keys()
 
         # 2. Get the similar examples
-        similar_examples = _example_retrieval(" ".join(keywords_list), related_table_column_dict.keys())
-
+        similar_examples = _example_retrieval(
+            " ".join(keywords_list), list(related_table_column_dict), speculation.get("table_selection_examples")
+        )
+        return {
+            "related_table_column_dict": related_table_column_dict,
+            "relevant_columns": relevant_columns,
+            "similar_examples": similar_examples,
+            "dimensions": dimensions,
+            "metrics": metrics,
+            "start_time": start_time,
+        }
+
+    def _heuristic_select(candidates: dict) -> dict | None:
+        """Selects the table without the LLM when the candidates are not ambiguous."""
+        if table_selector is None:
+            return None
+        return table_selector.select(**candidates)
+
+    def _llm_selection_args(state: SQLGraphState, candidates: dict) -> tuple:
+        """Builds the table selection prompt, the arguments of `_call_llm_select`."""
         # 3. Build tables prompt
-        system_prompt = _build_table_selection_prompt(related_table_column_dict, similar_examples)
+        system_prompt = _build_table_selection_prompt(
+            candidates["related_table_column_dict"], candidates["similar_examples"], candidates["relevant_columns"]
+        )
+        return (
+            llm,
+            system_prompt,
+            list(state["messages"]),
+            state["rewrite_question"],
+            list(candidates["related_table_column_dict"]),
+        )
+
+    def _selection_update(selected: dict, candidates: dict) -> dict:
+        """Adds the relevant columns to the selected tables, ranking the columns of the SQL generation schema."""
+        if not selected:
+            return selected
+        return {**selected, "relevant_columns": candidates["relevant_columns"]}
+
+    def _select(state: SQLGraphState) -> dict:
+        if not state.get("rewrite_question"):
+            log("Missing rewrite question, skipping schema linking.")
+            return {}
+
+        candidates = _selection_candidates(state)
+        selected = _heuristic_select(candidates)
+        if selected is None:
+            # 4. Call LLM to select the table
+            selected = _call_llm_select(*_llm_selection_args(state, candidates))
+        return _selection_update(selected, candidates)
+
+    async def _aselect(state: SQLGraphState) -> dict:
+        if not state.get("rewrite_question"):
+            log("Missing rewrite question, skipping schema linking.")
+            return {}
 
-        # 4. Call LLM to select the table
-        return _call_llm_select(llm, system_prompt, messages, question, candidate_tables)
+        # column and example retrieval may call embedding models, keep them off the event loop
+        candidates = await asyncio.to_thread(_selection_candidates, state)
+        selected = _heuristic_select(candidates)
+        if selected is None:
+            # 4. Call LLM to select the table
+            selected = await _acall_llm_select(*_llm_selection_args(state, candidates))
+        return _selection_update(selected, candidates)
 
-    return _select
+    return _select if sync_mode else _aselect
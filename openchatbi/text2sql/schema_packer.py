@@ -0,0 +1,209 @@
+"""Token-budgeted packing of the table schemas in the table selection and SQL generation prompts."""
+
+import re
+import threading
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from openchatbi.context_manager import ContextManager
+from openchatbi.utils import log
+
+DEFAULT_SCHEMA_PROMPT_BUDGET_CONFIG = {
+    "enabled": True,
+    "sql_max_tokens": 6000,  # tokens of the table schemas in the SQL generation prompt, 0 for no limit
+    "table_selection_max_tokens": 4000,  # tokens of the candidate tables in the table selection prompt, 0 for no limit
+}
+
+_TIME_TYPE_PATTERN = re.compile(r"date|time", re.IGNORECASE)
+_TIME_NAME_PATTERN = re.compile(r"(^|_)(date|time|timestamp|day|hour|dt|ds)$|_at$", re.IGNORECASE)
+_KEY_NAME_PATTERN = re.compile(r"(^|_)(id|key)$", re.IGNORECASE)
+# Partition columns of common warehouse layouts
+_PARTITION_NAMES = frozenset({"dt", "ds", "pt", "hr", "dh", "partition_date", "partition_hour", "p_date"})
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a text, the estimate used for context management."""
+    return ContextManager.estimate_tokens(text)
+
+
+def essential_columns(columns: list[Mapping[str, Any]], table_info: Mapping[str, Any] | None = None) -> frozenset[str]:
+    """Get the columns a table schema always keeps: keys, time and partition columns, and columns its rules name.
+
+    Args:
+        columns (List[Mapping[str, Any]]): Columns of the table.
+        table_info (Mapping[str, Any] | None): Table information, its `partition_columns` and the columns named in
+            its `sql_rule`, `selection_rule` and `derived_metric` are kept too.
+
+    Returns:
+        frozenset[str]: Names of the columns to keep.
+    """
+    table_info = table_info or {}
+    rule_words = set(
+        re.findall(
+            r"\w+", " ".join(str(table_info.get(key) or "") for key in ("sql_rule", "selection_rule", "derived_metric"))
+        )
+    )
+    partition_columns = set(table_info.get("partition_columns") or [])
+    essential = set()
+    for column in columns:
+        name = column["column_name"]
+        if (
+            name in rule_words
+            or name in partition_columns
+            or name.lower() in _PARTITION_NAMES
+            or _KEY_NAME_PATTERN.search(name)
+            or _TIME_NAME_PATTERN.search(name)
+            or _TIME_TYPE_PATTERN.search(str(column.get("type") or ""))
+            or column.get("category") in ("identifier", "temporal")
+            or column.get("dimension_table")
+        ):
+            essential.add(name)
+    return frozenset(essential)
+
+
+@dataclass
+class TableSchema:
+    """Schema section of a table in a prompt, with one prompt line per column in catalog order."""
+
+    table: str
+    columns: list[str]
+    column_lines: list[str]
+    essential: frozenset[str]
+    render: Callable[[list[str], int], str]  # renders the section from the kept column lines and the omitted count
+
+    def full(self) -> str:
+        """Render the section with all the columns."""
+        return self.render(self.column_lines, 0)
+
+
+@dataclass
+class SchemaPackReport:
+    """Token counts of a packed prompt schema."""
+
+    full_tokens: int
+    packed_tokens: int
+    columns: int
+    kept_columns: int
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.full_tokens - self.packed_tokens
+
+
+class SchemaPacker:
+    """Fits the table schemas of a prompt into a token budget by leaving out the least relevant columns.
+
+    Key, time and partition columns are always kept. The other columns are added by relevance until the
+    budget is used: the columns schema linking selected for the table first, then the columns retrieved
+    for the question in their rank order, then the remaining columns in catalog order. Kept columns stay
+    in catalog order, so the same selection always renders the same text.
+    """
+
+    def __init__(self, max_tokens: int, name: str = "schema"):
+        """Initialize the packer.
+
+        Args:
+            max_tokens (int): Token budget of the table schemas.
+            name (str): Name of the prompt in the logs.
+        """
+        self.max_tokens = max_tokens
+        self.name = name
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "packed": 0, "full_tokens": 0, "packed_tokens": 0}
+
+    def pack(
+        self,
+        schemas: list[TableSchema],
+        relevant_columns: list[str] | None = None,
+        selected_columns: dict[str, list[str]] | None = None,
+    ) -> tuple[list[str], SchemaPackReport]:
+        """Render the table schemas within the token budget.
+
+        Args:
+            schemas (List[TableSchema]): Table schemas, in prompt order.
+            relevant_columns (List[str] | None): Columns retrieved for the question, most relevant first.
+            selected_columns (Dict[str, List[str]] | None): Table to the columns schema linking selected.
+
+        Returns:
+            Tuple[List[str], SchemaPackReport]: Rendered schema section of each table, and the token report.
+        """
+        sections = [schema.full() for schema in schemas]
+        full_tokens = sum(estimate_tokens(section) for section in sections)
+        total_columns = sum(len(schema.columns) for schema in schemas)
+        if full_tokens > self.max_tokens:
+            sections, kept_columns = self._pack(schemas, relevant_columns or [], selected_columns or {})
+        else:
+            kept_columns = total_columns
+        report = SchemaPackReport(
+            full_tokens=full_tokens,
+            packed_tokens=sum(estimate_tokens(section) for section in sections),
+            columns=total_columns,
+            kept_columns=kept_columns,
+        )
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["packed"] += kept_columns < total_columns
+            self.stats["full_tokens"] += report.full_tokens
+            self.stats["packed_tokens"] += report.packed_tokens
+        if kept_columns < total_columns:
+            log(
+                f"Packed {self.name} prompt into {report.packed_tokens} of {self.max_tokens} tokens, "
+                f"{report.saved_tokens} tokens saved, {kept_columns} of {total_columns} columns kept"
+            )
+        return sections, report
+
+    def _pack(
+        self, schemas: list[TableSchema], relevant_columns: list[str], selected_columns: dict[str, list[str]]
+    ) -> tuple[list[str], int]:
+        column_ranks = {column_name: rank for rank, column_name in enumerate(dict.fromkeys(relevant_columns))}
+        kept = [set() for _ in schemas]
+        # the sections with their essential columns, and a placeholder for the omitted count
+        used = 0
+        candidates = []
+        for table_idx, schema in enumerate(schemas):
+            essential_lines = []
+            selected = set(selected_columns.get(schema.table) or [])
+            for column_idx, (column_name, line) in enumerate(zip(schema.columns, schema.column_lines, strict=True)):
+                if column_name in schema.essential:
+                    kept[table_idx].add(column_idx)
+                    essential_lines.append(line)
+                    continue
+                tier = 0 if column_name in selected else 1 if column_name in column_ranks else 2
+                rank = column_ranks.get(column_name, len(column_ranks) + column_idx)
+                candidates.append(((tier, rank, table_idx), table_idx, column_idx, estimate_tokens(line) + 1))
+            used += estimate_tokens(schema.render(essential_lines, len(schema.columns) - len(essential_lines)))
+
+        for _, table_idx, column_idx, tokens in sorted(candidates):
+            if used + tokens <= self.max_tokens:
+                kept[table_idx].add(column_idx)
+                used += tokens
+
+        sections = []
+        for schema, kept_idx in zip(schemas, kept, strict=True):
+            lines = [line for column_idx, line in enumerate(schema.column_lines) if column_idx in kept_idx]
+            sections.append(schema.render(lines, len(schema.column_lines) - len(lines)))
+        return sections, sum(len(kept_idx) for kept_idx in kept)
+
+
+def create_schema_packers(
+    budget_config: dict[str, Any] | None,
+) -> tuple[SchemaPacker | None, SchemaPacker | None]:
+    """Create the schema packers of the SQL generation and table selection prompts from the `schema_prompt_budget` config.
+
+    Args:
+        budget_config (Dict[str, Any] | None): Overrides of `DEFAULT_SCHEMA_PROMPT_BUDGET_CONFIG`.
+
+    Returns:
+        Tuple[SchemaPacker | None, SchemaPacker | None]: The SQL generation and table selection packers, None
+            for a prompt without a budget.
+    """
+    budget_config = {**DEFAULT_SCHEMA_PROMPT_BUDGET_CONFIG, **(budget_config or {})}
+    if not budget_config["enabled"]:
+        return None, None
+    sql_max_tokens = budget_config["sql_max_tokens"]
+    selection_max_tokens = budget_config["table_selection_max_tokens"]
+    return (
+        SchemaPacker(sql_max_tokens, "SQL generation schema") if sql_max_tokens > 0 else None,
+        SchemaPacker(selection_max_tokens, "table selection schema") if selection_max_tokens > 0 else None,
+    )
@@ -0,0 +1,163 @@
+"""Speculative retrieval on the raw question, run while the model extracts the information of the question.
+
+The words of the raw question are often the dimensions and metrics the extraction returns, so column, table
+selection example and SQL example retrieval start on the raw question in parallel with the extraction LLM
+call. Table selection reuses the column search of a dimension or metric query only when that exact text was
+searched, so its results are the ones of the normal search, and the examples are merged with those of the
+rewritten question. Once the model answered, the extraction only waits briefly for the searches it can reuse
+and cancels the others.
+"""
+
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Any
+
+from openchatbi.catalog import CatalogStore
+from openchatbi.catalog.schema_retrival import search_columns_by_term
+from openchatbi.text2sql.data import sql_example_retriever, table_selection_retriever
+from openchatbi.text_segmenter import _segmenter
+from openchatbi.utils import log
+
+# Words of the raw question searched at most, unigrams first then bigrams
+MAX_SPECULATIVE_TERMS = 8
+
+_STOP_WORDS = frozenset(
+    "a an and are as at be by can did do does for from give how i in is it list me my of on or show the "
+    "their there this to was we what when where which who with".split()
+)
+
+# Seconds the extraction waits for the reusable speculative searches once the model answered
+SPECULATION_WAIT_SECONDS = 0.5
+
+# Pool of the speculative searches, separate from the column search pool of the critical path
+_speculation_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="speculative-retrieval")
+
+
+def _words(text: str) -> list[str]:
+    """Lowercased words of a text, without stop words and single characters."""
+    return [
+        word
+        for word in (token.strip().lower() for token in _segmenter.cut(text))
+        if len(word) > 1 and word not in _STOP_WORDS
+    ]
+
+
+def question_terms(question: str) -> list[str]:
+    """Get the terms of a raw question searched speculatively: its words and adjacent word pairs.
+
+    Args:
+        question (str): Raw user question.
+
+    Returns:
+        list[str]: Distinct terms, words first.
+    """
+    words = list(dict.fromkeys(_words(question)))
+    bigrams = [f"{first} {second}" for first, second in zip(words, words[1:], strict=False)]
+    return list(dict.fromkeys(words + bigrams))[:MAX_SPECULATIVE_TERMS]
+
+
+def _retrieve_questions(retriever: Any, question: str) -> list[str]:
+    return [document.page_content for document in retriever.invoke(question)]
+
+
+def _speculative_tasks(question: str, catalog: CatalogStore) -> dict[tuple[str, str], Callable[[], Any]]:
+    """Tasks of the speculative retrieval keyed by (state key, term): a column search per term, and the examples."""
+    tasks = {
+        ("term_columns", term): partial(search_columns_by_term, [term], catalog=catalog, parallel=False)
+        for term in question_terms(question)
+    }
+    tasks[("table_selection_examples", "")] = partial(_retrieve_questions, table_selection_retriever, question)
+    tasks[("sql_examples", "")] = partial(_retrieve_questions, sql_example_retriever, question)
+    return tasks
+
+
+def _speculation(question: str, results: dict[tuple[str, str], Any]) -> dict[str, Any]:
+    """Build the speculative retrieval state, failed searches are left out and run normally later."""
+    speculation = {"question": question, "term_columns": {}}
+    for (name, term), result in results.items():
+        if isinstance(result, BaseException):
+            log(f"Speculative {name} retrieval {term} failed: {result}")
+        elif name == "term_columns":
+            speculation[name].update(result)
+        else:
+            speculation[name] = result
+    return speculation
+
+
+def _future_result(future: Future) -> Any:
+    try:
+        return future.result()
+    except Exception as e:
+        return e
+
+
+def _vector_queries(info_entities: dict[str, Any]) -> set[str]:
+    """The dimension and metric vector search queries of the extracted information, as `get_relevant_columns` joins them."""
+    return {" ".join(terms) for terms in (info_entities.get(key) or [] for key in ("dimensions", "metrics")) if terms}
+
+
+class SpeculativeRetrieval:
+    """Speculative retrieval of a raw question running in background threads."""
+
+    def __init__(self, question: str, catalog: CatalogStore):
+        """Start the searches.
+
+        Args:
+            question (str): Raw user question.
+            catalog (CatalogStore): Catalog store to search in.
+        """
+        self.question = question
+        self._futures = {
+            key: _speculation_executor.submit(task) for key, task in _speculative_tasks(question, catalog).items()
+        }
+
+    def _reusable(self, info_entities: dict[str, Any]) -> list[Future]:
+        """The searches the extracted information can reuse: the examples and the exact vector queries."""
+        queries = _vector_queries(info_entities)
+        return [future for (name, term), future in self._futures.items() if name != "term_columns" or term in queries]
+
+    def _collect(self) -> dict[str, Any]:
+        """Cancel the searches still running and build the state from the finished ones."""
+        self.cancel()
+        finished = {key: future for key, future in self._futures.items() if future.done() and not future.cancelled()}
+        return _speculation(self.question, {key: _future_result(future) for key, future in finished.items()})
+
+    def result(self, info_entities: dict[str, Any], timeout: float = SPECULATION_WAIT_SECONDS) -> dict[str, Any]:
+        """Wait briefly for the reusable searches and get the `speculative_retrieval` state.
+
+        Args:
+            info_entities (dict): Extracted information of the question.
+            timeout (float): Seconds to wait for the reusable searches, the unfinished ones are left out.
+
+        Returns:
+            dict: The `speculative_retrieval` state of the finished searches.
+        """
+        wait(self._reusable(info_entities), timeout=timeout)
+        return self._collect()
+
+    async def aresult(self, info_entities: dict[str, Any], timeout: float = SPECULATION_WAIT_SECONDS) -> dict[str, Any]:
+        """Async version of `result`, waiting without blocking the event loop."""
+        reusable = [asyncio.wrap_future(future) for future in self._reusable(info_entities)]
+        if reusable:
+            await asyncio.wait(reusable, timeout=timeout)
+        return self._collect()
+
+    def cancel(self) -> None:
+        """Cancel the searches not started yet, when their results will not be used."""
+        for future in self._futures.values():
+            future.cancel()
+
+
+def start_speculative_retrieval(question: str, catalog: CatalogStore) -> SpeculativeRetrieval:
+    """Start the speculative retrieval of a raw question in background threads.
+
+    Args:
+        question (str): Raw user question.
+        catalog (CatalogStore): Catalog store to search in.
+
+    Returns:
+        SpeculativeRetrieval: The running retrieval, `result` returns the `speculative_retrieval` state.
+    """
+    return SpeculativeRetrieval(question, catalog)
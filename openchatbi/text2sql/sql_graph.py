@@ -12,10 +12,15 @@ from openchatbi import config
 from openchatbi.catalog import CatalogStore
 from openchatbi.constants import SQL_SUCCESS
 from openchatbi.graph_state import InputState, SQLGraphState, SQLOutputState
-from openchatbi.llm.llm import get_default_llm, get_text2sql_llm
+from openchatbi.llm.llm import get_default_llm, get_embedding_model, get_text2sql_llm
 from openchatbi.text2sql.extraction import information_extraction, information_extraction_conditional_edges
 from openchatbi.text2sql.generate_sql import create_sql_nodes, should_execute_sql
+from openchatbi.text2sql.question_cache import create_sql_cache_nodes, create_sql_question_cache, sql_cache_route
+from openchatbi.text2sql.result_cache import create_sql_result_cache
+from openchatbi.text2sql.result_store import get_result_store
 from openchatbi.text2sql.schema_linking import schema_linking
+from openchatbi.text2sql.schema_packer import create_schema_packers
+from openchatbi.text2sql.table_selector import create_table_selector
 from openchatbi.tool.ask_human import AskHuman
 from openchatbi.tool.search_knowledge import search_knowledge
 
@@ -58,13 +63,17 @@ def should_generate_visualization_or_retry(state: SQLGraphState) -> str:
         return "end"
 
 
-def build_sql_graph(catalog: CatalogStore, checkpointer: Checkpointer, memory_store: BaseStore) -> CompiledStateGraph:
+def build_sql_graph(
+    catalog: CatalogStore, checkpointer: Checkpointer, memory_store: BaseStore, sync_mode: bool = True
+) -> CompiledStateGraph:
     """Build SQL generation graph with all nodes and edges.
 
     Args:
         catalog: Catalog store containing schema information.
         checkpointer: The Checkpointer for state persistence (short memory). If None, no short memory.
         memory_store: The BaseStore to use for long-term memory. If None, no long-term memory.
+        sync_mode: Whether the graph is run with `invoke`/`stream`, or with `ainvoke`/`astream` using async nodes
+            that call the LLMs with `ainvoke` and run database queries in worker threads.
 
     Returns:
         CompiledStateGraph: Compiled SQL graph ready for execution.
@@ -76,23 +85,65 @@ def build_sql_graph(catalog: CatalogStore, checkpointer: Checkpointer, memory_st
         llm_with_tools = default_llm.bind_tools(tools, strict=True).bind(response_format={"type": "json_object"})
     else:
         llm_with_tools = default_llm.bind_tools(tools)
+    # Token budgets of the table schemas in the SQL generation and table selection prompts
+    sql_schema_packer, selection_schema_packer = create_schema_packers(config.get().schema_prompt_budget)
     # Create SQL processing nodes with visualization configuration
     generate_sql_node, execute_sql_node, regenerate_sql_node, generate_visualization_node = create_sql_nodes(
-        get_text2sql_llm(), catalog, dialect=config.get().dialect, visualization_mode=config.get().visualization_mode
+        get_text2sql_llm(),
+        catalog,
+        dialect=config.get().dialect,
+        visualization_mode=config.get().visualization_mode,
+        result_limits=config.get().sql_result_limits,
+        result_store=get_result_store(),
+        result_cache=create_sql_result_cache(config.get().sql_result_cache, catalog),
+        sync_mode=sync_mode,
+        schema_packer=sql_schema_packer,
     )
 
+    # Cache of the SQL generated for rewritten questions, a hit skips table selection and SQL generation
+    question_cache = create_sql_question_cache(config.get().sql_question_cache, get_embedding_model())
+
     # Define the SQL generation graph
     graph = StateGraph(SQLGraphState, input_schema=InputState, output_schema=SQLOutputState)
 
     # Add nodes to the graph
     graph.add_node("search_knowledge", search_tool_node)
     graph.add_node("ask_human", ask_human)
-    graph.add_node("information_extraction", information_extraction(llm_with_tools))
-    graph.add_node("table_selection", schema_linking(default_llm, catalog))
+    graph.add_node(
+        "information_extraction",
+        information_extraction(
+            llm_with_tools, sync_mode=sync_mode, catalog=catalog if config.get().speculative_retrieval else None
+        ),
+    )
+    graph.add_node(
+        "table_selection",
+        schema_linking(
+            default_llm,
+            catalog,
+            sync_mode=sync_mode,
+            table_selector=create_table_selector(config.get().table_selection_heuristic),
+            schema_packer=selection_schema_packer,
+        ),
+    )
     graph.add_node("generate_sql", generate_sql_node)
     graph.add_node("execute_sql", execute_sql_node)
     graph.add_node("regenerate_sql", regenerate_sql_node)
     graph.add_node("generate_visualization", generate_visualization_node)
+    if question_cache is not None:
+        lookup_sql_cache_node, update_sql_cache_node = create_sql_cache_nodes(
+            catalog, question_cache, sync_mode=sync_mode
+        )
+        graph.add_node("lookup_sql_cache", lookup_sql_cache_node)
+        graph.add_node("update_sql_cache", update_sql_cache_node)
+        graph.add_conditional_edges(
+            "lookup_sql_cache",
+            sql_cache_route,
+            {
+                "execute_sql": "execute_sql",
+                "table_selection": "table_selection",
+            },
+        )
+        graph.add_edge("update_sql_cache", "generate_visualization")
 
     # Add basic edges
     graph.add_edge(START, "information_extraction")
@@ -108,7 +159,7 @@ def build_sql_graph(catalog: CatalogStore, checkpointer: Checkpointer, memory_st
         {
             "ask_human": "ask_human",
             "search_knowledge": "search_knowledge",
-            "next": "table_selection",
+            "next": "lookup_sql_cache" if question_cache is not None else "table_selection",
             "end": END,
         },
     )
@@ -138,7 +189,7 @@ def build_sql_graph(catalog: CatalogStore, checkpointer: Checkpointer, memory_st
         "execute_sql",
         should_generate_visualization_or_retry,
         {
-            "generate_visualization": "generate_visualization",
+            "generate_visualization": "update_sql_cache" if question_cache is not None else "generate_visualization",
             "regenerate_sql": "regenerate_sql",
             "end": END,
         },
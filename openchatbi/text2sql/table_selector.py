@@ -0,0 +1,214 @@
+"""Heuristic table selection, skipping the table selection LLM call when one candidate table clearly fits."""
+
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from openchatbi.utils import log
+
+DEFAULT_TABLE_SELECTION_HEURISTIC_CONFIG = {
+    "enabled": False,
+    "min_coverage": 0.8,  # rank-weighted share of the relevant columns the selected table must contain
+    "min_margin": 0.15,  # score lead of the selected table over the second candidate
+}
+
+# Weights of the score components, summing to 1
+SCORE_WEIGHTS = {"coverage": 0.5, "category": 0.2, "examples": 0.2, "time": 0.1}
+
+
+@dataclass
+class TableScore:
+    """Heuristic score of a candidate table, components between 0 and 1."""
+
+    table: str
+    score: float
+    coverage: float  # share of the relevant columns in the table, weighted by 1 / rank
+    category: float  # share of the extracted column categories (dimension, metric) the table has columns of
+    examples: float  # share of the similar table selection examples that selected the table
+    time: float  # 1 if the table is known to hold data from the question start time, 0.5 if unknown
+    columns: list[str] = field(default_factory=list)
+
+
+def score_candidate_tables(
+    related_table_column_dict: dict[str, tuple[dict, list[dict]]],
+    relevant_columns: list[str],
+    dimensions: list[str] | None = None,
+    metrics: list[str] | None = None,
+    similar_examples: dict[str, list[str]] | None = None,
+    start_time: str | None = None,
+) -> list[TableScore]:
+    """Score the candidate tables of a question, best first.
+
+    Args:
+        related_table_column_dict (Dict): Candidate table to (table information, related columns).
+        relevant_columns (List[str]): Relevant column names, most relevant first.
+        dimensions (List[str] | None): Extracted dimensions.
+        metrics (List[str] | None): Extracted metrics.
+        similar_examples (Dict[str, List[str]] | None): Similar example questions to their selected candidate tables.
+        start_time (str | None): Extracted start time, candidates starting after it are already left out.
+
+    Returns:
+        List[TableScore]: Scores of the candidate tables, highest first.
+    """
+    similar_examples = similar_examples or {}
+    # columns only count once, and only if some candidate has them
+    candidate_columns = {
+        column["column_name"] for _, columns in related_table_column_dict.values() for column in columns
+    }
+    rank_weights = {}
+    for column_name in relevant_columns:
+        if column_name in candidate_columns and column_name not in rank_weights:
+            rank_weights[column_name] = 1.0 / (len(rank_weights) + 1)
+    total_weight = sum(rank_weights.values())
+    categories = [category for category, terms in (("dimension", dimensions), ("metric", metrics)) if terms]
+
+    scores = []
+    for table, (table_info, columns) in related_table_column_dict.items():
+        column_names = list(dict.fromkeys(column["column_name"] for column in columns))
+        coverage = sum(rank_weights.get(name, 0.0) for name in column_names) / total_weight if total_weight else 0.0
+        table_categories = {column.get("category") for column in columns}
+        category = sum(category in table_categories for category in categories) / len(categories) if categories else 1.0
+        examples = (
+            sum(table in tables for tables in similar_examples.values()) / len(similar_examples)
+            if similar_examples
+            else 0.0
+        )
+        time = 1.0 if not start_time or table_info.get("start_time") else 0.5
+        components = {"coverage": coverage, "category": category, "examples": examples, "time": time}
+        score = sum(SCORE_WEIGHTS[name] * value for name, value in components.items())
+        scores.append(TableScore(table=table, score=score, columns=column_names, **components))
+    return sorted(scores, key=lambda table_score: -table_score.score)
+
+
+class HeuristicTableSelector:
+    """Selects the table of a question from the candidate scores, deferring to the LLM when they are ambiguous.
+
+    A table is selected when it is the only candidate, or when it covers at least `min_coverage` of the
+    relevant columns and scores `min_margin` above the next candidate. Questions needing a join of several
+    tables rarely pass the coverage check, and go to the LLM.
+    """
+
+    def __init__(
+        self,
+        min_coverage: float = DEFAULT_TABLE_SELECTION_HEURISTIC_CONFIG["min_coverage"],
+        min_margin: float = DEFAULT_TABLE_SELECTION_HEURISTIC_CONFIG["min_margin"],
+    ):
+        """Initialize the selector.
+
+        Args:
+            min_coverage (float): Rank-weighted share of the relevant columns the selected table must contain.
+            min_margin (float): Score lead of the selected table over the second candidate.
+        """
+        self.min_coverage = min_coverage
+        self.min_margin = min_margin
+        self._lock = threading.Lock()
+        self.stats = {"heuristic": 0, "llm": 0}
+
+    def decide(self, scores: list[TableScore]) -> TableScore | None:
+        """Get the table to select from the candidate scores, None if the LLM should select.
+
+        Args:
+            scores (List[TableScore]): Candidate scores, highest first.
+
+        Returns:
+            TableScore | None: The selected table, None if the candidates are ambiguous.
+        """
+        if len(scores) == 1:
+            return scores[0]
+        if len(scores) > 1 and scores[0].coverage >= self.min_coverage:
+            if scores[0].score - scores[1].score >= self.min_margin:
+                return scores[0]
+        return None
+
+    def select(
+        self,
+        related_table_column_dict: dict[str, tuple[dict, list[dict]]],
+        relevant_columns: list[str],
+        dimensions: list[str] | None = None,
+        metrics: list[str] | None = None,
+        similar_examples: dict[str, list[str]] | None = None,
+        start_time: str | None = None,
+    ) -> dict[str, Any] | None:
+        """Select the table of a question without the LLM, if the candidates are not ambiguous.
+
+        Args:
+            related_table_column_dict (Dict): Candidate table to (table information, related columns).
+            relevant_columns (List[str]): Relevant column names, most relevant first.
+            dimensions (List[str] | None): Extracted dimensions.
+            metrics (List[str] | None): Extracted metrics.
+            similar_examples (Dict[str, List[str]] | None): Similar example questions to their selected tables.
+            start_time (str | None): Extracted start time.
+
+        Returns:
+            Dict[str, Any] | None: The selection in the format of the LLM answer, {"tables": [{"table", "columns"}]},
+                None if the LLM should select.
+        """
+        scores = score_candidate_tables(
+            related_table_column_dict, relevant_columns, dimensions, metrics, similar_examples, start_time
+        )
+        selected = self.decide(scores)
+        with self._lock:
+            self.stats["heuristic" if selected else "llm"] += 1
+            avoided = self.stats["heuristic"]
+            total = avoided + self.stats["llm"]
+        if selected is None:
+            top = ", ".join(f"{s.table}={s.score:.2f}" for s in scores[:3])
+            log(f"Table candidates are ambiguous ({top}), asking the LLM. LLM call avoided {avoided}/{total}")
+            return None
+        log(
+            f"Selected table {selected.table} without the LLM (score {selected.score:.2f}, coverage "
+            f"{selected.coverage:.2f}, {len(scores)} candidates). LLM call avoided {avoided}/{total}"
+        )
+        return {"tables": [{"table": selected.table, "columns": selected.columns}]}
+
+    @property
+    def avoided_rate(self) -> float:
+        """Share of the table selections made without the LLM."""
+        total = self.stats["heuristic"] + self.stats["llm"]
+        return self.stats["heuristic"] / total if total else 0.0
+
+
+def evaluate_table_selector(selector: HeuristicTableSelector, cases: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    """Measure how often the selector avoids the LLM call, and how often it agrees with the labelled tables.
+
+    Args:
+        selector (HeuristicTableSelector): The selector to evaluate.
+        cases (Iterable[Dict[str, Any]]): Labelled questions, the keyword arguments of `score_candidate_tables`
+            and `expected`, the tables to select.
+
+    Returns:
+        Dict[str, Any]: `cases`, `decided` (selections made without the LLM), `avoided_rate`, `agreed`
+            (decided selections among the expected tables) and `agreement` (agreed / decided).
+    """
+    total = decided = agreed = 0
+    for case in cases:
+        case = dict(case)
+        expected = set(case.pop("expected"))
+        selected = selector.decide(score_candidate_tables(**case))
+        total += 1
+        if selected is not None:
+            decided += 1
+            agreed += selected.table in expected
+    return {
+        "cases": total,
+        "decided": decided,
+        "avoided_rate": decided / total if total else 0.0,
+        "agreed": agreed,
+        "agreement": agreed / decided if decided else 0.0,
+    }
+
+
+def create_table_selector(selector_config: dict[str, Any] | None) -> HeuristicTableSelector | None:
+    """Create the heuristic table selector from the `table_selection_heuristic` config.
+
+    Args:
+        selector_config (Dict[str, Any] | None): Overrides of `DEFAULT_TABLE_SELECTION_HEURISTIC_CONFIG`.
+
+    Returns:
+        HeuristicTableSelector | None: The selector, None if it is disabled.
+    """
+    selector_config = {**DEFAULT_TABLE_SELECTION_HEURISTIC_CONFIG, **(selector_config or {})}
+    if not selector_config.pop("enabled"):
+        return None
+    return HeuristicTableSelector(**selector_config)
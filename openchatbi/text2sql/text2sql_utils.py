@@ -22,6 +22,7 @@ def init_sql_example_retriever(catalog):
         get_embedding_model(),
         collection_name="text2sql",
         collection_metadata={"hnsw:space": "cosine"},
+        index_dir=catalog.get_index_directory(),
     )
     retriever = vector_db.as_retriever(
         search_type="mmr", search_kwargs={"distance_metric": "cosine", "fetch_k": 30, "k": 10}
@@ -50,6 +51,7 @@ def init_table_selection_example_dict(catalog):
         get_embedding_model(),
         collection_name="table_selection_example",
         collection_metadata={"hnsw:space": "cosine"},
+        index_dir=catalog.get_index_directory(),
     )
     retriever = vector_db.as_retriever(
         search_type="mmr", search_kwargs={"distance_metric": "cosine", "fetch_k": 30, "k": 10}
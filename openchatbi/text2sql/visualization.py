@@ -243,6 +243,28 @@ class VisualizationService:
                 chart_type="table", data_columns=columns, config={"columns": columns}, layout={"title": "Data Table"}
             )
 
+    def _chart_type_prompt(self, question: str, schema_info: dict[str, Any], data_sample: str) -> str:
+        """Build the prompt asking the LLM to recommend a chart type."""
+        return (
+            get_visualization_prompt_template()
+            .replace("[question]", question)
+            .replace("[columns]", str(schema_info.get("columns", [])))
+            .replace("[numeric_columns]", str(schema_info.get("numeric_columns", [])))
+            .replace("[categorical_columns]", str(schema_info.get("categorical_columns", [])))
+            .replace("[datetime_columns]", str(schema_info.get("datetime_columns", [])))
+            .replace("[row_count]", str(schema_info.get("row_count", 0)))
+            .replace("[data_sample]", data_sample)
+        )
+
+    @staticmethod
+    def _data_sample(csv_data: str | pd.DataFrame) -> str:
+        """Format the first rows of the result for LLM analysis."""
+        try:
+            df = csv_data if isinstance(csv_data, pd.DataFrame) else pd.read_csv(StringIO(csv_data))
+            return df.head(3).to_string() if len(df) > 0 else "No data available"
+        except Exception:
+            return "Unable to parse data"
+
     def _llm_recommend_chart_type(self, question: str, schema_info: dict[str, Any], data_sample: str) -> ChartType:
         """Use LLM to recommend chart type based on question and data analysis.
 
@@ -255,19 +277,25 @@ class VisualizationService:
             ChartType: Recommended chart type
         """
         try:
-            prompt = (
-                get_visualization_prompt_template()
-                .replace("[question]", question)
-                .replace("[columns]", str(schema_info.get("columns", [])))
-                .replace("[numeric_columns]", str(schema_info.get("numeric_columns", [])))
-                .replace("[categorical_columns]", str(schema_info.get("categorical_columns", [])))
-                .replace("[datetime_columns]", str(schema_info.get("datetime_columns", [])))
-                .replace("[row_count]", str(schema_info.get("row_count", 0)))
-                .replace("[data_sample]", data_sample)
+            # Call LLM with the formatted prompt
+            response = self.llm.invoke(
+                [HumanMessage(content=self._chart_type_prompt(question, schema_info, data_sample))]
             )
+            chart_type_str = response.content.strip().lower()
+            return self.CHART_TYPE_MAPPING.get(chart_type_str, ChartType.TABLE)
 
-            # Call LLM with the formatted prompt
-            response = self.llm.invoke([HumanMessage(content=prompt)])
+        except Exception:
+            # Fallback to rule-based recommendation on other LLM errors
+            return self._get_chart_type_by_rule(question, schema_info)
+
+    async def _allm_recommend_chart_type(
+        self, question: str, schema_info: dict[str, Any], data_sample: str
+    ) -> ChartType:
+        """Async version of `_llm_recommend_chart_type`, calling the LLM with `ainvoke`."""
+        try:
+            response = await self.llm.ainvoke(
+                [HumanMessage(content=self._chart_type_prompt(question, schema_info, data_sample))]
+            )
             chart_type_str = response.content.strip().lower()
             return self.CHART_TYPE_MAPPING.get(chart_type_str, ChartType.TABLE)
 
@@ -276,14 +304,18 @@ class VisualizationService:
             return self._get_chart_type_by_rule(question, schema_info)
 
     def generate_visualization(
-        self, question: str, schema_info: dict[str, Any], csv_data: str, chart_type: ChartType | None = None
+        self,
+        question: str,
+        schema_info: dict[str, Any],
+        csv_data: str | pd.DataFrame,
+        chart_type: ChartType | None = None,
     ) -> VisualizationDSL | None:
         """Generate visualization using the configured analysis method.
 
         Args:
             question: User's question or intent
             schema_info: Pre-analyzed schema information
-            csv_data: CSV data string for LLM analysis if needed
+            csv_data: CSV data string, or the result DataFrame, for LLM analysis if needed
             chart_type: Optional specific chart type to use
 
         Returns:
@@ -304,13 +336,29 @@ class VisualizationService:
                 )
 
             # Prepare data sample for LLM analysis
-            try:
-                df = pd.read_csv(StringIO(csv_data))
-                data_sample = df.head(3).to_string() if len(df) > 0 else "No data available"
-            except Exception:
-                data_sample = "Unable to parse data"
-
-            chart_type = self._llm_recommend_chart_type(question, schema_info, data_sample)
+            chart_type = self._llm_recommend_chart_type(question, schema_info, self._data_sample(csv_data))
 
         # Generate DSL using determined or recommended chart type
         return self.generate_visualization_dsl(question, schema_info, chart_type)
+
+    async def agenerate_visualization(
+        self,
+        question: str,
+        schema_info: dict[str, Any],
+        csv_data: str | pd.DataFrame,
+        chart_type: ChartType | None = None,
+    ) -> VisualizationDSL | None:
+        """Async version of `generate_visualization`, calling the LLM with `ainvoke`.
+
+        Args:
+            question: User's question or intent
+            schema_info: Pre-analyzed schema information
+            csv_data: CSV data string, or the result DataFrame, for LLM analysis if needed
+            chart_type: Optional specific chart type to use
+
+        Returns:
+            VisualizationDSL or None: Generated visualization configuration, or None if skipped
+        """
+        if chart_type is None and self.llm and "error" not in schema_info:
+            chart_type = await self._allm_recommend_chart_type(question, schema_info, self._data_sample(csv_data))
+        return self.generate_visualization(question, schema_info, csv_data, chart_type)
@@ -3,27 +3,35 @@
 import datetime
 from pathlib import Path
 
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 from langchain.tools import tool
 from pydantic import BaseModel, Field
 
 from openchatbi import config
+from openchatbi.text2sql.result_store import get_result_store
 from openchatbi.utils import log
 
 
 class SaveReportInput(BaseModel):
-    content: str = Field(description="The content of the report to save")
+    content: str = Field(default="", description="The content of the report to save, not needed with result_handle")
     title: str = Field(description="The title of the report (will be used in filename)")
-    file_format: str = Field(description="The file format/extension (e.g., 'md', 'csv', 'txt', 'json')")
+    file_format: str = Field(description="The file format/extension (e.g., 'md', 'csv', 'txt', 'json', 'parquet')")
+    result_handle: str = Field(
+        default="",
+        description="Handle of a stored SQL query result to save in full as 'csv' or 'parquet', instead of content",
+    )
 
 
 @tool("save_report", args_schema=SaveReportInput, return_direct=False, infer_schema=True)
-def save_report(content: str, title: str, file_format: str = "md") -> str:
+def save_report(content: str = "", title: str = "report", file_format: str = "md", result_handle: str = "") -> str:
     """Save a report to a file with timestamp and title in filename.
 
     Args:
         content: The content of the report to save
         title: The title of the report (will be used in filename)
-        file_format: The file format/extension (e.g., 'md', 'csv', 'txt', 'json')
+        file_format: The file format/extension (e.g., 'md', 'csv', 'txt', 'json', 'parquet')
+        result_handle: Handle of a stored SQL query result, saved in full as csv or parquet instead of content
 
     Returns:
         str: Success message with download link or error message
@@ -49,9 +57,21 @@ def save_report(content: str, title: str, file_format: str = "md") -> str:
         filename = f"{timestamp}_{clean_title}.{file_format}"
         file_path = Path(report_dir) / filename
 
-        # Write content to file
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(content)
+        if result_handle:
+            # Write the stored result directly from its Arrow table
+            table = get_result_store().get_table(result_handle)
+            if table is None:
+                return f"Failed to save report: result {result_handle} is not available anymore"
+            if file_format == "parquet":
+                pq.write_table(table, file_path)
+            elif file_format == "csv":
+                pa_csv.write_csv(table, file_path)
+            else:
+                return "Failed to save report: a stored result can only be saved as 'csv' or 'parquet'"
+        else:
+            # Write content to file
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(content)
 
         log(f"Report saved: {file_path}")
 
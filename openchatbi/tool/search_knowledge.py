@@ -4,7 +4,7 @@ from langchain.tools import tool
 from pydantic import BaseModel, Field
 
 from openchatbi import config
-from openchatbi.catalog.schema_retrival import col_dict, column_tables_mapping, get_relevant_columns
+from openchatbi.catalog.schema_retrival import get_column_retriever, get_relevant_columns
 from openchatbi.utils import log
 
 
@@ -91,6 +91,9 @@ def list_table_from_catalog(tables: list[str]) -> list[str]:
 
 def render_column_result(column_list: list[str], with_table_list: bool = False) -> list[str]:
     """Render column information as formatted strings."""
+    retriever = get_column_retriever()
+    col_dict = retriever.col_dict
+    column_tables_mapping = retriever.column_tables_mapping
     column_results = []
     for column_name in column_list:
         if column_name not in col_dict:
@@ -1,5 +1,6 @@
 """Utility functions for OpenChatBI."""
 
+import hashlib
 import json
 import sys
 import uuid
@@ -12,9 +13,10 @@ from langchain_chroma import Chroma
 from langchain_core.documents import Document
 from langchain_core.messages import AIMessage, AIMessageChunk, RemoveMessage, ToolMessage
 from langchain_core.vectorstores import VectorStore
-from rank_bm25 import BM25Okapi
+import numpy as np
 import regex
 
+from openchatbi.bm25_index import BM25Index, load_or_build_bm25_index
 from openchatbi.graph_state import AgentState
 from openchatbi.text_segmenter import _segmenter
 
@@ -126,23 +128,84 @@ def get_report_download_response(filename: str) -> FileResponse:
         raise HTTPException(status_code=500, detail=f"Failed to download report: {str(e)}") from e
 
 
-def _create_chroma_from_texts(
+def _document_ids_and_hashes(
+    texts: list[str], metadatas: list[dict], embedding_model: str = ""
+) -> tuple[list[str], list[str]]:
+    """Get stable document ids and content hashes for the vector database sync.
+
+    The id is derived from the text, so an edited text becomes a new document and the old one is deleted.
+    The content hash also covers the metadata and the embedding model, so a metadata change or another
+    embedding model re-embeds the document in place.
+    """
+    ids, hashes = [], []
+    occurrences: dict[str, int] = {}
+    for text, metadata in zip(texts, metadatas, strict=True):
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        # disambiguate duplicated texts by their occurrence
+        occurrence = occurrences.get(text_hash, 0)
+        occurrences[text_hash] = occurrence + 1
+        ids.append(text_hash if occurrence == 0 else f"{text_hash}-{occurrence}")
+        content = json.dumps([text, metadata, embedding_model], sort_keys=True, ensure_ascii=False, default=str)
+        hashes.append(hashlib.sha256(content.encode("utf-8")).hexdigest())
+    return ids, hashes
+
+
+def _content_hashes(client: Chroma) -> dict[str, str | None]:
+    """Get the content hash of each document in a Chroma collection."""
+    existing = client.get(include=["metadatas"])
+    return {
+        doc_id: (metadata or {}).get("content_hash")
+        for doc_id, metadata in zip(existing["ids"], existing["metadatas"], strict=True)
+    }
+
+
+def sync_vector_db(
+    client: Chroma,
     texts: list[str],
-    embedding,
-    collection_name: str,
-    metadatas,
-    collection_metadata: dict,
-    chroma_dir: str,
+    metadatas: list[dict] | None = None,
+    batch_size: int = 256,
+    embedding_model: str = "",
+    existing_hashes: dict[str, str | None] | None = None,
 ):
-    """Helper function to create Chroma client from texts."""
-    return Chroma.from_texts(
-        texts,
-        embedding,
-        metadatas=metadatas,
-        collection_name=collection_name,
-        collection_metadata=collection_metadata,
-        persist_directory=chroma_dir,
-    )
+    """Incrementally sync a Chroma collection with the texts.
+
+    Only added or changed documents are embedded and upserted, in batches of `batch_size`; documents
+    no longer in `texts` are deleted. Each document stores its content hash in the `content_hash` metadata.
+
+    Args:
+        client (Chroma): Chroma vector database.
+        texts (List[str]): Text documents the collection should contain.
+        metadatas: Metadata for each document.
+        batch_size (int): Number of documents embedded per request.
+        embedding_model (str): Identity of the embedding model, documents embedded by another model are re-embedded.
+        existing_hashes (dict, optional): Content hash of each document in the collection, read if not given.
+
+    Returns:
+        tuple[int, int]: (number of upserted documents, number of deleted documents)
+    """
+    metadatas = metadatas or [{} for _ in texts]
+    ids, hashes = _document_ids_and_hashes(texts, metadatas, embedding_model)
+
+    if existing_hashes is None:
+        existing_hashes = _content_hashes(client)
+    wanted = set(ids)
+    stale_ids = [doc_id for doc_id in existing_hashes if doc_id not in wanted]
+    changed = [
+        i
+        for i, (doc_id, content_hash) in enumerate(zip(ids, hashes, strict=True))
+        if existing_hashes.get(doc_id) != content_hash
+    ]
+
+    for start in range(0, len(stale_ids), batch_size):
+        client.delete(ids=stale_ids[start : start + batch_size])
+    for start in range(0, len(changed), batch_size):
+        batch = changed[start : start + batch_size]
+        client.add_texts(
+            [texts[i] for i in batch],
+            metadatas=[{**metadatas[i], "content_hash": hashes[i]} for i in batch],
+            ids=[ids[i] for i in batch],
+        )
+    return len(changed), len(stale_ids)
 
 
 def create_vector_db(
@@ -151,8 +214,11 @@ def create_vector_db(
     collection_name: str = "langchain",
     metadatas=None,
     collection_metadata: dict = None,
+    index_dir: str | None = None,
+    batch_size: int = 256,
+    persist_directory: str = "./.chroma_db",
 ) -> VectorStore:
-    """Create or reuse a Chroma vector database.
+    """Create a Chroma vector database, or sync an existing collection with the texts.
 
     Args:
         texts (List[str]): Text documents to index.
@@ -160,37 +226,37 @@ def create_vector_db(
         collection_name (str): Name of the collection.
         metadatas: Metadata for each document.
         collection_metadata (dict): Collection-level metadata.
+        index_dir (str, optional): Directory of BM25 index snapshots for the SimpleStore fallback.
+        batch_size (int): Number of documents embedded per request when syncing.
+        persist_directory (str): Directory of the Chroma database.
 
     Returns:
         Chroma: Vector database instance.
     """
     # fallback to Simple vector store using BM25 if no embedding model configured
     if not embedding:
-        return SimpleStore(texts, metadatas)
+        return SimpleStore(texts, metadatas, index_dir=index_dir, index_name=collection_name)
 
-    chroma_dir = "./.chroma_db"
     client = Chroma(
         collection_name,
-        persist_directory=chroma_dir,
+        persist_directory=persist_directory,
         embedding_function=embedding,
         collection_metadata=collection_metadata,
     )
     try:
-        # Try to get documents to check if collection exists and has content
-        existing_docs = client.get()
-        if not existing_docs["documents"]:
-            print(f"Init new client from text for {collection_name}...")
-            client = _create_chroma_from_texts(
-                texts, embedding, collection_name, metadatas, collection_metadata, chroma_dir
-            )
-        else:
-            print(f"Re-use collection for {collection_name}")
-    except Exception:
-        # If collection doesn't exist or any error, create new one
-        print(f"Init new client from text for {collection_name}...")
-        client = _create_chroma_from_texts(
-            texts, embedding, collection_name, metadatas, collection_metadata, chroma_dir
-        )
+        existing_hashes = _content_hashes(client)
+    except Exception as e:
+        # If the collection is corrupted or incompatible, rebuild it from scratch. Embedding errors during
+        # the sync are raised instead, resetting would only lose the vectors already embedded
+        log(f"Failed to read collection {collection_name}: {e}, rebuilding...")
+        client.reset_collection()
+        existing_hashes = {}
+    from openchatbi.llm.embedding_cache import get_embedding_model_name
+
+    upserted, deleted = sync_vector_db(
+        client, texts, metadatas, batch_size, get_embedding_model_name(embedding), existing_hashes
+    )
+    log(f"Synced collection {collection_name}: {upserted} upserted, {deleted} deleted, {len(texts)} total")
     return client
 
 
@@ -285,13 +351,19 @@ def recover_incomplete_tool_calls(state: AgentState) -> list:
 
 
 class SimpleStore(VectorStore):
-    """Simple vector store using BM25 for text retrieval without embeddings."""
+    """Simple vector store using BM25 for text retrieval without embeddings.
+
+    Documents are kept in slots aligned with the BM25 document ids. Adding and deleting documents
+    updates the index incrementally, deleted slots are tombstoned until the index is compacted.
+    """
 
     def __init__(
         self,
         texts: list[str],
         metadatas: list[dict] | None = None,
         ids: list[str] | None = None,
+        index_dir: str | None = None,
+        index_name: str = "simple_store",
     ):
         """Initialize SimpleStore with texts.
 
@@ -299,21 +371,40 @@ class SimpleStore(VectorStore):
             texts: List of text documents to store.
             metadatas: Optional list of metadata dicts for each document.
             ids: Optional list of IDs for each document.
+            index_dir: Optional directory to load/save the BM25 index snapshot of the initial texts.
+            index_name: Name of the BM25 index snapshot in `index_dir`.
         """
-        self.texts = texts
-        self.metadatas = metadatas or [{} for _ in texts]
-        self.ids = ids or [str(uuid.uuid4()) for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
 
-        # Create Document objects
-        self.documents = [
+        # Document slots indexed by BM25 document id, None for deleted documents
+        self._documents: list[Document | None] = [
             Document(id=doc_id, page_content=text, metadata=meta)
-            for doc_id, text, meta in zip(self.ids, self.texts, self.metadatas)
+            for doc_id, text, meta in zip(ids, texts, metadatas, strict=True)
         ]
+        self._slot_by_id = {doc_id: slot for slot, doc_id in enumerate(ids)}
+        # Token sets of documents for MMR similarity, tokenized on first use
+        self._token_sets: dict[str, frozenset[str]] = {}
+
+        # Load BM25 index snapshot or tokenize texts to build it, None if empty
+        self.bm25 = load_or_build_bm25_index(texts, self._tokenize, index_dir, index_name) if texts else None
+
+    @property
+    def documents(self) -> list[Document]:
+        """Live documents in insertion order."""
+        return [doc for doc in self._documents if doc is not None]
 
-        # Tokenize texts and create BM25 index
-        self.tokenized_corpus = [self._tokenize(text) for text in texts]
-        # BM25Okapi doesn't support empty corpus, so set to None if empty
-        self.bm25 = BM25Okapi(self.tokenized_corpus) if texts else None
+    @property
+    def texts(self) -> list[str]:
+        return [doc.page_content for doc in self.documents]
+
+    @property
+    def metadatas(self) -> list[dict]:
+        return [doc.metadata for doc in self.documents]
+
+    @property
+    def ids(self) -> list[str]:
+        return [doc.id for doc in self.documents]
 
     def _tokenize(self, text: str) -> list[str]:
         """Tokenize text for BM25 indexing using TextSegmenter.
@@ -337,21 +428,7 @@ class SimpleStore(VectorStore):
         Returns:
             List of most similar Document objects.
         """
-        if not self.texts:
-            return []
-
-        # Tokenize query
-        tokenized_query = self._tokenize(query)
-
-        # Get BM25 scores
-        scores = self.bm25.get_scores(tokenized_query)
-
-        # Get top-k indices
-        top_k = min(k, len(scores))
-        top_k_indices = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:top_k]
-
-        # Return corresponding documents
-        return [self.documents[i] for i in top_k_indices]
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
 
     def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> list[tuple[Document, float]]:
         """Search for documents similar to the query with BM25 scores.
@@ -364,21 +441,17 @@ class SimpleStore(VectorStore):
         Returns:
             List of (Document, score) tuples.
         """
-        if not self.texts:
+        if self.bm25 is None:
             return []
 
         # Tokenize query
         tokenized_query = self._tokenize(query)
 
-        # Get BM25 scores
-        scores = self.bm25.get_scores(tokenized_query)
-
-        # Get top-k items
-        top_k = min(k, len(scores))
-        top_k_items = sorted(enumerate(scores), key=lambda x: x[1], reverse=True)[:top_k]
+        # Get top-k items from BM25 index
+        top_k_items = self.bm25.top_k(tokenized_query, k)
 
         # Return (Document, score) tuples
-        return [(self.documents[i], score) for i, score in top_k_items]
+        return [(self._documents[i], score) for i, score in top_k_items]
 
     def _select_relevance_score_fn(self):
         """Return relevance score function for BM25.
@@ -395,7 +468,7 @@ class SimpleStore(VectorStore):
         ids: list[str] | None = None,
         **kwargs: Any,
     ) -> list[str]:
-        """Add texts to the store.
+        """Add texts to the store, replacing documents with the same IDs.
 
         Args:
             texts: Texts to add.
@@ -413,22 +486,21 @@ class SimpleStore(VectorStore):
         if ids is None:
             ids = [str(uuid.uuid4()) for _ in texts]
 
-        # Add to existing data
-        self.texts.extend(texts)
-        self.metadatas.extend(metadatas)
-        self.ids.extend(ids)
+        # Replace existing documents with the same IDs
+        self._remove([doc_id for doc_id in ids if doc_id in self._slot_by_id])
 
-        # Create new Document objects
-        new_documents = [
-            Document(id=doc_id, page_content=text, metadata=meta) for doc_id, text, meta in zip(ids, texts, metadatas)
-        ]
-        self.documents.extend(new_documents)
+        if self.bm25 is None:
+            self.bm25 = BM25Index.from_corpus([])
 
-        # Update BM25 index
-        new_tokenized = [self._tokenize(text) for text in texts]
-        self.tokenized_corpus.extend(new_tokenized)
-        self.bm25 = BM25Okapi(self.tokenized_corpus)
+        # Index only the new documents
+        for doc_id, text, meta in zip(ids, texts, metadatas, strict=True):
+            tokens = self._tokenize(text)
+            slot = self.bm25.add_document(tokens)
+            self._token_sets[doc_id] = frozenset(tokens)
+            self._documents.append(Document(id=doc_id, page_content=text, metadata=meta))
+            self._slot_by_id[doc_id] = slot
 
+        self._compact_if_needed()
         return ids
 
     def delete(self, ids: list[str] | None = None, **kwargs: Any) -> bool | None:
@@ -444,28 +516,43 @@ class SimpleStore(VectorStore):
         if ids is None:
             return False
 
-        # Find indices to delete
-        indices_to_delete = [i for i, doc_id in enumerate(self.ids) if doc_id in ids]
-
-        if not indices_to_delete:
+        if not self._remove(ids):
             return False
 
-        # Remove items in reverse order to maintain indices
-        for idx in sorted(indices_to_delete, reverse=True):
-            del self.texts[idx]
-            del self.metadatas[idx]
-            del self.ids[idx]
-            del self.documents[idx]
-            del self.tokenized_corpus[idx]
-
-        # Rebuild BM25 index
-        if self.tokenized_corpus:
-            self.bm25 = BM25Okapi(self.tokenized_corpus)
-        else:
+        if not self._slot_by_id:
+            # Reset to an empty store
+            self._documents = []
+            self._token_sets = {}
             self.bm25 = None
-
+        else:
+            self._compact_if_needed()
         return True
 
+    def _remove(self, ids: list[str]) -> bool:
+        """Tombstone documents by IDs, re-tokenizing only the removed texts to update the index.
+
+        Returns:
+            True if any document was removed.
+        """
+        removed = False
+        for doc_id in ids:
+            slot = self._slot_by_id.pop(doc_id, None)
+            if slot is None:
+                continue
+            tokens = self._token_sets.pop(doc_id, None) or self._tokenize(self._documents[slot].page_content)
+            self.bm25.remove_document(slot, tokens)
+            self._documents[slot] = None
+            removed = True
+        return removed
+
+    def _compact_if_needed(self) -> None:
+        """Compact the index and document slots once tombstones or appended postings pile up."""
+        if not self.bm25.needs_compaction():
+            return
+        self.bm25.compact()
+        self._documents = self.documents
+        self._slot_by_id = {doc.id: slot for slot, doc in enumerate(self._documents)}
+
     def get_by_ids(self, ids: list[str], /) -> list[Document]:
         """Get documents by their IDs.
 
@@ -475,8 +562,7 @@ class SimpleStore(VectorStore):
         Returns:
             List of Document objects.
         """
-        id_to_doc = {doc.id: doc for doc in self.documents}
-        return [id_to_doc[doc_id] for doc_id in ids if doc_id in id_to_doc]
+        return [self._documents[self._slot_by_id[doc_id]] for doc_id in ids if doc_id in self._slot_by_id]
 
     @classmethod
     def from_texts(
@@ -527,7 +613,7 @@ class SimpleStore(VectorStore):
         Returns:
             List of `Document` objects selected by maximal marginal relevance.
         """
-        if not self.texts:
+        if self.bm25 is None:
             return []
 
         # Get initial candidates using BM25 similarity search
@@ -540,47 +626,64 @@ class SimpleStore(VectorStore):
             return [doc for doc, _ in candidates]
 
         # Normalize BM25 scores to [0, 1] for proper MMR calculation
-        scores = [score for _, score in candidates]
-        min_score = min(scores) if scores else 0
-        max_score = max(scores) if scores else 1
+        docs = [doc for doc, _ in candidates]
+        scores = np.array([score for _, score in candidates])
+        min_score = scores.min()
+        max_score = scores.max()
         score_range = max_score - min_score if max_score > min_score else 1
+        relevance = (scores - min_score) / score_range
 
-        normalized_candidates = [(doc, (score - min_score) / score_range) for doc, score in candidates]
+        similarity = self._similarity_matrix(docs)
 
-        # MMR implementation following standard algorithm
+        # MMR implementation following standard algorithm, tracking each candidate's
+        # maximum similarity to the selected documents
         selected = []
-        remaining = list(range(len(normalized_candidates)))
+        max_similarity = np.zeros(len(docs))
+        available = np.ones(len(docs), dtype=bool)
 
         # Select documents iteratively using MMR formula
-        while len(selected) < k and remaining:
-            best_mmr_score = float("-inf")
-            best_idx = -1
-            best_remaining_idx = -1
-
-            for i, doc_idx in enumerate(remaining):
-                candidate_doc, relevance_score = normalized_candidates[doc_idx]
-
-                # Calculate maximum similarity to already selected documents
-                max_similarity = 0.0
-                if selected:
-                    max_similarity = max(
-                        self._calculate_similarity(candidate_doc, normalized_candidates[sel_idx][0])
-                        for sel_idx in selected
-                    )
+        while len(selected) < k:
+            # Standard MMR formula: λ * Sim(q, d) - (1-λ) * max(Sim(d, s)) for s in selected
+            mmr_scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+            best_idx = int(np.argmax(np.where(available, mmr_scores, -np.inf)))
+            selected.append(best_idx)
+            available[best_idx] = False
+            np.maximum(max_similarity, similarity[best_idx], out=max_similarity)
+
+        return [docs[idx] for idx in selected]
+
+    def _token_set(self, doc: Document) -> frozenset[str]:
+        """Get the token set of a document, cached for documents in the store."""
+        slot = self._slot_by_id.get(doc.id)
+        if slot is None or self._documents[slot] is not doc:
+            return frozenset(self._tokenize(doc.page_content))
+        tokens = self._token_sets.get(doc.id)
+        if tokens is None:
+            tokens = self._token_sets[doc.id] = frozenset(self._tokenize(doc.page_content))
+        return tokens
+
+    def _similarity_matrix(self, docs: list[Document]) -> np.ndarray:
+        """Calculate pairwise Jaccard similarity of documents in one step.
 
-                # Standard MMR formula: λ * Sim(q, d) - (1-λ) * max(Sim(d, s)) for s in selected
-                mmr_score = lambda_mult * relevance_score - (1 - lambda_mult) * max_similarity
-
-                if mmr_score > best_mmr_score:
-                    best_mmr_score = mmr_score
-                    best_idx = doc_idx
-                    best_remaining_idx = i
-
-            if best_idx != -1:
-                selected.append(best_idx)
-                remaining.pop(best_remaining_idx)
+        Args:
+            docs: Documents to compare.
 
-        return [normalized_candidates[idx][0] for idx in selected]
+        Returns:
+            Matrix of similarity scores between 0 and 1, empty documents have similarity 0.
+        """
+        vocabulary: dict[str, int] = {}
+        rows, cols = [], []
+        for row, doc in enumerate(docs):
+            for token in self._token_set(doc):
+                rows.append(row)
+                cols.append(vocabulary.setdefault(token, len(vocabulary)))
+        incidence = np.zeros((len(docs), len(vocabulary)))
+        incidence[rows, cols] = 1
+
+        intersection = incidence @ incidence.T
+        sizes = incidence.sum(axis=1)
+        union = sizes[:, None] + sizes[None, :] - intersection
+        return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
 
     def _calculate_similarity(self, doc1: Document, doc2: Document) -> float:
         """Calculate similarity between two documents using Jaccard similarity.
@@ -592,8 +695,8 @@ class SimpleStore(VectorStore):
         Returns:
             Similarity score between 0 and 1 (higher means more similar).
         """
-        tokens1 = set(self._tokenize(doc1.page_content))
-        tokens2 = set(self._tokenize(doc2.page_content))
+        tokens1 = self._token_set(doc1)
+        tokens2 = self._token_set(doc2)
 
         # Calculate Jaccard similarity
         intersection = len(tokens1 & tokens2)
@@ -10,6 +10,8 @@ from pydantic import BaseModel
 
 from openchatbi import config
 from openchatbi.agent_graph import build_agent_graph_async
+from openchatbi.catalog.catalog_watcher import start_catalog_watcher
+from openchatbi.catalog.schema_retrival import get_column_retriever
 from openchatbi.utils import get_report_download_response
 
 # Session state storage: session_id -> state
@@ -24,6 +26,9 @@ async def lifespan(app: FastAPI):
     """Manage application lifespan events."""
     # Startup: Initialize the async graph
     global graph
+    # Build column indexes in background so the worker starts serving immediately
+    get_column_retriever(config.get().catalog_store).build_in_background()
+    start_catalog_watcher(config.get().catalog_store)
     graph = await build_agent_graph_async(config.get().catalog_store)
     yield
     # Shutdown: cleanup if needed
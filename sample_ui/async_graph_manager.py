@@ -37,6 +37,13 @@ class AsyncGraphManager:
             async_store = await get_async_memory_store()
             async_memory_tools = await get_async_memory_tools(get_default_llm())
 
+            # Build column indexes in background while the graph is being built
+            from openchatbi.catalog.catalog_watcher import start_catalog_watcher
+            from openchatbi.catalog.schema_retrival import get_column_retriever
+
+            get_column_retriever(config.get().catalog_store).build_in_background()
+            start_catalog_watcher(config.get().catalog_store)
+
             # Build the graph
             self.graph = await build_agent_graph_async(
                 config.get().catalog_store,
@@ -8,17 +8,26 @@ import plotly.express as px
 import plotly.graph_objects as go
 
 
-def create_plotly_chart(data_csv: str, visualization_dsl: dict[str, Any]) -> go.Figure:
+def _to_dataframe(data: str | pd.DataFrame | None) -> pd.DataFrame | None:
+    """Get the chart data as a DataFrame, parsing it if it is a CSV string, None if there is no data."""
+    if isinstance(data, pd.DataFrame):
+        return data
+    if not data:
+        return None
+    return pd.read_csv(StringIO(data))
+
+
+def create_plotly_chart(data_csv: str | pd.DataFrame, visualization_dsl: dict[str, Any]) -> go.Figure:
     """Create a plotly chart from CSV data and visualization DSL.
 
     Args:
-        data_csv: CSV string containing the data
+        data_csv: CSV string containing the data, or the result DataFrame read from the result store
         visualization_dsl: Dictionary containing chart configuration
 
     Returns:
         Plotly Figure object
     """
-    if not data_csv or not visualization_dsl:
+    if (not isinstance(data_csv, pd.DataFrame) and not data_csv) or not visualization_dsl:
         return create_empty_chart("No data available")
 
     if "error" in visualization_dsl:
@@ -26,7 +35,7 @@ def create_plotly_chart(data_csv: str, visualization_dsl: dict[str, Any]) -> go.
 
     try:
         # Parse CSV data
-        df = pd.read_csv(StringIO(data_csv))
+        df = _to_dataframe(data_csv)
 
         if df.empty:
             return create_empty_chart("No data to visualize")
@@ -222,11 +231,13 @@ def create_empty_chart(message: str) -> go.Figure:
     return fig
 
 
-def visualization_dsl_to_gradio_plot(data_csv: str, visualization_dsl: dict[str, Any]) -> tuple[go.Figure, str]:
+def visualization_dsl_to_gradio_plot(
+    data_csv: str | pd.DataFrame, visualization_dsl: dict[str, Any]
+) -> tuple[go.Figure, str]:
     """Convert visualization DSL to Gradio-compatible plotly figure.
 
     Args:
-        data_csv: CSV string containing the data
+        data_csv: CSV string containing the data, or the result DataFrame
         visualization_dsl: Dictionary containing chart configuration
 
     Returns:
@@ -244,23 +255,19 @@ def visualization_dsl_to_gradio_plot(data_csv: str, visualization_dsl: dict[str,
     return fig, description
 
 
-def create_inline_chart_markdown(data_csv: str, visualization_dsl: dict[str, Any]) -> str:
+def create_inline_chart_markdown(data_csv: str | pd.DataFrame, visualization_dsl: dict[str, Any]) -> str:
     """Create a simplified markdown representation of the chart for inline display.
 
     This creates a text-based summary with a clickable link to show the interactive chart.
     """
-    if not data_csv or not visualization_dsl:
+    if (not isinstance(data_csv, pd.DataFrame) and not data_csv) or not visualization_dsl:
         return "📊 *No visualization data available*"
 
     if "error" in visualization_dsl:
         return f"⚠️ *Visualization error: {visualization_dsl['error']}*"
 
     try:
-        from io import StringIO
-
-        import pandas as pd
-
-        df = pd.read_csv(StringIO(data_csv))
+        df = _to_dataframe(data_csv)
         chart_type = visualization_dsl.get("chart_type", "table")
         layout = visualization_dsl.get("layout", {})
         title = layout.get("title", f"{chart_type.title()} Chart")
@@ -289,4 +296,4 @@ def create_inline_chart_markdown(data_csv: str, visualization_dsl: dict[str, Any
         return "\n".join(summary_lines)
 
     except Exception as e:
-        return f"⚠️ *Chart generation error: {str(e)}*"
\ No newline at end of file
+        return f"⚠️ *Chart generation error: {str(e)}*"
@@ -18,6 +18,7 @@ sys.modules["sqlite3"] = sqlite3
 
 from langgraph.types import Command
 
+from openchatbi.text2sql.result_store import get_result_store
 from openchatbi.utils import get_text_from_message_chunk, log
 from sample_ui.plotly_utils import visualization_dsl_to_gradio_plot
 from sample_ui.async_graph_manager import AsyncGraphManager
@@ -129,6 +130,12 @@ async def process_user_message_stream(
                 # Capture data from execute_sql event
                 if event_value["execute_sql"].get("data"):
                     data_csv = event_value["execute_sql"].get("data")
+                # Chart the full result from the result store, the CSV preview if it is not stored
+                result_handle = event_value["execute_sql"].get("result_handle")
+                if result_handle:
+                    result_df = get_result_store().get_dataframe(result_handle)
+                    if result_df is not None:
+                        data_csv = result_df
 
             elif event_value.get("regenerate_sql"):
                 sql = event_value["regenerate_sql"].get("sql")
@@ -137,7 +144,7 @@ async def process_user_message_stream(
 
             elif event_value.get("generate_visualization"):
                 visualization_dsl = event_value["generate_visualization"].get("visualization_dsl")
-                if visualization_dsl and "error" not in visualization_dsl and data_csv:
+                if visualization_dsl and "error" not in visualization_dsl and data_csv is not None:
                     try:
                         plot_figure, plot_description = visualization_dsl_to_gradio_plot(data_csv, visualization_dsl)
                         step_description = f"📊 Generated visualization: {plot_description}"
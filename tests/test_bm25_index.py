@@ -0,0 +1,169 @@
+"""Tests for BM25 index and its on-disk snapshot."""
+
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+from rank_bm25 import BM25Okapi
+
+from openchatbi.bm25_index import BM25Index, compute_content_hash, load_or_build_bm25_index
+from openchatbi.text_segmenter import _segmenter
+
+TEXTS = [
+    "user id of the account",
+    "total revenue amount in usd",
+    "revenue per user",
+    "ad impressions count",
+    "click count of ads",
+    "user country name",
+]
+
+
+class TestBM25Index:
+    """Test BM25Index scoring and persistence."""
+
+    def test_scores_match_bm25okapi(self):
+        """Test scores are the same as rank_bm25.BM25Okapi."""
+        corpus = [_segmenter.cut(text) for text in TEXTS]
+        index = BM25Index.from_corpus(corpus)
+        okapi = BM25Okapi(corpus)
+
+        for query in (["revenue"], ["user", "revenue"], ["count", "count"], ["unknown"], []):
+            np.testing.assert_allclose(index.get_scores(query), okapi.get_scores(query))
+
+    def test_empty_corpus(self):
+        """Test empty corpus returns empty scores."""
+        index = BM25Index.from_corpus([])
+
+        assert index.corpus_size == 0
+        assert len(index.get_scores(["revenue"])) == 0
+
+    def test_save_and_load_snapshot(self, temp_dir):
+        """Test snapshot round trip with memory-mapped arrays."""
+        corpus = [_segmenter.cut(text) for text in TEXTS]
+        index = BM25Index.from_corpus(corpus)
+        path = str(temp_dir / "columns")
+        index.save(path, "hash1")
+
+        loaded = BM25Index.load(path, "hash1")
+
+        assert loaded is not None
+        assert isinstance(loaded.doc_ids, np.memmap)
+        np.testing.assert_allclose(loaded.get_scores(["user", "revenue"]), index.get_scores(["user", "revenue"]))
+        assert BM25Index.load(path, "other_hash") is None
+        assert BM25Index.load(str(temp_dir / "missing")) is None
+
+    def test_save_replaces_snapshot(self, temp_dir):
+        """Test saving over a snapshot swaps in the new one and leaves no temporary directories."""
+        corpus = [_segmenter.cut(text) for text in TEXTS]
+        path = str(temp_dir / "columns")
+        BM25Index.from_corpus(corpus).save(path, "hash1")
+        BM25Index.from_corpus(corpus[:2]).save(path, "hash2")
+
+        assert BM25Index.load(path, "hash1") is None
+        assert BM25Index.load(path, "hash2").corpus_size == 2
+        assert [p.name for p in temp_dir.iterdir()] == ["columns"]
+
+    def test_load_or_build_without_writable_directory(self, temp_dir):
+        """Test the index is still built when its snapshot cannot be saved."""
+        blocked = temp_dir / "file"
+        blocked.write_text("")
+
+        index = load_or_build_bm25_index(TEXTS, _segmenter.cut, str(blocked / "index"), "columns")
+
+        assert index.corpus_size == len(TEXTS)
+
+    def test_load_or_build_reuses_snapshot(self, temp_dir):
+        """Test a matching snapshot is loaded without tokenizing the texts again."""
+        tokenize = Mock(side_effect=_segmenter.cut)
+        first = load_or_build_bm25_index(TEXTS, tokenize, str(temp_dir), "columns")
+        assert tokenize.call_count == len(TEXTS)
+
+        tokenize.reset_mock()
+        second = load_or_build_bm25_index(TEXTS, tokenize, str(temp_dir), "columns")
+        tokenize.assert_not_called()
+        np.testing.assert_allclose(first.get_scores(["revenue"]), second.get_scores(["revenue"]))
+
+        # Changed content rebuilds the snapshot
+        changed = load_or_build_bm25_index(TEXTS + ["new column"], tokenize, str(temp_dir), "columns")
+        assert tokenize.call_count == len(TEXTS) + 1
+        assert changed.corpus_size == len(TEXTS) + 1
+
+    def test_content_hash_depends_on_text_boundaries(self):
+        """Test hash distinguishes different splits of the same characters."""
+        assert compute_content_hash(["ab", "c"]) != compute_content_hash(["a", "bc"])
+        assert compute_content_hash(["ab", "c"]) == compute_content_hash(["ab", "c"])
+
+
+class TestBM25IncrementalUpdates:
+    """Test adding and removing documents without rebuilding the index."""
+
+    def test_updates_match_rebuild(self):
+        """Test scores after adds and removes equal BM25Okapi over the live documents."""
+        corpus = [_segmenter.cut(text) for text in TEXTS]
+        index = BM25Index.from_corpus(corpus[:3])
+        for tokens in corpus[3:]:
+            index.add_document(tokens)
+        index.remove_document(1, corpus[1])
+        index.remove_document(4, corpus[4])
+        live = [0, 2, 3, 5]
+        okapi = BM25Okapi([corpus[i] for i in live])
+
+        for query in (["revenue"], ["user", "revenue"], ["count"], ["country", "user"]):
+            np.testing.assert_allclose(index.get_scores(query)[live], okapi.get_scores(query))
+            assert index.get_scores(query)[[1, 4]].tolist() == [0, 0]
+            assert {doc_id for doc_id, _ in index.top_k(query, 10)} == set(live)
+
+        index.compact()
+        assert index.corpus_size == len(live)
+        assert "click" not in index.term_ids
+        np.testing.assert_allclose(index.get_scores(["user", "revenue"]), okapi.get_scores(["user", "revenue"]))
+
+    def test_update_loaded_snapshot(self, temp_dir):
+        """Test a memory-mapped index can be updated, and must be compacted before saving."""
+        corpus = [_segmenter.cut(text) for text in TEXTS]
+        BM25Index.from_corpus(corpus).save(str(temp_dir / "columns"), "hash1")
+        index = BM25Index.load(str(temp_dir / "columns"), "hash1")
+
+        index.remove_document(0, corpus[0])
+        index.add_document(["user", "email"])
+        okapi = BM25Okapi(corpus[1:] + [["user", "email"]])
+        np.testing.assert_allclose(index.get_scores(["user", "email"])[1:], okapi.get_scores(["user", "email"]))
+
+        with pytest.raises(ValueError):
+            index.save(str(temp_dir / "columns"), "hash2")
+        assert index.needs_compaction(ratio=0.1)
+        index.compact()
+        index.save(str(temp_dir / "columns"), "hash2")
+        assert BM25Index.load(str(temp_dir / "columns"), "hash2").corpus_size == len(TEXTS)
+
+
+class TestBM25TopK:
+    """Test top-k selection against a full sort of BM25Okapi scores."""
+
+    @staticmethod
+    def _expected(scores, k):
+        return sorted(enumerate(scores), key=lambda x: x[1], reverse=True)[:k]
+
+    def test_top_k_matches_full_sort(self):
+        """Test ranking and padding with non-matching documents match the full sort."""
+        rng = np.random.default_rng(0)
+        vocab = [f"term{i}" for i in range(30)]
+        corpus = [list(rng.choice(vocab, size=rng.integers(1, 8))) for _ in range(200)]
+        index = BM25Index.from_corpus(corpus)
+        okapi = BM25Okapi(corpus)
+
+        for query in (["term1"], ["term2", "term3", "term2"], ["missing"], vocab[:10]):
+            scores = okapi.get_scores(query)
+            for k in (1, 5, 50, 300):
+                actual = index.top_k(query, k)
+                expected = self._expected(scores, k)
+                assert [doc_id for doc_id, _ in actual] == [doc_id for doc_id, _ in expected]
+                np.testing.assert_allclose([s for _, s in actual], [s for _, s in expected])
+
+    def test_top_k_ties_ordered_by_doc_id(self):
+        """Test documents with equal scores keep document order."""
+        index = BM25Index.from_corpus([["a"], ["b"], ["a"], ["c"], ["a"]])
+
+        assert [doc_id for doc_id, _ in index.top_k(["a"], 2)] == [0, 2]
+        assert [doc_id for doc_id, _ in index.top_k(["a"], 4)] == [0, 2, 4, 1]
@@ -99,6 +99,25 @@ class TestDataCatalogLoader:
             mock_catalog_store.save_table_information.assert_called()
             mock_catalog_store.save_table_sql_examples.assert_called()
             mock_catalog_store.save_table_selection_examples.assert_called()
+            mock_catalog_store.begin_batch.assert_called_once()
+            mock_catalog_store.commit.assert_called_once()
+
+    def test_save_to_catalog_store_commit_failure(self, mock_engine):
+        """Test loading fails when the catalog batch cannot be written."""
+        mock_catalog_store = Mock()
+        mock_catalog_store.save_table_information.return_value = True
+        mock_catalog_store.commit.return_value = False
+
+        mock_inspector = Mock()
+        mock_inspector.get_table_names.return_value = ["table1"]
+        mock_inspector.get_columns.return_value = []
+
+        with patch("openchatbi.catalog.catalog_loader.inspect", return_value=mock_inspector):
+            loader = DataCatalogLoader(engine=mock_engine)
+            result = loader.save_to_catalog_store(mock_catalog_store)
+
+            assert result == False
+            mock_catalog_store.save_table_information.assert_called_once()
 
     def test_save_to_catalog_store_failure(self, mock_engine):
         """Test handling catalog store save failures."""
@@ -145,3 +164,53 @@ class TestDataCatalogLoader:
             result = loader.get_tables_and_columns()
 
             assert result == {}
+
+    def test_concurrent_introspection_matches_sequential(self, mock_engine):
+        """Test introspecting tables concurrently gives the same result as one by one, in table order."""
+        table_names = [f"table{i}" for i in range(20)]
+
+        def get_columns(table_name):
+            return [{"name": f"{table_name}_col", "type": "BIGINT", "comment": None, "default": None}]
+
+        mock_inspector = Mock()
+        mock_inspector.get_table_names.return_value = table_names
+        mock_inspector.get_columns.side_effect = get_columns
+        mock_inspector.get_table_comment.side_effect = lambda table_name: {"text": f"{table_name} comment"}
+
+        progress = []
+        with patch("openchatbi.catalog.catalog_loader.inspect", return_value=mock_inspector) as mock_inspect:
+            sequential = DataCatalogLoader(engine=mock_engine).get_tables_and_columns()
+            loader = DataCatalogLoader(
+                engine=mock_engine,
+                max_workers=4,
+                progress_callback=lambda stage, done, total: progress.append((stage, done, total)),
+            )
+            concurrent = loader.get_tables_and_columns()
+            comments = loader.get_table_comments(table_names)
+
+            # each worker thread creates its own inspector
+            assert 2 < mock_inspect.call_count <= 2 + 2 * 4
+
+        assert concurrent == sequential
+        assert list(concurrent) == table_names
+        assert comments["table3"] == "table3 comment"
+        assert [done for stage, done, _ in progress if stage == "Loading table columns"] == list(range(1, 21))
+        assert all(total == 20 for _, _, total in progress)
+
+    def test_concurrent_introspection_skips_failed_tables(self, mock_engine):
+        """Test a table failing introspection does not stop the other tables."""
+
+        def get_columns(table_name):
+            if table_name == "broken":
+                raise Exception("Timeout")
+            return [{"name": "col1", "type": "BIGINT"}]
+
+        mock_inspector = Mock()
+        mock_inspector.get_table_names.return_value = ["table1", "broken", "table2"]
+        mock_inspector.get_columns.side_effect = get_columns
+
+        with patch("openchatbi.catalog.catalog_loader.inspect", return_value=mock_inspector):
+            loader = DataCatalogLoader(engine=mock_engine, max_workers=3)
+            result = loader.get_tables_and_columns()
+
+        assert list(result) == ["table1", "table2"]
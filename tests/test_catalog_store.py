@@ -185,3 +185,103 @@ class TestFileSystemCatalogStore:
         # Should not have errors from concurrent access
         assert len(errors) == 0
         assert len(results) > 0
+
+    def test_catalog_version_changes_on_save(self, mock_catalog_store):
+        """Test saving to the catalog changes its version."""
+        version = mock_catalog_store.get_catalog_version()
+
+        mock_catalog_store.save_table_information(
+            "test.new_table",
+            {"description": "New table"},
+            [{"column_name": "id", "type": "bigint", "category": "dimension", "description": "ID"}],
+        )
+        after_table = mock_catalog_store.get_catalog_version()
+        mock_catalog_store.save_table_selection_examples([("How many users?", ["test.user_data"])])
+
+        assert version < after_table < mock_catalog_store.get_catalog_version()
+
+    def test_column_views_are_read_only_and_shared(self, mock_catalog_store):
+        """Test column views are served from the per-table index without copying."""
+        views = mock_catalog_store.get_column_views("test_table", "test")
+
+        assert views is mock_catalog_store.get_column_views("test.test_table")
+        assert [dict(view) for view in views] == mock_catalog_store.get_column_list("test_table", "test")
+        with pytest.raises(TypeError):
+            views[0]["description"] = "changed"
+
+        # get_column_list returns copies that do not affect the catalog
+        columns = mock_catalog_store.get_column_list("test_table", "test")
+        columns[0]["description"] = "changed"
+        assert mock_catalog_store.get_column_list("test_table", "test")[0]["description"] != "changed"
+        assert mock_catalog_store.get_column_views("missing_table", "test") == ()
+
+    def test_column_views_refreshed_after_save(self, mock_catalog_store):
+        """Test the column index is rebuilt after saving a table."""
+        mock_catalog_store.get_column_views("test.new_table")
+        mock_catalog_store.save_table_information(
+            "test.new_table",
+            {"description": "New table"},
+            [{"column_name": "clicks", "type": "bigint", "category": "metric", "description": "Clicks"}],
+        )
+
+        views = mock_catalog_store.get_column_views("test.new_table")
+        assert [view["column_name"] for view in views] == ["clicks"]
+        assert views[0]["is_common"] is False
+
+    def _save_tables(self, store, count):
+        for i in range(count):
+            store.save_table_information(
+                f"test.table_{i}",
+                {"description": f"Table {i}"},
+                [
+                    {"column_name": "id", "type": "bigint", "category": "dimension", "description": "ID"},
+                    {"column_name": "status", "type": "varchar", "description": "Status", "is_common": True},
+                ],
+            )
+            store.save_table_sql_examples(f"test.table_{i}", [{"question": "null", "answer": "null"}])
+
+    def test_batch_writes_same_files_as_single_saves(self, temp_dir):
+        """Test a batch of saves produces the same catalog files as saving one by one."""
+        single = FileSystemCatalogStore(str(temp_dir / "single"), {})
+        self._save_tables(single, 3)
+
+        batched = FileSystemCatalogStore(str(temp_dir / "batched"), {})
+        batched.begin_batch()
+        self._save_tables(batched, 3)
+        assert batched.get_table_list() == []
+        assert batched.commit() is True
+
+        for name in ("table_info.yaml", "sql_example.yaml", "table_columns.csv", "common_columns.csv"):
+            assert (temp_dir / "batched" / name).read_text() == (temp_dir / "single" / name).read_text()
+        assert batched.get_table_list() == ["test.table_0", "test.table_1", "test.table_2"]
+        assert not [path for path in (temp_dir / "batched").iterdir() if path.suffix == ".tmp"]
+
+    def test_batch_writes_each_file_once(self, mock_catalog_store):
+        """Test committing a batch writes each catalog file once."""
+        written = []
+        save_yaml, save_csv = mock_catalog_store._save_yaml_file, mock_catalog_store._save_csv_file
+        mock_catalog_store._save_yaml_file = lambda path, *args: written.append(path) or save_yaml(path, *args)
+        mock_catalog_store._save_csv_file = lambda path, *args: written.append(path) or save_csv(path, *args)
+        version = mock_catalog_store.get_catalog_version()
+
+        mock_catalog_store.begin_batch()
+        self._save_tables(mock_catalog_store, 5)
+        mock_catalog_store.save_table_selection_examples([("", [])])
+        assert written == []
+        assert mock_catalog_store.commit() is True
+
+        assert sorted(written) == sorted(set(written))
+        assert len(written) == 6
+        assert mock_catalog_store.get_catalog_version() == version + 1
+        assert "test.table_4" in mock_catalog_store.get_table_list()
+
+    def test_batch_rollback_discards_changes(self, mock_catalog_store):
+        """Test rolling back a batch leaves the catalog files unchanged."""
+        mock_catalog_store.begin_batch()
+        with pytest.raises(RuntimeError):
+            mock_catalog_store.begin_batch()
+        self._save_tables(mock_catalog_store, 2)
+        mock_catalog_store.rollback()
+
+        assert "test.table_0" not in mock_catalog_store.get_table_list()
+        assert mock_catalog_store.commit() is True
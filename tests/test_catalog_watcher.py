@@ -0,0 +1,110 @@
+"""Tests for catalog hot reload."""
+
+import time
+from unittest.mock import Mock, patch
+
+from openchatbi.catalog.catalog_watcher import CatalogWatcher, start_catalog_watcher, watch_catalog
+from openchatbi.text2sql.data import ExampleIndex
+
+
+def _table_columns(name):
+    return [{"column_name": name, "type": "bigint", "category": "dimension", "description": name}]
+
+
+class TestCatalogWatcher:
+    """Test rebuilding indexes when the catalog changes."""
+
+    def test_check_rebuilds_on_version_change(self, mock_catalog_store):
+        """Test the registered indexes are rebuilt once per catalog change."""
+        watcher = CatalogWatcher(mock_catalog_store, interval=3600)
+        rebuild = Mock()
+        watcher._rebuilds["index"] = rebuild
+
+        assert watcher.check() is False
+        mock_catalog_store.save_table_information("test.new_table", {}, _table_columns("clicks"))
+        assert watcher.check() is True
+        rebuild.assert_called_once_with(mock_catalog_store)
+        assert watcher.check() is False
+
+    def test_failed_rebuild_keeps_other_indexes(self, mock_catalog_store):
+        """Test a failing rebuild does not stop the other rebuilds."""
+        watcher = CatalogWatcher(mock_catalog_store, interval=3600)
+        rebuild = Mock()
+        watcher._rebuilds["broken"] = Mock(side_effect=RuntimeError("boom"))
+        watcher._rebuilds["index"] = rebuild
+
+        mock_catalog_store.save_table_selection_examples([("How many users?", ["test.user_data"])])
+        assert watcher.check() is True
+        rebuild.assert_called_once()
+
+    def test_background_rebuild_on_change_notification(self, mock_catalog_store):
+        """Test saving to the catalog wakes the watcher thread to rebuild."""
+        rebuilt = []
+        watcher = CatalogWatcher(mock_catalog_store, interval=3600, settle=0)
+        watcher.register("index", lambda catalog: rebuilt.append(catalog.get_table_list()))
+        watcher.start()
+
+        mock_catalog_store.save_table_information("test.new_table", {}, _table_columns("clicks"))
+        deadline = time.time() + 5
+        while not rebuilt and time.time() < deadline:
+            time.sleep(0.01)
+        watcher.stop()
+
+        assert rebuilt and "test.new_table" in rebuilt[-1]
+
+    def test_file_edits_change_version(self, mock_catalog_store):
+        """Test editing the catalog files outside the store is picked up."""
+        mock_catalog_store.get_column_list("test_table", "test")
+        version = mock_catalog_store.get_catalog_version()
+
+        with open(mock_catalog_store.table_spec_columns_file, "a", encoding="utf-8") as f:
+            f.write("\ntest,test_table,email,varchar,Email,User email")
+        with open(mock_catalog_store.table_columns_file, "a", encoding="utf-8") as f:
+            f.write("\ntest,test_table,email")
+
+        assert mock_catalog_store.get_catalog_version() > version
+        columns = mock_catalog_store.get_column_list("test_table", "test")
+        assert columns[-1]["column_name"] == "email"
+
+    def test_disabled_by_config(self, mock_catalog_store):
+        """Test hot reload is disabled with a reload interval of 0."""
+        with patch("openchatbi.catalog.catalog_watcher._reload_interval", return_value=0):
+            assert watch_catalog(mock_catalog_store, "index", Mock()) is None
+            assert start_catalog_watcher(mock_catalog_store) is None
+
+    def test_thread_started_by_entry_point(self, mock_catalog_store):
+        """Test registering an index does not start the thread, starting the watcher does."""
+        with patch("openchatbi.catalog.catalog_watcher._reload_interval", return_value=3600):
+            watcher = watch_catalog(mock_catalog_store, "index", Mock())
+            assert watcher._thread is None
+
+            assert start_catalog_watcher(mock_catalog_store) is watcher
+            assert watcher._thread.is_alive()
+        watcher.stop()
+
+
+class TestExampleIndex:
+    """Test swapping example indexes."""
+
+    def test_views_follow_rebuild(self):
+        """Test the retriever and example dict views delegate to the latest index."""
+        retriever_v1, retriever_v2 = Mock(), Mock()
+        builds = iter([(retriever_v1, {"q1": "a1"}), (retriever_v2, {"q2": "a2"})])
+        index = ExampleIndex(lambda catalog: next(builds), Mock())
+
+        index.retriever.invoke("question")
+        retriever_v1.invoke.assert_called_once_with("question")
+        assert dict(index.examples) == {"q1": "a1"}
+
+        index.rebuild(Mock())
+        index.retriever.invoke("question")
+        retriever_v2.invoke.assert_called_once_with("question")
+        assert "q1" not in index.examples
+        assert index.examples.get("q2") == "a2"
+
+    def test_empty_without_catalog(self):
+        """Test an index without catalog store is empty."""
+        index = ExampleIndex(Mock(), None)
+
+        assert not index.retriever
+        assert len(index.examples) == 0
@@ -0,0 +1,98 @@
+"""Tests for the embedding cache."""
+
+import asyncio
+from unittest.mock import MagicMock
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from openchatbi.llm.embedding_cache import CachedEmbeddings, wrap_embedding_model
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """Fake embedding model recording the texts it embeds."""
+
+    calls: list = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.calls.append([text])
+        return super().embed_query(text)
+
+
+class TestCachedEmbeddings:
+    """Test CachedEmbeddings tiers and metrics."""
+
+    def test_repeated_texts_are_served_from_cache(self):
+        """Test only texts missing from the cache are embedded, in one batch."""
+        model = CountingEmbeddings(size=8, calls=[])
+        cached = CachedEmbeddings(model)
+
+        first = cached.embed_documents(["revenue", "country"])
+        second = cached.embed_documents(["  revenue ", "user id", "country", "Revenue"])
+
+        assert model.calls == [["revenue", "country"], ["user id", "Revenue"]]
+        assert second[0] == first[0]
+        assert second[2] == first[1]
+        assert cached.stats() == {"hits": 2, "misses": 4, "hit_rate": 2 / 6, "size": 4}
+
+    def test_query_and_document_embeddings_cached_separately(self):
+        """Test embed_query does not reuse a document embedding of the same text."""
+        model = CountingEmbeddings(size=8, calls=[])
+        cached = CachedEmbeddings(model)
+
+        cached.embed_documents(["revenue"])
+        cached.embed_query("revenue")
+        cached.embed_query("revenue")
+
+        assert model.calls == [["revenue"], ["revenue"]]
+
+    def test_lru_eviction(self):
+        """Test the least recently used vector is evicted from memory."""
+        model = CountingEmbeddings(size=8, calls=[])
+        cached = CachedEmbeddings(model, max_entries=2)
+
+        cached.embed_documents(["a", "b"])
+        cached.embed_documents(["a"])
+        cached.embed_documents(["c"])
+        cached.embed_documents(["a", "b"])
+
+        assert model.calls == [["a", "b"], ["c"], ["b"]]
+
+    def test_sqlite_store_shared_across_instances(self, temp_dir):
+        """Test vectors persisted in SQLite are reused by a new cache."""
+        path = str(temp_dir / "embeddings.db")
+        first_model = CountingEmbeddings(size=8, calls=[])
+        expected = CachedEmbeddings(first_model, sqlite_path=path).embed_documents(["revenue", "country"])
+
+        second_model = CountingEmbeddings(size=8, calls=[])
+        cached = CachedEmbeddings(second_model, sqlite_path=path)
+
+        assert cached.embed_documents(["revenue", "country"]) == expected
+        assert second_model.calls == []
+        assert cached.stats()["hit_rate"] == 1.0
+
+    def test_async_embeddings(self):
+        """Test async variants use the same cache."""
+        model = CountingEmbeddings(size=8, calls=[])
+        cached = CachedEmbeddings(model)
+
+        vector = asyncio.run(cached.aembed_query("revenue"))
+
+        assert cached.embed_query("revenue") == vector
+        assert len(model.calls) == 1
+
+    def test_wrap_embedding_model(self):
+        """Test only real embedding models are wrapped, unless disabled."""
+        model = CountingEmbeddings(size=8, calls=[])
+        mock_model = MagicMock()
+
+        wrapped = wrap_embedding_model(model, {"max_entries": 5})
+        assert isinstance(wrapped, CachedEmbeddings)
+        assert wrapped.max_entries == 5
+        assert wrapped.size == 8
+        assert wrap_embedding_model(wrapped) is wrapped
+        assert wrap_embedding_model(model, {"enabled": False}) is model
+        assert wrap_embedding_model(mock_model) is mock_model
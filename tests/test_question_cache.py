@@ -0,0 +1,164 @@
+"""Tests for the question SQL cache."""
+
+from unittest.mock import Mock, patch
+
+from openchatbi.constants import SQL_SUCCESS
+from openchatbi.graph_state import SQLGraphState
+from openchatbi.text2sql import question_cache, sql_graph
+from openchatbi.text2sql.question_cache import (
+    SQLQuestionCache,
+    create_sql_cache_nodes,
+    create_sql_question_cache,
+    sql_cache_route,
+)
+
+TABLES = [{"table": "db.orders", "columns": []}]
+
+
+class FakeEmbeddings:
+    """Embeddings of known questions."""
+
+    vectors = {
+        "How many orders in 2024?": [1.0, 0.0, 0.0],
+        "Number of orders in 2024": [0.99, 0.1, 0.0],
+        "Revenue by country": [0.0, 1.0, 0.0],
+    }
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return self.vectors[text]
+
+
+class TestSQLQuestionCache:
+    """Test SQLQuestionCache lookups."""
+
+    def test_exact_and_semantic_hits(self):
+        """Test exact matches skip embedding, similar questions hit above the threshold only."""
+        embeddings = FakeEmbeddings()
+        cache = SQLQuestionCache(embeddings, similarity_threshold=0.95)
+        cache.add("How many orders in 2024?", "u1", 1, "SELECT 1", TABLES, 2.5)
+        calls = embeddings.calls
+
+        entry, match, _ = cache.lookup("how many   orders in 2024", "u1", 1)
+        assert (entry.sql, match) == ("SELECT 1", "exact")
+        assert embeddings.calls == calls
+
+        entry, match, similarity = cache.lookup("Number of orders in 2024", "u1", 1)
+        assert match == "semantic" and similarity > 0.95
+        assert cache.lookup("Revenue by country", "u1", 1)[1] == "miss"
+        assert cache.stats == {"exact_hits": 1, "semantic_hits": 1, "misses": 1, "saved_seconds": 5.0}
+
+    def test_scope_version_and_ttl(self, monkeypatch):
+        """Test cached SQL is only reused for the same user, catalog version and within the TTL."""
+        now = [1000.0]
+        monkeypatch.setattr(question_cache.time, "time", lambda: now[0])
+        cache = SQLQuestionCache(ttl_seconds=60)
+        cache.add("How many orders in 2024?", "u1", 1, "SELECT 1", TABLES, 1.0)
+
+        assert cache.lookup("How many orders in 2024?", "u2", 1)[0] is None
+        assert cache.lookup("How many orders in 2024?", "u1", 2)[0] is None
+        assert cache.lookup("How many orders in 2024?", "u1", 1)[0] is not None
+        now[0] += 61
+        assert cache.lookup("How many orders in 2024?", "u1", 1)[0] is None
+
+    def test_relative_time_questions_not_cached(self, monkeypatch):
+        """Test questions relative to the current time are not cached, and cached SQL expires at midnight."""
+        monkeypatch.setattr(question_cache.time, "time", lambda: 1718000000.0)
+        cache = SQLQuestionCache(ttl_seconds=7 * 86400)
+        for question in ("Orders last week", "Top 5 products this month", "Revenue yesterday", "最近7天的订单"):
+            cache.add(question, "", 1, "SELECT 1", TABLES, 1.0)
+            assert cache.lookup(question, "", 1)[0] is None
+        cache.add("Orders in 2024", "", 1, "SELECT 1", TABLES, 1.0)
+
+        assert list(cache._entries.values())[0].expires == question_cache._end_of_day(1718000000.0)
+        assert question_cache._end_of_day(1718000000.0) - 1718000000.0 <= 86400
+
+    def test_create_from_config(self):
+        """Test the cache can be disabled by config, and shares SQL across users if configured."""
+        assert create_sql_question_cache({"enabled": False}, None) is None
+        assert create_sql_question_cache({}, None) is None
+        cache = create_sql_question_cache({"enabled": True, "share_across_users": True}, None)
+        assert cache.scope_of({"configurable": {"user_id": "u1"}}) == ""
+        cache = create_sql_question_cache({"enabled": True}, FakeEmbeddings())
+        assert cache.scope_of({"configurable": {"user_id": "u1"}}) == "u1"
+        assert cache.embeddings is None
+
+
+class TestSQLCacheNodes:
+    """Test the cache lookup and update nodes."""
+
+    def test_miss_then_hit(self):
+        """Test a successful run is cached, and the next run of the question jumps to SQL execution."""
+        catalog = Mock()
+        catalog.get_catalog_version.return_value = 3
+        cache = SQLQuestionCache()
+        lookup_node, update_node = create_sql_cache_nodes(catalog, cache)
+        config = {"configurable": {"user_id": "u1"}}
+        question = "How many orders in 2024?"
+
+        miss = lookup_node(SQLGraphState(messages=[], rewrite_question=question), config)
+        assert sql_cache_route(miss) == "table_selection"
+
+        state = SQLGraphState(
+            messages=[],
+            rewrite_question=question,
+            sql="SELECT count(*) FROM orders",
+            tables=TABLES,
+            sql_execution_result=SQL_SUCCESS,
+            sql_retry_count=0,
+            sql_generated_time=miss["sql_cache"]["lookup_time"] + 2.5,
+            **miss,
+        )
+        assert update_node(state, config) == {}
+        # the saved time ends when the SQL was generated, not when it finished executing
+        assert cache.lookup(question, "u1", 3)[0].generation_seconds == 2.5
+
+        hit = lookup_node(SQLGraphState(messages=[], rewrite_question=question), config)
+        assert sql_cache_route(hit) == "execute_sql"
+        assert hit["sql"] == "SELECT count(*) FROM orders" and hit["tables"] == TABLES
+        assert hit["sql_cache"]["match"] == "exact"
+
+    def test_regenerated_sql_replaces_cached_sql(self):
+        """Test SQL regenerated after the cached SQL failed replaces the cached SQL."""
+        catalog = Mock()
+        catalog.get_catalog_version.return_value = 1
+        cache = SQLQuestionCache()
+        cache.add("q", "", 1, "SELECT broken", TABLES, 1.0)
+        lookup_node, update_node = create_sql_cache_nodes(catalog, cache)
+
+        hit = lookup_node(SQLGraphState(messages=[], rewrite_question="q"), {})
+        state = {**hit, "rewrite_question": "q", "sql": "SELECT fixed", "sql_retry_count": 1}
+        update_node({**state, "sql_execution_result": SQL_SUCCESS}, {})
+
+        assert cache.lookup("q", "", 1)[0].sql == "SELECT fixed"
+
+
+class TestSQLGraphWithCache:
+    """Test the SQL graph is built with the cache nodes."""
+
+    def test_graph_nodes(self):
+        """Test the cache nodes are added when the cache is enabled."""
+        llm = Mock()
+        test_config = Mock(
+            dialect="sqlite",
+            visualization_mode=None,
+            sql_result_limits={},
+            sql_result_cache={"enabled": False},
+            sql_question_cache={"enabled": True},
+            table_selection_heuristic={},
+            schema_prompt_budget={},
+            result_store={},
+        )
+        with (
+            patch.object(sql_graph.config, "get", return_value=test_config),
+            patch.object(sql_graph, "get_default_llm", return_value=llm),
+            patch.object(sql_graph, "get_text2sql_llm", return_value=llm),
+            patch.object(sql_graph, "get_embedding_model", return_value=None),
+            patch.object(sql_graph, "schema_linking", return_value=lambda state: {}),
+        ):
+            graph = sql_graph.build_sql_graph(Mock(), None, None)
+
+        assert {"lookup_sql_cache", "update_sql_cache"} <= set(graph.get_graph().nodes)
@@ -0,0 +1,125 @@
+"""Tests for the SQL result cache."""
+
+from unittest.mock import Mock
+
+from openchatbi.text2sql import result_cache
+from openchatbi.text2sql.result_cache import (
+    SQLResultCache,
+    create_sql_result_cache,
+    invalidate_sql_results,
+    is_deterministic,
+    is_read_query,
+    normalize_sql,
+    referenced_tables,
+)
+
+RESULT = {"schema_info": {"columns": ["n"]}, "data": "n\n1\n", "result_info": {"preview_rows": 1}}
+
+
+class TestNormalizeSQL:
+    """Test SQL normalization."""
+
+    def test_whitespace_case_and_comments(self):
+        """Test queries differing in whitespace, keyword case and comments normalize equally."""
+        sql = "SELECT  Country, COUNT(*)\n-- clicks per country\nFROM db.Clicks /* all */ GROUP BY 1;"
+        assert normalize_sql(sql) == "select country, count(*) from db.clicks group by 1"
+        assert normalize_sql("select 'US' from t") != normalize_sql("select 'us' from t")
+        assert normalize_sql("select 'a  --b' from t") == "select 'a  --b' from t"
+
+    def test_tables_and_determinism(self):
+        """Test referenced tables and non-deterministic function detection."""
+        sql = normalize_sql('SELECT * FROM db.orders o JOIN "Users" u ON o.uid = u.id')
+        assert referenced_tables(sql) == {"orders", "users"}
+        assert referenced_tables(normalize_sql("SELECT * FROM a, db.b AS x, c y WHERE a.id = x.id")) == {"a", "b", "c"}
+        assert is_deterministic(sql)
+        assert not is_deterministic(normalize_sql("SELECT RAND() FROM t"))
+        assert not is_deterministic(normalize_sql("SELECT * FROM t WHERE day = CURRENT_DATE"))
+        assert is_deterministic(normalize_sql("SELECT * FROM t WHERE note = 'now()'"))
+        assert not is_deterministic(normalize_sql("SELECT * FROM t WHERE day = CURDATE()"))
+        assert not is_deterministic(normalize_sql("SELECT * FROM t WHERE day = today() - 1"))
+
+    def test_read_queries(self):
+        """Test only SELECT and WITH queries without data changing statements are read queries."""
+        assert is_read_query(normalize_sql("(SELECT 1) UNION (SELECT 2)"))
+        assert is_read_query(normalize_sql("WITH x AS (SELECT 1) SELECT * FROM x WHERE s = 'delete'"))
+        assert not is_read_query(normalize_sql("INSERT INTO t SELECT * FROM s"))
+        assert not is_read_query(normalize_sql("WITH d AS (DELETE FROM t RETURNING *) SELECT * FROM d"))
+
+
+class TestSQLResultCache:
+    """Test SQLResultCache functionality."""
+
+    def test_hit_miss_and_namespace(self):
+        """Test results are served for equivalent SQL on the same database only."""
+        cache = SQLResultCache()
+        assert cache.put("SELECT n FROM t", RESULT, "sqlite:a")
+
+        assert cache.get("select n\n  from T", "sqlite:a") == RESULT
+        assert cache.get("SELECT n FROM t", "sqlite:b") is None
+        assert not cache.put("SELECT now()", RESULT)
+        assert not cache.put("UPDATE t SET n = 1", RESULT)
+        assert cache.get("SELECT now()") is None
+
+    def test_ttl(self, monkeypatch):
+        """Test results expire after the TTL."""
+        now = [1000.0]
+        monkeypatch.setattr(result_cache.time, "time", lambda: now[0])
+        cache = SQLResultCache(ttl_seconds=10)
+        cache.put("SELECT n FROM t", RESULT)
+
+        now[0] += 9
+        assert cache.get("SELECT n FROM t") == RESULT
+        now[0] += 2
+        assert cache.get("SELECT n FROM t") is None
+
+    def test_lru_eviction_by_bytes(self):
+        """Test the least recently used results are evicted over max_bytes."""
+        cache = SQLResultCache(max_bytes=250)
+        cache.put("SELECT 1 FROM a", RESULT)
+        cache.put("SELECT 1 FROM b", RESULT)
+        cache.get("SELECT 1 FROM a")
+        cache.put("SELECT 1 FROM c", RESULT)
+
+        assert cache.get("SELECT 1 FROM a") == RESULT
+        assert cache.get("SELECT 1 FROM b") is None
+        assert cache.get("SELECT 1 FROM c") == RESULT
+
+    def test_invalidate_tables(self, temp_dir):
+        """Test invalidating a table removes the results reading it, in memory and on disk."""
+        cache = SQLResultCache(disk_path=str(temp_dir / "cache.db"))
+        cache.put("SELECT * FROM db.orders", RESULT)
+        cache.put("SELECT * FROM users", RESULT)
+
+        assert cache.invalidate(["other_db.orders"]) == 1
+        assert cache.get("SELECT * FROM db.orders") is None
+        assert cache.get("SELECT * FROM users") == RESULT
+        cache.close()
+
+        reopened = SQLResultCache(disk_path=str(temp_dir / "cache.db"))
+        assert reopened.get("SELECT * FROM db.orders") is None
+        assert reopened.get("SELECT  *  FROM users") == RESULT
+        reopened.close()
+
+    def test_invalidate_all_caches_and_on_catalog_change(self):
+        """Test results are invalidated in every cache by table, and cleared when the catalog changes."""
+        catalog = Mock()
+        cache = create_sql_result_cache({}, catalog)
+        other = SQLResultCache()
+        for c in (cache, other):
+            c.put("SELECT * FROM orders, shipments", RESULT)
+            c.put("SELECT * FROM items", RESULT)
+
+        assert invalidate_sql_results(["shipments"]) == 2
+        assert cache.get("SELECT * FROM orders, shipments") is None
+        assert other.get("SELECT * FROM items") == RESULT
+
+        catalog.add_change_listener.assert_called_once_with(cache.on_catalog_change)
+        cache.on_catalog_change(catalog)
+        assert cache.get("SELECT * FROM items") is None
+        assert other.get("SELECT * FROM items") == RESULT
+
+    def test_create_from_config(self):
+        """Test the cache can be disabled by config."""
+        assert isinstance(create_sql_result_cache({}), SQLResultCache)
+        assert create_sql_result_cache({"enabled": False}) is None
+        assert create_sql_result_cache({"ttl_seconds": 0}) is None
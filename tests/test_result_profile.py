@@ -0,0 +1,82 @@
+"""Tests for the schema profiling of SQL query results."""
+
+import datetime
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from openchatbi.text2sql.result_profile import column_kinds_from_cursor, estimate_distinct_count, profile_dataframe
+
+
+class TestProfileDataFrame:
+    """Test profile_dataframe."""
+
+    def test_column_kinds_and_stats(self):
+        """Test columns are classified by dtype and sampled values, with null counts and min/max."""
+        df = pd.DataFrame(
+            {
+                "day": ["2024-01-01", "2024-01-02", None],
+                "country": ["US", "CA", "US"],
+                "clicks": [10, 20, 30],
+                "cost": [Decimal("1.5"), None, Decimal("3.5")],
+                "ts": pd.to_datetime(["2024-01-01", "2024-01-03", "2024-01-02"]),
+                "active": [True, False, True],
+            }
+        )
+
+        schema_info = profile_dataframe(df)
+
+        assert schema_info["numeric_columns"] == ["clicks", "cost"]
+        assert schema_info["categorical_columns"] == ["country", "active"]
+        assert schema_info["datetime_columns"] == ["day", "ts"]
+        assert schema_info["unique_counts"] == {"country": 2, "active": 2}
+        assert schema_info["sampled"] is False
+        assert schema_info["column_stats"]["clicks"] == {"null_count": 0, "min": 10, "max": 30}
+        assert schema_info["column_stats"]["cost"] == {"null_count": 1, "min": 1.5, "max": 3.5}
+        assert schema_info["column_stats"]["ts"]["max"] == "2024-01-03T00:00:00"
+        assert schema_info["column_stats"]["day"] == {"null_count": 1}
+
+    def test_cursor_kinds_override_inference(self):
+        """Test column kinds from the cursor type metadata take precedence over the values."""
+        df = pd.DataFrame({"code": ["1", "2"], "amount": [Decimal("1"), Decimal("2")]})
+        kinds = column_kinds_from_cursor([("code", "varchar", None), ("amount", "decimal(10,2)", None)])
+
+        schema_info = profile_dataframe(df, kinds)
+
+        assert kinds == {"code": "categorical", "amount": "numeric"}
+        assert schema_info["categorical_columns"] == ["code"]
+        assert schema_info["numeric_columns"] == ["amount"]
+        assert column_kinds_from_cursor(None) == {}
+        assert column_kinds_from_cursor([("d", datetime.date, None)]) == {}
+
+    def test_large_frame_is_sampled(self):
+        """Test distinct counts and object null counts of large frames are estimated from a sample."""
+        rng = np.random.default_rng(1)
+        low = rng.choice(np.array(["a", "b", "c", None], dtype=object), 50_000)
+        df = pd.DataFrame({"low": low, "high": [f"id{i}" for i in range(50_000)], "value": rng.random(50_000)})
+
+        schema_info = profile_dataframe(df, sample_rows=5_000)
+
+        assert schema_info["sampled"] is True
+        assert schema_info["unique_counts"]["low"] == 3
+        assert 40_000 < schema_info["unique_counts"]["high"] <= 50_000
+        assert abs(schema_info["column_stats"]["low"]["null_count"] - (low == None).sum()) < 1_000  # noqa: E711
+        assert schema_info["column_stats"]["value"]["null_count"] == 0
+
+    def test_duplicate_column_names(self):
+        """Test results with duplicate column names are profiled by position."""
+        df = pd.DataFrame([[1, "a", 2]], columns=["id", "name", "id"])
+
+        schema_info = profile_dataframe(df)
+
+        assert schema_info["numeric_columns"] == ["id", "id"]
+        assert schema_info["column_stats"]["id"]["max"] == 2
+
+    def test_estimate_distinct_count(self):
+        """Test the estimate is exact when the sample is the whole column."""
+        sample = pd.Series(["a", "b", "b"])
+        assert estimate_distinct_count(sample, 3) == 2
+        assert estimate_distinct_count(pd.Series([], dtype=object), 10) == 0
+        assert estimate_distinct_count(sample, 300) == round(3 * 2 / (2 + 3 / 300))
+        assert estimate_distinct_count(pd.Series(range(100)), 1000) == 1000
@@ -0,0 +1,88 @@
+"""Tests for the SQL result store."""
+
+from decimal import Decimal
+
+import pyarrow as pa
+import pytest
+
+from openchatbi.text2sql import result_store
+from openchatbi.text2sql.result_store import ResultStore, load_result
+
+
+class TestResultWriter:
+    """Test writing fetched rows as Arrow tables."""
+
+    def test_typed_columns(self):
+        """Test rows are stored with typed columns, promoting types that differ across batches."""
+        store = ResultStore()
+        writer = store.create_writer(["id", "value", "name"])
+        writer.write_rows([(1, None, "a"), (2, None, "b")])
+        writer.write_rows([(3, 1.5, "c")])
+        handle = writer.close()
+
+        table = store.get_table(handle)
+        assert table.num_rows == writer.stored_rows == 3
+        assert table.schema.field("id").type == pa.int64()
+        assert table.schema.field("value").type == pa.float64()
+        assert store.get_dataframe(handle)["name"].tolist() == ["a", "b", "c"]
+
+    def test_mixed_values_kept_as_strings(self):
+        """Test columns without a common Arrow type are stored as strings."""
+        store = ResultStore()
+        writer = store.create_writer(["value"])
+        writer.write_rows([(1,), ("x",)])
+        writer.write_rows([(Decimal("2.5"),)])
+
+        table = store.get_table(writer.close())
+        assert table.column("value").to_pylist() == ["1", "x", "2.5"]
+
+    def test_result_size_cap(self):
+        """Test rows after max_result_bytes are not stored."""
+        store = ResultStore(max_result_bytes=100)
+        writer = store.create_writer(["id"])
+        for start in range(0, 100, 10):
+            writer.write_rows([(i,) for i in range(start, start + 10)])
+
+        assert not writer.complete
+        assert store.get_table(writer.close()).num_rows == writer.stored_rows < 100
+
+
+class TestResultStore:
+    """Test eviction and spilling of stored results."""
+
+    def _table(self, rows: int) -> pa.Table:
+        return pa.table({"id": list(range(rows))})
+
+    def test_evicts_oldest_results(self):
+        """Test the oldest results are dropped over max_results and max_memory_bytes without a spill directory."""
+        store = ResultStore(max_results=2)
+        handles = [store.put(self._table(10)) for _ in range(3)]
+        assert handles[0] not in store and store.get_table(handles[0]) is None
+        assert len(store) == 2
+
+        store = ResultStore(max_memory_bytes=1000)
+        first, second = store.put(self._table(100)), store.put(self._table(100))
+        assert first not in store and second in store
+
+    def test_spills_to_disk(self, temp_dir):
+        """Test results over max_memory_bytes are spilled to Arrow IPC files and read back."""
+        store = ResultStore(max_memory_bytes=1000, spill_dir=str(temp_dir / "results"))
+        first, second = store.put(self._table(100)), store.put(self._table(100))
+
+        spilled = temp_dir / "results" / f"{first}.arrow"
+        assert spilled.exists()
+        assert store.get_table(first).column("id").to_pylist() == list(range(100))
+        assert store.get_table(second).num_rows == 100
+
+        store.remove(first)
+        assert not spilled.exists()
+
+    def test_load_result(self, monkeypatch):
+        """Test the executor helper loads a DataFrame and fails clearly for unknown handles."""
+        store = ResultStore()
+        monkeypatch.setattr(result_store, "_result_store", store)
+        handle = store.put(self._table(5))
+
+        assert load_result(handle)["id"].tolist() == list(range(5))
+        with pytest.raises(KeyError):
+            load_result("result_missing")
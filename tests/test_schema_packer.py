@@ -0,0 +1,176 @@
+"""Tests for token-budgeted schema packing."""
+
+from unittest.mock import Mock, patch
+
+from langchain_core.messages import AIMessage
+
+from openchatbi.catalog.schema_retrival import TableColumnIndex
+from openchatbi.graph_state import SQLGraphState
+from openchatbi.text2sql.generate_sql import create_sql_nodes
+from openchatbi.text2sql.schema_linking import schema_linking
+from openchatbi.text2sql.schema_packer import (
+    SchemaPacker,
+    TableSchema,
+    create_schema_packers,
+    essential_columns,
+    estimate_tokens,
+)
+
+
+def _column(name, column_type="double", category="metric", **extra):
+    return {
+        "column_name": name,
+        "type": column_type,
+        "category": category,
+        "display_name": name.replace("_", " ").title(),
+        "description": f"Description of {name}",
+        "alias": "",
+        **extra,
+    }
+
+
+def _schema(table, column_names, essential=()):
+    return TableSchema(
+        table=table,
+        columns=list(column_names),
+        column_lines=[f"- {name}: {'x' * 36}" for name in column_names],
+        essential=frozenset(essential),
+        render=lambda lines, omitted: f"# {table}\n" + "\n".join(lines) + (f"\n- {omitted} omitted" if omitted else ""),
+    )
+
+
+class TestEssentialColumns:
+    """Test the columns always kept in a packed schema."""
+
+    def test_keys_time_partition_and_rule_columns(self):
+        """Test keys, time and partition columns and columns named by the table rules are essential."""
+        columns = [
+            _column("user_id", "bigint", "dimension"),
+            _column("created_at", "varchar", "dimension"),
+            _column("event_time", "timestamp", "dimension"),
+            _column("dt", "varchar", "dimension"),
+            _column("region", "varchar", "dimension"),
+            _column("country_code", "varchar", "dimension", dimension_table="countries"),
+            _column("revenue"),
+            _column("clicks"),
+            _column("bucket", "int", "dimension"),
+        ]
+        table_info = {"sql_rule": "Always sum revenue, never clicks.", "partition_columns": ["bucket"]}
+
+        assert essential_columns(columns, table_info) == {
+            "user_id",
+            "created_at",
+            "event_time",
+            "dt",
+            "country_code",
+            "revenue",
+            "clicks",
+            "bucket",
+        }
+        assert essential_columns([_column("region", "varchar", "dimension")]) == frozenset()
+
+
+class TestSchemaPacker:
+    """Test fitting table schemas into a token budget."""
+
+    def test_within_budget_unchanged(self):
+        """Test schemas within the budget are rendered in full."""
+        schemas = [_schema("sales", ["revenue", "clicks"])]
+
+        sections, report = SchemaPacker(1000).pack(schemas)
+
+        assert sections == [schemas[0].full()]
+        assert report.saved_tokens == 0
+        assert report.kept_columns == report.columns == 2
+
+    def test_keeps_essential_then_most_relevant(self):
+        """Test essential columns are kept, then selected and retrieved columns by rank, in catalog order."""
+        columns = [f"metric_{i}" for i in range(40)] + ["user_id"]
+        schemas = [_schema("sales", columns, essential=["user_id"]), _schema("users", ["name", "age"])]
+        packer = SchemaPacker(75)
+
+        sections, report = packer.pack(
+            schemas, relevant_columns=["metric_30", "age", "metric_5"], selected_columns={"sales": ["metric_20"]}
+        )
+
+        sales_lines = [line.split(":")[0] for line in sections[0].splitlines()[1:-1]]
+        assert sales_lines == ["- metric_5", "- metric_20", "- metric_30", "- user_id"]
+        assert sections[0].endswith("- 37 omitted")
+        assert "- age" in sections[1] and "- name" not in sections[1]
+        assert sum(estimate_tokens(section) for section in sections) <= 75
+        assert report.kept_columns == 5
+        assert report.saved_tokens == report.full_tokens - report.packed_tokens > 0
+        assert packer.stats["packed"] == 1
+        assert packer.stats["full_tokens"] - packer.stats["packed_tokens"] == report.saved_tokens
+
+    def test_create_schema_packers(self):
+        """Test the packers are created from the config, without a packer for unlimited prompts."""
+        sql_packer, selection_packer = create_schema_packers({"table_selection_max_tokens": 0})
+
+        assert sql_packer.max_tokens == 6000
+        assert selection_packer is None
+        assert create_schema_packers({"enabled": False}) == (None, None)
+
+
+class TestSQLGenerationSchemaBudget:
+    """Test the SQL generation prompt lists the table schema within the token budget."""
+
+    def test_generate_sql_packs_schema(self):
+        """Test the columns ranked by retrieval are listed and the rest counted."""
+        llm = Mock()
+        llm.invoke.return_value = AIMessage(content="SELECT 1")
+        catalog = Mock()
+        catalog.get_catalog_version.return_value = 1
+        catalog.get_table_information.return_value = {"description": "Fact table", "sql_rule": "", "derived_metric": ""}
+        catalog.get_column_list.return_value = [_column("dt", "date", "dimension")] + [
+            _column(f"metric_{i}") for i in range(400)
+        ]
+        generate_node, _, _, _ = create_sql_nodes(llm, catalog, "presto", schema_packer=SchemaPacker(500))
+        state = SQLGraphState(
+            messages=[],
+            rewrite_question="Total metric 7",
+            tables=[{"table": "facts", "columns": ["metric_7"]}],
+            relevant_columns=["metric_250", "metric_7"],
+        )
+
+        with patch("openchatbi.text2sql.generate_sql.sql_example_retriever") as mock_retriever:
+            mock_retriever.invoke.return_value = []
+            generate_node(state)
+
+        system_prompt = llm.invoke.call_args.args[0][0].content
+        for column_name in ("dt", "metric_7", "metric_250"):
+            assert f'Column("{column_name}"' in system_prompt
+        assert 'Column("metric_399"' not in system_prompt
+        assert "less relevant columns are not listed" in system_prompt
+
+
+class TestTableSelectionSchemaBudget:
+    """Test the table selection prompt lists the candidate tables within the token budget."""
+
+    def test_selection_prompt_packs_candidates(self):
+        """Test the most relevant related columns of the candidates are listed."""
+        relevant_columns = [f"metric_{i}" for i in range(300)]
+        retriever = Mock(
+            col_dict={name: _column(name) for name in relevant_columns},
+            table_index=TableColumnIndex({name: ["facts", "rollup"] for name in relevant_columns}),
+        )
+        llm = Mock()
+        llm.invoke.return_value = AIMessage(content='{"tables": [{"table": "facts"}]}')
+        catalog = Mock()
+        catalog.get_table_information.side_effect = lambda table: {"description": f"{table} table"}
+        state = SQLGraphState(
+            messages=[], rewrite_question="Total metric", info_entities={"keywords": ["metric"], "metrics": ["metric"]}
+        )
+        with (
+            patch("openchatbi.text2sql.schema_linking.get_column_retriever", return_value=retriever),
+            patch("openchatbi.text2sql.schema_linking.get_relevant_columns", return_value=relevant_columns),
+            patch("openchatbi.text2sql.schema_linking.table_selection_retriever") as examples,
+        ):
+            examples.invoke.return_value = []
+            result = schema_linking(llm, catalog, schema_packer=SchemaPacker(1000))(state)
+
+        system_prompt = llm.invoke.call_args.args[0][0].content
+        assert result["tables"] == [{"table": "facts"}]
+        assert system_prompt.count("metric(metric_0,") == 2
+        assert "metric(metric_299," not in system_prompt
+        assert "less relevant columns are not listed" in system_prompt
@@ -0,0 +1,261 @@
+"""Tests for lazy column retriever in schema retrieval."""
+
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+import numpy as np
+
+from openchatbi.bm25_index import BM25Index
+from openchatbi.catalog.schema_retrival import (
+    ColumnNameMatcher,
+    ColumnRetriever,
+    TableColumnIndex,
+    _rebuild_column_retriever,
+    bm25_search,
+    edit_distance_score,
+    edit_distance_search,
+    get_column_retriever,
+    get_relevant_columns,
+    normalize_column_name,
+    reciprocal_rank_fusion,
+    search_columns_by_term,
+)
+
+COLUMNS = [
+    {"column_name": "user_id", "display_name": "User ID", "category": "dimension"},
+    {"column_name": "revenue", "display_name": "Revenue", "category": "metric"},
+    {"column_name": "country", "display_name": "Country", "category": "dimension"},
+]
+
+
+def _mock_build(catalog):
+    bm25 = BM25Index.from_corpus([["user", "id"], ["revenue"], ["country"]])
+    return bm25, None, COLUMNS, {column["column_name"]: column for column in COLUMNS}
+
+
+class TestColumnRetriever:
+    """Test ColumnRetriever lazy build and registry."""
+
+    def test_not_built_until_first_use(self):
+        """Test indexes are only built when first accessed."""
+        with (
+            patch("openchatbi.catalog.schema_retrival.build_columns_retriever", side_effect=_mock_build) as mock_build,
+            patch(
+                "openchatbi.catalog.schema_retrival.build_column_tables_mapping", return_value={"user_id": ["users"]}
+            ),
+        ):
+            retriever = ColumnRetriever(Mock())
+            assert not retriever.is_built
+            mock_build.assert_not_called()
+
+            assert retriever.column_tables_mapping == {"user_id": ["users"]}
+            assert retriever.is_built
+            assert set(retriever.col_dict) == {"user_id", "revenue", "country"}
+            mock_build.assert_called_once()
+
+    def test_build_in_background(self):
+        """Test building indexes in a background thread."""
+        with (
+            patch("openchatbi.catalog.schema_retrival.build_columns_retriever", side_effect=_mock_build) as mock_build,
+            patch("openchatbi.catalog.schema_retrival.build_column_tables_mapping", return_value={}),
+        ):
+            retriever = ColumnRetriever(Mock())
+            thread = retriever.build_in_background()
+            assert retriever.build_in_background() is thread
+            thread.join(timeout=5)
+
+            assert retriever.is_built
+            assert retriever.columns == COLUMNS
+            mock_build.assert_called_once()
+
+    def test_keyed_per_catalog(self):
+        """Test each catalog store gets its own retriever."""
+        catalog_a, catalog_b = Mock(), Mock()
+
+        assert get_column_retriever(catalog_a) is get_column_retriever(catalog_a)
+        assert get_column_retriever(catalog_a) is not get_column_retriever(catalog_b)
+        assert get_column_retriever(catalog_a).catalog is catalog_a
+
+    def test_rebuild_swaps_retriever(self):
+        """Test a catalog change swaps in a rebuilt retriever while the previous one keeps working."""
+        catalog = Mock()
+        with (
+            patch("openchatbi.catalog.schema_retrival.build_columns_retriever", side_effect=_mock_build) as mock_build,
+            patch("openchatbi.catalog.schema_retrival.build_column_tables_mapping", return_value={}),
+        ):
+            previous = get_column_retriever(catalog).build()
+            _rebuild_column_retriever(catalog)
+
+            retriever = get_column_retriever(catalog)
+            assert retriever is not previous
+            assert retriever.is_built
+            assert mock_build.call_count == 2
+            assert previous.col_dict == retriever.col_dict
+
+            # an unbuilt retriever is replaced without building
+            _rebuild_column_retriever(Mock())
+            assert mock_build.call_count == 2
+
+    def test_empty_retriever_without_catalog(self):
+        """Test searching without any configured catalog returns nothing."""
+        retriever = get_column_retriever()
+
+        assert retriever.col_dict == {}
+        assert bm25_search(["revenue"], retriever=retriever) == []
+        assert edit_distance_search(["revenue"], retriever=retriever) == []
+
+    def test_bm25_search_uses_retriever(self):
+        """Test BM25 search reads from the given retriever."""
+        with (
+            patch("openchatbi.catalog.schema_retrival.build_columns_retriever", side_effect=_mock_build),
+            patch("openchatbi.catalog.schema_retrival.build_column_tables_mapping", return_value={}),
+        ):
+            retriever = ColumnRetriever(Mock())
+
+            assert bm25_search(["revenue"], top_k=2, retriever=retriever) == ["revenue"]
+
+
+class TestColumnNameMatcher:
+    """Test batched fuzzy matching of column names."""
+
+    @staticmethod
+    def _reference_search(col_dict, keyword, top_k, threshold):
+        scores = {}
+        for column_name, row in col_dict.items():
+            score = min(
+                edit_distance_score(keyword, normalize_column_name(row.get("column_name", ""))),
+                edit_distance_score(keyword, normalize_column_name(row.get("display_name", ""))),
+            )
+            if score < threshold:
+                scores[column_name] = score
+        return [name for name, _ in sorted(scores.items(), key=lambda x: x[1])[:top_k]]
+
+    def test_matches_pairwise_reference(self):
+        """Test results equal the pairwise edit distance scores, best matches first."""
+        rng = np.random.default_rng(3)
+        words = ["user", "revenue", "country", "click", "ad", "campaign", "cost", "date", "order", "device"]
+        col_dict = {}
+        for i in range(500):
+            column_name = "_".join(rng.choice(words, size=rng.integers(1, 4))) + ("_id" if i % 5 == 0 else "")
+            col_dict[f"{column_name}_{i}"] = {"column_name": column_name, "display_name": column_name.replace("_", " ")}
+        matcher = ColumnNameMatcher(col_dict)
+
+        for keyword in ["revenue", "user", "countr", "clicks", "ad campaign", "order date", "x"]:
+            for threshold in (0.3, 0.5):
+                expected = self._reference_search(col_dict, keyword, 10, threshold)
+                assert matcher.search(keyword, 10, threshold) == expected
+
+    def test_keeps_best_matches(self):
+        """Test top_k keeps the closest columns, not the farthest ones."""
+        with (
+            patch("openchatbi.catalog.schema_retrival.build_columns_retriever", side_effect=_mock_build),
+            patch("openchatbi.catalog.schema_retrival.build_column_tables_mapping", return_value={}),
+        ):
+            retriever = ColumnRetriever(Mock())
+            retriever.build()._name_matcher = ColumnNameMatcher(
+                {
+                    "revenue": {"column_name": "revenue", "display_name": "Revenue"},
+                    "revenues_usd": {"column_name": "revenues_usd", "display_name": "Revenue USD"},
+                    "user_id": {"column_name": "user_id", "display_name": "User ID"},
+                }
+            )
+
+            assert edit_distance_search(["Revenue"], top_k=1, threshold=0.6, retriever=retriever) == ["revenue"]
+            assert edit_distance_search(["user name"], top_k=1, retriever=retriever) == ["user_id"]
+
+
+class TestTableColumnIndex:
+    """Test the table membership index of the columns."""
+
+    def test_tables_and_columns(self):
+        """Test the tables of columns come from the bitsets in catalog order, with their column sets."""
+        index = TableColumnIndex({"user_id": ["users", "orders"], "revenue": ["orders", "sales"], "country": ["users"]})
+
+        assert index.tables_of(["revenue"]) == ["orders", "sales"]
+        assert index.tables_of(["country", "revenue", "unknown"]) == ["users", "orders", "sales"]
+        assert index.tables_of([]) == []
+        assert index.table_columns["orders"] == {"user_id", "revenue"}
+
+    def test_start_times_parsed_on_build(self):
+        """Test the retriever parses the table start times once, skipping invalid ones."""
+        catalog = Mock()
+        catalog.get_table_information.side_effect = lambda table: {
+            "users": {"start_time": "2024-01-01 00:00:00"},
+            "orders": {"start_time": "2024-01-01"},
+            "sales": {},
+        }[table]
+        with (
+            patch("openchatbi.catalog.schema_retrival.build_columns_retriever", side_effect=_mock_build),
+            patch(
+                "openchatbi.catalog.schema_retrival.build_column_tables_mapping",
+                return_value={"user_id": ["users", "orders"], "revenue": ["sales"]},
+            ),
+        ):
+            retriever = ColumnRetriever(catalog)
+
+            assert retriever.table_index.table_start_times == {"users": datetime(2024, 1, 1)}
+            assert retriever.table_index.table_start_times is retriever.table_index.table_start_times
+            assert catalog.get_table_information.call_count == 3
+
+
+class TestGetRelevantColumns:
+    """Test fan-out of the column retrievers and result fusion."""
+
+    def test_reciprocal_rank_fusion(self):
+        """Test items ranked high by several retrievers come first."""
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"], [], ["c", "b"]])
+
+        assert fused[0] == "b"
+        assert set(fused) == {"a", "b", "c", "d"}
+        assert fused.index("c") < fused.index("a")
+
+    def test_parallel_matches_sequential(self):
+        """Test both modes return the same ranking, each vector search embedding its query as a search query."""
+        vector_db = Mock()
+        vector_db.similarity_search_with_score.side_effect = lambda query, k, filter: [
+            (Mock(metadata={"column_name": "country" if filter["category"] == "dimension" else "revenue"}), 0.1)
+        ]
+        retriever = ColumnRetriever(None).build()
+        retriever._vector_db = vector_db
+        retriever._name_matcher = ColumnNameMatcher({column["column_name"]: column for column in COLUMNS})
+
+        with patch("openchatbi.catalog.schema_retrival.get_column_retriever", return_value=retriever):
+            timings = {}
+            parallel = get_relevant_columns(["revenue"], ["country"], ["revenue"], timings=timings)
+            sequential = get_relevant_columns(["revenue"], ["country"], ["revenue"], parallel=False)
+
+        assert parallel == sequential
+        assert parallel[0] == "revenue"
+        assert set(parallel) == {"revenue", "country"}
+        assert set(timings) == {"bm25", "edit_distance", "dimension", "metric"}
+        searched = sorted(c.args[0] for c in vector_db.similarity_search_with_score.call_args_list)
+        assert searched == ["country", "country", "revenue", "revenue"]
+        vector_db.embeddings.embed_documents.assert_not_called()
+
+    def test_term_columns_are_not_searched_again(self):
+        """Test a query searched ahead as is reuses its results, ranking the columns like the baseline search."""
+        vector_db = Mock()
+        vector_db.embeddings.embed_query.side_effect = lambda query: [float(len(query))]
+        vector_db.similarity_search_by_vector_with_relevance_scores.side_effect = lambda embedding, k, filter: [
+            (Mock(metadata={"column_name": "country" if embedding == [6.0] else "revenue"}), 0.1)
+        ]
+        vector_db.similarity_search_with_score.side_effect = lambda query, k, filter: [
+            (Mock(metadata={"column_name": "country" if query == "nation" else "revenue"}), 0.1)
+        ]
+        retriever = ColumnRetriever(None).build()
+        retriever._vector_db = vector_db
+        retriever._name_matcher = ColumnNameMatcher({column["column_name"]: column for column in COLUMNS})
+
+        with patch("openchatbi.catalog.schema_retrival.get_column_retriever", return_value=retriever):
+            term_columns = search_columns_by_term(["nation", "income", "nation"])
+            assert vector_db.embeddings.embed_query.call_count == 2
+            assert search_columns_by_term(["nation", "income"], parallel=False) == term_columns
+            columns = get_relevant_columns([], ["nation"], ["gross", "income"], term_columns=term_columns)
+            vector_db.similarity_search_with_score.assert_called_once_with(
+                "gross income", k=10, filter={"category": "metric"}
+            )
+            baseline = get_relevant_columns([], ["nation"], ["gross", "income"])
+
+        assert term_columns["nation"] == {"dimension": ["country"], "metric": ["country"]}
+        assert columns == baseline
+        assert set(columns) == {"country", "revenue"}
@@ -1,5 +1,6 @@
 """Unit tests for SimpleStore."""
 
+import numpy as np
 import pytest
 
 from openchatbi.utils import SimpleStore
@@ -264,3 +265,87 @@ class TestSimpleStore:
         empty_doc2 = Document(page_content="", metadata={})
         similarity_empty = simple_store._calculate_similarity(empty_doc1, empty_doc2)
         assert similarity_empty == 0.0  # Empty sets have 0 Jaccard similarity
+
+    def test_index_snapshot(self, sample_texts, temp_dir):
+        """Test BM25 index snapshot is reused by a new store with the same texts."""
+        store = SimpleStore(list(sample_texts), index_dir=str(temp_dir), index_name="examples")
+        reloaded = SimpleStore(list(sample_texts), index_dir=str(temp_dir), index_name="examples")
+
+        assert (temp_dir / "examples" / "meta.json").exists()
+        assert [doc.page_content for doc in reloaded.similarity_search("neural networks", k=2)] == [
+            doc.page_content for doc in store.similarity_search("neural networks", k=2)
+        ]
+
+        # The memory-mapped index is updated in place
+        reloaded.add_texts(["Neural networks are trained with backpropagation"])
+        assert len(reloaded.texts) == len(sample_texts) + 1
+        assert reloaded.similarity_search("backpropagation", k=1)[0].page_content.startswith("Neural networks")
+
+    def test_incremental_updates_match_rebuild(self, sample_texts):
+        """Test scores after incremental adds and deletes equal a store built from the remaining texts."""
+        ids = [f"id{i}" for i in range(len(sample_texts))]
+        store = SimpleStore(list(sample_texts[:3]), ids=ids[:3])
+        store.add_texts(list(sample_texts[3:]), ids=ids[3:])
+        store.delete(["id1", "id3"])
+        store.add_texts(["Deep learning uses neural networks"], ids=["id_new"])
+
+        rebuilt = SimpleStore(store.texts, ids=store.ids)
+        for query in ["neural networks", "programming language", "learning"]:
+            results = store.similarity_search_with_score(query, k=len(store.texts))
+            expected = rebuilt.similarity_search_with_score(query, k=len(rebuilt.texts))
+            assert [doc.id for doc, _ in results] == [doc.id for doc, _ in expected]
+            assert [score for _, score in results] == pytest.approx([score for _, score in expected])
+
+    def test_add_existing_id_replaces_document(self):
+        """Test adding a text with an existing ID replaces the document."""
+        store = SimpleStore(["Text A", "Text B"], ids=["id1", "id2"])
+        store.add_texts(["Text C"], ids=["id1"])
+
+        assert store.ids == ["id2", "id1"]
+        assert store.get_by_ids(["id1"])[0].page_content == "Text C"
+        assert store.similarity_search("Text A", k=2)[0].id in {"id1", "id2"}
+
+    def test_compaction(self):
+        """Test tombstoned documents are compacted away once they pile up."""
+        texts = [f"document number {i}" for i in range(8)]
+        store = SimpleStore(texts, ids=[str(i) for i in range(8)])
+        store.delete(["0", "1", "2"])
+
+        assert store.bm25.deleted_count == 0
+        assert store.bm25.corpus_size == 5
+        assert store.ids == ["3", "4", "5", "6", "7"]
+        assert store.similarity_search("7", k=1)[0].id == "7"
+
+    def test_max_marginal_relevance_search_matches_reference(self):
+        """Test vectorized MMR selects the same documents as the pairwise reference implementation."""
+        words = ["revenue", "user", "country", "click", "impression", "ad", "campaign", "cost", "date", "spend"]
+        rng = np.random.default_rng(7)
+        texts = [" ".join(rng.choice(words, size=rng.integers(1, 6))) for _ in range(60)]
+        store = SimpleStore(texts, ids=[str(i) for i in range(len(texts))])
+
+        def reference_mmr(query, k, fetch_k, lambda_mult):
+            candidates = store.similarity_search_with_score(query, k=fetch_k)
+            if len(candidates) <= k:
+                return [doc for doc, _ in candidates]
+            scores = [score for _, score in candidates]
+            score_range = max(scores) - min(scores) if max(scores) > min(scores) else 1
+            normalized = [(doc, (score - min(scores)) / score_range) for doc, score in candidates]
+            selected, remaining = [], list(range(len(normalized)))
+            while len(selected) < k and remaining:
+                best = max(
+                    remaining,
+                    key=lambda i: lambda_mult * normalized[i][1]
+                    - (1 - lambda_mult)
+                    * max(
+                        (store._calculate_similarity(normalized[i][0], normalized[j][0]) for j in selected), default=0.0
+                    ),
+                )
+                selected.append(best)
+                remaining.remove(best)
+            return [normalized[i][0] for i in selected]
+
+        for query in ["revenue user", "click ad campaign", "country date spend cost"]:
+            for lambda_mult in (0.0, 0.3, 0.5, 1.0):
+                expected = reference_mmr(query, 10, 30, lambda_mult)
+                results = store.max_marginal_relevance_search(query, k=10, fetch_k=30, lambda_mult=lambda_mult)
+                assert [doc.id for doc in results] == [doc.id for doc in expected]
@@ -0,0 +1,164 @@
+"""Tests for speculative retrieval during information extraction."""
+
+import json
+import threading
+import time
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, HumanMessage
+
+from openchatbi.graph_state import SQLGraphState
+from openchatbi.text2sql import speculative_retrieval
+from openchatbi.text2sql.extraction import information_extraction
+from openchatbi.text2sql.speculative_retrieval import question_terms, start_speculative_retrieval
+
+
+def _term_result(dimensions, metrics=()):
+    return {"dimension": list(dimensions), "metric": list(metrics)}
+
+
+@pytest.fixture
+def retrievers():
+    """Patch the column search and example retrievers, the SQL example retriever failing."""
+    table_selection_retriever = Mock()
+    table_selection_retriever.invoke.return_value = [Document(page_content="revenue by country")]
+    sql_example_retriever = Mock()
+    sql_example_retriever.invoke.side_effect = RuntimeError("index unavailable")
+    search = Mock(
+        side_effect=lambda terms, catalog=None, parallel=True: {term: _term_result([f"{term}_col"]) for term in terms}
+    )
+    with (
+        patch.object(speculative_retrieval, "search_columns_by_term", search),
+        patch.object(speculative_retrieval, "table_selection_retriever", table_selection_retriever),
+        patch.object(speculative_retrieval, "sql_example_retriever", sql_example_retriever),
+    ):
+        yield search
+
+
+class TestQuestionTerms:
+    """Test the terms searched for a raw question."""
+
+    def test_words_and_bigrams(self):
+        """Test stop words are dropped and adjacent words are paired."""
+        assert question_terms("Show me the total Revenue by country?") == [
+            "total",
+            "revenue",
+            "country",
+            "total revenue",
+            "revenue country",
+        ]
+
+    def test_term_limit(self):
+        """Test long questions are capped, words first."""
+        terms = question_terms(" ".join(f"word{i}" for i in range(40)))
+
+        assert len(terms) == speculative_retrieval.MAX_SPECULATIVE_TERMS
+        assert " " not in terms[-1]
+
+
+class TestSpeculativeRetrieval:
+    """Test running the speculative retrieval in the background."""
+
+    info = {"dimensions": ["country"], "metrics": ["revenue"]}
+
+    def test_sync_retrieval_leaves_out_failures(self, retrievers):
+        """Test the reusable searches are returned and failed ones left to the following nodes."""
+        speculation = start_speculative_retrieval("revenue by country", Mock()).result(self.info)
+
+        assert speculation["question"] == "revenue by country"
+        assert {"country", "revenue"} <= set(speculation["term_columns"])
+        assert speculation["term_columns"]["country"] == _term_result(["country_col"])
+        assert speculation["table_selection_examples"] == ["revenue by country"]
+        assert "sql_examples" not in speculation
+        assert all(call.kwargs["parallel"] is False for call in retrievers.call_args_list)
+
+    def test_unused_searches_not_awaited(self, retrievers):
+        """Test a search the extracted information cannot reuse is not waited for."""
+        release = threading.Event()
+        retrievers.side_effect = lambda terms, catalog=None, parallel=True: (
+            release.wait(5) if terms == ["country"] else None
+        ) or {term: _term_result([f"{term}_col"]) for term in terms}
+        try:
+            speculation = start_speculative_retrieval("country revenue", Mock())
+            time.sleep(0.1)
+            start = time.perf_counter()
+            result = speculation.result({"metrics": ["revenue"]})
+            assert time.perf_counter() - start < 0.5
+        finally:
+            release.set()
+
+        assert "country" not in result["term_columns"]
+        assert result["term_columns"]["revenue"] == _term_result(["revenue_col"])
+
+    @pytest.mark.asyncio
+    async def test_async_result_matches_sync(self, retrievers):
+        """Test the async wait returns the same state."""
+        speculation = await start_speculative_retrieval("revenue by country", Mock()).aresult(self.info)
+
+        expected = start_speculative_retrieval("revenue by country", Mock()).result(self.info)
+        assert speculation["term_columns"]["country"] == expected["term_columns"]["country"]
+        assert speculation["table_selection_examples"] == expected["table_selection_examples"]
+
+
+class TestExtractionWithSpeculation:
+    """Test the extraction node runs the speculative retrieval alongside the LLM call."""
+
+    extracted = AIMessage(content=json.dumps({"rewrite_question": "Revenue by country", "dimensions": ["country"]}))
+
+    def test_speculation_added_to_extraction(self, retrievers):
+        """Test the speculative results of the last user question are added to the extracted information."""
+        state = SQLGraphState(messages=[HumanMessage("Show revenue by country")])
+        with patch("openchatbi.text2sql.extraction.call_llm_chat_model_with_retry", return_value=self.extracted):
+            result = information_extraction(Mock(), catalog=Mock())(state)
+
+        assert result["rewrite_question"] == "Revenue by country"
+        assert result["speculative_retrieval"]["question"] == "Show revenue by country"
+        assert result["speculative_retrieval"]["table_selection_examples"] == ["revenue by country"]
+
+    def test_no_speculation_for_tool_calls_or_without_catalog(self, retrievers):
+        """Test tool calls and nodes without a catalog do not return speculative results."""
+        tool_call = AIMessage(content="", tool_calls=[{"name": "AskHuman", "args": {"question": "?"}, "id": "1"}])
+        state = SQLGraphState(messages=[HumanMessage("Show revenue")])
+        with patch("openchatbi.text2sql.extraction.call_llm_chat_model_with_retry", return_value=tool_call):
+            assert "speculative_retrieval" not in information_extraction(Mock(), catalog=Mock())(state)
+        with patch("openchatbi.text2sql.extraction.call_llm_chat_model_with_retry", return_value=self.extracted):
+            assert "speculative_retrieval" not in information_extraction(Mock())(state)
+
+    def test_speculation_cancelled_for_tool_calls(self):
+        """Test the pending searches are cancelled when the extraction ends in a tool call."""
+        tool_call = AIMessage(content="", tool_calls=[{"name": "AskHuman", "args": {"question": "?"}, "id": "1"}])
+        speculation = Mock()
+        with (
+            patch("openchatbi.text2sql.extraction.start_speculative_retrieval", return_value=speculation),
+            patch("openchatbi.text2sql.extraction.call_llm_chat_model_with_retry", return_value=tool_call),
+        ):
+            information_extraction(Mock(), catalog=Mock())(SQLGraphState(messages=[HumanMessage("Show revenue")]))
+
+        speculation.cancel.assert_called_once()
+        speculation.result.assert_not_called()
+
+    def test_speculation_awaits_extracted_terms(self):
+        """Test the extraction waits for the searches of the extracted information only."""
+        speculation = Mock()
+        with (
+            patch("openchatbi.text2sql.extraction.start_speculative_retrieval", return_value=speculation),
+            patch("openchatbi.text2sql.extraction.call_llm_chat_model_with_retry", return_value=self.extracted),
+        ):
+            information_extraction(Mock(), catalog=Mock())(SQLGraphState(messages=[HumanMessage("Show revenue")]))
+
+        speculation.result.assert_called_once_with(
+            {"rewrite_question": "Revenue by country", "dimensions": ["country"]}
+        )
+
+    @pytest.mark.asyncio
+    async def test_async_node(self, retrievers):
+        """Test the async node awaits the speculative retrieval with the LLM call."""
+        state = SQLGraphState(messages=[HumanMessage("Show revenue by country")])
+        with patch(
+            "openchatbi.text2sql.extraction.acall_llm_chat_model_with_retry", new=AsyncMock(return_value=self.extracted)
+        ):
+            result = await information_extraction(Mock(), sync_mode=False, catalog=Mock())(state)
+
+        assert result["speculative_retrieval"]["term_columns"]["country"] == _term_result(["country_col"])
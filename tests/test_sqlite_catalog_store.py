@@ -0,0 +1,177 @@
+"""Tests for the SQLite catalog store."""
+
+import os
+import sqlite3
+
+import pytest
+
+from openchatbi.catalog.factory import create_catalog_store
+from openchatbi.catalog.store.sqlite import SQLiteCatalogStore
+
+
+@pytest.fixture
+def sqlite_store(temp_dir):
+    """Empty SQLite catalog store fixture."""
+    store = SQLiteCatalogStore(str(temp_dir / "sqlite_catalog"), {})
+    yield store
+    store.close()
+
+
+class TestSQLiteCatalogStore:
+    """Test SQLiteCatalogStore functionality."""
+
+    def test_save_and_get_table(self, sqlite_store):
+        """Test saving a table with specific and common columns."""
+        assert not sqlite_store.check_exists()
+        assert sqlite_store.save_table_information(
+            "orders",
+            {"description": "Orders", "selection_rule": ""},
+            [
+                {"column_name": "order_id", "type": "bigint", "category": "dimension", "description": "Order ID"},
+                {"column_name": "status", "type": "varchar", "description": "Status", "is_common": True},
+            ],
+            database="shop",
+        )
+
+        assert sqlite_store.check_exists()
+        assert sqlite_store.get_table_list() == ["shop.orders"]
+        assert sqlite_store.get_table_list("other") == []
+        assert sqlite_store.get_database_list() == ["shop"]
+        assert sqlite_store.get_table_information("shop.orders")["description"] == "Orders"
+        assert sqlite_store.get_table_information("shop.missing") == {}
+
+        columns = sqlite_store.get_column_list("orders", "shop")
+        assert [(column["column_name"], column["is_common"]) for column in columns] == [
+            ("order_id", False),
+            ("status", True),
+        ]
+        assert columns[0]["table_name"] == "orders"
+        assert [column["column_name"] for column in sqlite_store.get_column_list()] == ["status"]
+        with pytest.raises(TypeError):
+            sqlite_store.get_column_views("shop.orders")[0]["description"] = "changed"
+
+    def test_update_existing(self, sqlite_store):
+        """Test existing tables and columns are only changed with update_existing."""
+        column = {"column_name": "id", "type": "bigint", "description": "ID"}
+        sqlite_store.save_table_information("db.t", {"description": "v1"}, [column])
+        sqlite_store.save_table_information("db.t", {"description": "v2"}, [{**column, "description": "new"}])
+        assert sqlite_store.get_table_information("db.t")["description"] == "v1"
+        assert sqlite_store.get_column_list("db.t")[0]["description"] == "ID"
+
+        sqlite_store.save_table_information(
+            "db.t", {"description": "v2"}, [{**column, "description": "new"}], update_existing=True
+        )
+        assert sqlite_store.get_table_information("db.t")["description"] == "v2"
+        assert sqlite_store.get_column_list("db.t")[0]["description"] == "new"
+
+    def test_none_values_saved_empty(self, sqlite_store):
+        """Test None column values are saved as empty strings, as in the CSV catalog."""
+        sqlite_store.save_table_information(
+            "db.t", {"description": "T"}, [{"column_name": "id", "type": "bigint", "dimension_table": None}]
+        )
+
+        assert sqlite_store.get_column_list("db.t")[0]["dimension_table"] == ""
+
+    def test_examples(self, sqlite_store):
+        """Test saving SQL examples replaces the examples of the table."""
+        sqlite_store.save_table_sql_examples("db.t", [{"question": "q1", "answer": "SELECT 1"}])
+        sqlite_store.save_table_sql_examples(
+            "db.t", [{"question": "q2", "answer": "SELECT 2"}, {"question": "q3", "answer": "SELECT 3"}]
+        )
+        sqlite_store.save_table_sql_examples("db.u", [{"question": "q4", "answer": "SELECT 4"}])
+
+        assert sqlite_store.get_sql_examples("t", "db") == [("q2", "SELECT 2", ["db.t"]), ("q3", "SELECT 3", ["db.t"])]
+        assert len(sqlite_store.get_sql_examples()) == 3
+        with pytest.raises(ValueError):
+            sqlite_store.save_table_sql_examples("db.t", [{"question": "", "answer": "SELECT 1"}])
+
+        sqlite_store.save_table_selection_examples([("", []), ("How many orders?", ["db.t", "db.u"])])
+        assert sqlite_store.get_table_selection_examples() == [("How many orders?", ["db.t", "db.u"])]
+
+    def test_batch_commit_and_rollback(self, sqlite_store):
+        """Test a batch is written in one transaction, and rolling back discards it."""
+        column = {"column_name": "id", "type": "bigint"}
+        sqlite_store.begin_batch()
+        sqlite_store.save_table_information("db.a", {}, [column])
+        sqlite_store.rollback()
+        assert sqlite_store.get_table_list() == []
+
+        other = SQLiteCatalogStore(sqlite_store.data_path, {})
+        sqlite_store.begin_batch()
+        sqlite_store.save_table_information("db.a", {}, [column])
+        sqlite_store.save_table_information("db.b", {}, [column])
+        assert other.get_table_list() == []
+        assert sqlite_store.commit() is True
+        assert other.get_table_list() == ["db.a", "db.b"]
+        other.close()
+
+    def test_errors_logged_not_raised(self, sqlite_store):
+        """Test failed saves and reads return False or empty like the file system store."""
+        column = {"column_name": "id", "type": "bigint"}
+        sqlite_store.begin_batch()
+        assert sqlite_store.save_table_information("db.a", {}, [column])
+        assert sqlite_store.save_table_information("db.b", {"owner": object()}, [column]) is False
+        assert sqlite_store.save_table_selection_examples([("Orders?", {object()})]) is False
+        assert sqlite_store.commit() is True
+        assert sqlite_store.get_table_list() == ["db.a"]
+
+        sqlite_store.close()
+        assert sqlite_store.get_table_list() == []
+        assert sqlite_store.get_column_list("db.a") == []
+        assert sqlite_store.get_table_information("db.a") == {}
+        assert sqlite_store.get_catalog_version() is None
+        assert sqlite_store.check_exists() is False
+
+    def test_changes_visible_to_other_connections(self, sqlite_store):
+        """Test cached column records are refreshed after another process changes the catalog."""
+        column = {"column_name": "id", "type": "bigint", "description": "ID"}
+        sqlite_store.save_table_information("db.t", {}, [column])
+        other = SQLiteCatalogStore(sqlite_store.data_path, {})
+        assert other.get_column_list("db.t")[0]["description"] == "ID"
+
+        version = other.get_catalog_version()
+        sqlite_store.save_table_information("db.t", {}, [{**column, "description": "new"}], update_existing=True)
+        assert other.get_catalog_version() > version
+        assert other.get_column_list("db.t")[0]["description"] == "new"
+        assert sqlite3.connect(other.db_file).execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        other.close()
+
+    def test_import_from_file_system(self, mock_catalog_store, sqlite_store):
+        """Test importing the file system catalog gives the same catalog content."""
+        mock_catalog_store.save_table_sql_examples("test.test_table", [{"question": "q", "answer": "SELECT 1"}])
+        mock_catalog_store.save_table_selection_examples([("How many users?", ["test.user_data"])])
+
+        assert sqlite_store.import_catalog(mock_catalog_store) is True
+        assert sqlite_store.import_catalog(mock_catalog_store) is False
+
+        assert sqlite_store.get_table_list() == mock_catalog_store.get_table_list()
+        assert sqlite_store.get_column_list() == mock_catalog_store.get_column_list()
+        for table in mock_catalog_store.get_table_list():
+            assert sqlite_store.get_column_list(table) == mock_catalog_store.get_column_list(table)
+            assert sqlite_store.get_table_information(table) == mock_catalog_store.get_table_information(table)
+        assert sqlite_store.get_sql_examples() == mock_catalog_store.get_sql_examples()
+        assert sqlite_store.get_table_selection_examples() == mock_catalog_store.get_table_selection_examples()
+
+    def test_factory_migrates_catalog_files(self, mock_catalog_store):
+        """Test the sqlite store type imports catalog files from the data path on first start."""
+        store = create_catalog_store("sqlite", auto_load=False, data_path=mock_catalog_store.data_path)
+
+        assert isinstance(store, SQLiteCatalogStore)
+        assert store.get_table_list() == mock_catalog_store.get_table_list()
+        store.close()
+
+    def test_factory_index_directory(self, mock_catalog_store, temp_dir):
+        """Test the index snapshots are kept out of the data path, in the configured directory."""
+        store = create_catalog_store("sqlite", auto_load=False, data_path=mock_catalog_store.data_path)
+        configured = create_catalog_store(
+            "sqlite", auto_load=False, data_path=mock_catalog_store.data_path, index_dir=str(temp_dir / "index")
+        )
+        disabled = create_catalog_store(
+            "sqlite", auto_load=False, data_path=mock_catalog_store.data_path, index_dir=None
+        )
+
+        assert store.get_index_directory() == os.path.abspath(".index")
+        assert configured.get_index_directory() == str(temp_dir / "index")
+        assert disabled.get_index_directory() is None
+        for catalog in (store, configured, disabled):
+            catalog.close()
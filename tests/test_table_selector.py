@@ -0,0 +1,173 @@
+"""Tests for the heuristic table selector."""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from openchatbi.catalog.schema_retrival import TableColumnIndex
+from openchatbi.graph_state import SQLGraphState
+from openchatbi.text2sql.schema_linking import schema_linking
+from openchatbi.text2sql.table_selector import (
+    HeuristicTableSelector,
+    create_table_selector,
+    evaluate_table_selector,
+    score_candidate_tables,
+)
+
+COLUMNS = {
+    "country": {"column_name": "country", "category": "dimension"},
+    "revenue": {"column_name": "revenue", "category": "metric"},
+    "clicks": {"column_name": "clicks", "category": "metric"},
+    "user_id": {"column_name": "user_id", "category": "dimension"},
+}
+
+
+def _candidates(tables: dict[str, list[str]], table_info: dict | None = None) -> dict:
+    return {table: (table_info or {}, [COLUMNS[name] for name in columns]) for table, columns in tables.items()}
+
+
+class TestScoreCandidateTables:
+    """Test scoring the candidate tables."""
+
+    def test_covering_table_scores_first(self):
+        """Test the table with the most relevant columns and both categories ranks first."""
+        scores = score_candidate_tables(
+            _candidates({"users": ["country", "user_id"], "sales": ["country", "revenue"]}),
+            ["revenue", "country", "user_id"],
+            dimensions=["country"],
+            metrics=["revenue"],
+        )
+
+        assert [score.table for score in scores] == ["sales", "users"]
+        assert scores[0].coverage == pytest.approx((1 + 1 / 2) / (1 + 1 / 2 + 1 / 3))
+        assert scores[0].category == 1.0
+        assert scores[1].category == 0.5
+        assert scores[0].columns == ["country", "revenue"]
+
+    def test_examples_and_time(self):
+        """Test similar examples and unknown start times move the score."""
+        scores = score_candidate_tables(
+            {
+                "daily": ({"start_time": "2024-01-01 00:00:00"}, [COLUMNS["revenue"]]),
+                "hourly": ({}, [COLUMNS["revenue"]]),
+            },
+            ["revenue"],
+            similar_examples={"revenue last week": ["hourly"], "revenue by day": ["hourly", "daily"]},
+            start_time="2024-06-01 00:00:00",
+        )
+
+        by_table = {score.table: score for score in scores}
+        assert by_table["hourly"].examples == 1.0
+        assert by_table["daily"].examples == 0.5
+        assert by_table["daily"].time == 1.0
+        assert by_table["hourly"].time == 0.5
+
+
+class TestHeuristicTableSelector:
+    """Test selecting the table without the LLM."""
+
+    def test_single_candidate(self):
+        """Test the only candidate is selected."""
+        selector = HeuristicTableSelector()
+
+        result = selector.select(_candidates({"sales": ["revenue"]}), ["revenue", "country"])
+
+        assert result == {"tables": [{"table": "sales", "columns": ["revenue"]}]}
+        assert selector.stats == {"heuristic": 1, "llm": 0}
+
+    def test_clear_winner(self):
+        """Test a covering candidate well ahead of the next is selected."""
+        selector = HeuristicTableSelector()
+
+        result = selector.select(
+            _candidates({"sales": ["revenue", "country"], "users": ["user_id"]}),
+            ["revenue", "country", "user_id"],
+            dimensions=["country"],
+            metrics=["revenue"],
+        )
+
+        assert result["tables"][0]["table"] == "sales"
+
+    def test_ambiguous_candidates_defer_to_llm(self):
+        """Test close candidates and candidates needing a join are left to the LLM."""
+        selector = HeuristicTableSelector()
+
+        close = selector.select(_candidates({"sales": ["revenue"], "orders": ["revenue"]}), ["revenue"])
+        join = selector.select(
+            _candidates({"sales": ["revenue"], "users": ["country"]}), ["revenue", "country"], metrics=["revenue"]
+        )
+
+        assert close is None
+        assert join is None
+        assert selector.stats == {"heuristic": 0, "llm": 2}
+        assert selector.select({}, []) is None
+        assert selector.avoided_rate == 0.0
+
+    def test_create_table_selector(self):
+        """Test the selector is created from the config, or disabled."""
+        selector = create_table_selector({"enabled": True, "min_margin": 0.3})
+
+        assert selector.min_margin == 0.3
+        assert selector.min_coverage == 0.8
+        assert create_table_selector({}) is None
+        assert create_table_selector({"enabled": False}) is None
+
+
+class TestEvaluateTableSelector:
+    """Test evaluating the selector on labelled questions."""
+
+    def test_avoided_and_agreement_rates(self):
+        """Test the evaluation counts decided selections and those matching the labels."""
+        cases = [
+            {
+                "related_table_column_dict": _candidates({"sales": ["revenue"]}),
+                "relevant_columns": ["revenue"],
+                "expected": ["sales"],
+            },
+            {
+                "related_table_column_dict": _candidates({"users": ["country"]}),
+                "relevant_columns": ["country"],
+                "expected": ["geo"],
+            },
+            {
+                "related_table_column_dict": _candidates({"sales": ["revenue"], "orders": ["revenue"]}),
+                "relevant_columns": ["revenue"],
+                "expected": ["orders"],
+            },
+        ]
+
+        result = evaluate_table_selector(HeuristicTableSelector(), cases)
+
+        assert result == {"cases": 3, "decided": 2, "avoided_rate": 2 / 3, "agreed": 1, "agreement": 0.5}
+
+
+class TestSchemaLinkingWithSelector:
+    """Test schema linking with the heuristic table selector."""
+
+    @pytest.fixture(autouse=True)
+    def patch_retrieval(self):
+        """Link "revenue" to the sales table only."""
+        retriever = Mock(col_dict=COLUMNS, table_index=TableColumnIndex({"revenue": ["sales"]}))
+        with (
+            patch("openchatbi.text2sql.schema_linking.get_column_retriever", return_value=retriever),
+            patch("openchatbi.text2sql.schema_linking.get_relevant_columns", return_value=["revenue"]),
+            patch("openchatbi.text2sql.schema_linking.table_selection_retriever") as examples,
+        ):
+            examples.invoke.return_value = []
+            yield
+
+    def test_llm_skipped_for_single_candidate(self):
+        """Test the LLM is not called when the selector decides."""
+        llm = Mock()
+        catalog = Mock()
+        catalog.get_table_information.return_value = {"description": "Sales"}
+        state = SQLGraphState(
+            messages=[],
+            rewrite_question="Total revenue",
+            info_entities={"keywords": ["revenue"], "metrics": ["revenue"]},
+        )
+
+        result = schema_linking(llm, catalog, table_selector=HeuristicTableSelector())(state)
+
+        assert result == {"tables": [{"table": "sales", "columns": ["revenue"]}], "relevant_columns": ["revenue"]}
+        llm.invoke.assert_not_called()
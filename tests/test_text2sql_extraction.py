@@ -2,8 +2,9 @@
 
 import json
 from datetime import date
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 
+import pytest
 from langchain_core.messages import AIMessage, HumanMessage
 
 from openchatbi.graph_state import SQLGraphState
@@ -97,6 +98,22 @@ class TestText2SQLExtraction:
         assert "info_entities" in result
         assert result["rewrite_question"] == "What is the total revenue by region?"
 
+    @pytest.mark.asyncio
+    async def test_information_extraction_async(self):
+        """Test the async extraction node awaits the LLM."""
+        extracted_info = {"rewrite_question": "What is the total revenue by region?", "keywords": ["revenue"]}
+        mock_response = AIMessage(content=json.dumps(extracted_info))
+
+        with patch(
+            "openchatbi.text2sql.extraction.acall_llm_chat_model_with_retry", new=AsyncMock(return_value=mock_response)
+        ) as mock_call:
+            extraction_func = information_extraction(Mock(), sync_mode=False)
+            result = await extraction_func(SQLGraphState(messages=[HumanMessage(content="Show me revenue by region")]))
+
+        mock_call.assert_awaited_once()
+        assert result["rewrite_question"] == "What is the total revenue by region?"
+        assert result["info_entities"] == extracted_info
+
     def test_information_extraction_empty_response(self):
         """Test handling empty extraction response."""
         mock_llm = Mock()
@@ -1,12 +1,24 @@
 """Tests for text2sql SQL generation functionality."""
 
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 
+import pandas as pd
+import pyarrow as pa
 import pytest
+from langchain_core.documents import Document
 from langchain_core.messages import AIMessage
+from sqlalchemy import create_engine, text
 
 from openchatbi.graph_state import SQLGraphState
-from openchatbi.text2sql.generate_sql import create_sql_nodes, should_execute_sql, should_retry_sql
+from openchatbi.text2sql.generate_sql import (
+    DEFAULT_SQL_RESULT_LIMITS,
+    create_sql_nodes,
+    fetch_sql_result,
+    should_execute_sql,
+    should_retry_sql,
+)
+from openchatbi.text2sql.result_cache import SQLResultCache
+from openchatbi.text2sql.result_store import ResultStore
 
 
 class TestText2SQLGenerateSQL:
@@ -41,7 +53,7 @@ class TestText2SQLGenerateSQL:
         mock_engine = Mock()
         mock_connection = Mock()
         mock_result = Mock()
-        mock_result.fetchall.return_value = [("1", "John"), ("2", "Jane")]
+        mock_result.fetchmany.side_effect = [[("1", "John"), ("2", "Jane")], []]
         mock_result.keys.return_value = ["id", "name"]
         mock_connection.execute.return_value = mock_result
 
@@ -183,6 +195,55 @@ class TestText2SQLGenerateSQL:
         assert "sql_retry_count" in result
         assert result["sql_retry_count"] == 2
 
+    @pytest.mark.asyncio
+    async def test_async_nodes_call_llm_with_ainvoke(self, mock_llm, mock_catalog):
+        """Test the async generation nodes await the LLM instead of blocking on invoke."""
+        mock_llm.ainvoke = AsyncMock(return_value=AIMessage(content="```sql\nSELECT id FROM users\n```"))
+        generate_node, _, regenerate_node, _ = create_sql_nodes(mock_llm, mock_catalog, "presto", sync_mode=False)
+        state = SQLGraphState(
+            messages=[],
+            rewrite_question="Show all users",
+            tables=[{"table": "users", "columns": []}],
+            previous_sql_errors=[{"sql": "SELECT * FRON users", "error": "Syntax error: FRON"}],
+        )
+
+        with patch("openchatbi.text2sql.generate_sql.sql_example_retriever") as mock_retriever:
+            mock_retriever.invoke.return_value = []
+            generated = await generate_node(state)
+            regenerated = await regenerate_node(state)
+
+        assert generated["sql"] == regenerated["sql"] == "SELECT id FROM users"
+        assert regenerated["sql_retry_count"] == 1
+        assert "Syntax error: FRON" in mock_llm.ainvoke.call_args.args[0][-1].content
+        mock_llm.invoke.assert_not_called()
+
+    def test_schema_prompt_reused_until_catalog_changes(self, mock_llm, mock_catalog):
+        """Test the schema prompt is rendered once per table set and catalog version."""
+        mock_catalog.get_catalog_version.return_value = 1
+        generate_node, _, regenerate_node, _ = create_sql_nodes(mock_llm, mock_catalog, "presto")
+        state = SQLGraphState(
+            messages=[],
+            question="Show all users",
+            rewrite_question="Show all users",
+            tables=[{"table": "users", "columns": []}],
+            previous_sql_errors=[{"sql": "SELECT", "error": "Syntax error", "error_type": "SQL syntax error"}],
+            sql_retry_count=1,
+        )
+
+        with patch("openchatbi.text2sql.generate_sql.sql_example_retriever") as mock_retriever:
+            mock_retriever.invoke.return_value = []
+            generate_node(state)
+            regenerate_node(state)
+            assert mock_catalog.get_column_list.call_count == 1
+
+            mock_catalog.get_catalog_version.return_value = 2
+            generate_node(state)
+            assert mock_catalog.get_column_list.call_count == 2
+
+        system_prompts = [call.args[0][0].content for call in mock_llm.invoke.call_args_list]
+        assert "## Table users" in system_prompts[0]
+        assert system_prompts[0] == system_prompts[2]
+
     def test_should_retry_sql_success(self):
         """Test retry decision with successful execution."""
         # Import the constant from the module
@@ -257,6 +318,35 @@ class TestText2SQLGenerateSQL:
 
         assert "sql" in result
 
+    def test_sql_generation_merges_speculative_examples(self, mock_llm, mock_catalog):
+        """Test SQL examples retrieved with the raw question are added after those of the rewritten question."""
+        generate_node, _, _, _ = create_sql_nodes(mock_llm, mock_catalog, "presto")
+        state = SQLGraphState(
+            messages=[],
+            rewrite_question="Show all users",
+            tables=[{"table": "users", "columns": []}],
+            speculative_retrieval={"sql_examples": ["list orders", "count users", "list users"]},
+        )
+        examples = {
+            "list orders": ("SELECT * FROM orders", ["orders"]),
+            "count users": ("SELECT 1", ["users"]),
+            "list users": ("SELECT * FROM users", ["users"]),
+        }
+
+        with (
+            patch("openchatbi.text2sql.generate_sql.sql_example_retriever") as mock_retriever,
+            patch("openchatbi.text2sql.generate_sql.sql_example_dicts", examples),
+            patch("openchatbi.text2sql.generate_sql.get_text2sql_dialect_prompt_template", return_value="[examples]"),
+        ):
+            mock_retriever.invoke.return_value = [Document(page_content="list users")]
+            generate_node(state)
+            mock_retriever.invoke.assert_called_once_with("Show all users")
+
+        system_prompt = mock_llm.invoke.call_args.args[0][0].content
+        assert system_prompt.count("Q: list users") == 1
+        assert system_prompt.index("Q: list users") < system_prompt.index("Q: count users")
+        assert "list orders" not in system_prompt
+
     def test_sql_error_handling_database_error(self, mock_llm, mock_catalog):
         """Test handling of database connection errors."""
         _, execute_node, _, _ = create_sql_nodes(mock_llm, mock_catalog, "presto")
@@ -302,3 +392,112 @@ class TestText2SQLGenerateSQL:
         from openchatbi.constants import SQL_NA
 
         assert result["sql_execution_result"] == SQL_NA
+
+
+class TestFetchSqlResult:
+    """Test bounded fetching of SQL results."""
+
+    @pytest.fixture
+    def engine(self, temp_dir):
+        """SQLite engine with a 2500 row table."""
+        engine = create_engine(f"sqlite:///{temp_dir / 'result.db'}")
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE events (id INTEGER, name TEXT)"))
+            connection.execute(
+                text("INSERT INTO events VALUES (:id, :name)"), [{"id": i, "name": f"event {i}"} for i in range(2500)]
+            )
+        return engine
+
+    def _fetch(self, engine, sql, **limits):
+        with engine.connect() as connection:
+            return fetch_sql_result(connection, sql, {**DEFAULT_SQL_RESULT_LIMITS, "fetch_size": 100, **limits})
+
+    def test_complete_result(self, engine):
+        """Test a result within the limits is returned as a whole."""
+        df, csv_data, result_info = self._fetch(engine, "SELECT * FROM events WHERE id < 10")
+
+        assert csv_data == pd.DataFrame({"id": range(10), "name": [f"event {i}" for i in range(10)]}).to_csv(
+            index=False
+        )
+        assert result_info == {"preview_rows": 10, "total_rows": 10, "total_rows_exact": True, "truncated": False}
+
+    def test_row_and_byte_caps(self, engine):
+        """Test the preview is cut at the row cap and at the byte cap, while all rows are counted."""
+        df, csv_data, result_info = self._fetch(engine, "SELECT * FROM events", max_rows=50)
+        assert len(df) == 50 and len(csv_data.splitlines()) == 51
+        assert result_info == {"preview_rows": 50, "total_rows": 2500, "total_rows_exact": True, "truncated": True}
+
+        df, csv_data, result_info = self._fetch(engine, "SELECT * FROM events", max_bytes=1000)
+        assert len(csv_data) <= 1000
+        assert 0 < result_info["preview_rows"] == len(df) < 100
+        assert result_info["total_rows"] == 2500
+
+    def test_approximate_total(self, engine):
+        """Test counting stops at the count limit."""
+        _, _, result_info = self._fetch(engine, "SELECT * FROM events", max_rows=10, count_limit=1000)
+
+        assert result_info == {"preview_rows": 10, "total_rows": 1000, "total_rows_exact": False, "truncated": True}
+
+    def test_execute_node_reports_truncation(self, engine):
+        """Test the SQL node tells the LLM the result is a preview."""
+        catalog = Mock()
+        catalog.get_sql_engine.return_value = engine
+        _, execute_node, _, _ = create_sql_nodes(Mock(), catalog, "sqlite", result_limits={"max_rows": 20})
+
+        result = execute_node(SQLGraphState(messages=[], sql="SELECT * FROM events"))
+
+        assert result["result_info"]["preview_rows"] == 20
+        assert "SQL Result (first 20 of 2500 rows):" in result["messages"][0].content
+        assert result["schema_info"]["row_count"] == 20
+
+    def test_execute_node_stores_full_result(self, engine):
+        """Test the full result is stored as an Arrow table and referenced from the state by handle."""
+        catalog = Mock()
+        catalog.get_sql_engine.return_value = engine
+        store = ResultStore()
+        _, execute_node, _, _ = create_sql_nodes(
+            Mock(), catalog, "sqlite", result_limits={"max_rows": 20}, result_store=store
+        )
+
+        result = execute_node(SQLGraphState(messages=[], sql="SELECT * FROM events"))
+
+        table = store.get_table(result["result_handle"])
+        assert table.num_rows == 2500 == result["result_info"]["stored_rows"]
+        assert table.schema.field("id").type == pa.int64()
+        assert len(result["data"].splitlines()) == 21
+        assert "result_handle" not in result["result_info"]
+
+    @pytest.mark.asyncio
+    async def test_async_execute_node(self, engine):
+        """Test the async SQL node runs the query off the event loop with the same result as the sync node."""
+        catalog = Mock()
+        catalog.get_sql_engine.return_value = engine
+        _, execute_node, _, _ = create_sql_nodes(
+            Mock(), catalog, "sqlite", result_limits={"max_rows": 20}, sync_mode=False
+        )
+
+        result = await execute_node(SQLGraphState(messages=[], sql="SELECT * FROM events"))
+        failed = await execute_node(SQLGraphState(messages=[], sql="SELECT * FROM missing_table"))
+
+        assert "SQL Result (first 20 of 2500 rows):" in result["messages"][0].content
+        assert "no such table: missing_table" in failed["messages"][0].content
+
+    def test_execute_node_serves_cached_result(self, engine):
+        """Test an equivalent query is answered from the result cache without querying the database."""
+        catalog = Mock()
+        catalog.get_sql_engine.return_value = engine
+        store = ResultStore()
+        _, execute_node, _, _ = create_sql_nodes(
+            Mock(), catalog, "sqlite", result_store=store, result_cache=SQLResultCache()
+        )
+
+        first = execute_node(SQLGraphState(messages=[], sql="SELECT * FROM events WHERE id < 5"))
+        with patch.object(engine, "connect", side_effect=AssertionError("database queried")):
+            second = execute_node(SQLGraphState(messages=[], sql="select *\nfrom EVENTS where id < 5 -- again"))
+
+        assert second["data"] == first["data"]
+        assert second["result_handle"] == first["result_handle"]
+        assert second["schema_info"] == first["schema_info"]
+        store.clear()
+        third = execute_node(SQLGraphState(messages=[], sql="SELECT * FROM events WHERE id < 5"))
+        assert third["result_handle"] == "" and third["data"] == first["data"]
@@ -1,17 +1,31 @@
 """Tests for text2sql schema linking functionality."""
 
-from unittest.mock import Mock, patch
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock, PropertyMock, patch
 
 import pytest
 from langchain_core.messages import AIMessage
 
+from openchatbi.catalog.schema_retrival import TableColumnIndex
 from openchatbi.graph_state import SQLGraphState
-from openchatbi.text2sql.schema_linking import schema_linking
+from openchatbi.text2sql.schema_linking import get_related_tables_and_columns, schema_linking
+
+# Column retriever stub returned by get_column_retriever, tests patch its col_dict and column_tables_mapping
+column_retriever = Mock()
+type(column_retriever).table_index = PropertyMock(
+    side_effect=lambda: TableColumnIndex(column_retriever.column_tables_mapping)
+)
 
 
 class TestText2SQLSchemaLinking:
     """Test text2sql schema linking functionality."""
 
+    @pytest.fixture(autouse=True)
+    def patch_column_retriever(self):
+        """Route schema linking to the column retriever stub."""
+        with patch("openchatbi.text2sql.schema_linking.get_column_retriever", return_value=column_retriever):
+            yield
+
     @pytest.fixture
     def mock_llm(self):
         """Mock LLM for testing."""
@@ -40,12 +54,14 @@ class TestText2SQLSchemaLinking:
         with patch("openchatbi.text2sql.schema_linking.get_relevant_columns") as mock_get_columns:
             mock_get_columns.return_value = ["user_id", "name", "email"]
 
-            with patch(
-                "openchatbi.text2sql.schema_linking.column_tables_mapping",
+            with patch.object(
+                column_retriever,
+                "column_tables_mapping",
                 {"user_id": ["users", "profiles"], "name": ["users"], "email": ["users", "contacts"]},
             ):
-                with patch(
-                    "openchatbi.text2sql.schema_linking.col_dict",
+                with patch.object(
+                    column_retriever,
+                    "col_dict",
                     {
                         "user_id": {
                             "column_name": "user_id",
@@ -113,11 +129,10 @@ class TestText2SQLSchemaLinking:
         with patch("openchatbi.text2sql.schema_linking.get_relevant_columns") as mock_get_columns:
             mock_get_columns.return_value = ["user_id", "revenue"]
 
-            with patch(
-                "openchatbi.text2sql.schema_linking.column_tables_mapping", {"user_id": ["users"], "revenue": ["sales"]}
-            ):
-                with patch(
-                    "openchatbi.text2sql.schema_linking.col_dict",
+            with patch.object(column_retriever, "column_tables_mapping", {"user_id": ["users"], "revenue": ["sales"]}):
+                with patch.object(
+                    column_retriever,
+                    "col_dict",
                     {
                         "user_id": {
                             "column_name": "user_id",
@@ -170,9 +185,10 @@ class TestText2SQLSchemaLinking:
         with patch("openchatbi.text2sql.schema_linking.get_relevant_columns") as mock_get_columns:
             mock_get_columns.return_value = ["user_id"]
 
-            with patch("openchatbi.text2sql.schema_linking.column_tables_mapping", {"user_id": ["users"]}):
-                with patch(
-                    "openchatbi.text2sql.schema_linking.col_dict",
+            with patch.object(column_retriever, "column_tables_mapping", {"user_id": ["users"]}):
+                with patch.object(
+                    column_retriever,
+                    "col_dict",
                     {
                         "user_id": {
                             "column_name": "user_id",
@@ -209,9 +225,10 @@ class TestText2SQLSchemaLinking:
         with patch("openchatbi.text2sql.schema_linking.get_relevant_columns") as mock_get_columns:
             mock_get_columns.return_value = ["user_id"]
 
-            with patch("openchatbi.text2sql.schema_linking.column_tables_mapping", {"user_id": ["users"]}):
-                with patch(
-                    "openchatbi.text2sql.schema_linking.col_dict",
+            with patch.object(column_retriever, "column_tables_mapping", {"user_id": ["users"]}):
+                with patch.object(
+                    column_retriever,
+                    "col_dict",
                     {
                         "user_id": {
                             "column_name": "user_id",
@@ -258,9 +275,10 @@ class TestText2SQLSchemaLinking:
         with patch("openchatbi.text2sql.schema_linking.get_relevant_columns") as mock_get_columns:
             mock_get_columns.return_value = ["user_id"]
 
-            with patch("openchatbi.text2sql.schema_linking.column_tables_mapping", {"user_id": ["users"]}):
-                with patch(
-                    "openchatbi.text2sql.schema_linking.col_dict",
+            with patch.object(column_retriever, "column_tables_mapping", {"user_id": ["users"]}):
+                with patch.object(
+                    column_retriever,
+                    "col_dict",
                     {
                         "user_id": {
                             "column_name": "user_id",
@@ -303,9 +321,10 @@ class TestText2SQLSchemaLinking:
         with patch("openchatbi.text2sql.schema_linking.get_relevant_columns") as mock_get_columns:
             mock_get_columns.return_value = ["user_id"]
 
-            with patch("openchatbi.text2sql.schema_linking.column_tables_mapping", {"user_id": ["users"]}):
-                with patch(
-                    "openchatbi.text2sql.schema_linking.col_dict",
+            with patch.object(column_retriever, "column_tables_mapping", {"user_id": ["users"]}):
+                with patch.object(
+                    column_retriever,
+                    "col_dict",
                     {
                         "user_id": {
                             "column_name": "user_id",
@@ -337,9 +356,10 @@ class TestText2SQLSchemaLinking:
         with patch("openchatbi.text2sql.schema_linking.get_relevant_columns") as mock_get_columns:
             mock_get_columns.return_value = ["user_id"]
 
-            with patch("openchatbi.text2sql.schema_linking.column_tables_mapping", {"user_id": ["users"]}):
-                with patch(
-                    "openchatbi.text2sql.schema_linking.col_dict",
+            with patch.object(column_retriever, "column_tables_mapping", {"user_id": ["users"]}):
+                with patch.object(
+                    column_retriever,
+                    "col_dict",
                     {
                         "user_id": {
                             "column_name": "user_id",
@@ -370,3 +390,145 @@ class TestText2SQLSchemaLinking:
 
         # Should return empty dict after max retries
         assert result == {}
+
+    @pytest.mark.asyncio
+    async def test_select_table_async_retries_with_ainvoke(self, mock_llm, mock_catalog):
+        """Test the async node awaits the LLM and asks again after an invalid selection."""
+        mock_llm.ainvoke = AsyncMock(
+            side_effect=[
+                AIMessage(content='{"tables": [{"table": "invalid_table"}]}'),
+                AIMessage(content='{"tables": [{"table": "users"}]}'),
+            ]
+        )
+        col_dict = {
+            "user_id": {
+                "column_name": "user_id",
+                "category": "dimension",
+                "display_name": "User ID",
+                "description": "Unique user identifier",
+            }
+        }
+        with (
+            patch("openchatbi.text2sql.schema_linking.get_relevant_columns", return_value=["user_id"]),
+            patch.object(column_retriever, "column_tables_mapping", {"user_id": ["users"]}),
+            patch.object(column_retriever, "col_dict", col_dict),
+            patch("openchatbi.text2sql.schema_linking.table_selection_retriever") as mock_retriever,
+            patch("openchatbi.text2sql.schema_linking.table_selection_example_dict", {}),
+        ):
+            mock_retriever.invoke.return_value = []
+            select_func = schema_linking(mock_llm, mock_catalog, sync_mode=False)
+
+            result = await select_func(
+                SQLGraphState(
+                    messages=[],
+                    rewrite_question="Show user info",
+                    info_entities={"keywords": ["user"], "dimensions": ["user_id"], "metrics": []},
+                )
+            )
+
+        assert result == {"tables": [{"table": "users"}], "relevant_columns": ["user_id"]}
+        assert mock_llm.ainvoke.await_count == 2
+        assert "invalid_table is not valid" in mock_llm.ainvoke.call_args.args[0][-1].content
+        mock_llm.invoke.assert_not_called()
+
+    def test_select_table_reuses_speculative_retrieval(self, mock_llm, mock_catalog):
+        """Test the columns and examples retrieved with the raw question are reused."""
+        col_dict = {
+            "user_id": {
+                "column_name": "user_id",
+                "category": "dimension",
+                "display_name": "User ID",
+                "description": "Unique user identifier",
+            }
+        }
+        speculation = {
+            "question": "show users",
+            "term_columns": {"user": {"dimension": ["user_id"], "metric": []}},
+            "table_selection_examples": ["how many users"],
+        }
+        with (
+            patch("openchatbi.text2sql.schema_linking.get_relevant_columns", return_value=["user_id"]) as mock_columns,
+            patch.object(column_retriever, "column_tables_mapping", {"user_id": ["users"]}),
+            patch.object(column_retriever, "col_dict", col_dict),
+            patch("openchatbi.text2sql.schema_linking.table_selection_retriever") as mock_retriever,
+            patch("openchatbi.text2sql.schema_linking.table_selection_example_dict", {"how many users": ["users"]}),
+        ):
+            result = schema_linking(mock_llm, mock_catalog)(
+                SQLGraphState(
+                    messages=[],
+                    rewrite_question="Show user info",
+                    info_entities={"keywords": ["user"], "dimensions": ["user"], "metrics": []},
+                    speculative_retrieval=speculation,
+                )
+            )
+
+        assert result == {
+            "tables": [{"table": "users", "reason": "Contains user data"}],
+            "relevant_columns": ["user_id"],
+        }
+        assert mock_columns.call_args.kwargs["term_columns"] == {"user": {"dimension": ["user_id"], "metric": []}}
+        mock_retriever.invoke.assert_not_called()
+        assert "how many users" in mock_llm.invoke.call_args.args[0][0].content
+
+
+class TestGetRelatedTablesAndColumns:
+    """Test building the candidate tables from the table index."""
+
+    col_dict = {
+        name: {"column_name": name, "category": "dimension"} for name in ("user_id", "revenue", "country", "clicks")
+    }
+
+    @pytest.fixture(autouse=True)
+    def patch_retrieval(self):
+        """Index three tables, the orders table starting in June 2024."""
+        retriever = Mock(
+            col_dict=self.col_dict,
+            table_index=TableColumnIndex(
+                {
+                    "user_id": ["users", "orders"],
+                    "revenue": ["orders", "sales"],
+                    "country": ["users"],
+                    "clicks": ["ads"],
+                },
+                {"orders": datetime(2024, 6, 1)},
+            ),
+        )
+        with (
+            patch("openchatbi.text2sql.schema_linking.get_column_retriever", return_value=retriever),
+            patch(
+                "openchatbi.text2sql.schema_linking.get_relevant_columns",
+                return_value=["revenue", "country", "user_id"],
+            ),
+        ):
+            yield
+
+    def test_candidate_tables_and_columns(self):
+        """Test candidates keep the relevance order of their columns, sharing the catalog column views."""
+        catalog = Mock()
+        catalog.get_table_information.side_effect = lambda table: {"description": table}
+
+        related, relevant_columns = get_related_tables_and_columns(catalog, ["kw"], [], [])
+
+        assert relevant_columns == ["revenue", "country", "user_id"]
+        assert {table: [c["column_name"] for c in columns] for table, (_, columns) in related.items()} == {
+            "users": ["country", "user_id"],
+            "orders": ["revenue", "user_id"],
+            "sales": ["revenue"],
+        }
+        assert related["sales"][1][0] is self.col_dict["revenue"]
+
+    def test_time_and_invalid_table_filters(self):
+        """Test tables starting after the question start time and invalid tables are left out."""
+        catalog = Mock()
+        catalog.get_table_information.side_effect = lambda table: {"description": table}
+
+        related, _ = get_related_tables_and_columns(
+            catalog, ["kw"], [], [], start_time="2024-03-01 00:00:00", invalid_table=["sales"]
+        )
+
+        assert list(related) == ["users"]
+        assert (
+            related
+            == get_related_tables_and_columns(catalog, ["kw"], [], [], "2024-07-01 00:00:00", ["sales", "orders"])[0]
+        )
+        catalog.get_table_information.assert_called_with("users")
@@ -4,8 +4,9 @@ import io
 from unittest.mock import patch
 
 import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
 
-from openchatbi.utils import log
+from openchatbi.utils import create_vector_db, log
 
 
 class TestUtilityFunctions:
@@ -176,3 +177,57 @@ class TestUtilityFunctions:
         output = captured_output.getvalue()
         # Should handle concurrent access gracefully
         assert len(output) > 0
+
+
+class TestCreateVectorDb:
+    """Test incremental sync of Chroma collections."""
+
+    class CountingEmbeddings(DeterministicFakeEmbedding):
+        calls: list = []
+        model: str = "fake"
+
+        def embed_documents(self, texts):
+            self.calls.append(list(texts))
+            return super().embed_documents(texts)
+
+    def test_sync_only_embeds_changes(self, temp_dir):
+        """Test a reused collection only embeds added or changed texts and deletes removed ones."""
+        embedding = self.CountingEmbeddings(size=8, calls=[])
+        texts = ["user_id: User ID", "revenue: Revenue", "country: Country"]
+        metadatas = [{"column_name": "user_id"}, {"column_name": "revenue"}, {"column_name": "country"}]
+        kwargs = {"collection_name": "columns", "persist_directory": str(temp_dir / "chroma"), "batch_size": 2}
+
+        create_vector_db(texts, embedding, metadatas=metadatas, **kwargs)
+        assert embedding.calls == [texts[:2], texts[2:]]
+
+        embedding.calls.clear()
+        create_vector_db(texts, embedding, metadatas=metadatas, **kwargs)
+        assert embedding.calls == []
+
+        new_texts = ["user_id: User ID", "revenue: Revenue (USD)", "clicks: Clicks"]
+        new_metadatas = [{"column_name": "user_id", "category": "dimension"}, metadatas[1], {"column_name": "clicks"}]
+        db = create_vector_db(new_texts, embedding, metadatas=new_metadatas, **kwargs)
+
+        assert sorted(embedding.calls[0] + embedding.calls[1]) == sorted(new_texts)
+        stored = db.get(include=["documents", "metadatas"])
+        assert sorted(stored["documents"]) == sorted(new_texts)
+        assert {meta["column_name"] for meta in stored["metadatas"]} == {"user_id", "revenue", "clicks"}
+        assert all("content_hash" in meta for meta in stored["metadatas"])
+
+    def test_embedding_errors_keep_collection(self, temp_dir):
+        """Test an embedding error is raised without resetting the collection, and a new model re-embeds."""
+        texts = ["user_id: User ID", "revenue: Revenue"]
+        kwargs = {"collection_name": "columns", "persist_directory": str(temp_dir / "chroma")}
+        create_vector_db(texts, self.CountingEmbeddings(size=8, calls=[]), **kwargs)
+
+        failing = self.CountingEmbeddings(size=8, calls=[])
+        with patch.object(type(failing), "embed_documents", side_effect=RuntimeError("429 Too Many Requests")):
+            with pytest.raises(RuntimeError):
+                create_vector_db(texts + ["clicks: Clicks"], failing, **kwargs)
+        with patch("openchatbi.utils.sync_vector_db", return_value=(0, 0)):
+            assert len(create_vector_db(texts, failing, **kwargs).get()["ids"]) == 2
+
+        other_model = self.CountingEmbeddings(size=8, calls=[], model="other")
+        db = create_vector_db(texts, other_model, **kwargs)
+        assert len(db.get()["ids"]) == 2
+        assert sorted(other_model.calls[0]) == sorted(texts)